@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: timed hot-path scenarios on synthetic books.
+
+For each book size a synthetic database is generated (see synthetic_book.py)
+and every scenario is run --repeat times against it:
+
+    dashboard_load          DashboardWidget.refresh()
+    installment_filter      InstallmentWidget with next-month, overdue and search filters
+    calendar_month_switch   Calendar next month + selecting its first day
+    overdue_sweep           Flagging past-due pending installments as overdue
+    report_export           Installment report DataFrame written to CSV
+    reminder_dispatch       process_pending_reminders() with stubbed SMS/notification senders
+    portfolio_analytics     Aging, collection rates, cash-in and roll rates from a cold cache
+
+Results are written as JSON (one file per invocation) so runs of different
+releases can be compared; a summary table is printed as well. With
+--compare, medians are checked against an earlier results file and the
+exit status is non-zero if any scenario got slower than --tolerance allows.
+
+Usage:
+    python benchmarks/bench_hot_paths.py                          # 10k and 100k
+    python benchmarks/bench_hot_paths.py --sizes 10000 100000 1000000 --repeat 5
+    python benchmarks/bench_hot_paths.py --sizes 10000 --scenarios overdue_sweep report_export
+    python benchmarks/bench_hot_paths.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from src.models import User, Installment, Reminder, session_scope
+from src.utils.query_stats import QueryStats
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_book import generate_book
+
+RESULTS_SCHEMA = 1
+DEFAULT_SIZES = (10000, 100000)
+DEFAULT_TOLERANCE = 1.25
+
+
+class Context:
+    """Database, session and lazily created widgets shared by the scenarios of one book"""
+
+    def __init__(self, engine, user_id, workdir):
+        self.engine = engine
+        self.session = sessionmaker(bind=engine)()
+        self.user = self.session.get(User, user_id)
+        self.user.full_name  # loaded once, like the application's logged-in user
+        self.workdir = workdir
+        self.state = {}
+
+    def release(self):
+        """Unsubscribe and drop the widgets of the previous scenario"""
+        from src.utils.change_bus import get_change_bus, POLICY_CHANGED, INSTALLMENT_CHANGED
+
+        bus = get_change_bus()
+        for widget in self.state.values():
+            for name in ('on_data_changed', 'on_installments_changed', 'on_policies_changed'):
+                if hasattr(widget, name):
+                    for topic in (POLICY_CHANGED, INSTALLMENT_CHANGED):
+                        bus.unsubscribe(topic, getattr(widget, name))
+            if hasattr(widget, 'deleteLater'):
+                widget.deleteLater()
+        self.state.clear()
+        gc.collect()
+
+    def close(self):
+        self.release()
+        self.session.close()
+
+
+class _StubSender:
+    """Stands in for NotificationManager/SMSManager so dispatch cost excludes the network"""
+
+    def send_notification(self, title, message):
+        return True
+
+    def send_sms(self, phone, message):
+        return True, 'ok'
+
+
+# -- scenarios ------------------------------------------------------------
+# Each scenario has an untimed prepare(ctx), run once, and a timed run(ctx)
+# returning the number of rows it produced or touched.
+
+def prepare_dashboard(ctx):
+    from src.ui.dashboard_widget import DashboardWidget
+    ctx.state['dashboard'] = DashboardWidget(ctx.user, ctx.session)
+
+
+def run_dashboard(ctx):
+    ctx.state['dashboard'].refresh()
+    return 1
+
+
+def prepare_installment_filter(ctx):
+    from src.ui.installment_widget import InstallmentWidget
+    # The default "all installments" load is a separate concern; start filtered
+    with mock.patch.object(InstallmentWidget, 'load_installments'):
+        widget = InstallmentWidget(ctx.user, ctx.session)
+    for combo in (widget.date_filter, widget.status_filter, widget.search_box):
+        combo.blockSignals(True)
+    ctx.state['installments'] = widget
+
+
+def run_installment_filter(ctx):
+    widget = ctx.state['installments']
+    rows = 0
+    for date_text, status_text, search in (("ماه آینده", "همه", ""),
+                                           ("همه اقساط", "معوق", ""),
+                                           ("همه اقساط", "همه", "رضایی")):
+        widget.date_filter.setCurrentText(date_text)
+        widget.status_filter.setCurrentText(status_text)
+        widget.search_box.setText(search)
+        # apply_filters() only restarts the debounce timer
+        widget.load_installments()
+        rows += len(widget.filters.ids(widget.shown_key))
+    return rows
+
+
+def prepare_calendar(ctx):
+    from src.ui.calendar_widget import CalendarWidget
+    ctx.state['calendar'] = CalendarWidget(ctx.user, ctx.session)
+
+
+def run_calendar(ctx):
+    from PyQt5.QtCore import QDate
+    widget = ctx.state['calendar']
+    widget.calendar.next_month()
+    first = widget.calendar.current_jalali.to_gregorian()
+    widget.date_selected(QDate(first.year, first.month, first.day))
+    return widget.installments_list.count()
+
+
+def prepare_overdue_sweep(ctx):
+    # Put half of the already-overdue installments back to pending before each
+    # run so every run has the same amount of work
+    with session_scope(ctx.session) as session:
+        session.execute(update(Installment).where(
+            Installment.status == 'overdue', Installment.id % 2 == 0
+        ).values(status='pending'))
+
+
+def run_overdue_sweep(ctx):
+    from src.controllers import InstallmentController
+    with session_scope(ctx.session) as session:
+        return len(InstallmentController(session).get_overdue_installments(ctx.user.id))
+
+
+def run_report_export(ctx):
+    from src.utils.report_generator import ReportGenerator
+    with session_scope(ctx.session) as session:
+        generator = ReportGenerator(session)
+        df = generator.generate_installment_report()
+        generator.export_to_csv(df, os.path.join(ctx.workdir, 'installments.csv'))
+    return len(df)
+
+
+def prepare_portfolio_analytics(ctx):
+    from src.utils.portfolio_analytics import clear_cache
+    clear_cache()
+
+
+def run_portfolio_analytics(ctx):
+    from src.utils.portfolio_analytics import PortfolioAnalytics
+    with session_scope(ctx.session) as session:
+        analytics = PortfolioAnalytics(session)
+        analytics.aging()
+        analytics.collection_rate()
+        analytics.expected_cash_in()
+        analytics.roll_rates()
+        return len(analytics.collection_rate())
+
+
+def prepare_reminder_dispatch(ctx):
+    with session_scope(ctx.session) as session:
+        if 'reminder_ids' not in ctx.state:
+            ctx.state['reminder_ids'] = [r for (r,) in session.query(Reminder.id).filter(
+                Reminder.status == 'pending')]
+        session.execute(update(Reminder).where(Reminder.id.in_(ctx.state['reminder_ids'])).values(
+            status='pending', sent_date=None, scheduled_date=datetime.now() - timedelta(minutes=1)))
+
+
+def run_reminder_dispatch(ctx):
+    from src.controllers import ReminderController
+    with mock.patch('src.utils.NotificationManager', _StubSender), \
+            mock.patch('src.utils.SMSManager', _StubSender):
+        with session_scope(ctx.session) as session:
+            return ReminderController(session).process_pending_reminders()['total']
+
+
+# name -> (prepare once, prepare before every run, run)
+SCENARIOS = {
+    'dashboard_load': (prepare_dashboard, None, run_dashboard),
+    'installment_filter': (prepare_installment_filter, None, run_installment_filter),
+    'calendar_month_switch': (prepare_calendar, None, run_calendar),
+    'overdue_sweep': (None, prepare_overdue_sweep, run_overdue_sweep),
+    'report_export': (None, None, run_report_export),
+    'reminder_dispatch': (None, prepare_reminder_dispatch, run_reminder_dispatch),
+    'portfolio_analytics': (None, prepare_portfolio_analytics, run_portfolio_analytics),
+}
+
+
+# -- harness ----------------------------------------------------------------
+
+def _needs_qt(names):
+    return any(SCENARIOS[name][0] in (prepare_dashboard, prepare_installment_filter, prepare_calendar)
+               for name in names)
+
+
+def run_scenario(ctx, name, repeat, stats):
+    """Time one scenario; returns its result record"""
+    prepare_once, prepare_each, run = SCENARIOS[name]
+    record = {'runs_s': [], 'queries': [], 'rows': None, 'setup_s': 0.0, 'error': None}
+    try:
+        start = time.perf_counter()
+        if prepare_once:
+            prepare_once(ctx)
+        record['setup_s'] = round(time.perf_counter() - start, 4)
+
+        for _ in range(repeat):
+            if prepare_each:
+                prepare_each(ctx)
+            stats.reset()
+            start = time.perf_counter()
+            record['rows'] = run(ctx)
+            record['runs_s'].append(round(time.perf_counter() - start, 4))
+            record['queries'].append(stats.snapshot()['totals']['queries'])
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+
+    runs = record['runs_s']
+    if runs:
+        record.update(min_s=min(runs), median_s=round(statistics.median(runs), 4), max_s=max(runs))
+    return record
+
+
+def benchmark_book(size, args, scenario_names):
+    """Generate one book and run the scenarios on it"""
+    workdir = tempfile.mkdtemp(prefix=f'bench_{size}_')
+    db_path = os.path.join(workdir, 'book.db')
+    engine = create_engine(f'sqlite:///{db_path}')
+    try:
+        book = generate_book(engine, installments=size, users=args.users, seed=args.seed)
+        book['target_installments'] = size
+        book['db_bytes'] = os.path.getsize(db_path)
+        print(f"\n{size:,} installments: generated in {book['generate_s']:.1f} s "
+              f"({book['policies']:,} policies, {book['db_bytes'] / 1e6:.0f} MB)")
+
+        stats = QueryStats(slow_query_ms=float('inf'))
+        stats.install(engine)
+        ctx = Context(engine, user_id=1, workdir=workdir)
+        book['scenarios'] = {}
+        for name in scenario_names:
+            record = run_scenario(ctx, name, args.repeat, stats)
+            ctx.release()  # scenarios do not see each other's widgets
+            book['scenarios'][name] = record
+            if record['error']:
+                print(f"  {name:<24} ERROR {record['error']}")
+            else:
+                print(f"  {name:<24} median {record['median_s'] * 1000:9.1f} ms  "
+                      f"min {record['min_s'] * 1000:9.1f} ms  "
+                      f"queries {record['queries'][-1]:>5}  rows {record['rows']:,}")
+        ctx.close()
+        return book
+    finally:
+        engine.dispose()
+        if args.keep:
+            print(f"  database kept at {db_path}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare_results(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare scenario medians of two results documents
+
+    Returns:
+        list: (size, scenario, baseline median, current median, ratio, regressed)
+              for every size/scenario present in both
+    """
+    def medians(results):
+        return {(book['target_installments'], name): record.get('median_s')
+                for book in results['books'] for name, record in book['scenarios'].items()
+                if record.get('median_s') is not None}
+
+    before, after = medians(baseline), medians(current)
+    rows = []
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key] / before[key] if before[key] else float('inf')
+        rows.append((key[0], key[1], before[key], after[key], round(ratio, 3), ratio > tolerance))
+    return rows
+
+
+def environment():
+    """Versions and machine info recorded with the results"""
+    import sqlalchemy
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'sqlalchemy': sqlalchemy.__version__,
+        'pandas': pandas.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path benchmarks on synthetic books")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Book sizes in installments (e.g. 10000 100000 1000000)")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1402)
+    parser.add_argument('--output', help="Results JSON path (default: benchmarks/results/hot_paths_<time>.json)")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated databases")
+    parser.add_argument('--compare', help="Earlier results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed median slowdown ratio before a scenario counts as regressed")
+    args = parser.parse_args()
+
+    app = None
+    if _needs_qt(args.scenarios):
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    results = {'schema': RESULTS_SCHEMA, 'environment': environment(), 'repeat': args.repeat,
+               'books': []}
+    for size in args.sizes:
+        results['books'].append(benchmark_book(size, args, args.scenarios))
+    results['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"hot_paths_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nResults written to {output}")
+
+    failed = [name for book in results['books'] for name, r in book['scenarios'].items() if r['error']]
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (tolerance {args.tolerance}x):")
+        for size, name, before, after, ratio, regressed in compare_results(baseline, results, args.tolerance):
+            mark = 'REGRESSED' if regressed else 'ok'
+            print(f"  {size:>9,} {name:<24} {before * 1000:9.1f} -> {after * 1000:9.1f} ms  "
+                  f"{ratio:5.2f}x  {mark}")
+            if regressed:
+                failed.append(name)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: Persian currency formatting of 1M installment amounts.
+
+Compares the old per-value implementation (int() plus ten str.replace calls)
+with the new scalar formatter (digit-group table), with and without its memo, and
+with the column batch API. Two inputs are measured: realistic amounts
+(a few thousand distinct values, as installments share amounts) and
+amounts that are all distinct.
+
+Usage:
+    python benchmarks/bench_number_format.py [num_values]
+"""
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.utils import number_format
+from src.utils.number_format import format_currency, format_currency_column
+
+
+def legacy_format_currency(amount):
+    """The replaced implementation: int() and one str.replace per digit"""
+    if amount is None:
+        return "۰ ریال"
+    formatted = "{:,}".format(int(amount))
+    persian_digits = '۰۱۲۳۴۵۶۷۸۹'
+    english_digits = '0123456789'
+    for i in range(10):
+        formatted = formatted.replace(english_digits[i], persian_digits[i])
+    return f"{formatted} ریال"
+
+
+def build_amounts(num_values, distinct, seed=42):
+    """Integer rial amounts; 'distinct' caps the number of different values"""
+    rng = random.Random(seed)
+    if distinct:
+        return [rng.randrange(1_000_000, 500_000_000) for _ in range(num_values)]
+    # Policy totals in whole 100k rials split into 3-12 installments
+    pool = [rng.randrange(10, 6000) * 100_000 // rng.choice((3, 4, 6, 9, 12)) for _ in range(5000)]
+    return [rng.choice(pool) for _ in range(num_values)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run(label, amounts):
+    series = pd.Series(np.array(amounts, dtype=np.int64))
+
+    number_format.clear_memo()
+    legacy_time, expected = timed(lambda: [legacy_format_currency(a) for a in amounts])
+    plain_time, plain = timed(lambda: [format_currency(a, memo=False) for a in amounts])
+    number_format.clear_memo()
+    memo_time, memoized = timed(lambda: [format_currency(a) for a in amounts])
+    batch_time, batch = timed(lambda: format_currency_column(series))
+    batch_plain_time, batch_plain = timed(lambda: format_currency_column(series, memo=False))
+
+    assert plain == expected and memoized == expected
+    assert batch.tolist() == expected and batch_plain.tolist() == expected
+
+    print(f"\n{label}: {len(amounts):,} values, {len(set(amounts)):,} distinct")
+    print(f"  Legacy (10x str.replace):    {legacy_time:.3f} s")
+    for name, elapsed in (("Scalar", plain_time), ("Scalar + memo", memo_time),
+                          ("Column batch", batch_time), ("Column batch, no memo", batch_plain_time)):
+        print(f"  {name + ':':<28} {elapsed:.3f} s  ({legacy_time / elapsed:.1f}x)")
+    print(f"  Memo: {number_format.memo_info()}")
+
+
+def main():
+    num_values = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    run("Repeated amounts", build_amounts(num_values, distinct=False))
+    run("Distinct amounts", build_amounts(num_values, distinct=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -114,9 +114,15 @@ def main():
         
         # Initialize database
         logger.info("Initializing database...")
-        init_database()
+        engine = init_database()
         
-        # Get database session
+        # Optional profiling of refresh paths (--profile or profiling.enabled)
+        from src.utils.profiler import profiling_requested, start_profiling, stop_profiling
+        if profiling_requested():
+            start_profiling(engine)
+        
+        # Session for login and the current user; widgets open their own
+        # short-lived sessions per operation (see session_scope/read_session)
         session = get_session()
         
         # Create default user if needed
@@ -140,7 +146,7 @@ def main():
                 logger.info(f"User '{user.username}' logged in successfully")
                 
                 # Create and show main window
-                main_window = MainWindow(user, session)
+                main_window = MainWindow(user, session, auth_controller)
                 main_window.show()
                 
                 # Run application
@@ -148,6 +154,7 @@ def main():
                 
                 # Cleanup
                 logger.info("Application closing")
+                stop_profiling()
                 session.close()
                 
                 return exit_code
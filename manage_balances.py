@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Maintenance command for the policy_balances summary table
+
+Usage:
+    python manage_balances.py check     # Report mismatches against installments
+    python manage_balances.py rebuild   # Recompute the whole table
+"""
+import sys
+import argparse
+import logging
+
+from src.models import init_database, get_session
+from src.controllers import PolicyBalanceController
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+
+def main():
+    """Run the requested maintenance command"""
+    parser = argparse.ArgumentParser(description="Policy balance summary maintenance")
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    args = parser.parse_args()
+
+    init_database()
+    session = get_session()
+
+    try:
+        controller = PolicyBalanceController(session)
+
+        if args.command == 'rebuild':
+            success, message, count = controller.rebuild()
+            print(f"{'✓' if success else '❌'} Rebuilt balances for {count} policies")
+            return 0 if success else 1
+
+        mismatches = controller.check_consistency()
+        if not mismatches:
+            print("✓ Policy balances are consistent")
+            return 0
+
+        print(f"❌ {len(mismatches)} mismatches found:")
+        for m in mismatches[:50]:
+            print(f"  policy {m['policy_id']}: {m['field']} stored={m['stored']} expected={m['expected']}")
+        if len(mismatches) > 50:
+            print(f"  ... and {len(mismatches) - 50} more")
+        print("Run 'python manage_balances.py rebuild' to fix.")
+        return 1
+
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
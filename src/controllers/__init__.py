@@ -3,10 +3,14 @@ from .auth_controller import AuthController
 from .policy_controller import PolicyController
 from .installment_controller import InstallmentController
 from .reminder_controller import ReminderController
+from .balance_controller import PolicyBalanceController
+from .reconciliation_controller import ReconciliationController
 
 __all__ = [
     'AuthController',
     'PolicyController',
     'InstallmentController',
-    'ReminderController'
+    'ReminderController',
+    'PolicyBalanceController',
+    'ReconciliationController'
 ]
@@ -8,69 +8,192 @@ class AuthController:
     """Handle user authentication"""
     
     def __init__(self, session):
+        from ..utils.auth_service import get_auth_service
+
         self.session = session
         self.current_user = None
+        self.session_token = None
+        self.auth_service = get_auth_service()
     
-    def login(self, username, password):
+    def begin_login(self, username, password):
         """
-        Authenticate user with username and password
-        
+        Look up the user and start password verification in the auth worker
+
+        The returned future resolves to (valid, new_hash); pass it to
+        finish_login() on the calling (GUI) thread once it is done.
+
         Args:
             username: User's username
             password: User's password
-            
+
         Returns:
-            tuple: (success: bool, message: str, user: User or None)
+            tuple: (future or None, message: str, user: User or None)
         """
         from ..models import User
-        
+
         try:
             user = self.session.query(User).filter(
                 User.username == username
             ).first()
-            
+
             if not user:
                 logger.warning(f"Login failed: User '{username}' not found")
-                return False, "نام کاربری یا رمز عبور اشتباه است", None
-            
+                return None, "نام کاربری یا رمز عبور اشتباه است", None
+
             if not user.is_active:
                 logger.warning(f"Login failed: User '{username}' is inactive")
-                return False, "حساب کاربری غیرفعال است", None
-            
-            if not user.check_password(password):
-                logger.warning(f"Login failed: Invalid password for '{username}'")
+                return None, "حساب کاربری غیرفعال است", None
+
+            future = self.auth_service.check_and_rehash_async(password, user.password_hash)
+            return future, "", user
+
+        except Exception as e:
+            logger.error(f"Login error: {e}")
+            self.session.rollback()
+            return None, "خطا در ورود به سیستم", None
+
+    def finish_login(self, user, password, verify_result):
+        """
+        Complete a login after the worker verified the password
+
+        Args:
+            user: User returned by begin_login
+            password: Password that was verified
+            verify_result: (valid, new_hash) from the verification future
+
+        Returns:
+            tuple: (success: bool, message: str, user: User or None)
+        """
+        try:
+            valid, new_hash = verify_result
+
+            if not valid:
+                logger.warning(f"Login failed: Invalid password for '{user.username}'")
                 return False, "نام کاربری یا رمز عبور اشتباه است", None
-            
+
+            # Upgrade hashes made with an older work factor
+            if new_hash:
+                user.password_hash = new_hash
+                logger.info(f"Password hash for '{user.username}' upgraded to cost {self.auth_service.rounds}")
+
             # Update last login
             user.last_login = datetime.now()
             self.session.commit()
-            
+
             self.current_user = user
-            logger.info(f"User '{username}' logged in successfully")
+            self.session_token = self.auth_service.issue_token(user.id, password)
+            logger.info(f"User '{user.username}' logged in successfully")
             return True, "ورود موفقیت‌آمیز بود", user
-            
+
         except Exception as e:
             logger.error(f"Login error: {e}")
             self.session.rollback()
             return False, "خطا در ورود به سیستم", None
+
+    def login(self, username, password):
+        """
+        Authenticate user with username and password (blocking)
+        
+        Args:
+            username: User's username
+            password: User's password
+            
+        Returns:
+            tuple: (success: bool, message: str, user: User or None)
+        """
+        future, message, user = self.begin_login(username, password)
+        if future is None:
+            return False, message, None
+
+        try:
+            verify_result = future.result()
+        except Exception as e:
+            logger.error(f"Login error: {e}")
+            return False, "خطا در ورود به سیستم", None
+
+        return self.finish_login(user, password, verify_result)
+
+    def begin_reauthentication(self, password):
+        """
+        Re-check the logged-in user's password without blocking on bcrypt
+
+        The session token answers at once while it is valid; after it
+        expired, bcrypt runs in the auth worker and the returned future
+        resolves to the result. Pass that to finish_reauthentication() on
+        the calling (GUI) thread once it is done.
+
+        Args:
+            password: Password to check
+
+        Returns:
+            tuple: (valid: bool or None, future or None) - exactly one is set
+        """
+        if not self.current_user:
+            return False, None
+
+        result = self.auth_service.reauthenticate(
+            self.session_token, self.current_user.id, password
+        )
+        if result is not None:
+            return result, None
+
+        future = self.auth_service.verify_password_async(password, self.current_user.password_hash)
+        return None, future
+
+    def finish_reauthentication(self, password, valid):
+        """
+        Complete a re-authentication after the worker verified the password
+
+        Args:
+            password: Password that was verified
+            valid: Result of the verification future
+
+        Returns:
+            bool: True if the password matches
+        """
+        if valid and self.current_user:
+            self.session_token = self.auth_service.issue_token(self.current_user.id, password)
+        return bool(valid)
+
+    def verify_current_password(self, password):
+        """
+        Re-authenticate the logged-in user (blocking)
+
+        Uses the session token when it is still valid and falls back to
+        bcrypt otherwise.
+
+        Args:
+            password: Password to check
+
+        Returns:
+            bool: True if the password matches
+        """
+        valid, future = self.begin_reauthentication(password)
+        if future is None:
+            return valid
+        return self.finish_reauthentication(password, future.result())
     
     def logout(self):
         """Logout current user"""
         if self.current_user:
             logger.info(f"User '{self.current_user.username}' logged out")
+        self.auth_service.revoke_token(self.session_token)
+        self.session_token = None
         self.current_user = None
     
-    def register_user(self, username, password, full_name, email=None, phone=None, role='user'):
+    def register_user(self, username, password, full_name, email=None, phone=None, role='user',
+                      password_hash=None):
         """
         Register a new user
         
         Args:
             username: Username
-            password: Password
+            password: Password (ignored if password_hash is given)
             full_name: Full name
             email: Email address (optional)
             phone: Phone number (optional)
             role: User role (default: 'user')
+            password_hash: Hash precomputed with auth_service.hash_password_async (optional)
             
         Returns:
             tuple: (success: bool, message: str, user: User or None)
@@ -92,9 +215,9 @@ class AuthController:
                 full_name=full_name,
                 email=email,
                 phone=phone,
-                role=role
+                role=role,
+                password_hash=password_hash or self.auth_service.hash_password(password)
             )
-            user.set_password(password)
             
             self.session.add(user)
             self.session.commit()
@@ -107,8 +230,23 @@ class AuthController:
             self.session.rollback()
             return False, f"خطا در ثبت‌نام: {str(e)}", None
     
-    def change_password(self, user_id, old_password, new_password):
-        """Change user password"""
+    def change_password(self, user_id, old_password, new_password, password_hash=None,
+                        old_password_verified=False):
+        """
+        Change user password
+        
+        Args:
+            user_id: User ID
+            old_password: Current password
+            new_password: New password
+            password_hash: Hash of new_password precomputed with
+                           auth_service.hash_password_async (optional)
+            old_password_verified: old_password was already checked for the
+                                   logged-in user with begin_reauthentication()
+            
+        Returns:
+            tuple: (success: bool, message: str)
+        """
         from ..models import User
         
         try:
@@ -117,11 +255,20 @@ class AuthController:
             if not user:
                 return False, "کاربر یافت نشد"
             
-            if not user.check_password(old_password):
+            # The logged-in user is re-checked against the session token
+            if self.current_user is not None and self.current_user.id == user.id:
+                valid = old_password_verified or self.verify_current_password(old_password)
+            else:
+                valid = self.auth_service.verify_password(old_password, user.password_hash)
+
+            if not valid:
                 return False, "رمز عبور فعلی اشتباه است"
             
-            user.set_password(new_password)
+            user.password_hash = password_hash or self.auth_service.hash_password(new_password)
             self.session.commit()
+
+            if self.current_user is not None and self.current_user.id == user.id:
+                self.auth_service.update_token_password(self.session_token, new_password)
             
             logger.info(f"Password changed for user '{user.username}'")
             return True, "رمز عبور با موفقیت تغییر کرد"
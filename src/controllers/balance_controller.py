@@ -0,0 +1,209 @@
+"""Policy balance summary controller"""
+from datetime import datetime
+import logging
+
+from sqlalchemy import select, delete, insert, func, case, literal
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_ID_CHUNK_SIZE = 500
+
+# Columns of policy_balances that are derived from installments
+BALANCE_FIELDS = [
+    'total_paid', 'total_pending', 'total_overdue',
+    'installment_count', 'paid_count', 'pending_count',
+    'overdue_count', 'cancelled_count', 'next_due_date'
+]
+
+
+class PolicyBalanceController:
+    """Maintain the materialized policy_balances summary table"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def _aggregate_query(self, policy_ids=None):
+        """Grouped aggregation of installments per policy (one row per policy)"""
+        from ..models import InsurancePolicy, Installment
+
+        def amount_if(status):
+            return func.coalesce(func.sum(case(
+                (Installment.status == status, Installment.amount), else_=0
+            )), 0)
+
+        def count_if(status):
+            return func.coalesce(func.sum(case(
+                (Installment.status == status, 1), else_=0
+            )), 0)
+
+        query = select(
+            InsurancePolicy.id.label('policy_id'),
+            amount_if('paid').label('total_paid'),
+            amount_if('pending').label('total_pending'),
+            amount_if('overdue').label('total_overdue'),
+            func.count(Installment.id).label('installment_count'),
+            count_if('paid').label('paid_count'),
+            count_if('pending').label('pending_count'),
+            count_if('overdue').label('overdue_count'),
+            count_if('cancelled').label('cancelled_count'),
+            func.min(case(
+                (Installment.status.in_(['pending', 'overdue']), Installment.due_date),
+                else_=None
+            )).label('next_due_date'),
+            literal(datetime.now()).label('updated_at')
+        ).outerjoin(
+            Installment, Installment.policy_id == InsurancePolicy.id
+        ).group_by(InsurancePolicy.id)
+
+        if policy_ids is not None:
+            query = query.where(InsurancePolicy.id.in_(policy_ids))
+
+        return query
+
+    def _replace_rows(self, policy_ids=None):
+        """Delete and re-insert balance rows from the installment aggregation"""
+        from ..models import PolicyBalance
+
+        table = PolicyBalance.__table__
+        columns = ['policy_id'] + BALANCE_FIELDS + ['updated_at']
+
+        delete_stmt = delete(table)
+        if policy_ids is not None:
+            delete_stmt = delete_stmt.where(table.c.policy_id.in_(policy_ids))
+
+        self.session.execute(delete_stmt)
+        self.session.execute(
+            insert(table).from_select(columns, self._aggregate_query(policy_ids))
+        )
+
+    def refresh_policies(self, policy_ids):
+        """
+        Recompute balances for the given policies
+
+        Runs inside the caller's transaction; the caller commits.
+
+        Args:
+            policy_ids: Iterable of policy IDs whose installments changed
+        """
+        policy_ids = sorted({pid for pid in policy_ids if pid is not None})
+        if not policy_ids:
+            return
+
+        # Make pending ORM changes visible to the aggregation
+        self.session.flush()
+
+        for i in range(0, len(policy_ids), _ID_CHUNK_SIZE):
+            self._replace_rows(policy_ids[i:i + _ID_CHUNK_SIZE])
+
+        # Expire stale PolicyBalance objects already loaded in the session
+        from ..models import PolicyBalance
+        for policy_id in policy_ids:
+            obj = self.session.identity_map.get(
+                self.session.identity_key(PolicyBalance, policy_id)
+            )
+            if obj is not None:
+                self.session.expire(obj)
+
+    def rebuild(self):
+        """
+        Rebuild the whole summary table from installments
+
+        Returns:
+            tuple: (success: bool, message: str, count: int)
+        """
+        from ..models import PolicyBalance
+
+        try:
+            self.session.flush()
+            self._replace_rows()
+            self.session.commit()
+            self.session.expire_all()
+
+            count = self.session.query(func.count(PolicyBalance.policy_id)).scalar() or 0
+            logger.info(f"Policy balances rebuilt for {count} policies")
+            return True, f"خلاصه مانده {count} بیمه‌نامه بازسازی شد", count
+
+        except Exception as e:
+            logger.error(f"Policy balance rebuild error: {e}")
+            self.session.rollback()
+            return False, f"خطا در بازسازی مانده بیمه‌نامه‌ها: {str(e)}", 0
+
+    def check_consistency(self):
+        """
+        Compare the stored summary with a fresh aggregation
+
+        Returns:
+            list: One dict per mismatch with keys policy_id, field, stored, expected
+                  (field is 'missing' / 'orphan' for absent or extra rows)
+        """
+        from ..models import PolicyBalance
+
+        expected = {
+            row.policy_id: row
+            for row in self.session.execute(self._aggregate_query())
+        }
+        stored = {
+            row.policy_id: row
+            for row in self.session.execute(select(PolicyBalance.__table__))
+        }
+
+        mismatches = []
+        for policy_id, exp in expected.items():
+            cur = stored.get(policy_id)
+            if cur is None:
+                mismatches.append({'policy_id': policy_id, 'field': 'missing',
+                                   'stored': None, 'expected': None})
+                continue
+            for field in BALANCE_FIELDS:
+                stored_value = getattr(cur, field)
+                expected_value = getattr(exp, field)
+                if isinstance(expected_value, float) or isinstance(stored_value, float):
+                    equal = abs((stored_value or 0) - (expected_value or 0)) < 0.005
+                else:
+                    equal = stored_value == expected_value
+                if not equal:
+                    mismatches.append({'policy_id': policy_id, 'field': field,
+                                       'stored': stored_value, 'expected': expected_value})
+
+        for policy_id in stored.keys() - expected.keys():
+            mismatches.append({'policy_id': policy_id, 'field': 'orphan',
+                               'stored': None, 'expected': None})
+
+        if mismatches:
+            logger.warning(f"Policy balance check found {len(mismatches)} mismatches")
+        return mismatches
+
+    def get_balance(self, policy_id):
+        """Get balance summary for a policy"""
+        from ..models import PolicyBalance
+
+        try:
+            return self.session.query(PolicyBalance).filter(
+                PolicyBalance.policy_id == policy_id
+            ).first()
+        except Exception as e:
+            logger.error(f"Error fetching policy balance: {e}")
+            return None
+
+    def get_balances(self, policy_ids):
+        """
+        Get balance summaries for several policies
+
+        Returns:
+            dict: policy_id -> PolicyBalance
+        """
+        from ..models import PolicyBalance
+
+        policy_ids = list({pid for pid in policy_ids if pid is not None})
+        balances = {}
+        try:
+            for i in range(0, len(policy_ids), _ID_CHUNK_SIZE):
+                chunk = policy_ids[i:i + _ID_CHUNK_SIZE]
+                for balance in self.session.query(PolicyBalance).filter(
+                    PolicyBalance.policy_id.in_(chunk)
+                ):
+                    balances[balance.policy_id] = balance
+        except Exception as e:
+            logger.error(f"Error fetching policy balances: {e}")
+        return balances
@@ -1,6 +1,11 @@
 """Installment management controller"""
 from datetime import datetime, timedelta
 import logging
+from sqlalchemy import select, update, delete, bindparam
+from sqlalchemy.orm.exc import StaleDataError
+from ..models.concurrency import (retry_on_busy, note_error, error_message, next_version,
+                                  CONFLICT_MESSAGE)
+from .balance_controller import PolicyBalanceController, _ID_CHUNK_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -9,7 +14,9 @@ class InstallmentController:
     
     def __init__(self, session):
         self.session = session
+        self.balances = PolicyBalanceController(session)
     
+    @retry_on_busy
     def create_installment(self, installment_data):
         """Create a new installment"""
         from ..models import Installment
@@ -24,149 +31,403 @@ class InstallmentController:
             )
             
             self.session.add(installment)
+            self.balances.refresh_policies([installment.policy_id])
+            installment_id, policy_id = installment.id, installment.policy_id
             self.session.commit()
             
-            logger.info(f"Installment created for policy {installment.policy_id}")
+            self._publish_changes([installment_id], [policy_id], installment_action='created')
+            
+            logger.info(f"Installment created for policy {policy_id}")
             return True, "قسط با موفقیت ثبت شد", installment
             
         except Exception as e:
             logger.error(f"Installment creation error: {e}")
             self.session.rollback()
-            return False, f"خطا در ثبت قسط: {str(e)}", None
+            note_error(e)
+            return False, error_message("خطا در ثبت قسط", e), None
     
+    @retry_on_busy
     def create_installments_batch(self, policy_id, total_amount, num_installments, 
-                                 start_date, interval_days=30):
+                                 start_date, interval_days=30, interval_months=None,
+                                 plan=None, down_payment=0, round_to=1, remainder='spread'):
         """
         Create multiple installments for a policy
         
         Args:
             policy_id: Policy ID
-            total_amount: Total amount to be divided
+            total_amount: Total amount to be divided (rounded to whole rials)
             num_installments: Number of installments
             start_date: Start date for first installment
             interval_days: Days between installments (default: 30)
+            interval_months: Jalali months between installments; when given, due
+                             dates fall on the same Jalali day of the month
+                             (clamped to short months) and interval_days is ignored
+            plan: 'weekly', 'monthly' or 'quarterly' (overrides the intervals)
+            down_payment: Deducted from total_amount before dividing
+            round_to: Installments are multiples of this many rials
+            remainder: Where the indivisible rest goes: 'spread', 'first' or 'last'
             
         Returns:
             tuple: (success: bool, message: str, installments: list)
         """
         from ..models import Installment
+        from ..utils.installment_schedule import build_schedule
         
         try:
-            installment_amount = total_amount / num_installments
-            installments = []
-            
-            for i in range(num_installments):
-                due_date = start_date + timedelta(days=interval_days * i)
-                installment = Installment(
-                    policy_id=policy_id,
-                    installment_number=i + 1,
-                    amount=installment_amount,
-                    due_date=due_date
-                )
-                installments.append(installment)
-                self.session.add(installment)
+            if plan is None:
+                plan = (0, interval_months) if interval_months else (interval_days, 0)
+            schedule = build_schedule(total_amount, num_installments, start_date, plan,
+                                      down_payment, round_to, remainder)
+            
+            installments = [Installment(**row) for row in schedule.rows([policy_id])]
+            self.session.add_all(installments)
             
+            self.balances.refresh_policies([policy_id])
+            installment_ids = [inst.id for inst in installments]
             self.session.commit()
             
+            self._publish_changes(installment_ids, [policy_id], installment_action='created')
+            
             logger.info(f"Created {num_installments} installments for policy {policy_id}")
             return True, f"{num_installments} قسط با موفقیت ایجاد شد", installments
             
         except Exception as e:
             logger.error(f"Batch installment creation error: {e}")
             self.session.rollback()
-            return False, f"خطا در ایجاد اقساط: {str(e)}", []
+            note_error(e)
+            return False, error_message("خطا در ایجاد اقساط", e), []
     
-    def update_installment(self, installment_id, installment_data):
-        """Update installment"""
+    @retry_on_busy
+    def create_schedules_bulk(self, schedules, plan='monthly', round_to=1, remainder='spread'):
+        """
+        Create the installments of many policies at once (batch onboarding)
+        
+        All schedules are built in one vectorized pass and written with a
+        single executemany INSERT, without ORM objects.
+        
+        Args:
+            schedules: Iterable of dicts with 'policy_id', 'total_amount',
+                       'num_installments', 'start_date' and optional 'down_payment'
+            plan: 'weekly', 'monthly' or 'quarterly', or a (days, months) interval
+            round_to: Installments are multiples of this many rials
+            remainder: Where the indivisible rest goes: 'spread', 'first' or 'last'
+            
+        Returns:
+            tuple: (success: bool, message: str, count: int)
+        """
+        from ..models import Installment
+        from ..utils.installment_schedule import build_schedules
+        
+        schedules = list(schedules)
+        if not schedules:
+            return True, "قسطی برای ایجاد وجود ندارد", 0
+        
+        try:
+            policy_ids = [spec['policy_id'] for spec in schedules]
+            built = build_schedules(
+                [spec['total_amount'] for spec in schedules],
+                [spec['num_installments'] for spec in schedules],
+                [spec['start_date'] for spec in schedules],
+                plan,
+                [spec.get('down_payment', 0) for spec in schedules],
+                round_to, remainder
+            )
+            now = datetime.now()
+            self.session.execute(
+                Installment.__table__.insert(),
+                built.rows(policy_ids, created_at=now, updated_at=now,
+                           is_reminder_sent=False)
+            )
+            
+            unique_ids = sorted(set(policy_ids))
+            self.balances.refresh_policies(unique_ids)
+            installment_ids = []
+            for i in range(0, len(unique_ids), _ID_CHUNK_SIZE):
+                installment_ids.extend(self.session.execute(
+                    select(Installment.id).where(
+                        Installment.policy_id.in_(unique_ids[i:i + _ID_CHUNK_SIZE]),
+                        Installment.created_at == now
+                    )
+                ).scalars())
+            self.session.commit()
+            
+            self._publish_changes(installment_ids, unique_ids, installment_action='created')
+            
+            logger.info(f"Created {len(built)} installments for {len(unique_ids)} policies")
+            return True, f"{len(built)} قسط با موفقیت ایجاد شد", len(built)
+            
+        except Exception as e:
+            logger.error(f"Bulk schedule creation error: {e}")
+            self.session.rollback()
+            note_error(e)
+            return False, error_message("خطا در ایجاد اقساط", e), 0
+    
+    @retry_on_busy
+    def update_installment(self, installment_id, installment_data, expected_updated_at=None):
+        """
+        Update installment
+        
+        Args:
+            installment_id: Installment ID
+            installment_data: Dictionary of fields to change
+            expected_updated_at: updated_at of the installment as the caller
+                                 read it; if another user changed it since,
+                                 nothing is written and a conflict is reported
+        """
         from ..models import Installment
         
         try:
             installment = self.session.query(Installment).filter(
                 Installment.id == installment_id
-            ).first()
+            ).populate_existing().first()
             
             if not installment:
                 return False, "قسط یافت نشد", None
+            if expected_updated_at is not None and installment.updated_at != expected_updated_at:
+                return False, CONFLICT_MESSAGE, None
             
             for key, value in installment_data.items():
-                if hasattr(installment, key) and value is not None:
+                if hasattr(installment, key) and key != 'updated_at' and value is not None:
                     setattr(installment, key, value)
             
-            installment.updated_at = datetime.now()
+            policy_id = installment.policy_id
+            self.balances.refresh_policies([policy_id])
             self.session.commit()
             
+            self._publish_changes([installment_id], [policy_id])
+            
             logger.info(f"Installment {installment_id} updated")
             return True, "قسط با موفقیت به‌روزرسانی شد", installment
             
         except Exception as e:
             logger.error(f"Installment update error: {e}")
             self.session.rollback()
-            return False, f"خطا در به‌روزرسانی قسط: {str(e)}", None
+            note_error(e)
+            return False, error_message("خطا در به‌روزرسانی قسط", e), None
     
+    @retry_on_busy
     def mark_as_paid(self, installment_id, payment_method=None, transaction_ref=None):
-        """Mark installment as paid"""
+        """Mark installment as paid (fails if it is already paid, e.g. by another user)"""
         from ..models import Installment
         
         try:
             installment = self.session.query(Installment).filter(
                 Installment.id == installment_id
-            ).first()
+            ).populate_existing().first()
             
             if not installment:
                 return False, "قسط یافت نشد"
+            if installment.status == 'paid':
+                return False, "این قسط قبلاً پرداخت شده است"
             
             installment.status = 'paid'
             installment.payment_date = datetime.now()
             installment.payment_method = payment_method
             installment.transaction_reference = transaction_ref
-            installment.updated_at = datetime.now()
             
+            # Read before commit; afterwards the instance is expired
+            policy_id = installment.policy_id
+            amount = installment.amount
+            self.balances.refresh_policies([policy_id])
             self.session.commit()
             
+            self._publish_changes([installment_id], [policy_id])
+            
             logger.info(f"Installment {installment_id} marked as paid")
             
             # Send notification
             from ..utils import NotificationManager
             from ..models import InsurancePolicy
             
-            policy = self.session.query(InsurancePolicy).filter(
-                InsurancePolicy.id == installment.policy_id
-            ).first()
+            policy_number = self.session.query(InsurancePolicy.policy_number).filter(
+                InsurancePolicy.id == policy_id
+            ).scalar()
             
-            if policy:
+            if policy_number:
                 notif = NotificationManager()
-                notif.send_payment_confirmation(policy.policy_number, installment.amount)
+                notif.send_payment_confirmation(policy_number, amount)
                 
                 # Check if all installments are paid, then auto-delete policy
-                self._check_and_delete_policy_if_all_paid(policy.id)
+                self._check_and_delete_policy_if_all_paid(policy_id)
             
             return True, "قسط به عنوان پرداخت شده ثبت شد"
             
         except Exception as e:
             logger.error(f"Payment marking error: {e}")
             self.session.rollback()
-            return False, f"خطا در ثبت پرداخت: {str(e)}"
+            note_error(e)
+            return False, error_message("خطا در ثبت پرداخت", e)
     
-    def _check_and_delete_policy_if_all_paid(self, policy_id):
-        """Check if all installments are paid and delete policy automatically"""
-        from ..models import Installment, InsurancePolicy
+    @retry_on_busy
+    def mark_many_as_paid(self, payments, payment_method=None, payment_date=None, notify=True):
+        """
+        Mark many installments as paid in one transaction
+        
+        Installments are updated with one bulk UPDATE, policy completion is
+        decided with one grouped query on policy_balances, fully paid policies
+        are deleted together, and a single summary notification is sent.
+        Each row is only updated if it is unchanged since it was read; if
+        another user changed one in between, the whole batch is rolled back
+        and retried.
+        
+        Args:
+            payments: Iterable of installment IDs or dicts with 'installment_id'
+                      and optional 'payment_method', 'transaction_reference',
+                      'payment_date'
+            payment_method: Default payment method
+            payment_date: Default payment date (default: now)
+            notify: Send a summary desktop notification
+            
+        Returns:
+            tuple: (success: bool, message: str, result: dict) where result has
+                   'paid', 'skipped' (already paid or cancelled), 'missing'
+                   (installment IDs), 'total_amount' (integer rials) and
+                   'completed_policies' (deleted policy numbers)
+        """
+        from ..models import Installment, InsurancePolicy, PolicyBalance
+        
+        result = {'paid': [], 'skipped': [], 'missing': [],
+                  'total_amount': 0, 'completed_policies': []}
+        
+        now = datetime.now()
+        requested = {}
+        for payment in payments:
+            if not isinstance(payment, dict):
+                payment = {'installment_id': payment}
+            requested[payment['installment_id']] = payment
+        
+        if not requested:
+            return True, "قسطی برای ثبت پرداخت وجود ندارد", result
         
         try:
-            # Get all installments for this policy
-            installments = self.session.query(Installment).filter(
-                Installment.policy_id == policy_id
-            ).all()
+            # 1. One lookup per chunk of IDs
+            ids = sorted(requested)
+            found = {}
+            for i in range(0, len(ids), _ID_CHUNK_SIZE):
+                rows = self.session.execute(
+                    select(Installment.id, Installment.policy_id,
+                           Installment.amount, Installment.status, Installment.updated_at)
+                    .where(Installment.id.in_(ids[i:i + _ID_CHUNK_SIZE]))
+                )
+                found.update((row.id, row) for row in rows)
+            
+            result['missing'] = [iid for iid in ids if iid not in found]
+            # Paid and cancelled installments are left as they are
+            result['skipped'] = [iid for iid in ids
+                                 if iid in found and found[iid].status in ('paid', 'cancelled')]
+            to_pay = [iid for iid in ids
+                      if iid in found and found[iid].status not in ('paid', 'cancelled')]
+            
+            if not to_pay:
+                return True, "قسط جدیدی برای ثبت پرداخت وجود ندارد", result
+            
+            # 2. Bulk UPDATE of the versions read in step 1 (single executemany)
+            self.session.flush()
+            table = Installment.__table__
+            updated = self.session.execute(
+                update(table)
+                .where(table.c.id == bindparam('b_id'),
+                       table.c.updated_at == bindparam('b_updated_at'))
+                .values(status='paid', payment_date=bindparam('b_payment_date'),
+                        payment_method=bindparam('b_payment_method'),
+                        transaction_reference=bindparam('b_reference'),
+                        updated_at=bindparam('b_new_updated_at')),
+                [
+                    {
+                        'b_id': iid,
+                        'b_updated_at': found[iid].updated_at,
+                        'b_payment_date': requested[iid].get('payment_date') or payment_date or now,
+                        'b_payment_method': requested[iid].get('payment_method', payment_method),
+                        'b_reference': requested[iid].get('transaction_reference'),
+                        'b_new_updated_at': next_version(found[iid].updated_at),
+                    }
+                    for iid in to_pay
+                ]
+            ).rowcount
+            if updated != len(to_pay):
+                raise StaleDataError(
+                    f"{len(to_pay) - updated} of {len(to_pay)} installments changed concurrently"
+                )
+            for iid in to_pay:
+                obj = self.session.identity_map.get(self.session.identity_key(Installment, iid))
+                if obj is not None:
+                    self.session.expire(obj)
+            
+            # 3. Refresh balances and find completed policies with one grouped query
+            policy_ids = sorted({found[iid].policy_id for iid in to_pay})
+            self.balances.refresh_policies(policy_ids)
+            
+            completed = []
+            for i in range(0, len(policy_ids), _ID_CHUNK_SIZE):
+                completed.extend(self.session.execute(
+                    select(InsurancePolicy.id, InsurancePolicy.policy_number)
+                    .join(PolicyBalance, PolicyBalance.policy_id == InsurancePolicy.id)
+                    .where(
+                        InsurancePolicy.id.in_(policy_ids[i:i + _ID_CHUNK_SIZE]),
+                        PolicyBalance.installment_count > 0,
+                        PolicyBalance.paid_count == PolicyBalance.installment_count
+                    )
+                ).all())
+            
+            # 4. Delete fully paid policies together with their rows
+            completed_ids = [row.id for row in completed]
+            for i in range(0, len(completed_ids), _ID_CHUNK_SIZE):
+                chunk = completed_ids[i:i + _ID_CHUNK_SIZE]
+                self.session.execute(delete(Installment).where(Installment.policy_id.in_(chunk)))
+                self.session.execute(delete(PolicyBalance).where(PolicyBalance.policy_id.in_(chunk)))
+                self.session.execute(delete(InsurancePolicy).where(InsurancePolicy.id.in_(chunk)))
+            
+            self.session.commit()
             
-            # Check if there are any installments
-            if not installments:
-                return
+            from ..utils.change_bus import get_change_bus, POLICY_CHANGED, DELETED
+            with get_change_bus().batch():
+                self._publish_changes(to_pay, set(policy_ids) - set(completed_ids))
+                get_change_bus().publish(POLICY_CHANGED, completed_ids, DELETED)
             
-            # Check if all installments are paid
-            all_paid = all(inst.status == 'paid' for inst in installments)
+            result['paid'] = to_pay
+            result['total_amount'] = sum(found[iid].amount for iid in to_pay)
+            result['completed_policies'] = [row.policy_number for row in completed]
+            
+            logger.info(
+                f"{len(to_pay)} installments marked as paid, "
+                f"{len(completed)} policies completed and deleted"
+            )
+            
+        except Exception as e:
+            logger.error(f"Batch payment marking error: {e}")
+            self.session.rollback()
+            note_error(e)
+            return False, error_message("خطا در ثبت پرداخت‌ها", e), result
+        
+        if notify:
+            from ..utils import NotificationManager
+            NotificationManager().send_batch_payment_confirmation(
+                len(result['paid']), result['total_amount'], len(result['completed_policies'])
+            )
+        
+        return True, f"{len(result['paid'])} قسط به عنوان پرداخت شده ثبت شد", result
+    
+    def _publish_changes(self, installment_ids, policy_ids, installment_action='updated'):
+        """Tell subscribers which installments (and their policies' balances) changed"""
+        from ..utils.change_bus import get_change_bus, INSTALLMENT_CHANGED, POLICY_CHANGED
+        
+        bus = get_change_bus()
+        with bus.batch():
+            bus.publish(INSTALLMENT_CHANGED, installment_ids, installment_action)
+            bus.publish(POLICY_CHANGED, policy_ids)
+    
+    def _check_and_delete_policy_if_all_paid(self, policy_id):
+        """Check if all installments are paid and delete policy automatically"""
+        from ..models import InsurancePolicy
+        from ..models.queries import POLICY_FOR_DELETE
+        
+        try:
+            # The maintained balance row answers this without scanning installments
+            balance = self.balances.get_balance(policy_id)
             
-            if all_paid:
+            if balance and balance.is_fully_paid:
                 # Delete the policy (cascade will delete installments too)
-                policy = self.session.query(InsurancePolicy).filter(
+                policy = self.session.query(InsurancePolicy).options(*POLICY_FOR_DELETE).filter(
                     InsurancePolicy.id == policy_id
                 ).first()
                 
@@ -174,6 +435,9 @@ class InstallmentController:
                     policy_number = policy.policy_number
                     self.session.delete(policy)
                     self.session.commit()
+                    
+                    from ..utils.change_bus import publish_change, POLICY_CHANGED, DELETED
+                    publish_change(POLICY_CHANGED, [policy_id], DELETED)
                     logger.info(f"Policy {policy_number} auto-deleted: all installments paid")
         
         except Exception as e:
@@ -204,6 +468,25 @@ class InstallmentController:
             logger.error(f"Error fetching installments: {e}")
             return []
     
+    def get_policy_installments_page(self, policy_id, page_size=100, page_token=None):
+        """
+        Get one page of a policy's installments in installment-number order
+        
+        Returns:
+            Page: (installments, next_token); next_token is None on the last page
+        """
+        from ..models import Installment
+        from ..models.pagination import Page, keyset_page
+        
+        try:
+            query = self.session.query(Installment).filter(Installment.policy_id == policy_id)
+            return keyset_page(query, f'policy_installments:{policy_id}',
+                               (Installment.installment_number, Installment.id),
+                               page_size, page_token)
+        except Exception as e:
+            logger.error(f"Error fetching installment page: {e}")
+            return Page([], None)
+    
     def get_upcoming_installments(self, days_ahead=30, user_id=None):
         """Get installments due in next N days"""
         from ..models import Installment, InsurancePolicy
@@ -249,11 +532,157 @@ class InstallmentController:
             overdues = query.all()
             for inst in overdues:
                 inst.status = 'overdue'
+            self.balances.refresh_policies(inst.policy_id for inst in overdues)
+            changed = [(inst.id, inst.policy_id) for inst in overdues]
             self.session.commit()
             
+            if changed:
+                self._publish_changes([i for i, _ in changed], [p for _, p in changed])
+            
             return overdues
         except Exception as e:
             logger.error(f"Error fetching overdue installments: {e}")
+            self.session.rollback()
+            return []
+    
+    def _unpaid_past_due(self, stmt, user_id, threshold_days):
+        """Restrict a select() on installments to unpaid ones due more than threshold_days ago"""
+        from ..models import Installment, InsurancePolicy
+        
+        threshold_date = datetime.now() - timedelta(days=threshold_days)
+        stmt = stmt.where(
+            Installment.due_date < threshold_date,
+            Installment.status.in_(('pending', 'overdue'))
+        )
+        if user_id:
+            stmt = stmt.join(InsurancePolicy, InsurancePolicy.id == Installment.policy_id).where(
+                InsurancePolicy.user_id == user_id
+            )
+        return stmt
+    
+    def get_overdue_summary(self, user_id=None, threshold_days=0):
+        """
+        Totals of unpaid installments due more than threshold_days ago
+        
+        Returns:
+            dict: 'policies', 'installments' and 'amount'
+        """
+        from ..models import Installment
+        from sqlalchemy import func
+        
+        try:
+            row = self.session.execute(self._unpaid_past_due(select(
+                func.count(func.distinct(Installment.policy_id)),
+                func.count(Installment.id),
+                func.coalesce(func.sum(Installment.amount), 0)
+            ).select_from(Installment), user_id, threshold_days)).one()
+            return {'policies': row[0], 'installments': row[1], 'amount': row[2]}
+        except Exception as e:
+            logger.error(f"Error fetching overdue summary: {e}")
+            return {'policies': 0, 'installments': 0, 'amount': 0}
+    
+    def _overdue_groups(self, user_id, threshold_days, policy_ids=None):
+        """Per-policy overdue aggregates: (grouped subquery, ORM query with the policy columns)"""
+        from ..models import Installment, InsurancePolicy
+        from sqlalchemy import func
+        
+        grouped = self._unpaid_past_due(select(
+            Installment.policy_id,
+            func.count(Installment.id).label('overdue_count'),
+            func.sum(Installment.amount).label('overdue_amount'),
+            func.min(Installment.due_date).label('oldest_due_date')
+        ), user_id, threshold_days)
+        if policy_ids is not None:
+            grouped = grouped.where(Installment.policy_id.in_(policy_ids))
+        grouped = grouped.group_by(Installment.policy_id).subquery()
+        
+        query = self.session.query(
+            grouped.c.policy_id,
+            InsurancePolicy.policy_number,
+            InsurancePolicy.policy_holder_name,
+            InsurancePolicy.policy_type,
+            InsurancePolicy.mobile_number,
+            grouped.c.overdue_count,
+            grouped.c.overdue_amount,
+            grouped.c.oldest_due_date
+        ).join(InsurancePolicy, InsurancePolicy.id == grouped.c.policy_id)
+        return grouped, query
+    
+    def get_overdue_policies_page(self, user_id=None, threshold_days=0,
+                                  page_size=100, page_token=None):
+        """
+        Get one page of policies with unpaid installments due more than
+        threshold_days ago, most severe first
+        
+        Counts and totals are aggregated per policy in SQL; severity is the
+        due date of the policy's oldest unpaid installment.
+        
+        Returns:
+            Page: (rows, next_token); rows have policy_id, policy_number,
+                  policy_holder_name, policy_type, mobile_number,
+                  overdue_count, overdue_amount and oldest_due_date
+        """
+        from ..models.pagination import Page, keyset_page
+        
+        try:
+            grouped, query = self._overdue_groups(user_id, threshold_days)
+            return keyset_page(query, f'overdue_policies:{user_id}:{threshold_days}',
+                               (grouped.c.oldest_due_date, grouped.c.policy_id),
+                               page_size, page_token)
+        except Exception as e:
+            logger.error(f"Error fetching overdue policy page: {e}")
+            return Page([], None)
+    
+    def get_overdue_policy_groups(self, policy_ids, user_id=None, threshold_days=0):
+        """
+        Overdue aggregates of the given policies, as in get_overdue_policies_page
+        
+        Policies without unpaid installments due more than threshold_days
+        ago are left out.
+        
+        Returns:
+            dict: policy_id -> row
+        """
+        policy_ids = sorted(set(policy_ids))
+        groups = {}
+        for i in range(0, len(policy_ids), _ID_CHUNK_SIZE):
+            _, query = self._overdue_groups(user_id, threshold_days,
+                                            policy_ids[i:i + _ID_CHUNK_SIZE])
+            groups.update((row.policy_id, row) for row in query.all())
+        return groups
+    
+    def get_installment_policy_ids(self, installment_ids):
+        """Ids of the policies the given installments belong to"""
+        from ..models import Installment
+        
+        installment_ids = sorted(set(installment_ids))
+        policy_ids = set()
+        for i in range(0, len(installment_ids), _ID_CHUNK_SIZE):
+            policy_ids.update(self.session.execute(
+                select(Installment.policy_id).where(
+                    Installment.id.in_(installment_ids[i:i + _ID_CHUNK_SIZE]))
+            ).scalars())
+        return policy_ids
+    
+    def get_policy_overdue_installments(self, policy_id, threshold_days=0):
+        """
+        A policy's unpaid installments due more than threshold_days ago
+        
+        Returns:
+            list: InstallmentRow tuples in installment-number order
+        """
+        from ..models import Installment, InsurancePolicy
+        from ..models.read_models import InstallmentRow, INSTALLMENT_ROW_COLUMNS, fetch_rows
+        
+        try:
+            stmt = self._unpaid_past_due(
+                select(*INSTALLMENT_ROW_COLUMNS).select_from(Installment), None, threshold_days
+            ).join(InsurancePolicy, InsurancePolicy.id == Installment.policy_id).where(
+                Installment.policy_id == policy_id
+            ).order_by(Installment.installment_number)
+            return fetch_rows(self.session, stmt, InstallmentRow)
+        except Exception as e:
+            logger.error(f"Error fetching policy overdue installments: {e}")
             return []
     
     def get_installments_by_date_range(self, start_date, end_date, user_id=None):
@@ -276,23 +705,21 @@ class InstallmentController:
             logger.error(f"Error fetching installments by date range: {e}")
             return []
     
-    def get_installment_statistics(self, user_id=None):
-        """Get installment statistics"""
+    def get_installments_by_date_range_page(self, start_date, end_date, user_id=None,
+                                            page_size=100, page_token=None):
+        """
+        Get one page of installments within a date range, ordered by due date
+        
+        Returns:
+            Page: (installments, next_token); next_token is None on the last page
+        """
         from ..models import Installment, InsurancePolicy
-        from sqlalchemy import func
+        from ..models.pagination import Page, keyset_page
         
         try:
-            query = self.session.query(
-                func.count(Installment.id).label('total'),
-                func.sum(Installment.amount).filter(
-                    Installment.status == 'paid'
-                ).label('total_paid'),
-                func.sum(Installment.amount).filter(
-                    Installment.status == 'pending'
-                ).label('total_pending'),
-                func.sum(Installment.amount).filter(
-                    Installment.status == 'overdue'
-                ).label('total_overdue')
+            query = self.session.query(Installment).filter(
+                Installment.due_date >= start_date,
+                Installment.due_date <= end_date
             )
             
             if user_id:
@@ -300,14 +727,20 @@ class InstallmentController:
                     InsurancePolicy.user_id == user_id
                 )
             
-            result = query.first()
-            
-            return {
-                'total': result.total or 0,
-                'total_paid': result.total_paid or 0,
-                'total_pending': result.total_pending or 0,
-                'total_overdue': result.total_overdue or 0
-            }
+            return keyset_page(query, 'installments_by_date', (Installment.due_date, Installment.id),
+                               page_size, page_token)
+        except Exception as e:
+            logger.error(f"Error fetching installment page: {e}")
+            return Page([], None)
+    
+    def get_installment_statistics(self, user_id=None):
+        """Get installment statistics (cached until installments or policies change)"""
+        from ..utils.query_cache import cached_query
+        
+        try:
+            return cached_query(self.session, 'installment_statistics', (user_id,),
+                                ('installments', 'policies'),
+                                lambda: self._installment_statistics(user_id))
         except Exception as e:
             logger.error(f"Error calculating statistics: {e}")
             return {
@@ -316,3 +749,34 @@ class InstallmentController:
                 'total_pending': 0,
                 'total_overdue': 0
             }
+    
+    def _installment_statistics(self, user_id):
+        from ..models import Installment, InsurancePolicy
+        from sqlalchemy import func
+        
+        query = self.session.query(
+            func.count(Installment.id).label('total'),
+            func.sum(Installment.amount).filter(
+                Installment.status == 'paid'
+            ).label('total_paid'),
+            func.sum(Installment.amount).filter(
+                Installment.status == 'pending'
+            ).label('total_pending'),
+            func.sum(Installment.amount).filter(
+                Installment.status == 'overdue'
+            ).label('total_overdue')
+        )
+        
+        if user_id:
+            query = query.join(InsurancePolicy).filter(
+                InsurancePolicy.user_id == user_id
+            )
+        
+        result = query.first()
+        
+        return {
+            'total': result.total or 0,
+            'total_paid': result.total_paid or 0,
+            'total_pending': result.total_pending or 0,
+            'total_overdue': result.total_overdue or 0
+        }
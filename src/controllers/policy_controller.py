@@ -1,6 +1,7 @@
 """Policy management controller"""
-from datetime import datetime
 import logging
+from ..models.concurrency import retry_on_busy, note_error, error_message, CONFLICT_MESSAGE
+from .balance_controller import PolicyBalanceController
 
 logger = logging.getLogger(__name__)
 
@@ -9,7 +10,9 @@ class PolicyController:
     
     def __init__(self, session):
         self.session = session
+        self.balances = PolicyBalanceController(session)
     
+    @retry_on_busy
     def create_policy(self, user_id, policy_data):
         """
         Create a new insurance policy
@@ -42,50 +45,77 @@ class PolicyController:
             )
             
             self.session.add(policy)
+            self.session.flush()
+            policy_id = policy.id
+            self.balances.refresh_policies([policy_id])
             self.session.commit()
             
+            from ..utils.change_bus import publish_change, POLICY_CHANGED, CREATED
+            publish_change(POLICY_CHANGED, [policy_id], CREATED)
+            
             logger.info(f"Policy created: {policy.policy_number}")
             return True, "بیمه‌نامه با موفقیت ثبت شد", policy
             
         except Exception as e:
             logger.error(f"Policy creation error: {e}")
             self.session.rollback()
-            return False, f"خطا در ثبت بیمه‌نامه: {str(e)}", None
+            note_error(e)
+            return False, error_message("خطا در ثبت بیمه‌نامه", e), None
     
-    def update_policy(self, policy_id, policy_data):
-        """Update existing policy"""
+    @retry_on_busy
+    def update_policy(self, policy_id, policy_data, expected_updated_at=None):
+        """
+        Update existing policy
+        
+        Args:
+            policy_id: Policy ID
+            policy_data: Dictionary of fields to change
+            expected_updated_at: updated_at of the policy as the caller read
+                                 it; if another user changed it since,
+                                 nothing is written and a conflict is reported
+        
+        Returns:
+            tuple: (success: bool, message: str, policy: Policy or None)
+        """
         from ..models import InsurancePolicy
         
         try:
             policy = self.session.query(InsurancePolicy).filter(
                 InsurancePolicy.id == policy_id
-            ).first()
+            ).populate_existing().first()
             
             if not policy:
                 return False, "بیمه‌نامه یافت نشد", None
+            if expected_updated_at is not None and policy.updated_at != expected_updated_at:
+                return False, CONFLICT_MESSAGE, None
             
             # Update fields
             for key, value in policy_data.items():
-                if hasattr(policy, key) and value is not None:
+                if hasattr(policy, key) and key != 'updated_at' and value is not None:
                     setattr(policy, key, value)
             
-            policy.updated_at = datetime.now()
             self.session.commit()
             
+            from ..utils.change_bus import publish_change, POLICY_CHANGED
+            publish_change(POLICY_CHANGED, [policy_id])
+            
             logger.info(f"Policy updated: {policy.policy_number}")
             return True, "بیمه‌نامه با موفقیت به‌روزرسانی شد", policy
             
         except Exception as e:
             logger.error(f"Policy update error: {e}")
             self.session.rollback()
-            return False, f"خطا در به‌روزرسانی بیمه‌نامه: {str(e)}", None
+            note_error(e)
+            return False, error_message("خطا در به‌روزرسانی بیمه‌نامه", e), None
     
+    @retry_on_busy
     def delete_policy(self, policy_id):
         """Delete policy"""
         from ..models import InsurancePolicy
+        from ..models.queries import POLICY_FOR_DELETE
         
         try:
-            policy = self.session.query(InsurancePolicy).filter(
+            policy = self.session.query(InsurancePolicy).options(*POLICY_FOR_DELETE).filter(
                 InsurancePolicy.id == policy_id
             ).first()
             
@@ -96,13 +126,18 @@ class PolicyController:
             self.session.delete(policy)
             self.session.commit()
             
+            # Subscribers drop the policy's installment rows as well
+            from ..utils.change_bus import publish_change, POLICY_CHANGED, DELETED
+            publish_change(POLICY_CHANGED, [policy_id], DELETED)
+            
             logger.info(f"Policy deleted: {policy_number}")
             return True, "بیمه‌نامه با موفقیت حذف شد"
             
         except Exception as e:
             logger.error(f"Policy deletion error: {e}")
             self.session.rollback()
-            return False, f"خطا در حذف بیمه‌نامه: {str(e)}"
+            note_error(e)
+            return False, error_message("خطا در حذف بیمه‌نامه", e)
     
     def get_policy(self, policy_id):
         """Get policy by ID"""
@@ -117,12 +152,20 @@ class PolicyController:
             logger.error(f"Error fetching policy: {e}")
             return None
     
-    def get_all_policies(self, user_id=None, status=None):
-        """Get all policies with optional filters"""
+    def get_all_policies(self, user_id=None, status=None, options=()):
+        """
+        Get all policies with optional filters
+        
+        Args:
+            user_id: Filter by owner
+            status: Filter by policy status
+            options: Loader options, e.g. selectinload(InsurancePolicy.balance)
+                for relationships read after the session closes
+        """
         from ..models import InsurancePolicy
         
         try:
-            query = self.session.query(InsurancePolicy)
+            query = self.session.query(InsurancePolicy).options(*options)
             
             if user_id:
                 query = query.filter(InsurancePolicy.user_id == user_id)
@@ -134,6 +177,38 @@ class PolicyController:
             logger.error(f"Error fetching policies: {e}")
             return []
     
+    def get_all_policies_page(self, user_id=None, status=None, page_size=100, page_token=None,
+                              options=()):
+        """
+        Get one page of policies, newest first
+        
+        Args:
+            user_id: Filter by owner
+            status: Filter by policy status
+            page_size: Policies per page
+            page_token: next_token of the previous page, or None for the first
+            options: Loader options, as for get_all_policies
+            
+        Returns:
+            Page: (policies, next_token); next_token is None on the last page
+        """
+        from ..models import InsurancePolicy
+        from ..models.pagination import Page, keyset_page
+        
+        try:
+            query = self.session.query(InsurancePolicy).options(*options)
+            
+            if user_id:
+                query = query.filter(InsurancePolicy.user_id == user_id)
+            if status:
+                query = query.filter(InsurancePolicy.status == status)
+            
+            return keyset_page(query, 'policies', (InsurancePolicy.created_at, InsurancePolicy.id),
+                               page_size, page_token, descending=True)
+        except Exception as e:
+            logger.error(f"Error fetching policy page: {e}")
+            return Page([], None)
+    
     def search_policies(self, search_term, user_id=None):
         """Search policies by number or holder name"""
         from ..models import InsurancePolicy
@@ -153,29 +228,12 @@ class PolicyController:
             return []
     
     def get_policy_statistics(self, user_id=None):
-        """Get policy statistics"""
-        from ..models import InsurancePolicy, Installment
-        from sqlalchemy import func
+        """Get policy statistics (cached until policies change)"""
+        from ..utils.query_cache import cached_query
         
         try:
-            query = self.session.query(
-                func.count(InsurancePolicy.id).label('total_policies'),
-                func.sum(InsurancePolicy.total_amount).label('total_amount'),
-                func.count(InsurancePolicy.id).filter(
-                    InsurancePolicy.status == 'active'
-                ).label('active_policies')
-            )
-            
-            if user_id:
-                query = query.filter(InsurancePolicy.user_id == user_id)
-            
-            result = query.first()
-            
-            return {
-                'total_policies': result.total_policies or 0,
-                'total_amount': result.total_amount or 0,
-                'active_policies': result.active_policies or 0
-            }
+            return cached_query(self.session, 'policy_statistics', (user_id,), ('policies',),
+                                lambda: self._policy_statistics(user_id))
         except Exception as e:
             logger.error(f"Error calculating statistics: {e}")
             return {
@@ -183,3 +241,26 @@ class PolicyController:
                 'total_amount': 0,
                 'active_policies': 0
             }
+    
+    def _policy_statistics(self, user_id):
+        from ..models import InsurancePolicy
+        from sqlalchemy import func
+        
+        query = self.session.query(
+            func.count(InsurancePolicy.id).label('total_policies'),
+            func.sum(InsurancePolicy.total_amount).label('total_amount'),
+            func.count(InsurancePolicy.id).filter(
+                InsurancePolicy.status == 'active'
+            ).label('active_policies')
+        )
+        
+        if user_id:
+            query = query.filter(InsurancePolicy.user_id == user_id)
+        
+        result = query.first()
+        
+        return {
+            'total_policies': result.total_policies or 0,
+            'total_amount': result.total_amount or 0,
+            'active_policies': result.active_policies or 0
+        }
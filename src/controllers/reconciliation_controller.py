@@ -0,0 +1,352 @@
+"""Bank statement reconciliation controller"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+import logging
+
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+# Statement lines that can never match are counted; only a sample is kept
+MAX_UNMATCHED_SAMPLE = 1000
+# Review queue entries beyond this are counted as unmatched
+MAX_REVIEW_QUEUE = 10000
+# Candidates shown per review entry
+MAX_REVIEW_CANDIDATES = 5
+
+BANK_PAYMENT_METHOD = 'انتقال بانکی'
+
+_REFERENCE_CHUNK = 500
+
+
+class OpenInstallmentIndex:
+    """In-memory hash indexes over open (pending/overdue) installments"""
+
+    def __init__(self, amount_tolerance=1):
+        """
+        Args:
+            amount_tolerance: Allowed difference in rials when matching amounts
+        """
+        self.amount_tolerance = int(amount_tolerance)
+        self.installments = {}                  # id -> (policy_id, amount, due ordinal, policy_number)
+        self.by_reference = {}                  # transaction_reference -> id
+        self.by_policy_number = {}              # policy_number -> [ids by due date]
+        self.by_mobile = defaultdict(set)       # mobile -> {policy_number}
+        self.by_amount = defaultdict(list)      # rounded amount -> [(due ordinal, id)] sorted
+        self.claimed = set()
+
+    def load(self, session):
+        """Build the indexes with one query over open installments"""
+        from ..models import Installment, InsurancePolicy
+        from ..utils.statement_reader import normalize_mobile
+
+        rows = session.execute(
+            select(
+                Installment.id, Installment.policy_id, Installment.amount,
+                Installment.due_date, Installment.transaction_reference,
+                InsurancePolicy.policy_number, InsurancePolicy.mobile_number
+            ).join(
+                InsurancePolicy, Installment.policy_id == InsurancePolicy.id
+            ).where(
+                Installment.status.in_(['pending', 'overdue'])
+            ).order_by(Installment.due_date, Installment.id)
+        )
+
+        by_policy = defaultdict(list)
+        mobiles = {}
+        for row in rows:
+            due = row.due_date.toordinal() if row.due_date else 0
+            self.installments[row.id] = (row.policy_id, row.amount, due, row.policy_number)
+            if row.transaction_reference:
+                self.by_reference[row.transaction_reference] = row.id
+            by_policy[row.policy_number].append(row.id)
+            self.by_amount[self._amount_key(row.amount)].append((due, row.id))
+            if row.mobile_number and row.policy_number not in mobiles:
+                mobiles[row.policy_number] = normalize_mobile(row.mobile_number)
+
+        self.by_policy_number = dict(by_policy)
+        for policy_number, mobile in mobiles.items():
+            if mobile:
+                self.by_mobile[mobile].add(policy_number)
+
+        logger.info(f"Reconciliation index built over {len(self.installments)} open installments")
+        return self
+
+    @staticmethod
+    def _amount_key(amount):
+        return int(round(amount or 0))
+
+    def amount_matches(self, installment_id, amount):
+        """True if the installment amount equals the statement amount within tolerance"""
+        return abs(self.installments[installment_id][1] - amount) <= self.amount_tolerance
+
+    def claim(self, installment_id):
+        """Reserve an installment so no other statement line matches it"""
+        self.claimed.add(installment_id)
+
+    def open_for_policy(self, policy_number, amount=None):
+        """Unclaimed installments of a policy (earliest due first), optionally amount-filtered"""
+        return [
+            iid for iid in self.by_policy_number.get(policy_number, ())
+            if iid not in self.claimed and (amount is None or self.amount_matches(iid, amount))
+        ]
+
+    def by_amount_window(self, amount, pay_date, window_days):
+        """Unclaimed installments with this amount due within +/- window_days of pay_date"""
+        key = self._amount_key(amount)
+        day = pay_date.toordinal()
+        result = []
+        for k in range(key - self.amount_tolerance, key + self.amount_tolerance + 1):
+            entries = self.by_amount.get(k)
+            if not entries:
+                continue
+            lo = bisect_left(entries, (day - window_days, -1))
+            hi = bisect_right(entries, (day + window_days, float('inf')))
+            result.extend(iid for _, iid in entries[lo:hi] if iid not in self.claimed)
+        return result
+
+
+class ReconciliationController:
+    """Match bank statement lines to open installments and apply payments"""
+
+    def __init__(self, session, date_window_days=10, amount_tolerance=1):
+        """
+        Args:
+            session: SQLAlchemy database session
+            date_window_days: Window around the due date for amount/date matching
+            amount_tolerance: Allowed amount difference in rials
+        """
+        self.session = session
+        self.date_window_days = date_window_days
+        self.amount_tolerance = amount_tolerance
+        self.reset()
+
+    def reset(self):
+        """Clear the results of the previous run"""
+        self.index = None
+        self.matches = []        # dicts: row_number, installment_id, method, reference, date, amount
+        self.review_queue = []   # dicts: row_number, record, reason, candidates
+        self.duplicates = []     # row numbers whose reference is already paid or matched
+        self.matched_references = set()
+        self.unmatched_count = 0
+        self.unmatched_sample = []
+        self.rows_read = 0
+
+    def reconcile(self, path, chunk_size=None):
+        """
+        Stream a statement file and match every line
+
+        Args:
+            path: CSV or .xlsx bank statement
+            chunk_size: Lines per processing chunk
+
+        Returns:
+            tuple: (success: bool, message: str, summary: dict)
+        """
+        from ..utils.statement_reader import iter_statement_chunks, DEFAULT_CHUNK_SIZE
+
+        self.reset()
+        try:
+            self.index = OpenInstallmentIndex(self.amount_tolerance).load(self.session)
+            for chunk in iter_statement_chunks(path, chunk_size or DEFAULT_CHUNK_SIZE):
+                self.match_records(chunk)
+        except Exception as e:
+            logger.error(f"Statement reconciliation error: {e}")
+            return False, f"خطا در پردازش صورتحساب: {str(e)}", self.summary()
+
+        summary = self.summary()
+        logger.info(f"Statement reconciled: {summary}")
+        return True, (
+            f"{summary['matched']} مورد تطبیق داده شد، "
+            f"{summary['review']} مورد نیاز به بررسی دارد"
+        ), summary
+
+    def match_records(self, records):
+        """
+        Match one chunk of normalized statement records
+
+        Args:
+            records: List of dicts from statement_reader.normalize_record
+        """
+        if self.index is None:
+            self.index = OpenInstallmentIndex(self.amount_tolerance).load(self.session)
+
+        paid_refs = self._paid_references({r['reference'] for r in records if r['reference']})
+
+        for record in records:
+            self.rows_read += 1
+            if record['amount'] is None or record['amount'] <= 0:
+                self._unmatched(record)
+            elif record['reference'] and (record['reference'] in paid_refs or
+                                          record['reference'] in self.matched_references):
+                self.duplicates.append(record['row_number'])
+            else:
+                self._match(record)
+
+    def _paid_references(self, references):
+        """References in this chunk that are already recorded on paid installments"""
+        from ..models import Installment
+
+        references = list(references)
+        found = set()
+        for i in range(0, len(references), _REFERENCE_CHUNK):
+            found.update(self.session.execute(
+                select(Installment.transaction_reference).where(
+                    Installment.status == 'paid',
+                    Installment.transaction_reference.in_(references[i:i + _REFERENCE_CHUNK])
+                )
+            ).scalars())
+        return found
+
+    def _match(self, record):
+        """Try each index in order of confidence"""
+        from ..utils.statement_reader import description_tokens
+
+        index = self.index
+        amount = record['amount']
+
+        # 1. Exact transaction reference
+        installment_id = index.by_reference.get(record['reference'])
+        if installment_id is not None and installment_id not in index.claimed:
+            return self._accept(record, installment_id, 'reference')
+
+        # 2. Policy number (column, or a token of the description)
+        policy_numbers = []
+        if record['policy_number'] in index.by_policy_number:
+            policy_numbers = [record['policy_number']]
+        else:
+            policy_numbers = [t for t in description_tokens(record['description'])
+                              if t in index.by_policy_number][:1]
+        if policy_numbers:
+            return self._match_policies(record, policy_numbers, 'policy_number')
+
+        # 3. Mobile number -> policies of that customer
+        if record['mobile'] in index.by_mobile:
+            return self._match_policies(record, sorted(index.by_mobile[record['mobile']]), 'mobile')
+
+        # 4. Amount within a date window around the due date
+        if record['date'] is not None:
+            candidates = index.by_amount_window(amount, record['date'], self.date_window_days)
+            if len(candidates) == 1:
+                return self._accept(record, candidates[0], 'amount_date')
+            if candidates:
+                return self._review(record, 'ambiguous_amount_date', candidates)
+
+        self._unmatched(record)
+
+    def _match_policies(self, record, policy_numbers, method):
+        """Pick the earliest unpaid installment with the right amount among the policies"""
+        index = self.index
+        per_policy = {pn: index.open_for_policy(pn, record['amount']) for pn in policy_numbers}
+        matching = [ids for ids in per_policy.values() if ids]
+
+        if len(matching) == 1:
+            return self._accept(record, matching[0][0], method)
+        if len(matching) > 1:
+            return self._review(record, f'ambiguous_{method}', [ids[0] for ids in matching])
+
+        # The customer is known but no open installment has this amount
+        candidates = [iid for pn in policy_numbers for iid in index.open_for_policy(pn)]
+        if candidates:
+            return self._review(record, 'amount_mismatch', candidates)
+        self._unmatched(record)
+
+    def _accept(self, record, installment_id, method):
+        self.index.claim(installment_id)
+        if record['reference']:
+            self.matched_references.add(record['reference'])
+        self.matches.append({
+            'row_number': record['row_number'],
+            'installment_id': installment_id,
+            'method': method,
+            'reference': record['reference'],
+            'date': record['date'],
+            'amount': record['amount'],
+        })
+
+    def _review(self, record, reason, candidates):
+        if len(self.review_queue) >= MAX_REVIEW_QUEUE:
+            return self._unmatched(record)
+        self.review_queue.append({
+            'row_number': record['row_number'],
+            'record': record,
+            'reason': reason,
+            'candidates': candidates[:MAX_REVIEW_CANDIDATES],
+        })
+
+    def _unmatched(self, record):
+        self.unmatched_count += 1
+        if len(self.unmatched_sample) < MAX_UNMATCHED_SAMPLE:
+            self.unmatched_sample.append(record)
+
+    def confirm(self, row_number, installment_id):
+        """
+        Resolve a review queue entry by choosing an installment
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        entry = next((e for e in self.review_queue if e['row_number'] == row_number), None)
+        if entry is None:
+            return False, "ردیف در صف بررسی یافت نشد"
+        if installment_id in self.index.claimed:
+            return False, "این قسط قبلاً به ردیف دیگری اختصاص یافته است"
+        if installment_id not in self.index.installments:
+            return False, "قسط باز با این شناسه یافت نشد"
+
+        self.review_queue.remove(entry)
+        self._accept(entry['record'], installment_id, 'manual')
+        return True, "ردیف تأیید شد"
+
+    def reject(self, row_number):
+        """Drop a review queue entry (it is counted as unmatched)"""
+        entry = next((e for e in self.review_queue if e['row_number'] == row_number), None)
+        if entry is None:
+            return False, "ردیف در صف بررسی یافت نشد"
+        self.review_queue.remove(entry)
+        self._unmatched(entry['record'])
+        return True, "ردیف رد شد"
+
+    def describe_installment(self, installment_id):
+        """(policy_number, amount, due date) of an indexed installment for review display"""
+        _, amount, due, policy_number = self.index.installments[installment_id]
+        return policy_number, amount, date.fromordinal(due) if due else None
+
+    def apply(self, payment_method=BANK_PAYMENT_METHOD, notify=True):
+        """
+        Record all confirmed matches as payments in one transaction
+
+        Returns:
+            tuple: (success: bool, message: str, result: dict from mark_many_as_paid)
+        """
+        from .installment_controller import InstallmentController
+
+        payments = [
+            {
+                'installment_id': m['installment_id'],
+                'transaction_reference': m['reference'],
+                'payment_date': datetime.combine(m['date'], datetime.min.time()) if m['date'] else None,
+            }
+            for m in self.matches
+        ]
+        success, message, result = InstallmentController(self.session).mark_many_as_paid(
+            payments, payment_method=payment_method, notify=notify
+        )
+        if success:
+            self.matches = []
+        return success, message, result
+
+    def summary(self):
+        """Counts of the current run"""
+        methods = defaultdict(int)
+        for m in self.matches:
+            methods[m['method']] += 1
+        return {
+            'rows': self.rows_read,
+            'matched': len(self.matches),
+            'review': len(self.review_queue),
+            'duplicates': len(self.duplicates),
+            'unmatched': self.unmatched_count,
+            'by_method': dict(methods),
+        }
@@ -53,57 +53,19 @@ class ReminderController:
         Returns:
             tuple: (success: bool, message: str, reminder: Reminder or None)
         """
-        from ..models import Installment, InsurancePolicy, User, Reminder
+        from ..models import Installment, Reminder
+        from ..models.queries import reminder_targets
         
         try:
-            installment = self.session.query(Installment).filter(
-                Installment.id == installment_id
+            # Installment, policy number and owner contact in one query
+            target = self.session.execute(
+                reminder_targets().where(Installment.id == installment_id)
             ).first()
             
-            if not installment:
+            if not target:
                 return False, "قسط یافت نشد", None
             
-            policy = self.session.query(InsurancePolicy).filter(
-                InsurancePolicy.id == installment.policy_id
-            ).first()
-            
-            if not policy:
-                return False, "بیمه‌نامه یافت نشد", None
-            
-            user = self.session.query(User).filter(
-                User.id == policy.user_id
-            ).first()
-            
-            if not user:
-                return False, "کاربر یافت نشد", None
-            
-            # Calculate reminder date
-            scheduled_date = installment.due_date - timedelta(days=days_before)
-            
-            # Create reminder message
-            from ..utils.persian_utils import format_currency, PersianDateConverter
-            
-            persian_date = PersianDateConverter.gregorian_to_jalali(installment.due_date)
-            title = "یادآوری پرداخت قسط"
-            message = (
-                f"قسط شماره {installment.installment_number}\n"
-                f"بیمه‌نامه: {policy.policy_number}\n"
-                f"مبلغ: {format_currency(installment.amount)}\n"
-                f"سررسید: {persian_date}"
-            )
-            
-            reminder = Reminder(
-                user_id=user.id,
-                installment_id=installment_id,
-                reminder_type=reminder_type,
-                title=title,
-                message=message,
-                scheduled_date=scheduled_date,
-                recipient_phone=user.phone,
-                recipient_email=user.email,
-                priority='normal'
-            )
-            
+            reminder = Reminder(**self._installment_reminder_values(target, days_before, reminder_type))
             self.session.add(reminder)
             self.session.commit()
             
@@ -115,6 +77,35 @@ class ReminderController:
             self.session.rollback()
             return False, f"خطا در ایجاد یادآوری: {str(e)}", None
     
+    def _installment_reminder_values(self, target, days_before, reminder_type):
+        """Column values of a payment reminder for a reminder_targets() row"""
+        from ..utils.persian_utils import format_currency, PersianDateConverter
+        
+        # Calculate reminder date
+        scheduled_date = target.due_date - timedelta(days=days_before)
+        
+        # Create reminder message
+        persian_date = PersianDateConverter.gregorian_to_jalali(target.due_date)
+        title = "یادآوری پرداخت قسط"
+        message = (
+            f"قسط شماره {target.installment_number}\n"
+            f"بیمه‌نامه: {target.policy_number}\n"
+            f"مبلغ: {format_currency(target.amount)}\n"
+            f"سررسید: {persian_date}"
+        )
+        
+        return {
+            'user_id': target.user_id,
+            'installment_id': target.id,
+            'reminder_type': reminder_type,
+            'title': title,
+            'message': message,
+            'scheduled_date': scheduled_date,
+            'recipient_phone': target.phone,
+            'recipient_email': target.email,
+            'priority': 'normal',
+        }
+    
     def process_pending_reminders(self):
         """
         Process and send pending reminders
@@ -248,6 +239,30 @@ class ReminderController:
             logger.error(f"Error fetching reminders: {e}")
             return []
     
+    def get_user_reminders_page(self, user_id, status=None, page_size=100, page_token=None):
+        """
+        Get one page of a user's reminders, latest scheduled first
+        
+        Returns:
+            Page: (reminders, next_token); next_token is None on the last page
+        """
+        from ..models import Reminder
+        from ..models.pagination import Page, keyset_page
+        
+        try:
+            query = self.session.query(Reminder).filter(
+                Reminder.user_id == user_id
+            )
+            
+            if status:
+                query = query.filter(Reminder.status == status)
+            
+            return keyset_page(query, f'reminders:{user_id}', (Reminder.scheduled_date, Reminder.id),
+                               page_size, page_token, descending=True)
+        except Exception as e:
+            logger.error(f"Error fetching reminder page: {e}")
+            return Page([], None)
+    
     def cancel_reminder(self, reminder_id):
         """Cancel a reminder"""
         from ..models import Reminder
@@ -281,28 +296,31 @@ class ReminderController:
         Returns:
             tuple: (success: bool, count: int)
         """
-        from ..models import Installment
+        from sqlalchemy import insert
+        from ..models import Installment, Reminder
+        from ..models.queries import reminder_targets
         
         try:
-            installments = self.session.query(Installment).filter(
-                Installment.policy_id == policy_id,
-                Installment.status == 'pending'
+            targets = self.session.execute(
+                reminder_targets().where(
+                    Installment.policy_id == policy_id,
+                    Installment.status == 'pending'
+                )
             ).all()
             
-            count = 0
-            for inst in installments:
-                # Create reminder 3 days before due date
-                success, _, _ = self.create_installment_reminder(
-                    inst.id,
-                    days_before=3,
-                    reminder_type='notification'
-                )
-                if success:
-                    count += 1
+            # Create reminder 3 days before due date, one multi-row insert
+            if targets:
+                self.session.execute(insert(Reminder), [
+                    self._installment_reminder_values(target, 3, 'notification')
+                    for target in targets
+                ])
+                self.session.commit()
+            count = len(targets)
             
             logger.info(f"Auto-scheduled {count} reminders for policy {policy_id}")
             return True, count
             
         except Exception as e:
             logger.error(f"Error auto-scheduling reminders: {e}")
+            self.session.rollback()
             return False, 0
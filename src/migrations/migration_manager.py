@@ -1,11 +1,20 @@
 """Database migration manager"""
 import logging
 import os
+import re
 import sqlite3
+from decimal import Decimal, ROUND_FLOOR, ROUND_HALF_UP
 from typing import List, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Amount columns stored as whole rials from migration 004 on
+MONEY_COLUMNS = {
+    'policies': ('total_amount', 'down_payment'),
+    'installments': ('amount',),
+    'policy_balances': ('total_paid', 'total_pending', 'total_overdue'),
+}
+
 
 class MigrationManager:
     """Manages database migrations"""
@@ -76,6 +85,10 @@ class MigrationManager:
         # Define migrations in order
         migrations = [
             ('001_add_missing_columns', self._migration_001_add_missing_columns),
+            ('002_create_policy_balances', self._migration_002_create_policy_balances),
+            ('003_add_keyset_indexes', self._migration_003_add_keyset_indexes),
+            ('004_integer_money', self._migration_004_integer_money),
+            ('005_row_versions', self._migration_005_row_versions),
         ]
         
         for version, migration_func in migrations:
@@ -196,3 +209,267 @@ class MigrationManager:
             raise
         finally:
             conn.close()
+    
+    def _migration_002_create_policy_balances(self):
+        """
+        Migration 002: Create and populate the policy_balances summary table
+        
+        policy_balances holds per-policy paid/pending/overdue totals, counts and
+        the next unpaid due date. It is maintained incrementally by the
+        controllers; this migration backfills it for existing databases.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS policy_balances (
+                    policy_id INTEGER NOT NULL PRIMARY KEY
+                        REFERENCES policies(id) ON DELETE CASCADE,
+                    total_paid FLOAT NOT NULL DEFAULT 0,
+                    total_pending FLOAT NOT NULL DEFAULT 0,
+                    total_overdue FLOAT NOT NULL DEFAULT 0,
+                    installment_count INTEGER NOT NULL DEFAULT 0,
+                    paid_count INTEGER NOT NULL DEFAULT 0,
+                    pending_count INTEGER NOT NULL DEFAULT 0,
+                    overdue_count INTEGER NOT NULL DEFAULT 0,
+                    cancelled_count INTEGER NOT NULL DEFAULT 0,
+                    next_due_date DATETIME,
+                    updated_at DATETIME
+                )
+            """)
+            
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='policies'")
+            has_policies = cursor.fetchone() is not None
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='installments'")
+            has_installments = cursor.fetchone() is not None
+            
+            if has_policies and has_installments:
+                cursor.execute("DELETE FROM policy_balances")
+                cursor.execute("""
+                    INSERT INTO policy_balances (
+                        policy_id, total_paid, total_pending, total_overdue,
+                        installment_count, paid_count, pending_count,
+                        overdue_count, cancelled_count, next_due_date, updated_at
+                    )
+                    SELECT
+                        p.id,
+                        COALESCE(SUM(CASE WHEN i.status = 'paid' THEN i.amount ELSE 0 END), 0),
+                        COALESCE(SUM(CASE WHEN i.status = 'pending' THEN i.amount ELSE 0 END), 0),
+                        COALESCE(SUM(CASE WHEN i.status = 'overdue' THEN i.amount ELSE 0 END), 0),
+                        COUNT(i.id),
+                        COALESCE(SUM(CASE WHEN i.status = 'paid' THEN 1 ELSE 0 END), 0),
+                        COALESCE(SUM(CASE WHEN i.status = 'pending' THEN 1 ELSE 0 END), 0),
+                        COALESCE(SUM(CASE WHEN i.status = 'overdue' THEN 1 ELSE 0 END), 0),
+                        COALESCE(SUM(CASE WHEN i.status = 'cancelled' THEN 1 ELSE 0 END), 0),
+                        MIN(CASE WHEN i.status IN ('pending', 'overdue') THEN i.due_date END),
+                        CURRENT_TIMESTAMP
+                    FROM policies p
+                    LEFT OUTER JOIN installments i ON i.policy_id = p.id
+                    GROUP BY p.id
+                """)
+                logger.info(f"Backfilled policy_balances for {cursor.rowcount} policies")
+            
+            conn.commit()
+            logger.info("Migration 002 completed successfully")
+            
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration 002 failed: {e}")
+            raise
+        finally:
+            conn.close()
+    
+    def _migration_003_add_keyset_indexes(self):
+        """
+        Migration 003: Add indexes that back keyset pagination
+        
+        Each paged listing orders by (sort column, id) and filters with a row
+        value comparison on the same columns, so a matching composite index
+        lets SQLite seek straight to the page instead of sorting the table.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        indexes = [
+            ('installments', 'ix_installments_due_date_id', 'due_date, id'),
+            ('installments', 'ix_installments_policy_number_id', 'policy_id, installment_number, id'),
+            ('policies', 'ix_policies_created_at_id', 'created_at, id'),
+            ('reminders', 'ix_reminders_user_scheduled_id', 'user_id, scheduled_date, id'),
+        ]
+        
+        try:
+            for table, name, columns in indexes:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+                if cursor.fetchone():
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+                    logger.info(f"Ensured index {name} on {table}")
+            
+            conn.commit()
+            logger.info("Migration 003 completed successfully")
+            
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration 003 failed: {e}")
+            raise
+        finally:
+            conn.close()
+    
+    def _migration_004_integer_money(self):
+        """
+        Migration 004: Store amounts as INTEGER rials
+        
+        Fractional installment amounts (from dividing totals by the number of
+        installments) are rounded per policy with the largest remainder
+        method, so each policy's schedule still adds up to its rounded total.
+        Tables whose amount columns were declared FLOAT are then rebuilt with
+        INTEGER columns (SQLite cannot change a column type in place), and
+        the policy_balances totals are recomputed from the rounded amounts.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN")
+            
+            if self._column_exists(cursor, 'installments', 'amount'):
+                self._round_installment_amounts(cursor)
+            
+            for table, columns in MONEY_COLUMNS.items():
+                cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,))
+                row = cursor.fetchone()
+                if not row:
+                    continue
+                columns = [c for c in columns if self._column_exists(cursor, table, c)]
+                create_sql = row[0]
+                integer_sql = create_sql
+                for column in columns:
+                    integer_sql = self._retype_column(integer_sql, column, 'INTEGER')
+                
+                if integer_sql != create_sql:
+                    self._rebuild_table(cursor, table, integer_sql, columns)
+                    logger.info(f"Rebuilt {table} with INTEGER amount columns")
+                else:
+                    for column in columns:
+                        cursor.execute(
+                            f"UPDATE {table} SET {column} = CAST(ROUND({column}) AS INTEGER) "
+                            f"WHERE typeof({column}) = 'real'"
+                        )
+            
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='policy_balances'")
+            if cursor.fetchone() and self._column_exists(cursor, 'installments', 'amount'):
+                totals = ", ".join(
+                    f"""total_{status} = COALESCE((SELECT SUM(i.amount) FROM installments i
+                        WHERE i.policy_id = policy_balances.policy_id AND i.status = '{status}'), 0)"""
+                    for status in ('paid', 'pending', 'overdue')
+                )
+                cursor.execute(f"UPDATE policy_balances SET {totals}")
+            
+            conn.commit()
+            logger.info("Migration 004 completed successfully")
+            
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration 004 failed: {e}")
+            raise
+        finally:
+            conn.close()
+    
+    def _migration_005_row_versions(self):
+        """
+        Migration 005: Give every policy and installment a usable updated_at
+        
+        updated_at is now the optimistic-concurrency version: updates and
+        deletes match it by equality against the value the ORM read and
+        wrote back as 'YYYY-MM-DD HH:MM:SS.ffffff'. Missing values are
+        filled in and shorter legacy formats are padded to that form, so
+        older rows can still be changed.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            for table in ('policies', 'installments'):
+                if not self._column_exists(cursor, table, 'updated_at'):
+                    continue
+                cursor.execute(f"""
+                    UPDATE {table} SET updated_at = COALESCE(
+                        created_at, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+                    WHERE updated_at IS NULL
+                """)
+                cursor.execute(f"UPDATE {table} SET updated_at = updated_at || '.000000' "
+                               f"WHERE length(updated_at) = 19")
+                cursor.execute(f"UPDATE {table} SET updated_at = updated_at || '000' "
+                               f"WHERE length(updated_at) = 23")
+                logger.info(f"Normalized updated_at of {table}")
+            
+            conn.commit()
+            logger.info("Migration 005 completed successfully")
+            
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration 005 failed: {e}")
+            raise
+        finally:
+            conn.close()
+    
+    def _round_installment_amounts(self, cursor):
+        """Round fractional installment amounts without changing each policy's rounded sum"""
+        cursor.execute("""
+            SELECT policy_id, id, amount FROM installments
+            WHERE policy_id IN (
+                SELECT DISTINCT policy_id FROM installments
+                WHERE typeof(amount) = 'real' AND amount != CAST(amount AS INTEGER)
+            )
+            ORDER BY policy_id, installment_number, id
+        """)
+        schedules = {}
+        for policy_id, installment_id, amount in cursor.fetchall():
+            schedules.setdefault(policy_id, []).append((installment_id, Decimal(str(amount or 0))))
+        
+        updates = []
+        for rows in schedules.values():
+            floors = [amount.to_integral_value(rounding=ROUND_FLOOR) for _, amount in rows]
+            total = sum(amount for _, amount in rows).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+            leftover = int(total - sum(floors))
+            by_remainder = sorted(range(len(rows)), key=lambda i: (floors[i] - rows[i][1], i))
+            for i in by_remainder[:leftover]:
+                floors[i] += 1
+            updates.extend((int(floor), installment_id) for floor, (installment_id, _) in zip(floors, rows))
+        
+        cursor.executemany("UPDATE installments SET amount = ? WHERE id = ?", updates)
+        if schedules:
+            logger.info(f"Rounded installment amounts of {len(schedules)} policies to whole rials")
+    
+    @staticmethod
+    def _retype_column(create_sql: str, column: str, new_type: str) -> str:
+        """CREATE TABLE statement with one column's declared type replaced"""
+        pattern = re.compile(
+            r'((?:^|[(,])\s*["`\[]?' + re.escape(column) + r'["`\]]?\s+)([A-Za-z]+(?:\s*\([^)]*\))?)',
+            re.IGNORECASE
+        )
+        return pattern.sub(lambda m: m.group(1) + new_type, create_sql, count=1)
+    
+    def _rebuild_table(self, cursor, table: str, create_sql: str, money_columns: List[str]):
+        """Recreate a table from a new CREATE TABLE statement, copying rows and indexes"""
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+            (table,)
+        )
+        index_sql = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"PRAGMA table_info({table})")
+        names = [row[1] for row in cursor.fetchall()]
+        
+        new_table = f"{table}_migration_new"
+        cursor.execute(re.sub(
+            r'^\s*CREATE\s+TABLE\s+["`\[]?\w+["`\]]?', f'CREATE TABLE {new_table}', create_sql,
+            count=1, flags=re.IGNORECASE
+        ))
+        select_list = ", ".join(
+            f"CAST(ROUND({name}) AS INTEGER)" if name in money_columns else name for name in names
+        )
+        cursor.execute(f"INSERT INTO {new_table} ({', '.join(names)}) SELECT {select_list} FROM {table}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        for sql in index_sql:
+            cursor.execute(sql)
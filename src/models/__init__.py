@@ -1,15 +1,23 @@
 """Database models for Iran Insurance Installment Management System"""
-from .database import init_database, get_session
+from .database import init_database, get_session, session_scope, read_session
 from .user import User
 from .policy import InsurancePolicy
 from .installment import Installment
 from .reminder import Reminder
+from .policy_balance import PolicyBalance
+from .money import Money, to_rials, split_amount
 
 __all__ = [
     'init_database',
     'get_session',
+    'session_scope',
+    'read_session',
     'User',
     'InsurancePolicy',
     'Installment',
-    'Reminder'
+    'Reminder',
+    'PolicyBalance',
+    'Money',
+    'to_rials',
+    'split_amount'
 ]
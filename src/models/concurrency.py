@@ -0,0 +1,173 @@
+"""Concurrent access to a shared database file
+
+Several application processes may open the same SQLite file. Three
+mechanisms keep them from failing on locks or overwriting each other:
+
+- connections wait for locks (``PRAGMA busy_timeout``) and, in WAL mode,
+  readers never block the single writer;
+- policies and installments carry ``updated_at`` as an ORM version
+  column, so an UPDATE or DELETE only applies to the row version that was
+  read and a concurrent change raises StaleDataError instead of being
+  silently overwritten;
+- controller write methods decorated with ``retry_on_busy`` are run again,
+  with a fresh read, when they failed because the database stayed locked
+  or a row changed under them.
+
+WAL needs shared memory, so every process must run on the same host as
+the file; for a file on a network share use the ``delete`` journal mode.
+"""
+import functools
+import logging
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm.exc import StaleDataError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_MODE = 'wal'
+DEFAULT_BUSY_TIMEOUT_MS = 10000
+DEFAULT_RETRY_ATTEMPTS = 5
+RETRY_DELAY = 0.05              # seconds before the first retry, doubled per attempt
+
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'wal')
+
+CONFLICT_MESSAGE = "اطلاعات توسط کاربر دیگری تغییر کرده است. لطفاً دوباره تلاش کنید"
+BUSY_MESSAGE = "پایگاه داده در حال استفاده کاربر دیگری است. لطفاً دوباره تلاش کنید"
+
+_SQLITE_BUSY = 5
+_SQLITE_LOCKED = 6
+
+_state = threading.local()
+
+
+def next_version(current):
+    """
+    New updated_at for a changed row (the ORM version_id_generator)
+
+    Always later than the current value, even when the clock of this host
+    is behind the host that wrote it or two writes fall in one microsecond.
+    """
+    now = datetime.now()
+    if current is None or now > current:
+        return now
+    return current + timedelta(microseconds=1)
+
+
+def is_busy_error(error):
+    """True for 'database is locked' / 'database is busy' errors"""
+    if isinstance(error, DBAPIError):
+        error = error.orig
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (_SQLITE_BUSY, _SQLITE_LOCKED)
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def is_conflict(error):
+    """True if a row changed (or was deleted) since it was read"""
+    return isinstance(error, StaleDataError)
+
+
+def note_error(error):
+    """Record a failure of the current write so retry_on_busy can retry it"""
+    if is_busy_error(error) or is_conflict(error):
+        _state.retryable = error
+
+
+def error_message(prefix, error):
+    """Message for a failed write: a retry hint for conflicts and locks, else prefix and error"""
+    if is_conflict(error):
+        return CONFLICT_MESSAGE
+    if is_busy_error(error):
+        return BUSY_MESSAGE
+    return f"{prefix}: {str(error)}"
+
+
+def retry_on_busy(method):
+    """
+    Run a controller write method again after a lock or version conflict
+
+    The method must catch its errors, pass them to note_error() after the
+    rollback and return a (success, message, ...) tuple. A failed attempt
+    is repeated with exponential backoff and jitter, up to the configured
+    number of attempts, only when note_error() recorded a retryable error;
+    the last attempt's result is returned.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if getattr(_state, 'active', False):
+            # Nested write: the outermost call retries
+            return method(*args, **kwargs)
+        attempts = max(1, _setting('database.retry_attempts', DEFAULT_RETRY_ATTEMPTS))
+        _state.active = True
+        try:
+            for attempt in range(attempts):
+                _state.retryable = None
+                result = method(*args, **kwargs)
+                error = _state.retryable
+                if result[0] or error is None or attempt == attempts - 1:
+                    return result
+                delay = RETRY_DELAY * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"{method.__qualname__} attempt {attempt + 1} failed "
+                               f"({error.__class__.__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+        finally:
+            _state.active = False
+            _state.retryable = None
+    return wrapper
+
+
+def _setting(key, default):
+    try:
+        from ..utils.config_manager import get_config
+        return get_config().get(key, default)
+    except Exception:
+        return default
+
+
+def install(engine, journal_mode=None, busy_timeout_ms=None):
+    """
+    Configure every new connection of a SQLite engine for shared use
+
+    Args:
+        engine: SQLAlchemy engine
+        journal_mode: 'wal' (default), 'delete', 'truncate' or 'persist'
+        busy_timeout_ms: How long a statement waits for a lock
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    journal_mode = (journal_mode or _setting('database.journal_mode', DEFAULT_JOURNAL_MODE)).lower()
+    if journal_mode not in JOURNAL_MODES:
+        logger.error(f"Unknown journal mode {journal_mode!r}, using {DEFAULT_JOURNAL_MODE}")
+        journal_mode = DEFAULT_JOURNAL_MODE
+    if busy_timeout_ms is None:
+        busy_timeout_ms = _setting('database.busy_timeout_ms', DEFAULT_BUSY_TIMEOUT_MS)
+    in_memory = engine.url.database in (None, '', ':memory:')
+
+    def configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+            if in_memory:
+                return
+            try:
+                cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+            except sqlite3.OperationalError as e:
+                # Another process holds a lock; it already set the persistent mode
+                logger.warning(f"Could not set journal mode {journal_mode}: {e}")
+            if journal_mode == 'wal':
+                # Durable at checkpoints, safe against corruption in WAL mode
+                cursor.execute("PRAGMA synchronous = NORMAL")
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', configure_connection)
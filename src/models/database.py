@@ -1,6 +1,8 @@
 """Database configuration and session management"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import os
 import logging
 
@@ -8,21 +10,69 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
-# Database file path
+# Database file path (default; see resolve_db_path)
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'insurance.db')
 
+# Environment variable naming a shared database file
+DB_PATH_ENV = 'INSURANCE_DB_PATH'
+
 engine = None
 SessionLocal = None
+ReadSessionLocal = None
+
+def resolve_db_path():
+    """
+    Database file to open
+    
+    The INSURANCE_DB_PATH environment variable, else the 'database.path'
+    setting (relative to the config directory), else DB_PATH. Pointing
+    several installations at one file makes them share the data.
+    """
+    path = os.environ.get(DB_PATH_ENV)
+    if not path:
+        try:
+            from ..utils.config_manager import get_config
+            config = get_config()
+            path = config.get('database.path')
+            if path and not os.path.isabs(path):
+                path = os.path.join(config.config_dir, path)
+        except Exception as e:
+            logger.error(f"Failed to read database path setting: {e}")
+            path = None
+    return os.path.abspath(os.path.expanduser(path)) if path else DB_PATH
 
-def init_database():
-    """Initialize database and create all tables"""
-    global engine, SessionLocal
+def init_database(db_path=None):
+    """
+    Initialize database and create all tables
+    
+    Args:
+        db_path: Database file (defaults to resolve_db_path())
+    """
+    global engine, SessionLocal, ReadSessionLocal
+    
+    db_path = db_path or resolve_db_path()
+    engine = create_engine(f'sqlite:///{db_path}', echo=False)
+    logger.info(f"Database file: {db_path}")
+    
+    # Lock waits, WAL and retries for processes sharing the file
+    from . import concurrency
+    concurrency.install(engine)
     
-    engine = create_engine(f'sqlite:///{DB_PATH}', echo=False)
     SessionLocal = sessionmaker(bind=engine)
+    ReadSessionLocal = sessionmaker(bind=engine, expire_on_commit=False, autoflush=False,
+                                    info={'read_only': True})
+    
+    # Query timing for the diagnostics dialog
+    try:
+        from ..utils.config_manager import get_config
+        if get_config().get('diagnostics.query_stats', True):
+            from ..utils.query_stats import get_query_stats
+            get_query_stats().install(engine)
+    except Exception as e:
+        logger.error(f"Failed to install query statistics: {e}")
     
     # Import all models to ensure they're registered
-    from . import user, policy, installment, reminder
+    from . import user, policy, installment, reminder, policy_balance
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
@@ -30,7 +80,7 @@ def init_database():
     # Run migrations to update existing database schema
     try:
         from ..migrations import MigrationManager
-        migration_manager = MigrationManager(DB_PATH)
+        migration_manager = MigrationManager(db_path)
         migration_manager.run_migrations()
     except Exception as e:
         logger.error(f"Failed to run migrations: {e}")
@@ -44,3 +94,68 @@ def get_session():
     if SessionLocal is None:
         init_database()
     return SessionLocal()
+
+def _resolve_bind(bind):
+    """Engine for a session scope: explicit engine, the engine behind a session, or the app engine"""
+    if bind is None:
+        if engine is None:
+            init_database()
+        return engine
+    if isinstance(bind, Session):
+        return bind.get_bind()
+    return bind
+
+@contextmanager
+def session_scope(bind=None):
+    """
+    Short-lived unit of work for one user operation
+    
+    Commits when the block finishes, rolls back on error and always closes,
+    so loaded objects never outlive the operation and the identity map does
+    not grow across the application's lifetime. Use returned ORM objects
+    inside the block; after it closes they are detached.
+    
+    Args:
+        bind: Engine or Session whose engine to use (defaults to the app database)
+    """
+    if bind is None and SessionLocal is not None:
+        session = SessionLocal()
+    else:
+        session = Session(bind=_resolve_bind(bind))
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+@contextmanager
+def read_session(bind=None):
+    """
+    Read-only session for loading a view
+    
+    expire_on_commit is off and the session is closed on exit, so loaded
+    attributes stay readable on the detached objects without any lazy
+    reload. Relationships needed after the block must be eager loaded.
+    Attempting to flush raises InvalidRequestError.
+    
+    Args:
+        bind: Engine or Session whose engine to use (defaults to the app database)
+    """
+    if bind is None and ReadSessionLocal is not None:
+        session = ReadSessionLocal()
+    else:
+        session = Session(bind=_resolve_bind(bind), expire_on_commit=False, autoflush=False,
+                          info={'read_only': True})
+    try:
+        yield session
+    finally:
+        # close() ends the transaction without expiring, unlike rollback()
+        session.close()
+
+@event.listens_for(Session, 'before_flush')
+def _reject_read_only_flush(session, flush_context, instances):
+    if session.info.get('read_only'):
+        raise InvalidRequestError("Read-only session cannot flush changes")
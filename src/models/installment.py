@@ -1,17 +1,24 @@
 """Installment model for policy payments"""
-from sqlalchemy import Column, Integer, Float, DateTime, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, DateTime, String, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
+from .concurrency import next_version
+from .money import Money
 
 class Installment(Base):
     """Installment payment model"""
     __tablename__ = 'installments'
+    __table_args__ = (
+        # Keyset pagination orders (see models/pagination.py)
+        Index('ix_installments_due_date_id', 'due_date', 'id'),
+        Index('ix_installments_policy_number_id', 'policy_id', 'installment_number', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     policy_id = Column(Integer, ForeignKey('policies.id'), nullable=False)
     installment_number = Column(Integer, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     due_date = Column(DateTime, nullable=False)
     payment_date = Column(DateTime)
     status = Column(String(20), default='pending')  # pending, paid, overdue, cancelled
@@ -23,6 +30,9 @@ class Installment(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
+    # Optimistic concurrency: UPDATE and DELETE match the updated_at that was read
+    __mapper_args__ = {'version_id_col': updated_at, 'version_id_generator': next_version}
+    
     # Relationships
     policy = relationship("InsurancePolicy", back_populates="installments")
     
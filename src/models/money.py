@@ -0,0 +1,82 @@
+"""Exact integer-rial money
+
+Amounts are whole rials stored in INTEGER columns, so sums in SQL and pandas
+are exact integer arithmetic and never drift. Values coming from forms,
+imports or legacy REAL columns are rounded half-up once, when they enter.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+
+def to_rials(amount):
+    """
+    Whole rials for an amount
+
+    Args:
+        amount: int, float, Decimal or numeric string (None and '' give 0)
+
+    Returns:
+        int: Amount rounded half-up to the rial
+    """
+    if amount is None or amount == '':
+        return 0
+    if isinstance(amount, int):
+        return int(amount)
+    if isinstance(amount, float) and amount.is_integer():
+        return int(amount)
+    return int(Decimal(str(amount)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def split_amount(total, parts, weights=None):
+    """
+    Split a total into integer parts that add up to it exactly
+
+    Uses the largest remainder method: each part gets the floor of its
+    proportional share, and the rials left over go one each to the parts
+    with the largest fractional remainders (earlier parts win ties).
+
+    Args:
+        total: Amount in rials
+        parts: Number of parts
+        weights: Optional relative integer weights (defaults to equal parts)
+
+    Returns:
+        list: parts integers summing to total
+    """
+    total = to_rials(total)
+    if parts <= 0:
+        raise ValueError("parts must be positive")
+
+    weights = [1] * parts if weights is None else list(weights)
+    if (len(weights) != parts or any(not isinstance(w, int) or w < 0 for w in weights)
+            or not sum(weights)):
+        raise ValueError("weights must be non-negative integers, one per part, not all zero")
+
+    weight_sum = sum(weights)
+    shares = [divmod(total * w, weight_sum) for w in weights]
+    result = [share for share, _ in shares]
+
+    leftover = total - sum(result)
+    by_remainder = sorted(range(parts), key=lambda i: (-shares[i][1], i))
+    for i in by_remainder[:leftover]:
+        result[i] += 1
+    return result
+
+
+class Money(TypeDecorator):
+    """Whole-rial amount stored as INTEGER"""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_rials(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        # Rows written before the INTEGER migration may still hold REAL values
+        return value if isinstance(value, int) else to_rials(value)
@@ -0,0 +1,108 @@
+"""Keyset (cursor) pagination
+
+A page is fetched with ``WHERE (sort keys) > (last row's keys) ORDER BY keys
+LIMIT n`` instead of OFFSET, so every page costs the same no matter how deep
+into the result it is. The position is handed to the caller as an opaque
+token that encodes the last row's key values and which listing it belongs to.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+Page = namedtuple('Page', ['items', 'next_token'])
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def encode_token(listing, values):
+    """Opaque continuation token for the row with the given key values"""
+    payload = json.dumps({'l': listing, 'k': [_encode_value(v) for v in values]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_token(listing, token, key_count):
+    """
+    Key values from a continuation token
+
+    Raises:
+        ValueError: The token is malformed or belongs to another listing
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = [_decode_value(v) for v in payload['k']]
+    except Exception as e:
+        raise ValueError(f"Invalid page token: {e}") from None
+    if payload.get('l') != listing or len(values) != key_count:
+        raise ValueError("Page token does not belong to this listing")
+    return values
+
+
+def keyset_page(query, listing, keys, page_size=DEFAULT_PAGE_SIZE, page_token=None, descending=False):
+    """
+    Fetch one page of an ORM query ordered by the given key columns
+
+    Args:
+        query: ORM Query with filters applied and no ORDER BY
+        listing: Name that ties tokens to this listing
+        keys: Non-null columns that together are unique, e.g. (due_date, id)
+        page_size: Rows per page (capped at MAX_PAGE_SIZE)
+        page_token: Token from the previous page, or None for the first page
+        descending: Sort all keys descending
+
+    Returns:
+        Page: (items, next_token); next_token is None on the last page
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    key_tuple = tuple_(*keys)
+
+    if page_token:
+        last = tuple_(*decode_token(listing, page_token, len(keys)))
+        query = query.filter(key_tuple < last if descending else key_tuple > last)
+
+    order = [key.desc() for key in keys] if descending else list(keys)
+    rows = query.order_by(*order).limit(page_size + 1).all()
+
+    next_token = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_token = encode_token(listing, [getattr(rows[-1], key.key) for key in keys])
+    return Page(rows, next_token)
+
+
+def iter_pages(fetch_page, **kwargs):
+    """
+    Stream every item of a paged listing
+
+    Args:
+        fetch_page: A *_page controller method
+        **kwargs: Its filter arguments (and page_size)
+    """
+    token = None
+    while True:
+        page = fetch_page(page_token=token, **kwargs)
+        yield from page.items
+        token = page.next_token
+        if not token:
+            return
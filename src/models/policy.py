@@ -1,12 +1,17 @@
 """Insurance policy model"""
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
+from .concurrency import next_version
+from .money import Money
 
 class InsurancePolicy(Base):
     """Insurance policy model"""
     __tablename__ = 'policies'
+    __table_args__ = (
+        Index('ix_policies_created_at_id', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -16,8 +21,8 @@ class InsurancePolicy(Base):
     mobile_number = Column(String(20))  # Mobile number for reminders
     policy_type = Column(String(50))  # Third Party, Body, Life, Accident, Fire
     insurance_company = Column(String(100))
-    total_amount = Column(Float, nullable=False)
-    down_payment = Column(Float, default=0)  # Down payment amount
+    total_amount = Column(Money, nullable=False)
+    down_payment = Column(Money, default=0)  # Down payment amount
     num_installments = Column(Integer, default=0)  # Number of installments
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
@@ -26,8 +31,13 @@ class InsurancePolicy(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
+    # Optimistic concurrency: UPDATE and DELETE match the updated_at that was read
+    __mapper_args__ = {'version_id_col': updated_at, 'version_id_generator': next_version}
+    
     # Relationships
     installments = relationship("Installment", back_populates="policy", cascade="all, delete-orphan")
+    balance = relationship("PolicyBalance", back_populates="policy", uselist=False,
+                           cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Policy(number='{self.policy_number}', holder='{self.policy_holder_name}')>"
@@ -0,0 +1,39 @@
+"""Materialized per-policy balance summary"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from .database import Base
+from .money import Money
+
+class PolicyBalance(Base):
+    """Paid/pending/overdue totals per policy, maintained by the controllers"""
+    __tablename__ = 'policy_balances'
+
+    # Deleted with its policy by the ORM cascade (SQLite foreign keys are not enforced)
+    policy_id = Column(Integer, ForeignKey('policies.id'), primary_key=True)
+    total_paid = Column(Money, nullable=False, default=0)
+    total_pending = Column(Money, nullable=False, default=0)
+    total_overdue = Column(Money, nullable=False, default=0)
+    installment_count = Column(Integer, nullable=False, default=0)
+    paid_count = Column(Integer, nullable=False, default=0)
+    pending_count = Column(Integer, nullable=False, default=0)
+    overdue_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    next_due_date = Column(DateTime)  # Earliest unpaid (pending/overdue) due date
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relationships
+    policy = relationship("InsurancePolicy", back_populates="balance")
+
+    @property
+    def total_remaining(self):
+        """Unpaid amount (pending + overdue)"""
+        return (self.total_pending or 0) + (self.total_overdue or 0)
+
+    @property
+    def is_fully_paid(self):
+        """True if the policy has installments and all of them are paid"""
+        return bool(self.installment_count) and self.paid_count == self.installment_count
+
+    def __repr__(self):
+        return f"<PolicyBalance(policy_id={self.policy_id}, paid={self.total_paid}, remaining={self.total_remaining})>"
@@ -0,0 +1,105 @@
+"""Named eager-loading options, per-screen column projections and a lazy-load detector
+
+Code that reads relationships picks one of the loader option sets below
+instead of relying on the default lazy loading, which issues one SELECT per
+object. Screens that only display values select the columns they show
+instead of whole entities.
+"""
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from .installment import Installment
+from .policy import InsurancePolicy
+from .user import User
+
+# Loader options (pass to Query.options(*OPTIONS) or a controller's options=)
+POLICY_WITH_BALANCE = (selectinload(InsurancePolicy.balance),)
+POLICY_WITH_INSTALLMENTS = (selectinload(InsurancePolicy.installments),)
+# Everything session.delete() cascades to, loaded in two statements up front
+POLICY_FOR_DELETE = (
+    selectinload(InsurancePolicy.installments),
+    selectinload(InsurancePolicy.balance),
+)
+INSTALLMENT_WITH_POLICY = (joinedload(Installment.policy),)
+
+# Column projections
+INSTALLMENT_DETAIL_COLUMNS = (
+    Installment.id,
+    Installment.installment_number,
+    Installment.amount,
+    Installment.due_date,
+    Installment.payment_date,
+    Installment.status,
+    Installment.payment_method,
+)
+
+REMINDER_TARGET_COLUMNS = (
+    Installment.id,
+    Installment.installment_number,
+    Installment.amount,
+    Installment.due_date,
+    InsurancePolicy.policy_number,
+    User.id.label('user_id'),
+    User.phone,
+    User.email,
+)
+
+
+def policy_installment_rows(policy_id):
+    """Installment detail rows of one policy (policy installment dialog)"""
+    return select(*INSTALLMENT_DETAIL_COLUMNS).where(
+        Installment.policy_id == policy_id
+    ).order_by(Installment.installment_number)
+
+
+def reminder_targets():
+    """Installment, policy number and owner contact in one row (reminder creation)"""
+    return select(*REMINDER_TARGET_COLUMNS).select_from(Installment).join(
+        InsurancePolicy, InsurancePolicy.id == Installment.policy_id
+    ).join(
+        User, User.id == InsurancePolicy.user_id
+    )
+
+
+class LazyLoadError(AssertionError):
+    """Raised when a guarded block triggered lazy loads"""
+
+
+_guard = threading.local()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_lazy_load(orm_execute_state):
+    loads = getattr(_guard, 'loads', None)
+    if loads is None or not orm_execute_state.is_select:
+        return
+    if orm_execute_state.lazy_loaded_from is not None:
+        state = orm_execute_state.lazy_loaded_from
+        loads.append(f"relationship load from {state.class_.__name__}")
+    elif orm_execute_state.is_column_load:
+        mapper = orm_execute_state.bind_mapper
+        name = mapper.class_.__name__ if mapper is not None else "?"
+        loads.append(f"expired/deferred attribute load of {name}")
+
+
+@contextmanager
+def forbid_lazy_loads():
+    """
+    Fail if the block lazy loads a relationship or refreshes expired attributes
+
+    Meant for tests around hot paths. Loads are recorded rather than raised
+    on the spot, so a controller's own error handling cannot swallow them;
+    LazyLoadError is raised when the block exits.
+    """
+    outer = getattr(_guard, 'loads', None)
+    _guard.loads = loads = []
+    try:
+        yield loads
+    finally:
+        _guard.loads = outer
+        if outer is not None:
+            outer.extend(loads)
+    if loads:
+        raise LazyLoadError(f"{len(loads)} lazy load(s): " + "; ".join(sorted(set(loads))))
@@ -0,0 +1,99 @@
+"""Read models for table views
+
+Views that only display a handful of fields select exactly those columns
+with a Core select() and get back plain named tuples (no identity map, no
+change tracking, no per-instance state), or, for views that aggregate,
+one list per column.
+"""
+from collections import namedtuple
+from sqlalchemy import select
+
+from .installment import Installment
+from .policy import InsurancePolicy
+from .reminder import Reminder
+
+# An installment with the policy fields the installment, overdue and calendar views show
+InstallmentRow = namedtuple('InstallmentRow', [
+    'id', 'policy_id', 'installment_number', 'amount', 'due_date', 'status',
+    'policy_number', 'policy_holder_name', 'policy_type', 'mobile_number',
+])
+
+INSTALLMENT_ROW_COLUMNS = (
+    Installment.id,
+    Installment.policy_id,
+    Installment.installment_number,
+    Installment.amount,
+    Installment.due_date,
+    Installment.status,
+    InsurancePolicy.policy_number,
+    InsurancePolicy.policy_holder_name,
+    InsurancePolicy.policy_type,
+    InsurancePolicy.mobile_number,
+)
+
+ReminderRow = namedtuple('ReminderRow', [
+    'id', 'reminder_type', 'title', 'sent_date', 'recipient_phone', 'status',
+])
+
+REMINDER_ROW_COLUMNS = (
+    Reminder.id,
+    Reminder.reminder_type,
+    Reminder.title,
+    Reminder.sent_date,
+    Reminder.recipient_phone,
+    Reminder.status,
+)
+
+
+def installment_rows(user_id):
+    """select() of InstallmentRow columns for a user's installments; add filters with .where()"""
+    return select(*INSTALLMENT_ROW_COLUMNS).select_from(Installment).join(
+        InsurancePolicy, InsurancePolicy.id == Installment.policy_id
+    ).where(InsurancePolicy.user_id == user_id)
+
+
+def reminder_rows(user_id):
+    """select() of ReminderRow columns for a user's reminders, newest first"""
+    return select(*REMINDER_ROW_COLUMNS).where(
+        Reminder.user_id == user_id
+    ).order_by(Reminder.scheduled_date.desc())
+
+
+def fetch_rows(session, stmt, row_type):
+    """
+    Execute a select() and build one row_type tuple per result row
+
+    Args:
+        session: Database session
+        stmt: select() whose columns match row_type's fields in order
+        row_type: Named tuple class such as InstallmentRow
+    """
+    return list(map(row_type._make, session.execute(stmt).tuples()))
+
+
+class ColumnBatch:
+    """Query result stored as one list per column"""
+
+    __slots__ = ('names', 'columns')
+
+    def __init__(self, names, columns):
+        self.names = tuple(names)
+        self.columns = dict(zip(self.names, columns))
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def __getattr__(self, name):
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def fetch_columns(session, stmt):
+    """Execute a select() and return a ColumnBatch keyed by the result column names"""
+    result = session.execute(stmt)
+    names = list(result.keys())
+    rows = result.tuples().all()
+    columns = [list(col) for col in zip(*rows)] if rows else [[] for _ in names]
+    return ColumnBatch(names, columns)
@@ -1,11 +1,14 @@
 """Reminder model for notifications and SMS"""
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index
 from datetime import datetime
 from .database import Base
 
 class Reminder(Base):
     """Reminder model for notifications"""
     __tablename__ = 'reminders'
+    __table_args__ = (
+        Index('ix_reminders_user_scheduled_id', 'user_id', 'scheduled_date', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
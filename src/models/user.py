@@ -2,7 +2,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from datetime import datetime
 from .database import Base
-import bcrypt
 
 class User(Base):
     """User model for authentication"""
@@ -20,12 +19,14 @@ class User(Base):
     last_login = Column(DateTime)
     
     def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and set password (work factor from the auth service)"""
+        from ..utils.auth_service import get_auth_service
+        self.password_hash = get_auth_service().hash_password(password)
     
     def check_password(self, password):
         """Verify password"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        from ..utils.auth_service import get_auth_service
+        return get_auth_service().verify_password(password, self.password_hash)
     
     def __repr__(self):
         return f"<User(username='{self.username}', full_name='{self.full_name}')>"
@@ -4,11 +4,14 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QCalendarWidget, QLabel,
                             QPushButton, QFrame, QComboBox, QLineEdit)
 from PyQt5.QtCore import Qt, QDate, pyqtSignal
 from PyQt5.QtGui import QTextCharFormat, QColor, QFont
-from datetime import datetime
-import jdatetime
-from persiantools.jdatetime import JalaliDate, JalaliDateTime
+from datetime import date, datetime
+from persiantools.jdatetime import JalaliDateTime
 import logging
 
+from .deferred_refresh import DeferredRefreshMixin
+from ..utils.change_bus import POLICY_CHANGED, INSTALLMENT_CHANGED
+from ..utils.query_stats import track_action
+
 logger = logging.getLogger(__name__)
 
 class PersianCalendarWidget(QWidget):
@@ -119,30 +122,19 @@ class PersianCalendarWidget(QWidget):
     
     def update_calendar(self):
         """Update calendar display"""
-        # Update month/year label
-        month_names = {
-            1: 'فروردین', 2: 'اردیبهشت', 3: 'خرداد',
-            4: 'تیر', 5: 'مرداد', 6: 'شهریور',
-            7: 'مهر', 8: 'آبان', 9: 'آذر',
-            10: 'دی', 11: 'بهمن', 12: 'اسفند'
-        }
-        month_name = month_names.get(self.current_jalali.month, '')
-        self.month_year_label.setText(f"{month_name} {self.current_jalali.year}")
+        from ..utils.jalali_calendar import get_jalali_calendar, MONTH_NAMES
         
-        # Get first day of month
-        first_day = JalaliDate(self.current_jalali.year, self.current_jalali.month, 1)
+        calendar = get_jalali_calendar()
+        year, month = self.current_jalali.year, self.current_jalali.month
         
-        # Get weekday of first day (Saturday = 0)
-        first_weekday = first_day.weekday()
+        # Update month/year label
+        self.month_year_label.setText(f"{MONTH_NAMES[month - 1]} {year}")
         
-        # Get number of days in month
-        if self.current_jalali.month <= 6:
-            days_in_month = 31
-        elif self.current_jalali.month <= 11:
-            days_in_month = 30
-        else:
-            # Esfand - check for leap year
-            days_in_month = 30 if JalaliDate.is_leap(self.current_jalali.year) else 29
+        # Weekday of first day (Saturday = 0), month length and first day's ordinal
+        index = calendar.month_index(year, month)
+        first_weekday = calendar.first_weekday[index]
+        days_in_month = calendar.month_length[index]
+        first_ordinal = calendar.month_start[index]
         
         # Update day buttons
         day = 1
@@ -160,8 +152,7 @@ class PersianCalendarWidget(QWidget):
                     btn.setEnabled(True)
                     
                     # Create date for this day
-                    jalali_date = JalaliDate(self.current_jalali.year, self.current_jalali.month, day)
-                    gregorian_date = jalali_date.to_gregorian()
+                    gregorian_date = date.fromordinal(first_ordinal + day - 1)
                     qdate = QDate(gregorian_date.year, gregorian_date.month, gregorian_date.day)
                     
                     # Check if this date has custom formatting
@@ -212,18 +203,20 @@ class PersianCalendarWidget(QWidget):
     
     def previous_month(self):
         """Go to previous month"""
-        if self.current_jalali.month == 1:
-            self.current_jalali = JalaliDateTime(self.current_jalali.year - 1, 12, 1)
-        else:
-            self.current_jalali = JalaliDateTime(self.current_jalali.year, self.current_jalali.month - 1, 1)
-        self.update_calendar()
+        self.move_months(-1)
     
     def next_month(self):
         """Go to next month"""
-        if self.current_jalali.month == 12:
-            self.current_jalali = JalaliDateTime(self.current_jalali.year + 1, 1, 1)
-        else:
-            self.current_jalali = JalaliDateTime(self.current_jalali.year, self.current_jalali.month + 1, 1)
+        self.move_months(1)
+    
+    def move_months(self, months):
+        """Show the month the given number of Jalali months away"""
+        from ..utils.jalali_calendar import get_jalali_calendar
+        
+        year, month, _ = get_jalali_calendar().add_months(
+            self.current_jalali.year, self.current_jalali.month, 1, months
+        )
+        self.current_jalali = JalaliDateTime(year, month, 1)
         self.update_calendar()
     
     def setDateTextFormat(self, qdate, fmt):
@@ -231,18 +224,24 @@ class PersianCalendarWidget(QWidget):
         date = qdate.toPyDate()
         self.date_formats[date] = fmt
         self.update_calendar()
+    
+    def set_date_formats(self, formats):
+        """Replace all date formats ({date: QTextCharFormat}) and redraw once"""
+        self.date_formats = dict(formats)
+        self.update_calendar()
 
 
-class CalendarWidget(QWidget):
+class CalendarWidget(DeferredRefreshMixin, QWidget):
     """Calendar view for installments"""
     
     def __init__(self, user, session):
         super().__init__()
         self.user = user
         self.session = session
-        self.installments_by_date = {}
+        self.statuses_by_date = {}  # date -> set of installment statuses
         self.setup_ui()
         self.load_installments()
+        self.watch_changes(POLICY_CHANGED, INSTALLMENT_CHANGED)
     
     def setup_ui(self):
         """Setup UI"""
@@ -407,46 +406,69 @@ class CalendarWidget(QWidget):
         """)
         return label
     
-    def load_installments(self):
-        """Load installments and mark calendar"""
-        from ..controllers import InstallmentController
+    def filter_values(self):
+        """(insurance type, status, policy number text) of the current filters; None for unset"""
+        status_map = {
+            "در انتظار": "pending",
+            "پرداخت شده": "paid",
+            "معوق": "overdue"
+        }
+        policy_type = status = policy_number = None
+        if hasattr(self, 'insurance_type_filter') and self.insurance_type_filter.currentText() != "همه":
+            policy_type = self.insurance_type_filter.currentText()
+        if hasattr(self, 'status_filter'):
+            status = status_map.get(self.status_filter.currentText())
+        if hasattr(self, 'policy_number_filter') and self.policy_number_filter.text():
+            policy_number = self.policy_number_filter.text()
+        return policy_type, status, policy_number
+    
+    def filter_conditions(self):
+        """WHERE conditions for the current filters"""
         from ..models import InsurancePolicy, Installment
         
-        try:
-            # Build query with filters
-            query = self.session.query(Installment, InsurancePolicy).join(
-                InsurancePolicy
-            ).filter(InsurancePolicy.user_id == self.user.id)
-            
-            # Apply insurance type filter
-            if hasattr(self, 'insurance_type_filter') and self.insurance_type_filter.currentText() != "همه":
-                query = query.filter(InsurancePolicy.policy_type == self.insurance_type_filter.currentText())
-            
-            # Apply status filter
-            if hasattr(self, 'status_filter') and self.status_filter.currentText() != "همه":
-                status_map = {
-                    "در انتظار": "pending",
-                    "پرداخت شده": "paid",
-                    "معوق": "overdue"
-                }
-                status = status_map.get(self.status_filter.currentText())
-                if status:
-                    query = query.filter(Installment.status == status)
-            
-            # Apply policy number filter
-            if hasattr(self, 'policy_number_filter') and self.policy_number_filter.text():
-                query = query.filter(InsurancePolicy.policy_number.like(f'%{self.policy_number_filter.text()}%'))
-            
-            installments = query.all()
-            
-            # Group by date
-            self.installments_by_date = {}
+        conditions = [InsurancePolicy.user_id == self.user.id]
+        policy_type, status, policy_number = self.filter_values()
+        
+        # Apply insurance type filter
+        if policy_type:
+            conditions.append(InsurancePolicy.policy_type == policy_type)
+        
+        # Apply status filter
+        if status:
+            conditions.append(Installment.status == status)
+        
+        # Apply policy number filter
+        if policy_number:
+            conditions.append(InsurancePolicy.policy_number.like(f'%{policy_number}%'))
+        
+        return conditions
+    
+    def load_installments(self):
+        """Load due dates and statuses and mark calendar"""
+        from sqlalchemy import select
+        from ..models import InsurancePolicy, Installment, read_session
+        from ..models.read_models import fetch_columns
+        from ..utils.query_cache import cached_query
+        
+        def group_statuses():
+            # Marking only needs two columns; day details load on selection
+            batch = fetch_columns(session, select(Installment.due_date, Installment.status).join(
+                InsurancePolicy, InsurancePolicy.id == Installment.policy_id
+            ).where(*self.filter_conditions()))
             
-            for inst, policy in installments:
-                date_key = inst.due_date.date()
-                if date_key not in self.installments_by_date:
-                    self.installments_by_date[date_key] = []
-                self.installments_by_date[date_key].append((inst, policy))
+            # Group statuses by date
+            statuses = {}
+            for due_date, status in zip(batch.due_date, batch.status):
+                statuses.setdefault(due_date.date(), set()).add(status)
+            return statuses
+        
+        try:
+            # The map is cached per filter until installments or policies change
+            with read_session(self.session) as session:
+                self.statuses_by_date = cached_query(
+                    session, 'calendar_statuses', (self.user.id, *self.filter_values()),
+                    ('installments', 'policies'), group_statuses
+                )
             
             # Mark dates on calendar
             self.mark_calendar_dates()
@@ -454,15 +476,28 @@ class CalendarWidget(QWidget):
         except Exception as e:
             logger.error(f"Error loading installments: {e}")
     
+    def load_day(self, date):
+        """InstallmentRows due on one day under the current filters"""
+        from datetime import timedelta
+        from ..models import Installment, read_session
+        from ..models.read_models import InstallmentRow, installment_rows, fetch_rows
+        
+        start = datetime(date.year, date.month, date.day)
+        with read_session(self.session) as session:
+            return fetch_rows(session, installment_rows(self.user.id).where(
+                *self.filter_conditions(),
+                Installment.due_date >= start,
+                Installment.due_date < start + timedelta(days=1)
+            ).order_by(Installment.due_date), InstallmentRow)
+    
     def mark_calendar_dates(self):
         """Mark dates with installments on calendar"""
-        for date, installments in self.installments_by_date.items():
-            qdate = QDate(date.year, date.month, date.day)
-            
+        formats = {}
+        for date, statuses in self.statuses_by_date.items():
             # Determine color based on status
-            has_paid = any(inst.status == 'paid' for inst, _ in installments)
-            has_overdue = any(inst.status == 'overdue' for inst, _ in installments)
-            has_pending = any(inst.status == 'pending' for inst, _ in installments)
+            has_paid = 'paid' in statuses
+            has_overdue = 'overdue' in statuses
+            has_pending = 'pending' in statuses
             
             fmt = QTextCharFormat()
             fmt.setFontWeight(75)
@@ -474,38 +509,30 @@ class CalendarWidget(QWidget):
             elif has_paid:
                 fmt.setBackground(QColor(39, 174, 96, 100))
             
-            self.calendar.setDateTextFormat(qdate, fmt)
+            formats[date] = fmt
+        
+        # One redraw for all dates (also drops marks of dates no longer shown)
+        self.calendar.set_date_formats(formats)
     
     def date_selected(self, qdate):
         """Handle date selection"""
-        from ..utils.persian_utils import format_currency, PersianDateConverter
+        from ..utils.persian_utils import format_currency
+        from ..utils.jalali_calendar import get_jalali_calendar, MONTH_NAMES, WEEKDAY_NAMES
         
         date = qdate.toPyDate()
         
         # Update label with Persian date
-        gregorian_datetime = datetime(date.year, date.month, date.day)
-        jalali_date = JalaliDateTime.to_jalali(gregorian_datetime)
-        
-        month_names = {
-            1: 'فروردین', 2: 'اردیبهشت', 3: 'خرداد',
-            4: 'تیر', 5: 'مرداد', 6: 'شهریور',
-            7: 'مهر', 8: 'آبان', 9: 'آذر',
-            10: 'دی', 11: 'بهمن', 12: 'اسفند'
-        }
-        weekdays = {
-            0: 'شنبه', 1: 'یکشنبه', 2: 'دوشنبه',
-            3: 'سه‌شنبه', 4: 'چهارشنبه', 5: 'پنج‌شنبه', 6: 'جمعه'
-        }
-        
-        persian_date = f"{weekdays.get(jalali_date.weekday(), '')} {jalali_date.day} {month_names.get(jalali_date.month, '')} {jalali_date.year}"
+        calendar = get_jalali_calendar()
+        year, month, day = calendar.to_jalali(date)
+        persian_date = f"{WEEKDAY_NAMES[calendar.weekday(date)]} {day} {MONTH_NAMES[month - 1]} {year}"
         self.selected_date_label.setText(f"تاریخ انتخابی: {persian_date}")
         
         # Clear list
         self.installments_list.clear()
         
         # Show installments for this date
-        if date in self.installments_by_date:
-            for inst, policy in self.installments_by_date[date]:
+        if date in self.statuses_by_date:
+            for inst in self.load_day(date):
                 # Create detailed item text with all required information
                 status_persian = {
                     'pending': 'در انتظار',
@@ -515,11 +542,11 @@ class CalendarWidget(QWidget):
                 }.get(inst.status, inst.status)
                 
                 item_text = (
-                    f"📄 شماره بیمه‌نامه: {policy.policy_number}\n"
-                    f"👤 نام بیمه‌گذار: {policy.policy_holder_name}\n"
-                    f"📋 نوع بیمه: {policy.policy_type or '-'}\n"
+                    f"📄 شماره بیمه‌نامه: {inst.policy_number}\n"
+                    f"👤 نام بیمه‌گذار: {inst.policy_holder_name}\n"
+                    f"📋 نوع بیمه: {inst.policy_type or '-'}\n"
                     f"💰 مبلغ: {format_currency(inst.amount)}\n"
-                    f"📱 شماره موبایل: {policy.mobile_number or '-'}\n"
+                    f"📱 شماره موبایل: {inst.mobile_number or '-'}\n"
                     f"🔢 شماره قسط: {inst.installment_number}\n"
                     f"📊 وضعیت: {status_persian}\n"
                     f"{'-' * 50}"
@@ -539,6 +566,7 @@ class CalendarWidget(QWidget):
         self.policy_number_filter.clear()
         self.load_installments()
     
+    @track_action('calendar.refresh')
     def refresh(self):
         """Refresh calendar"""
         self.load_installments()
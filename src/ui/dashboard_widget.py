@@ -8,9 +8,13 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 import logging
 
+from .deferred_refresh import DeferredRefreshMixin
+from ..utils.change_bus import POLICY_CHANGED, INSTALLMENT_CHANGED
+from ..utils.query_stats import track_action
+
 logger = logging.getLogger(__name__)
 
-class DashboardWidget(QWidget):
+class DashboardWidget(DeferredRefreshMixin, QWidget):
     """Dashboard with statistics and charts"""
     
     def __init__(self, user, session):
@@ -19,6 +23,7 @@ class DashboardWidget(QWidget):
         self.session = session
         self.setup_ui()
         self.load_data()
+        self.watch_changes(POLICY_CHANGED, INSTALLMENT_CHANGED)
     
     def setup_ui(self):
         """Setup the dashboard UI"""
@@ -67,6 +72,13 @@ class DashboardWidget(QWidget):
         
         layout.addLayout(charts_layout)
         
+        # Cash-flow forecast chart (next 12 Jalali months)
+        self.forecast_chart_widget = QWidget()
+        self.forecast_chart_widget.setMinimumHeight(300)
+        self.forecast_chart_layout = QVBoxLayout()
+        self.forecast_chart_widget.setLayout(self.forecast_chart_layout)
+        layout.addWidget(self.forecast_chart_widget)
+        
         # Recent activity section
         recent_label = QLabel("فعالیت‌های اخیر")
         recent_label.setStyleSheet("font-size: 16px; font-weight: bold; margin-top: 20px;")
@@ -123,34 +135,41 @@ class DashboardWidget(QWidget):
     def load_data(self):
         """Load dashboard data"""
         from ..controllers import PolicyController, InstallmentController
+        from ..models import session_scope, read_session
         from ..utils.persian_utils import format_currency
         
         try:
-            policy_ctrl = PolicyController(self.session)
-            installment_ctrl = InstallmentController(self.session)
-            
-            # Get statistics
-            policy_stats = policy_ctrl.get_policy_statistics(self.user.id)
-            installment_stats = installment_ctrl.get_installment_statistics(self.user.id)
-            
-            # Update stat cards
-            self.update_stat_card(self.total_policies_card, str(policy_stats['total_policies']))
-            
-            overdue_count = len(installment_ctrl.get_overdue_installments(self.user.id))
-            self.update_stat_card(self.pending_installments_card, str(overdue_count))
-            
-            upcoming_count = len(installment_ctrl.get_upcoming_installments(30, self.user.id))
-            self.update_stat_card(self.upcoming_payments_card, str(upcoming_count))
-            
-            total_paid = format_currency(installment_stats['total_paid'])
-            self.update_stat_card(self.total_paid_card, total_paid)
-            
-            # Create charts
-            self.create_status_chart(installment_stats)
-            self.create_monthly_chart()
+            # Flagging overdue installments writes, so it gets its own unit of work
+            with session_scope(self.session) as session:
+                InstallmentController(session).get_overdue_installments(self.user.id)
             
-            # Load recent activity
-            self.load_recent_activity()
+            with read_session(self.session) as session:
+                policy_ctrl = PolicyController(session)
+                installment_ctrl = InstallmentController(session)
+                
+                # Get statistics
+                policy_stats = policy_ctrl.get_policy_statistics(self.user.id)
+                installment_stats = installment_ctrl.get_installment_statistics(self.user.id)
+                
+                # Update stat cards
+                self.update_stat_card(self.total_policies_card, str(policy_stats['total_policies']))
+                # All unpaid past-due installments, not only those flagged just now
+                overdue_count = installment_ctrl.get_overdue_summary(self.user.id)['installments']
+                self.update_stat_card(self.pending_installments_card, str(overdue_count))
+                
+                upcoming_count = len(installment_ctrl.get_upcoming_installments(30, self.user.id))
+                self.update_stat_card(self.upcoming_payments_card, str(upcoming_count))
+                
+                total_paid = format_currency(installment_stats['total_paid'])
+                self.update_stat_card(self.total_paid_card, total_paid)
+                
+                # Create charts
+                self.create_status_chart(installment_stats)
+                self.create_monthly_chart(session)
+                self.create_forecast_chart(session)
+                
+                # Load recent activity
+                self.load_recent_activity(session)
             
         except Exception as e:
             logger.error(f"Error loading dashboard data: {e}")
@@ -196,7 +215,7 @@ class DashboardWidget(QWidget):
         
         self.status_chart_layout.addWidget(canvas)
     
-    def create_monthly_chart(self):
+    def create_monthly_chart(self, session):
         """Create monthly payments bar chart"""
         # Clear previous chart
         for i in reversed(range(self.monthly_chart_layout.count())):
@@ -209,15 +228,18 @@ class DashboardWidget(QWidget):
         
         # Get monthly data
         from ..utils import ReportGenerator
+        from ..utils.report_engine import PAYMENT_STATISTICS_HEADERS
         from datetime import datetime, timedelta
         
-        report_gen = ReportGenerator(self.session)
-        start_date = datetime.now() - timedelta(days=180)  # Last 6 months
+        report_gen = ReportGenerator(session)
+        # Last 6 months from midnight, so the cached series is reused all day
+        start_date = datetime.combine(datetime.now().date() - timedelta(days=180), datetime.min.time())
         df = report_gen.generate_payment_statistics(start_date)
         
         if not df.empty:
-            months = df['month'].tolist()
-            amounts = df['total_amount'].tolist()
+            # The report comes with Persian headers
+            months = df[PAYMENT_STATISTICS_HEADERS['month']].tolist()
+            amounts = df[PAYMENT_STATISTICS_HEADERS['total']].tolist()
             
             ax.bar(range(len(months)), amounts, color='#3498db')
             ax.set_xticks(range(len(months)))
@@ -233,21 +255,52 @@ class DashboardWidget(QWidget):
         fig.tight_layout()
         self.monthly_chart_layout.addWidget(canvas)
     
-    def load_recent_activity(self):
+    def create_forecast_chart(self, session):
+        """Create expected cash-in chart for the next 12 Jalali months"""
+        # Clear previous chart
+        for i in reversed(range(self.forecast_chart_layout.count())):
+            self.forecast_chart_layout.itemAt(i).widget().setParent(None)
+        
+        fig = Figure(figsize=(10, 3.5), dpi=100)
+        canvas = FigureCanvasQTAgg(fig)
+        ax = fig.add_subplot(111)
+        
+        from ..utils.cash_flow_forecast import CashFlowForecast
+        
+        months, scheduled, expected = CashFlowForecast(session, self.user.id).chart_series('month')
+        
+        if sum(scheduled) > 0:
+            positions = range(len(months))
+            ax.bar([p - 0.2 for p in positions], scheduled, width=0.4,
+                   color='#bdc3c7', label='سررسید')
+            ax.bar([p + 0.2 for p in positions], expected, width=0.4,
+                   color='#16a085', label='وصول مورد انتظار')
+            ax.set_xticks(list(positions))
+            ax.set_xticklabels(months, rotation=45, ha='right')
+            ax.set_ylabel('مبلغ (ریال)')
+            ax.legend()
+        else:
+            ax.text(0.5, 0.5, 'داده‌ای موجود نیست', 
+                   horizontalalignment='center',
+                   verticalalignment='center',
+                   transform=ax.transAxes)
+        
+        ax.set_title('پیش‌بینی جریان نقدی', fontsize=14, fontweight='bold')
+        fig.tight_layout()
+        self.forecast_chart_layout.addWidget(canvas)
+    
+    def load_recent_activity(self, session):
         """Load recent activity"""
         # Clear previous items
         for i in reversed(range(self.recent_activity_layout.count())):
             self.recent_activity_layout.itemAt(i).widget().setParent(None)
         
-        from ..controllers import InstallmentController
         from ..utils.persian_utils import PersianDateConverter, format_currency
         
-        installment_ctrl = InstallmentController(self.session)
-        
         # Get recent paid installments
         from ..models import Installment, InsurancePolicy
         
-        recent = self.session.query(Installment, InsurancePolicy).join(
+        recent = session.query(Installment, InsurancePolicy).join(
             InsurancePolicy
         ).filter(
             InsurancePolicy.user_id == self.user.id,
@@ -279,6 +332,7 @@ class DashboardWidget(QWidget):
             no_activity.setAlignment(Qt.AlignCenter)
             self.recent_activity_layout.addWidget(no_activity)
     
+    @track_action('dashboard.refresh')
     def refresh(self):
         """Refresh dashboard data"""
         self.load_data()
@@ -0,0 +1,46 @@
+"""Deferred refresh for aggregate views"""
+from PyQt5.QtCore import QTimer
+
+
+class DeferredRefreshMixin:
+    """
+    Refresh a summary widget once after data change events
+
+    Views that show aggregates (dashboard cards, calendar)
+    cannot be patched row by row. Instead, change events only mark them
+    stale: a visible widget refreshes once on the next event-loop turn no
+    matter how many events arrived, and a hidden one waits until it is shown.
+    Subclasses must implement refresh().
+    """
+
+    def watch_changes(self, *topics):
+        """Subscribe to change bus topics"""
+        from ..utils.change_bus import get_change_bus
+
+        self._refresh_stale = False
+        self._refresh_scheduled = False
+        bus = get_change_bus()
+        for topic in topics:
+            bus.subscribe(topic, self.on_data_changed)
+
+    def on_data_changed(self, event):
+        """Mark the view stale and schedule a refresh if it is visible"""
+        self._refresh_stale = True
+        if self.isVisible():
+            self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            QTimer.singleShot(0, self._run_deferred_refresh)
+
+    def _run_deferred_refresh(self):
+        self._refresh_scheduled = False
+        if self._refresh_stale:
+            self._refresh_stale = False
+            self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if getattr(self, '_refresh_stale', False):
+            self._schedule_refresh()
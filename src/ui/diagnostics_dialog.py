@@ -0,0 +1,202 @@
+"""Performance diagnostics dialog"""
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                            QMessageBox, QFileDialog, QTableWidget, QTableWidgetItem,
+                            QTabWidget, QHeaderView, QTreeWidget, QTreeWidgetItem)
+from PyQt5.QtCore import Qt
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosticsDialog(QDialog):
+    """Show query latency, slow queries, queries per UI action and the profile breakdown"""
+
+    def __init__(self, parent=None, stats=None, profiler=None):
+        super().__init__(parent)
+        from ..utils.query_stats import get_query_stats
+        from ..utils.profiler import get_profiler
+
+        self.stats = stats or get_query_stats()
+        self.profiler = profiler or get_profiler()
+        self.setWindowTitle("عیب‌یابی کارایی")
+        self.setMinimumSize(1000, 600)
+        self.setLayoutDirection(Qt.RightToLeft)
+        self.setup_ui()
+        self.load_stats()
+
+    def setup_ui(self):
+        """Setup UI"""
+        layout = QVBoxLayout()
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.tabs = QTabWidget()
+
+        self.statements_table = self._create_table([
+            "دستور SQL", "تعداد", "مجموع (ms)", "میانگین (ms)", "p95 (ms)", "بیشینه (ms)"
+        ])
+        self.tabs.addTab(self.statements_table, "دستورها")
+
+        self.slow_table = self._create_table([
+            "زمان", "مدت (ms)", "عملیات", "دستور SQL", "طرح اجرا"
+        ])
+        self.tabs.addTab(self.slow_table, "کوئری‌های کند")
+
+        self.actions_table = self._create_table([
+            "عملیات", "دفعات", "کوئری در هر بار", "بیشینه کوئری", "آخرین بار", "زمان کوئری (ms)"
+        ])
+        self.tabs.addTab(self.actions_table, "عملیات رابط کاربری")
+
+        self.profile_tree = QTreeWidget()
+        self.profile_tree.setColumnCount(5)
+        self.profile_tree.setHeaderLabels(["مسیر", "نوع", "دفعات", "کل (ms)", "خالص (ms)"])
+        self.profile_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.tabs.addTab(self.profile_tree, "پروفایل")
+
+        layout.addWidget(self.tabs)
+
+        button_layout = QHBoxLayout()
+
+        refresh_btn = QPushButton("بروزرسانی")
+        refresh_btn.clicked.connect(self.load_stats)
+        button_layout.addWidget(refresh_btn)
+
+        reset_btn = QPushButton("پاک کردن آمار")
+        reset_btn.clicked.connect(self.reset_stats)
+        button_layout.addWidget(reset_btn)
+
+        export_btn = QPushButton("ذخیره JSON")
+        export_btn.clicked.connect(self.export_json)
+        button_layout.addWidget(export_btn)
+
+        trace_btn = QPushButton("ذخیره Trace")
+        trace_btn.clicked.connect(self.export_trace)
+        button_layout.addWidget(trace_btn)
+
+        button_layout.addStretch()
+
+        close_btn = QPushButton("بستن")
+        close_btn.clicked.connect(self.reject)
+        button_layout.addWidget(close_btn)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def _create_table(self, headers):
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSortingEnabled(True)
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setStretchLastSection(True)
+        return table
+
+    def _fill(self, table, rows):
+        table.setSortingEnabled(False)
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, (int, float)):
+                    item.setData(Qt.DisplayRole, value)
+                else:
+                    item.setText("" if value is None else str(value))
+                    if "\n" in item.text() or len(item.text()) > 80:
+                        item.setToolTip(item.text())
+                table.setItem(row, col, item)
+        table.setSortingEnabled(True)
+
+    def load_stats(self):
+        """Show the current snapshot"""
+        snapshot = self.stats.snapshot()
+        totals = snapshot['totals']
+        self.summary_label.setText(
+            f"از {snapshot['started_at']}: {totals['queries']} کوئری، "
+            f"{totals['query_ms']:.0f} ms، {totals['statements']} دستور متمایز، "
+            f"{totals['slow_queries']} کوئری کند (آستانه {snapshot['slow_query_ms']} ms)"
+        )
+
+        self._fill(self.statements_table, [
+            (s['statement'], s['count'], s['total_ms'], s['mean_ms'], s['p95_ms'], s['max_ms'])
+            for s in snapshot['statements']
+        ])
+        self._fill(self.slow_table, [
+            (q['at'], q['ms'], q['action'] or "", q['statement'], "\n".join(q['plan'] or []))
+            for q in reversed(snapshot['slow_queries'])
+        ])
+        self._fill(self.actions_table, [
+            (a['action'], a['runs'], a['queries_per_run'], a['max_queries'],
+             a['last_queries'], a['query_ms'])
+            for a in snapshot['actions']
+        ])
+        self.load_profile()
+
+    def load_profile(self):
+        """Show the profiler's nested time breakdown"""
+        self.profile_tree.clear()
+        if not self.profiler.enabled and not self.profiler.paths:
+            self.profile_tree.addTopLevelItem(QTreeWidgetItem(
+                ["پروفایل غیرفعال است (اجرا با --profile)"]
+            ))
+            return
+
+        def add(parent, nodes):
+            for node in nodes:
+                item = QTreeWidgetItem([
+                    node['name'], node['category'], str(node['calls']),
+                    f"{node['total_ms']:.1f}", f"{node['self_ms']:.1f}"
+                ])
+                if parent is None:
+                    self.profile_tree.addTopLevelItem(item)
+                else:
+                    parent.addChild(item)
+                add(item, node['children'])
+
+        add(None, self.profiler.breakdown())
+        for stall in list(self.profiler.stalls)[-20:]:
+            during = "، ".join(stall['during'])
+            self.profile_tree.addTopLevelItem(QTreeWidgetItem([
+                f"توقف رابط کاربری {during}", "stall", "1", f"{stall['dur_ns'] / 1e6:.1f}", ""
+            ]))
+
+    def reset_stats(self):
+        """Clear collected statistics"""
+        self.stats.reset()
+        self.profiler.reset()
+        self.load_stats()
+
+    def export_json(self):
+        """Save the snapshot to a JSON file"""
+        default_name = f"query_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "ذخیره آمار کوئری", default_name, "JSON Files (*.json)"
+        )
+        if not filename:
+            return
+
+        try:
+            self.stats.dump_json(filename)
+            QMessageBox.information(self, "موفق", "آمار کوئری ذخیره شد")
+        except Exception as e:
+            logger.error(f"Failed to write query statistics: {e}")
+            QMessageBox.warning(self, "خطا", f"خطا در ذخیره فایل: {e}")
+
+    def export_trace(self):
+        """Save the profile as a Chrome trace file"""
+        default_name = f"profile_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "ذخیره Trace", default_name, "JSON Files (*.json)"
+        )
+        if not filename:
+            return
+
+        try:
+            self.profiler.write_chrome_trace(filename)
+            QMessageBox.information(self, "موفق", "فایل Trace ذخیره شد")
+        except Exception as e:
+            logger.error(f"Failed to write profile trace: {e}")
+            QMessageBox.warning(self, "خطا", f"خطا در ذخیره فایل: {e}")
@@ -0,0 +1,211 @@
+"""Cached filter engine for the installments view
+
+Each filter resolves to a FilterKey (due-date range, status, search text).
+The engine keeps every InstallmentRow it has fetched and, per key, the ids
+of the matching rows in due-date order. A key already seen is answered
+from the cache; a key that is strictly tighter than a cached one (a longer
+search text, a status on top of "all", a shorter date range) narrows that
+result in memory; only other keys run a query.
+
+The in-memory predicate mirrors the SQL one: half-open due-date ranges,
+equal status, and a substring match on policy number, holder name or
+mobile that ignores ASCII case like SQLite's LIKE.
+
+Change events keep the cache valid: changed rows are re-read and moved
+in or out of every cached result, deleted ones are dropped.
+"""
+import logging
+import string
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Cached id-sets per engine (least recently used are dropped first)
+MAX_CACHED_KEYS = 32
+_ID_CHUNK_SIZE = 500
+
+# start/end: due_date >= start and < end (None: unbounded); status: None for
+# any; search: normalized with normalize_search()
+FilterKey = namedtuple('FilterKey', ['start', 'end', 'status', 'search'])
+
+ALL_INSTALLMENTS = FilterKey(None, None, None, '')
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def normalize_search(text):
+    """Strip and lower ASCII letters (SQLite LIKE is case-insensitive for ASCII only)"""
+    return (text or '').strip().translate(_ASCII_LOWER)
+
+
+def covers(wide, narrow):
+    """True if every row matching narrow also matches wide"""
+    return (
+        (wide.start is None or (narrow.start is not None and narrow.start >= wide.start)) and
+        (wide.end is None or (narrow.end is not None and narrow.end <= wide.end)) and
+        (wide.status is None or wide.status == narrow.status) and
+        wide.search in narrow.search
+    )
+
+
+def matches(key, row):
+    """In-memory equivalent of the key's SQL filter for one InstallmentRow"""
+    if key.start is not None and row.due_date < key.start:
+        return False
+    if key.end is not None and row.due_date >= key.end:
+        return False
+    if key.status is not None and row.status != key.status:
+        return False
+    if key.search:
+        return any(key.search in (value or '').translate(_ASCII_LOWER)
+                   for value in (row.policy_number, row.policy_holder_name, row.mobile_number))
+    return True
+
+
+class InstallmentFilter:
+    """Filter results of one user's installments, cached per FilterKey"""
+
+    def __init__(self, session, user_id, max_keys=MAX_CACHED_KEYS):
+        """
+        Initialize the engine
+
+        Args:
+            session: SQLAlchemy database session
+            user_id: Owner of the installments
+            max_keys: Number of filter results kept
+        """
+        self.session = session
+        self.user_id = user_id
+        self.max_keys = max_keys
+        self.rows = {}                  # installment id -> InstallmentRow
+        self.results = OrderedDict()    # FilterKey -> list of ids in due-date order
+        self._sort_keys = {}            # FilterKey -> (due_date, id) of each id in results
+
+    def statement(self, key):
+        """InstallmentRow select() for a key"""
+        from ..models import Installment, InsurancePolicy
+        from ..models.read_models import installment_rows
+
+        stmt = installment_rows(self.user_id)
+        if key.start is not None:
+            stmt = stmt.where(Installment.due_date >= key.start)
+        if key.end is not None:
+            stmt = stmt.where(Installment.due_date < key.end)
+        if key.status is not None:
+            stmt = stmt.where(Installment.status == key.status)
+        if key.search:
+            stmt = stmt.where(
+                InsurancePolicy.policy_number.contains(key.search, autoescape=True) |
+                InsurancePolicy.policy_holder_name.contains(key.search, autoescape=True) |
+                InsurancePolicy.mobile_number.contains(key.search, autoescape=True)
+            )
+        return stmt
+
+    def _sort_key(self, installment_id):
+        return self.rows[installment_id].due_date, installment_id
+
+    def _sorted_keys(self, key):
+        """Sort keys parallel to results[key], built before the result first changes"""
+        keys = self._sort_keys.get(key)
+        if keys is None:
+            keys = self._sort_keys[key] = [self._sort_key(iid) for iid in self.results[key]]
+        return keys
+
+    def ids(self, key):
+        """
+        Ids of the installments matching key, in due-date order
+
+        Returns the cached list; callers must not modify it.
+        """
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+
+        base = next((cached for cached in reversed(self.results) if covers(cached, key)), None)
+        if base is not None:
+            rows = self.rows
+            ids = [iid for iid in self.results[base] if matches(key, rows[iid])]
+        else:
+            ids = self._query(key)
+        self.results[key] = ids
+        while len(self.results) > self.max_keys:
+            dropped, _ = self.results.popitem(last=False)
+            self._sort_keys.pop(dropped, None)
+        return ids
+
+    def _query(self, key):
+        from ..models import Installment, read_session
+        from ..models.read_models import InstallmentRow, fetch_rows
+
+        with read_session(self.session) as session:
+            fetched = fetch_rows(
+                session, self.statement(key).order_by(Installment.due_date, Installment.id),
+                InstallmentRow
+            )
+        self.rows.update((row.id, row) for row in fetched)
+        return [row.id for row in fetched]
+
+    def refresh_rows(self, installment_ids):
+        """
+        Re-read changed installments and move them in or out of cached results
+
+        Returns:
+            list: The fresh InstallmentRows (installments of other users or
+                  deleted ones are dropped)
+        """
+        from ..models import Installment, read_session
+        from ..models.read_models import InstallmentRow, fetch_rows
+
+        ids = list(installment_ids)
+        fresh = []
+        with read_session(self.session) as session:
+            for i in range(0, len(ids), _ID_CHUNK_SIZE):
+                fresh.extend(fetch_rows(session, self.statement(ALL_INSTALLMENTS).where(
+                    Installment.id.in_(ids[i:i + _ID_CHUNK_SIZE])
+                ), InstallmentRow))
+
+        self.discard(set(ids) - {row.id for row in fresh})
+        for key in self.results:
+            self._sorted_keys(key)  # from the rows before this refresh
+        for row in fresh:
+            old = self.rows.get(row.id)
+            self.rows[row.id] = row
+            for key, result in self.results.items():
+                was = old is not None and matches(key, old)
+                now = matches(key, row)
+                if was and (not now or old.due_date != row.due_date):
+                    keys = self._sorted_keys(key)
+                    position = bisect_left(keys, (old.due_date, row.id))
+                    del keys[position]
+                    del result[position]
+                    was = False
+                if now and not was:
+                    # bisect's key= argument needs Python 3.10
+                    keys = self._sorted_keys(key)
+                    position = bisect_left(keys, (row.due_date, row.id))
+                    keys.insert(position, (row.due_date, row.id))
+                    result.insert(position, row.id)
+        return fresh
+
+    def installments_of(self, policy_ids):
+        """Ids of the cached installments of the given policies"""
+        return [iid for iid, row in self.rows.items() if row.policy_id in policy_ids]
+
+    def discard(self, installment_ids):
+        """Drop deleted installments"""
+        installment_ids = set(installment_ids).intersection(self.rows)
+        if not installment_ids:
+            return
+        for iid in installment_ids:
+            del self.rows[iid]
+        for key, result in self.results.items():
+            if any(iid in installment_ids for iid in result):
+                self.results[key] = [iid for iid in result if iid not in installment_ids]
+                self._sort_keys.pop(key, None)
+
+    def clear(self):
+        """Drop all cached rows and results"""
+        self.rows.clear()
+        self.results.clear()
+        self._sort_keys.clear()
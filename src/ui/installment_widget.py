@@ -2,12 +2,24 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
                             QTableWidgetItem, QPushButton, QLabel, QMessageBox,
                             QComboBox, QLineEdit, QGroupBox, QGridLayout)
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QTimer
 from datetime import datetime, timedelta
 import logging
+from ..utils.query_stats import track_action
+from .installment_filter import InstallmentFilter, FilterKey, covers, matches, normalize_search
 
 logger = logging.getLogger(__name__)
 
+# Filters apply once input has been idle this long
+FILTER_DELAY_MS = 250
+
+STATUS_FILTERS = {
+    "در انتظار": "pending",
+    "پرداخت شده": "paid",
+    "معوق": "overdue",
+    "لغو شده": "cancelled"
+}
+
 class InstallmentWidget(QWidget):
     """Installment management interface"""
     
@@ -16,8 +28,25 @@ class InstallmentWidget(QWidget):
         self.user = user
         self.session = session
         self.current_filter = "all"  # Default filter
+        # Per table row: installment id, policy id and due date (rows stay sorted by due date)
+        self.row_ids = []
+        self.row_policy_ids = []
+        self.row_due_dates = []
+        # The table holds the rows of rendered_key; rows outside shown_key are hidden
+        self.filters = InstallmentFilter(session, user.id)
+        self.rendered_key = None
+        self.shown_key = None
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.load_installments)
         self.setup_ui()
         self.load_installments()
+        
+        from ..utils.change_bus import get_change_bus, INSTALLMENT_CHANGED, POLICY_CHANGED
+        bus = get_change_bus()
+        bus.subscribe(INSTALLMENT_CHANGED, self.on_installments_changed)
+        bus.subscribe(POLICY_CHANGED, self.on_policies_changed)
     
     def setup_ui(self):
         """Setup UI"""
@@ -142,6 +171,13 @@ class InstallmentWidget(QWidget):
                 padding: 8px;
                 font-weight: bold;
             }
+            QPushButton#pay_button {
+                background-color: #27ae60;
+                color: white;
+                padding: 5px 10px;
+                border-radius: 3px;
+            }
+            QPushButton#pay_button:hover { background-color: #229954; }
         """)
         layout.addWidget(self.table)
         
@@ -162,8 +198,8 @@ class InstallmentWidget(QWidget):
         self.apply_filters()
     
     def apply_filters(self):
-        """Apply all filters and reload installments"""
-        self.load_installments()
+        """Apply all filters once input settles"""
+        self.filter_timer.start()
     
     def reset_filters(self):
         """Reset all filters to default"""
@@ -173,139 +209,198 @@ class InstallmentWidget(QWidget):
         self.start_date.setDate(QDate.currentDate())
         self.end_date.setDate(QDate.currentDate().addMonths(1))
     
+    def filter_key(self):
+        """FilterKey for the current filters (relative ranges are whole days from today)"""
+        date_filter_text = self.date_filter.currentText()
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        start = end = None
+        
+        if date_filter_text == "امروز":
+            start, end = today, today + timedelta(days=1)
+        elif date_filter_text == "7 روز آینده":
+            start, end = today, today + timedelta(days=8)
+        elif date_filter_text == "ماه آینده":
+            start, end = today, today + timedelta(days=31)
+        elif date_filter_text == "بازه تاریخی سفارشی":
+            start_date = self.start_date.date().toPyDate()
+            end_date = self.end_date.date().toPyDate()
+            start = datetime(start_date.year, start_date.month, start_date.day)
+            end = datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1)
+        # If "همه اقساط", no date filter applied
+        
+        return FilterKey(start, end, STATUS_FILTERS.get(self.status_filter.currentText()),
+                         normalize_search(self.search_box.text()))
+    
     def load_installments(self):
-        """Load installments with filters applied"""
-        from ..controllers import InstallmentController
-        from ..models import InsurancePolicy
-        from ..utils.persian_utils import format_currency, PersianDateConverter
+        """Show installments matching the filters
         
+        A filter within the rendered rows' filter only hides and shows rows;
+        any other filter re-renders the table.
+        """
+        self.filter_timer.stop()
         try:
-            controller = InstallmentController(self.session)
-            
-            # Get all installments for the user
-            from ..models import Installment
-            
-            # Start with base query
-            query = self.session.query(Installment, InsurancePolicy).join(
-                InsurancePolicy
-            ).filter(
-                InsurancePolicy.user_id == self.user.id
-            )
-            
-            # Apply date filter
-            date_filter_text = self.date_filter.currentText()
-            today = datetime.now()
-            
-            if date_filter_text == "امروز":
-                start_of_day = datetime(today.year, today.month, today.day)
-                end_of_day = start_of_day + timedelta(days=1)
-                query = query.filter(
-                    Installment.due_date >= start_of_day,
-                    Installment.due_date < end_of_day
-                )
-            elif date_filter_text == "7 روز آینده":
-                future_date = today + timedelta(days=7)
-                query = query.filter(
-                    Installment.due_date >= today,
-                    Installment.due_date <= future_date
-                )
-            elif date_filter_text == "ماه آینده":
-                future_date = today + timedelta(days=30)
-                query = query.filter(
-                    Installment.due_date >= today,
-                    Installment.due_date <= future_date
-                )
-            elif date_filter_text == "بازه تاریخی سفارشی":
-                start_date = self.start_date.date().toPyDate()
-                end_date = self.end_date.date().toPyDate()
-                start_datetime = datetime(start_date.year, start_date.month, start_date.day)
-                end_datetime = datetime(end_date.year, end_date.month, end_date.day, 23, 59, 59)
-                query = query.filter(
-                    Installment.due_date >= start_datetime,
-                    Installment.due_date <= end_datetime
-                )
-            # If "همه اقساط", no date filter applied
-            
-            # Apply status filter
-            status_filter_text = self.status_filter.currentText()
-            if status_filter_text != "همه":
-                status_map = {
-                    "در انتظار": "pending",
-                    "پرداخت شده": "paid",
-                    "معوق": "overdue",
-                    "لغو شده": "cancelled"
-                }
-                status = status_map.get(status_filter_text)
-                if status:
-                    query = query.filter(Installment.status == status)
-            
-            # Apply search filter
-            search_text = self.search_box.text().strip()
-            if search_text:
-                query = query.filter(
-                    (InsurancePolicy.policy_number.like(f'%{search_text}%')) |
-                    (InsurancePolicy.policy_holder_name.like(f'%{search_text}%')) |
-                    (InsurancePolicy.mobile_number.like(f'%{search_text}%'))
-                )
-            
-            # Order by due date
-            installments = query.order_by(Installment.due_date).all()
-            
+            key = self.filter_key()
+            ids = self.filters.ids(key)
+            if self.rendered_key is not None and covers(self.rendered_key, key):
+                self.show_rows(key, ids)
+            else:
+                self.render_rows(key, ids)
+        except Exception as e:
+            logger.error(f"Error loading installments: {e}")
+    
+    def render_rows(self, key, ids):
+        """Fill the table with the given installments"""
+        from ..utils.number_format import format_currency_column
+        
+        installments = [self.filters.rows[iid] for iid in ids]
+        self.table.setUpdatesEnabled(False)
+        try:
+            self.table.setRowCount(0)
             self.table.setRowCount(len(installments))
+            self.row_ids = list(ids)
+            self.row_policy_ids = [inst.policy_id for inst in installments]
+            self.row_due_dates = [inst.due_date for inst in installments]
             
-            for row, (inst, policy) in enumerate(installments):
-                # Policy Number
-                self.table.setItem(row, 0, QTableWidgetItem(policy.policy_number))
-                
-                # Insurance Type
-                self.table.setItem(row, 1, QTableWidgetItem(policy.policy_type or "-"))
-                
-                # Due Amount
-                self.table.setItem(row, 2, QTableWidgetItem(format_currency(inst.amount)))
-                
-                # Due Date
-                self.table.setItem(row, 3, QTableWidgetItem(
-                    PersianDateConverter.gregorian_to_jalali(inst.due_date)
-                ))
-                
-                # Mobile Number
-                self.table.setItem(row, 4, QTableWidgetItem(policy.mobile_number or "-"))
-                
-                # Policy Holder Name
-                self.table.setItem(row, 5, QTableWidgetItem(policy.policy_holder_name))
-                
-                # Action button
-                if inst.status in ['pending', 'overdue']:
-                    btn = QPushButton("ثبت پرداخت")
-                    btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #27ae60;
-                            color: white;
-                            padding: 5px 10px;
-                            border-radius: 3px;
-                        }
-                        QPushButton:hover { background-color: #229954; }
-                    """)
-                    btn.clicked.connect(lambda checked, i=inst: self.mark_paid(i))
-                    self.table.setCellWidget(row, 6, btn)
-                else:
-                    status_label = QLabel(inst.status)
-                    if inst.status == 'paid':
-                        status_label.setText("✓ پرداخت شده")
-                        status_label.setStyleSheet("color: #27ae60; font-weight: bold;")
-                    elif inst.status == 'cancelled':
-                        status_label.setText("✗ لغو شده")
-                        status_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
-                    self.table.setCellWidget(row, 6, status_label)
-            
-            self.table.resizeColumnsToContents()
-            
+            # Amount column formatted in one batch
+            amounts = format_currency_column([inst.amount for inst in installments])
+            for row, inst in enumerate(installments):
+                self.set_installment_row(row, inst, amounts[row])
+        finally:
+            self.table.setUpdatesEnabled(True)
+        self.rendered_key = self.shown_key = key
+        
+        self.table.resizeColumnsToContents()
+    
+    def show_rows(self, key, ids):
+        """Hide the rendered rows that do not match key"""
+        visible = set(ids)
+        is_hidden, set_hidden = self.table.isRowHidden, self.table.setRowHidden
+        for row, iid in enumerate(self.row_ids):
+            hidden = iid not in visible
+            if is_hidden(row) != hidden:
+                set_hidden(row, hidden)
+        self.shown_key = key
+    
+    def set_installment_row(self, row, inst, amount_text=None):
+        """Fill one table row from an InstallmentRow (amount_text: preformatted amount)"""
+        from ..utils.persian_utils import format_currency, PersianDateConverter
+        
+        # Policy Number
+        self.table.setItem(row, 0, QTableWidgetItem(inst.policy_number))
+        
+        # Insurance Type
+        self.table.setItem(row, 1, QTableWidgetItem(inst.policy_type or "-"))
+        
+        # Due Amount
+        self.table.setItem(row, 2, QTableWidgetItem(amount_text or format_currency(inst.amount)))
+        
+        # Due Date
+        self.table.setItem(row, 3, QTableWidgetItem(
+            PersianDateConverter.gregorian_to_jalali(inst.due_date)
+        ))
+        
+        # Mobile Number
+        self.table.setItem(row, 4, QTableWidgetItem(inst.mobile_number or "-"))
+        
+        # Policy Holder Name
+        self.table.setItem(row, 5, QTableWidgetItem(inst.policy_holder_name))
+        
+        # Action button
+        if inst.status in ['pending', 'overdue']:
+            btn = QPushButton("ثبت پرداخت")
+            btn.setObjectName("pay_button")  # styled by the table's style sheet
+            btn.clicked.connect(lambda checked, i=inst: self.mark_paid(i))
+            self.table.setCellWidget(row, 6, btn)
+        else:
+            status_label = QLabel(inst.status)
+            if inst.status == 'paid':
+                status_label.setText("✓ پرداخت شده")
+                status_label.setStyleSheet("color: #27ae60; font-weight: bold;")
+            elif inst.status == 'cancelled':
+                status_label.setText("✗ لغو شده")
+                status_label.setStyleSheet("color: #e74c3c; font-weight: bold;")
+            self.table.setCellWidget(row, 6, status_label)
+    
+    def on_installments_changed(self, event):
+        """Patch only the changed rows (insert, update, move or remove)"""
+        from ..utils.change_bus import DELETED
+        
+        if event.action == DELETED:
+            self.filters.discard(event.ids)
+            self.remove_rows(event.ids.intersection(self.row_ids))
+            return
+        
+        try:
+            rows = self.filters.refresh_rows(event.ids)
         except Exception as e:
-            logger.error(f"Error loading installments: {e}")
+            logger.error(f"Error patching installments: {e}")
+            return
+        self.patch_rows(event.ids, rows)
+    
+    def on_policies_changed(self, event):
+        """Drop rows of deleted policies and re-render rows of edited ones"""
+        from ..utils.change_bus import DELETED
+        
+        affected = self.filters.installments_of(event.ids)
+        if not affected:
+            return
+        if event.action == DELETED:
+            self.filters.discard(affected)
+            self.remove_rows(affected)
+        else:
+            try:
+                rows = self.filters.refresh_rows(affected)
+            except Exception as e:
+                logger.error(f"Error patching installments: {e}")
+                return
+            self.patch_rows(affected, rows)
+    
+    def patch_rows(self, changed_ids, rows):
+        """Upsert fresh rows of the rendered filter; remove the other changed ones"""
+        if self.rendered_key is None:
+            return
+        rendered = [inst for inst in rows if matches(self.rendered_key, inst)]
+        # Rows that no longer match the filters disappear
+        self.remove_rows(set(changed_ids).intersection(self.row_ids) - {inst.id for inst in rendered})
+        for inst in rendered:
+            row = self.upsert_row(inst)
+            self.table.setRowHidden(row, not matches(self.shown_key, inst))
+    
+    def upsert_row(self, inst):
+        """Update a row in place, or insert it at its due-date position; returns the row"""
+        from bisect import bisect_right
+        
+        if inst.id in self.row_ids:
+            row = self.row_ids.index(inst.id)
+            if self.row_due_dates[row] == inst.due_date:
+                self.row_policy_ids[row] = inst.policy_id
+                self.set_installment_row(row, inst)
+                return row
+            self.remove_rows([inst.id])
+        
+        row = bisect_right(self.row_due_dates, inst.due_date)
+        self.table.insertRow(row)
+        self.row_ids.insert(row, inst.id)
+        self.row_policy_ids.insert(row, inst.policy_id)
+        self.row_due_dates.insert(row, inst.due_date)
+        self.set_installment_row(row, inst)
+        return row
+    
+    def remove_rows(self, installment_ids):
+        """Remove the rows of the given installments"""
+        for iid in installment_ids:
+            if iid in self.row_ids:
+                row = self.row_ids.index(iid)
+                self.table.removeRow(row)
+                del self.row_ids[row]
+                del self.row_policy_ids[row]
+                del self.row_due_dates[row]
     
+    @track_action('installments.mark_paid')
     def mark_paid(self, installment):
         """Mark installment as paid"""
         from ..controllers import InstallmentController
+        from ..models import session_scope
         
         reply = QMessageBox.question(
             self,
@@ -315,12 +410,12 @@ class InstallmentWidget(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            controller = InstallmentController(self.session)
-            success, message = controller.mark_as_paid(installment.id)
+            with session_scope(self.session) as session:
+                success, message = InstallmentController(session).mark_as_paid(installment.id)
             
             if success:
+                # The row is patched through the change bus
                 QMessageBox.information(self, "موفق", message)
-                self.load_installments()
             else:
                 QMessageBox.warning(self, "خطا", message)
     
@@ -328,6 +423,9 @@ class InstallmentWidget(QWidget):
         """Show payment dialog for quick access"""
         QMessageBox.information(self, "اطلاعات", "لطفاً قسط مورد نظر را از جدول انتخاب کنید")
     
+    @track_action('installments.refresh')
     def refresh(self):
-        """Refresh table"""
+        """Reload from the database"""
+        self.filters.clear()
+        self.rendered_key = self.shown_key = None
         self.load_installments()
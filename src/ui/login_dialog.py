@@ -11,10 +11,13 @@ class LoginDialog(QDialog):
     """Login dialog for user authentication"""
     
     login_successful = pyqtSignal(object)  # Emits user object on successful login
+    verification_done = pyqtSignal(object)  # Emitted from the auth worker thread
     
     def __init__(self, auth_controller, parent=None):
         super().__init__(parent)
         self.auth_controller = auth_controller
+        self._pending_login = None
+        self.verification_done.connect(self.on_verification_done)
         self.setup_ui()
         self.apply_rtl()
         
@@ -168,16 +171,52 @@ class LoginDialog(QDialog):
             QMessageBox.warning(self, "خطا", "لطفاً نام کاربری و رمز عبور را وارد کنید")
             return
         
-        # Attempt login
-        success, message, user = self.auth_controller.login(username, password)
+        if self._pending_login is not None:
+            return
+        
+        # Look up the user here; bcrypt runs in the auth worker thread
+        future, message, user = self.auth_controller.begin_login(username, password)
+        if future is None:
+            self.show_login_error(message)
+            return
+        
+        self._pending_login = (user, password)
+        self.set_busy(True)
+        # Queued back to the GUI thread through the signal
+        future.add_done_callback(self.verification_done.emit)
+    
+    def on_verification_done(self, future):
+        """Finish login on the GUI thread once the password check is done"""
+        user, password = self._pending_login
+        self._pending_login = None
+        self.set_busy(False)
+        
+        try:
+            verify_result = future.result()
+        except Exception as e:
+            logger.error(f"Password verification failed: {e}")
+            verify_result = (False, None)
+        
+        success, message, user = self.auth_controller.finish_login(user, password, verify_result)
         
         if success:
             self.login_successful.emit(user)
             self.accept()
         else:
-            QMessageBox.warning(self, "خطا در ورود", message)
-            self.password_input.clear()
-            self.password_input.setFocus()
+            self.show_login_error(message)
+    
+    def set_busy(self, busy):
+        """Disable inputs while the password is being verified"""
+        self.login_button.setEnabled(not busy)
+        self.login_button.setText("در حال بررسی..." if busy else "ورود")
+        self.username_input.setEnabled(not busy)
+        self.password_input.setEnabled(not busy)
+    
+    def show_login_error(self, message):
+        """Show a login error and reset the password field"""
+        QMessageBox.warning(self, "خطا در ورود", message)
+        self.password_input.clear()
+        self.password_input.setFocus()
     
     def show_register_dialog(self):
         """Show registration dialog"""
@@ -3,23 +3,32 @@ from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QWidget, QVBoxLayout,
                             QMenuBar, QMenu, QAction, QStatusBar, QMessageBox,
                             QLabel, QToolBar, QSplitter, QPushButton, QHBoxLayout,
                             QListWidget, QListWidgetItem, QFrame)
-from PyQt5.QtCore import Qt, QTimer, QSize
+from PyQt5.QtCore import Qt, QTimer, QSize, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon, QColor, QFontDatabase
 import logging
 import os
+from ..utils.query_stats import track_action
 
 logger = logging.getLogger(__name__)
 
 class MainWindow(QMainWindow):
     """Main application window"""
     
-    def __init__(self, user, session):
+    password_verify_done = pyqtSignal(object)  # Emitted from the auth worker thread
+    password_hash_done = pyqtSignal(object)  # Emitted from the auth worker thread
+    
+    def __init__(self, user, session, auth_controller=None):
         super().__init__()
         self.user = user
         self.session = session
+        self.auth_controller = auth_controller
+        self._pending_password_change = None
+        self.password_verify_done.connect(self.on_password_verify_done)
+        self.password_hash_done.connect(self.on_password_hash_done)
         self.setup_ui()
         self.apply_vazir_font()
         self.setup_reminder_timer()
+        self.setup_change_feed()
         
     def setup_ui(self):
         """Setup the main window UI"""
@@ -311,6 +320,10 @@ class MainWindow(QMainWindow):
         refresh_action.triggered.connect(self.refresh_all)
         file_menu.addAction(refresh_action)
         
+        reconcile_action = QAction("تطبیق صورتحساب بانکی", self)
+        reconcile_action.triggered.connect(self.show_reconciliation)
+        file_menu.addAction(reconcile_action)
+        
         file_menu.addSeparator()
         
         exit_action = QAction("خروج", self)
@@ -328,9 +341,18 @@ class MainWindow(QMainWindow):
         profile_action.triggered.connect(self.show_profile)
         settings_menu.addAction(profile_action)
         
+        if self.auth_controller is not None:
+            change_password_action = QAction("تغییر رمز عبور", self)
+            change_password_action.triggered.connect(self.show_change_password)
+            settings_menu.addAction(change_password_action)
+        
         # Help menu
         help_menu = menubar.addMenu("راهنما")
         
+        diagnostics_action = QAction("عیب‌یابی کارایی", self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        help_menu.addAction(diagnostics_action)
+        
         about_action = QAction("درباره", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
@@ -439,10 +461,6 @@ class MainWindow(QMainWindow):
     
     def setup_reminder_timer(self):
         """Setup timer for checking reminders"""
-        from ..controllers import ReminderController
-        
-        self.reminder_controller = ReminderController(self.session)
-        
         # Check reminders every 5 minutes
         self.reminder_timer = QTimer()
         self.reminder_timer.timeout.connect(self.check_reminders)
@@ -451,15 +469,43 @@ class MainWindow(QMainWindow):
         # Check immediately on startup
         QTimer.singleShot(5000, self.check_reminders)  # Wait 5 seconds after startup
     
+    def setup_change_feed(self):
+        """Poll updated_at high-water marks for rows changed by other processes"""
+        from ..models import read_session
+        from ..utils.change_bus import ChangeFeed
+        
+        self.change_feed = ChangeFeed()
+        with read_session(self.session) as session:
+            self.change_feed.prime(session)
+        
+        self.change_feed_timer = QTimer()
+        self.change_feed_timer.timeout.connect(self.poll_changes)
+        self.change_feed_timer.start(30000)  # 30 seconds
+    
+    def poll_changes(self):
+        """Publish external changes so widgets patch the affected rows"""
+        from ..models import read_session
+        
+        try:
+            with read_session(self.session) as session:
+                self.change_feed.poll(session)
+        except Exception as e:
+            logger.error(f"Error polling changes: {e}")
+    
     def check_reminders(self):
         """Check and process pending reminders"""
+        from ..controllers import ReminderController
+        from ..models import session_scope
+        
         try:
-            stats = self.reminder_controller.process_pending_reminders()
+            with session_scope(self.session) as session:
+                stats = ReminderController(session).process_pending_reminders()
             if stats['sent'] > 0:
                 logger.info(f"Sent {stats['sent']} reminders")
         except Exception as e:
             logger.error(f"Error checking reminders: {e}")
     
+    @track_action('main.refresh_all')
     def refresh_all(self):
         """Refresh all widgets"""
         try:
@@ -489,6 +535,18 @@ class MainWindow(QMainWindow):
         dialog = SMSSettingsDialog(self.session, self)
         dialog.exec_()
     
+    def show_reconciliation(self):
+        """Show bank statement reconciliation dialog"""
+        from .reconciliation_dialog import ReconciliationDialog
+        dialog = ReconciliationDialog(self.session, self)
+        dialog.exec_()
+    
+    def show_diagnostics(self):
+        """Show query diagnostics dialog"""
+        from .diagnostics_dialog import DiagnosticsDialog
+        dialog = DiagnosticsDialog(self)
+        dialog.exec_()
+    
     def show_profile(self):
         """Show user profile"""
         QMessageBox.information(
@@ -500,6 +558,86 @@ class MainWindow(QMainWindow):
             f"تلفن: {self.user.phone or 'ثبت نشده'}"
         )
     
+    def show_change_password(self):
+        """Change the current user's password"""
+        from PyQt5.QtWidgets import QInputDialog, QLineEdit
+        
+        if self._pending_password_change is not None:
+            return
+        
+        old_password, ok = QInputDialog.getText(
+            self, "تغییر رمز عبور", "رمز عبور فعلی:", QLineEdit.Password
+        )
+        if not ok or not old_password:
+            return
+        
+        # Checked against the session token; once it expired, bcrypt runs in the auth worker
+        valid, future = self.auth_controller.begin_reauthentication(old_password)
+        if future is None:
+            self.ask_new_password(old_password, valid)
+            return
+        
+        self._pending_password_change = (old_password, None)
+        future.add_done_callback(self.password_verify_done.emit)
+    
+    def on_password_verify_done(self, future):
+        """Continue the password change once the current password was checked"""
+        old_password, _ = self._pending_password_change
+        self._pending_password_change = None
+        
+        try:
+            valid = future.result()
+        except Exception as e:
+            QMessageBox.warning(self, "خطا", str(e))
+            return
+        
+        valid = self.auth_controller.finish_reauthentication(old_password, valid)
+        self.ask_new_password(old_password, valid)
+    
+    def ask_new_password(self, old_password, valid):
+        """Ask for the new password after the current one was checked"""
+        from PyQt5.QtWidgets import QInputDialog, QLineEdit
+        
+        if not valid:
+            QMessageBox.warning(self, "خطا", "رمز عبور فعلی اشتباه است")
+            return
+        
+        new_password, ok = QInputDialog.getText(
+            self, "تغییر رمز عبور", "رمز عبور جدید:", QLineEdit.Password
+        )
+        if not ok or not new_password:
+            return
+        
+        if len(new_password) < 6:
+            QMessageBox.warning(self, "خطا", "رمز عبور باید حداقل 6 کاراکتر باشد")
+            return
+        
+        # Hash in the auth worker thread, then store on the GUI thread
+        self._pending_password_change = (old_password, new_password)
+        future = self.auth_controller.auth_service.hash_password_async(new_password)
+        future.add_done_callback(self.password_hash_done.emit)
+    
+    def on_password_hash_done(self, future):
+        """Store the new password once its hash is ready"""
+        old_password, new_password = self._pending_password_change
+        self._pending_password_change = None
+        
+        try:
+            password_hash = future.result()
+        except Exception as e:
+            QMessageBox.warning(self, "خطا", str(e))
+            return
+        
+        # The current password was verified before the new one was asked for
+        success, message = self.auth_controller.change_password(
+            self.user.id, old_password, new_password, password_hash=password_hash,
+            old_password_verified=True
+        )
+        if success:
+            QMessageBox.information(self, "موفق", message)
+        else:
+            QMessageBox.warning(self, "خطا", message)
+    
     def show_about(self):
         """Show about dialog"""
         QMessageBox.about(
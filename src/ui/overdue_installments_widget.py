@@ -1,29 +1,48 @@
 """Overdue installments management widget"""
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
-                            QTableWidgetItem, QPushButton, QLabel, QMessageBox,
-                            QGroupBox, QScrollArea)
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget,
+                            QTreeWidgetItem, QPushButton, QLabel, QMessageBox)
 from PyQt5.QtCore import Qt
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from datetime import datetime
 import logging
 
-from ..models import Installment, InsurancePolicy
+from ..models import session_scope, read_session
 from ..utils.persian_utils import format_currency, PersianDateConverter
+from ..utils.change_bus import get_change_bus, POLICY_CHANGED, INSTALLMENT_CHANGED, DELETED
 from ..controllers import InstallmentController
+from .deferred_refresh import DeferredRefreshMixin
+from ..utils.query_stats import track_action
 
 logger = logging.getLogger(__name__)
 
 # Constant for overdue threshold
 OVERDUE_THRESHOLD_DAYS = 30
 
-class OverdueInstallmentsWidget(QWidget):
+# Policy groups fetched per page ("show more" fetches the next one)
+POLICY_PAGE_SIZE = 100
+
+# Item data roles
+ROW_ROLE = Qt.UserRole          # policy group row or InstallmentRow
+LOADED_ROLE = Qt.UserRole + 1   # policy group whose installments are loaded
+
+class OverdueInstallmentsWidget(DeferredRefreshMixin, QWidget):
     """Widget for managing overdue installments (>1 month past due)"""
     
     def __init__(self, user, session):
         super().__init__()
         self.user = user
         self.session = session
+        self.next_page_token = None
+        self.loaded_until = None     # (oldest_due_date, policy_id) of the last loaded group
+        self.policy_items = {}       # policy_id -> top-level item
         self.setup_ui()
         self.load_overdue_installments()
+        
+        # Changed policies are patched in place; the rest falls back to a deferred reload
+        self.watch_changes()
+        bus = get_change_bus()
+        bus.subscribe(INSTALLMENT_CHANGED, self.on_installments_changed)
+        bus.subscribe(POLICY_CHANGED, self.on_policies_changed)
     
     def setup_ui(self):
         """Setup UI"""
@@ -59,213 +78,300 @@ class OverdueInstallmentsWidget(QWidget):
         desc.setStyleSheet("color: #7f8c8d; margin-bottom: 10px;")
         layout.addWidget(desc)
         
-        # Scroll area for policy groups
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setStyleSheet("""
-            QScrollArea {
-                border: none;
-                background: transparent;
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("font-weight: bold; color: #2c3e50;")
+        layout.addWidget(self.summary_label)
+        
+        # One row per policy, most severe first; a policy's installments
+        # are loaded when its row is expanded
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(7)
+        self.tree.setHeaderLabels([
+            "بیمه‌نامه / قسط", "بیمه‌گذار", "نوع بیمه",
+            "تعداد / وضعیت", "مبلغ معوق", "تاریخ سررسید", "تعداد روزهای تأخیر"
+        ])
+        self.tree.setLayoutDirection(Qt.RightToLeft)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setStyleSheet("""
+            QTreeWidget {
+                background-color: white;
+                border: 1px solid #bdc3c7;
+            }
+            QHeaderView::section {
+                background-color: #e74c3c;
+                color: white;
+                padding: 8px;
+                font-weight: bold;
             }
         """)
+        self.tree.itemExpanded.connect(self.on_policy_expanded)
+        self.tree.itemDoubleClicked.connect(self.on_item_double_clicked)
+        layout.addWidget(self.tree)
         
-        self.policies_widget = QWidget()
-        self.policies_layout = QVBoxLayout()
-        self.policies_widget.setLayout(self.policies_layout)
-        scroll.setWidget(self.policies_widget)
+        self.empty_label = QLabel("هیچ قسط معوقی یافت نشد! ✓")
+        self.empty_label.setStyleSheet("""
+            QLabel {
+                font-size: 16pt;
+                color: #27ae60;
+                padding: 50px;
+                background: white;
+                border: 2px dashed #27ae60;
+                border-radius: 10px;
+            }
+        """)
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.hide()
+        layout.addWidget(self.empty_label)
+        
+        # Actions on the selected installment
+        actions_layout = QHBoxLayout()
         
-        layout.addWidget(scroll)
+        view_btn = QPushButton("مشاهده")
+        view_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                padding: 5px 10px;
+                border-radius: 3px;
+            }
+            QPushButton:hover { background-color: #2980b9; }
+        """)
+        view_btn.clicked.connect(lambda: self._with_selected(self.view_details))
+        actions_layout.addWidget(view_btn)
+        
+        pay_btn = QPushButton("ثبت پرداخت")
+        pay_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #27ae60;
+                color: white;
+                padding: 5px 10px;
+                border-radius: 3px;
+            }
+            QPushButton:hover { background-color: #229954; }
+        """)
+        pay_btn.clicked.connect(lambda: self._with_selected(self.mark_paid))
+        actions_layout.addWidget(pay_btn)
+        
+        actions_layout.addStretch()
+        
+        self.more_btn = QPushButton("نمایش بیمه‌نامه‌های بیشتر")
+        self.more_btn.clicked.connect(self.load_more_policies)
+        actions_layout.addWidget(self.more_btn)
+        
+        layout.addLayout(actions_layout)
         self.setLayout(layout)
     
     def load_overdue_installments(self):
-        """Load overdue installments grouped by policy"""
-        
-        # Clear existing widgets
-        while self.policies_layout.count():
-            child = self.policies_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        """Load the summary and the first page of overdue policies"""
+        self.tree.clear()
+        self.next_page_token = None
+        self.loaded_until = None
+        self.policy_items = {}
         
         try:
-            # Get overdue installments - more than OVERDUE_THRESHOLD_DAYS days past due and not paid
-            today = datetime.now()
-            threshold_date = today - timedelta(days=OVERDUE_THRESHOLD_DAYS)
-            
-            query = self.session.query(Installment, InsurancePolicy).join(
-                InsurancePolicy
-            ).filter(
-                InsurancePolicy.user_id == self.user.id,
-                Installment.due_date < threshold_date,
-                Installment.status.in_(['pending', 'overdue'])
-            ).order_by(InsurancePolicy.policy_number, Installment.installment_number)
-            
-            installments = query.all()
-            
-            if not installments:
-                no_data = QLabel("هیچ قسط معوقی یافت نشد! ✓")
-                no_data.setStyleSheet("""
-                    QLabel {
-                        font-size: 16pt;
-                        color: #27ae60;
-                        padding: 50px;
-                        background: white;
-                        border: 2px dashed #27ae60;
-                        border-radius: 10px;
-                    }
-                """)
-                no_data.setAlignment(Qt.AlignCenter)
-                self.policies_layout.addWidget(no_data)
-                return
-            
-            # Group by policy
-            policies_dict = {}
-            for inst, policy in installments:
-                if policy.id not in policies_dict:
-                    policies_dict[policy.id] = {
-                        'policy': policy,
-                        'installments': []
-                    }
-                policies_dict[policy.id]['installments'].append(inst)
+            with read_session(self.session) as session:
+                controller = InstallmentController(session)
+                summary = controller.get_overdue_summary(self.user.id, OVERDUE_THRESHOLD_DAYS)
+                page = controller.get_overdue_policies_page(
+                    self.user.id, OVERDUE_THRESHOLD_DAYS, POLICY_PAGE_SIZE)
             
-            # Create a group box for each policy
-            for policy_id, policy_data in policies_dict.items():
-                policy = policy_data['policy']
-                installments_list = policy_data['installments']
-                
-                group = QGroupBox()
-                group.setStyleSheet("""
-                    QGroupBox {
-                        background: white;
-                        border: 2px solid #e74c3c;
-                        border-radius: 8px;
-                        margin-top: 15px;
-                        padding: 15px;
-                        font-weight: bold;
-                    }
-                """)
-                
-                group_layout = QVBoxLayout()
-                
-                # Policy header
-                policy_header = QLabel(
-                    f"📋 بیمه‌نامه: {policy.policy_number} | "
-                    f"بیمه‌گذار: {policy.policy_holder_name} | "
-                    f"نوع: {policy.policy_type or '-'} | "
-                    f"تعداد اقساط معوق: {len(installments_list)}"
-                )
-                policy_header.setStyleSheet("""
-                    QLabel {
-                        font-size: 12pt;
-                        font-weight: bold;
-                        color: #2c3e50;
-                        background: #ecf0f1;
-                        padding: 10px;
-                        border-radius: 5px;
-                    }
-                """)
-                group_layout.addWidget(policy_header)
-                
-                # Table for installments
-                table = QTableWidget()
-                table.setColumnCount(6)
-                table.setHorizontalHeaderLabels([
-                    "شماره قسط", "مبلغ", "تاریخ سررسید", "تعداد روزهای تأخیر", "وضعیت", "عملیات"
-                ])
-                table.setLayoutDirection(Qt.RightToLeft)
-                table.setRowCount(len(installments_list))
-                table.setStyleSheet("""
-                    QTableWidget {
-                        background-color: white;
-                        border: 1px solid #bdc3c7;
-                        gridline-color: #ecf0f1;
-                    }
-                    QHeaderView::section {
-                        background-color: #e74c3c;
-                        color: white;
-                        padding: 8px;
-                        font-weight: bold;
-                    }
-                """)
-                
-                for row, inst in enumerate(installments_list):
-                    # Installment number
-                    table.setItem(row, 0, QTableWidgetItem(str(inst.installment_number)))
-                    
-                    # Amount
-                    table.setItem(row, 1, QTableWidgetItem(format_currency(inst.amount)))
-                    
-                    # Due date
-                    table.setItem(row, 2, QTableWidgetItem(
-                        PersianDateConverter.gregorian_to_jalali(inst.due_date)
-                    ))
-                    
-                    # Days overdue
-                    days_overdue = (today - inst.due_date).days
-                    overdue_item = QTableWidgetItem(f"{days_overdue} روز")
-                    overdue_item.setForeground(Qt.red)
-                    table.setItem(row, 3, overdue_item)
-                    
-                    # Status
-                    status_text = "معوق" if inst.status == 'overdue' else "در انتظار"
-                    status_item = QTableWidgetItem(status_text)
-                    status_item.setForeground(Qt.red)
-                    table.setItem(row, 4, status_item)
-                    
-                    # Action buttons
-                    btn_widget = QWidget()
-                    btn_layout = QHBoxLayout()
-                    btn_layout.setContentsMargins(5, 5, 5, 5)
-                    
-                    view_btn = QPushButton("مشاهده")
-                    view_btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #3498db;
-                            color: white;
-                            padding: 5px 10px;
-                            border-radius: 3px;
-                        }
-                        QPushButton:hover { background-color: #2980b9; }
-                    """)
-                    view_btn.clicked.connect(lambda checked, i=inst, p=policy: self.view_details(i, p))
-                    btn_layout.addWidget(view_btn)
-                    
-                    pay_btn = QPushButton("ثبت پرداخت")
-                    pay_btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #27ae60;
-                            color: white;
-                            padding: 5px 10px;
-                            border-radius: 3px;
-                        }
-                        QPushButton:hover { background-color: #229954; }
-                    """)
-                    pay_btn.clicked.connect(lambda checked, i=inst: self.mark_paid(i))
-                    btn_layout.addWidget(pay_btn)
-                    
-                    btn_widget.setLayout(btn_layout)
-                    table.setCellWidget(row, 5, btn_widget)
-                
-                table.resizeColumnsToContents()
-                group_layout.addWidget(table)
-                
-                group.setLayout(group_layout)
-                self.policies_layout.addWidget(group)
-            
-            self.policies_layout.addStretch()
+            self._add_policies(page)
+            self.show_summary(summary)
             
         except Exception as e:
             logger.error(f"Error loading overdue installments: {e}")
             QMessageBox.warning(self, "خطا", "خطا در بارگذاری اقساط معوق")
     
-    def view_details(self, installment, policy):
-        """View installment and policy details"""
+    def load_more_policies(self):
+        """Append the next page of overdue policies"""
+        if not self.next_page_token:
+            return
+        try:
+            with read_session(self.session) as session:
+                page = InstallmentController(session).get_overdue_policies_page(
+                    self.user.id, OVERDUE_THRESHOLD_DAYS, POLICY_PAGE_SIZE, self.next_page_token)
+            self._add_policies(page)
+        except Exception as e:
+            logger.error(f"Error loading overdue policies: {e}")
+    
+    def show_summary(self, summary):
+        """Show the totals line, or the empty message if nothing is overdue"""
+        has_rows = self.tree.topLevelItemCount() > 0
+        self.tree.setVisible(has_rows)
+        self.empty_label.setVisible(not has_rows)
+        self.summary_label.setText(
+            f"{summary['policies']} بیمه‌نامه | {summary['installments']} قسط معوق | "
+            f"مجموع: {format_currency(summary['amount'])}" if has_rows else ""
+        )
+    
+    def _add_policies(self, page):
+        today = datetime.now()
+        items = []
+        for group in page.items:
+            item = self._new_policy_item(group, today)
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+        self.next_page_token = page.next_token
+        if page.next_token:
+            last = page.items[-1]
+            self.loaded_until = (last.oldest_due_date, last.policy_id)
+        else:
+            self.loaded_until = None
+        self.more_btn.setVisible(bool(page.next_token))
+    
+    def _new_policy_item(self, group, today):
+        item = QTreeWidgetItem()
+        item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        self.set_policy_row(item, group, today)
+        item.setData(0, LOADED_ROLE, False)
+        self.policy_items[group.policy_id] = item
+        return item
+    
+    def set_policy_row(self, item, group, today):
+        """Fill a policy group row"""
+        item.setText(0, f"📋 {group.policy_number}")
+        item.setText(1, group.policy_holder_name)
+        item.setText(2, group.policy_type or '-')
+        item.setText(3, f"{group.overdue_count} قسط")
+        item.setText(4, format_currency(group.overdue_amount))
+        item.setText(5, PersianDateConverter.gregorian_to_jalali(group.oldest_due_date))
+        item.setText(6, f"{(today - group.oldest_due_date).days} روز")
+        item.setForeground(6, Qt.red)
+        item.setData(0, ROW_ROLE, group)
+    
+    def on_policy_expanded(self, item):
+        """Load a policy's overdue installments the first time its row is expanded"""
+        if item.parent() is not None or item.data(0, LOADED_ROLE):
+            return
+        group = item.data(0, ROW_ROLE)
+        with read_session(self.session) as session:
+            installments = InstallmentController(session).get_policy_overdue_installments(
+                group.policy_id, OVERDUE_THRESHOLD_DAYS)
+        self._set_children(item, installments)
+    
+    def _set_children(self, item, installments):
+        item.takeChildren()
+        today = datetime.now()
+        children = []
+        for inst in installments:
+            child = QTreeWidgetItem()
+            self.set_installment_row(child, inst, today)
+            children.append(child)
+        item.addChildren(children)
+        item.setData(0, LOADED_ROLE, True)
+    
+    def on_installments_changed(self, event):
+        """Patch the groups of the changed installments' policies"""
+        if event.action == DELETED:
+            # A deleted installment's policy is no longer known
+            self.on_data_changed(event)
+            return
+        if self._refresh_stale:
+            return
+        try:
+            with read_session(self.session) as session:
+                policy_ids = InstallmentController(session).get_installment_policy_ids(event.ids)
+        except Exception as e:
+            logger.error(f"Error patching overdue installments: {e}")
+            self.on_data_changed(event)
+            return
+        self.patch_policies(policy_ids)
+    
+    def on_policies_changed(self, event):
+        """Patch (or drop) the groups of changed policies"""
+        if not self._refresh_stale:
+            self.patch_policies(event.ids)
+    
+    def patch_policies(self, policy_ids):
+        """
+        Re-query the groups of the given policies and update, move, insert
+        or remove their rows, keeping loaded pages and expanded groups
+        
+        Only groups inside the loaded pages are shown; expanded groups
+        reload their installments, collapsed ones reload when expanded.
+        """
+        try:
+            with read_session(self.session) as session:
+                controller = InstallmentController(session)
+                groups = controller.get_overdue_policy_groups(
+                    policy_ids, self.user.id, OVERDUE_THRESHOLD_DAYS)
+                expanded = [pid for pid, group in groups.items()
+                            if pid in self.policy_items and self.policy_items[pid].isExpanded()]
+                children = {pid: controller.get_policy_overdue_installments(
+                    pid, OVERDUE_THRESHOLD_DAYS) for pid in expanded}
+                summary = controller.get_overdue_summary(self.user.id, OVERDUE_THRESHOLD_DAYS)
+        except Exception as e:
+            logger.error(f"Error patching overdue policies: {e}")
+            self.on_data_changed(None)
+            return
+        
+        today = datetime.now()
+        for policy_id in policy_ids:
+            item = self.policy_items.pop(policy_id, None)
+            group = groups.get(policy_id)
+            was_expanded = item is not None and item.isExpanded()
+            if item is not None:
+                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(item))
+            key = group and (group.oldest_due_date, group.policy_id)
+            if group is None or (self.loaded_until is not None and key > self.loaded_until):
+                # Paid off, or moved past the loaded pages ("show more" fetches it)
+                continue
+            
+            if item is None:
+                item = self._new_policy_item(group, today)
+            else:
+                self.set_policy_row(item, group, today)
+                self.policy_items[policy_id] = item
+                if policy_id in children:
+                    self._set_children(item, children[policy_id])
+                else:
+                    item.takeChildren()
+                    item.setData(0, LOADED_ROLE, False)
+            
+            keys = [self._group_key(self.tree.topLevelItem(i))
+                    for i in range(self.tree.topLevelItemCount())]
+            self.tree.insertTopLevelItem(bisect_left(keys, key), item)
+            item.setExpanded(was_expanded)
+        
+        self.show_summary(summary)
+    
+    @staticmethod
+    def _group_key(item):
+        group = item.data(0, ROW_ROLE)
+        return (group.oldest_due_date, group.policy_id)
+    
+    def set_installment_row(self, item, inst, today):
+        """Fill an installment row under its policy"""
+        item.setText(0, f"قسط {inst.installment_number}")
+        item.setText(3, "معوق" if inst.status == 'overdue' else "در انتظار")
+        item.setText(4, format_currency(inst.amount))
+        item.setText(5, PersianDateConverter.gregorian_to_jalali(inst.due_date))
+        item.setText(6, f"{(today - inst.due_date).days} روز")
+        item.setForeground(3, Qt.red)
+        item.setForeground(6, Qt.red)
+        item.setData(0, ROW_ROLE, inst)
+    
+    def on_item_double_clicked(self, item, column):
+        """Show details of a double-clicked installment"""
+        if item.parent() is not None:
+            self.view_details(item.data(0, ROW_ROLE))
+    
+    def _with_selected(self, action):
+        item = self.tree.currentItem()
+        if item is None or item.parent() is None:
+            QMessageBox.information(self, "راهنما", "ابتدا یک قسط را از فهرست انتخاب کنید")
+            return
+        action(item.data(0, ROW_ROLE))
+    
+    def view_details(self, installment):
+        """View installment and policy details of an InstallmentRow"""
         
         details = (
             f"جزئیات قسط معوق:\n\n"
-            f"بیمه‌نامه: {policy.policy_number}\n"
-            f"بیمه‌گذار: {policy.policy_holder_name}\n"
-            f"موبایل: {policy.mobile_number or '-'}\n"
-            f"نوع بیمه: {policy.policy_type or '-'}\n\n"
+            f"بیمه‌نامه: {installment.policy_number}\n"
+            f"بیمه‌گذار: {installment.policy_holder_name}\n"
+            f"موبایل: {installment.mobile_number or '-'}\n"
+            f"نوع بیمه: {installment.policy_type or '-'}\n\n"
             f"شماره قسط: {installment.installment_number}\n"
             f"مبلغ: {format_currency(installment.amount)}\n"
             f"تاریخ سررسید: {PersianDateConverter.gregorian_to_jalali(installment.due_date)}\n"
@@ -275,6 +381,7 @@ class OverdueInstallmentsWidget(QWidget):
         
         QMessageBox.information(self, "جزئیات قسط معوق", details)
     
+    @track_action('overdue.mark_paid')
     def mark_paid(self, installment):
         """Mark installment as paid"""
         
@@ -286,15 +393,16 @@ class OverdueInstallmentsWidget(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            controller = InstallmentController(self.session)
-            success, message = controller.mark_as_paid(installment.id)
+            with session_scope(self.session) as session:
+                success, message = InstallmentController(session).mark_as_paid(installment.id)
             
             if success:
+                # The view reloads through the change bus
                 QMessageBox.information(self, "موفق", message)
-                self.load_overdue_installments()
             else:
                 QMessageBox.warning(self, "خطا", message)
     
+    @track_action('overdue.refresh')
     def refresh(self):
         """Refresh the widget"""
         self.load_overdue_installments()
@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget,
 from PyQt5.QtCore import Qt
 from datetime import datetime
 import logging
+from ..utils.query_stats import track_action
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +21,15 @@ class PolicyInstallmentDialog(QDialog):
         self.setMinimumWidth(900)
         self.setMinimumHeight(600)
         self.setLayoutDirection(Qt.RightToLeft)
+        self.policy_id = policy.id
+        self.row_ids = []  # installment id per table row
         self.setup_ui()
         self.load_installments()
+        
+        from ..utils.change_bus import get_change_bus, INSTALLMENT_CHANGED, POLICY_CHANGED
+        bus = get_change_bus()
+        bus.subscribe(INSTALLMENT_CHANGED, self.on_installments_changed)
+        bus.subscribe(POLICY_CHANGED, self.on_policies_changed)
     
     def setup_ui(self):
         """Setup UI"""
@@ -43,6 +51,12 @@ class PolicyInstallmentDialog(QDialog):
         remaining = self.policy.total_amount - self.policy.down_payment
         info_layout.addRow("باقی‌مانده:", QLabel(format_currency(remaining)))
         
+        # Paid / unpaid totals from the maintained policy balance summary
+        self.paid_label = QLabel("-")
+        self.unpaid_label = QLabel("-")
+        info_layout.addRow("پرداخت شده:", self.paid_label)
+        info_layout.addRow("مانده اقساط:", self.unpaid_label)
+        
         info_group.setLayout(info_layout)
         layout.addWidget(info_group)
         
@@ -95,64 +109,136 @@ class PolicyInstallmentDialog(QDialog):
     
     def load_installments(self):
         """Load installments for this policy"""
-        from ..controllers import InstallmentController
-        from ..utils.persian_utils import format_currency, PersianDateConverter
+        from ..models import read_session
+        from ..models.queries import policy_installment_rows
         
         try:
-            controller = InstallmentController(self.session)
-            installments = controller.get_policy_installments(self.policy.id)
+            # Only the displayed columns; rows are plain named tuples
+            with read_session(self.session) as session:
+                installments = session.execute(policy_installment_rows(self.policy_id)).all()
             
             self.table.setRowCount(len(installments))
+            self.row_ids = [inst.id for inst in installments]
             
             for row, inst in enumerate(installments):
-                self.table.setItem(row, 0, QTableWidgetItem(str(inst.installment_number)))
-                self.table.setItem(row, 1, QTableWidgetItem(format_currency(inst.amount)))
-                self.table.setItem(row, 2, QTableWidgetItem(
-                    PersianDateConverter.gregorian_to_jalali(inst.due_date)
-                ))
-                
-                payment_date = "-"
-                if inst.payment_date:
-                    payment_date = PersianDateConverter.gregorian_to_jalali(inst.payment_date)
-                self.table.setItem(row, 3, QTableWidgetItem(payment_date))
-                
-                # Status with color coding
-                status_item = QTableWidgetItem(self.get_status_text(inst.status))
-                status_item.setBackground(self.get_status_color(inst.status))
-                self.table.setItem(row, 4, status_item)
-                
-                self.table.setItem(row, 5, QTableWidgetItem(inst.payment_method or "-"))
-                
-                # Action buttons
-                if inst.status in ['pending', 'overdue']:
-                    btn_widget = QWidget()
-                    btn_layout = QHBoxLayout()
-                    btn_layout.setContentsMargins(0, 0, 0, 0)
-                    
-                    pay_btn = QPushButton("ثبت پرداخت")
-                    pay_btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #27ae60;
-                            color: white;
-                            padding: 5px 10px;
-                            border-radius: 3px;
-                        }
-                        QPushButton:hover { background-color: #229954; }
-                    """)
-                    pay_btn.clicked.connect(lambda checked, i=inst: self.mark_paid(i))
-                    btn_layout.addWidget(pay_btn)
-                    
-                    btn_widget.setLayout(btn_layout)
-                    self.table.setCellWidget(row, 6, btn_widget)
-                else:
-                    self.table.setItem(row, 6, QTableWidgetItem(""))
+                self.set_installment_row(row, inst)
             
             self.table.resizeColumnsToContents()
+            self.update_balance_labels()
             
         except Exception as e:
             logger.error(f"Error loading installments: {e}")
             QMessageBox.warning(self, "خطا", "خطا در بارگذاری اقساط")
     
+    def set_installment_row(self, row, inst):
+        """Fill one table row from a policy_installment_rows() row"""
+        from ..utils.persian_utils import format_currency, PersianDateConverter
+        
+        self.table.setItem(row, 0, QTableWidgetItem(str(inst.installment_number)))
+        self.table.setItem(row, 1, QTableWidgetItem(format_currency(inst.amount)))
+        self.table.setItem(row, 2, QTableWidgetItem(
+            PersianDateConverter.gregorian_to_jalali(inst.due_date)
+        ))
+        
+        payment_date = "-"
+        if inst.payment_date:
+            payment_date = PersianDateConverter.gregorian_to_jalali(inst.payment_date)
+        self.table.setItem(row, 3, QTableWidgetItem(payment_date))
+        
+        # Status with color coding
+        status_item = QTableWidgetItem(self.get_status_text(inst.status))
+        status_item.setBackground(self.get_status_color(inst.status))
+        self.table.setItem(row, 4, status_item)
+        
+        self.table.setItem(row, 5, QTableWidgetItem(inst.payment_method or "-"))
+        
+        # Action buttons
+        if inst.status in ['pending', 'overdue']:
+            btn_widget = QWidget()
+            btn_layout = QHBoxLayout()
+            btn_layout.setContentsMargins(0, 0, 0, 0)
+            
+            pay_btn = QPushButton("ثبت پرداخت")
+            pay_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #27ae60;
+                    color: white;
+                    padding: 5px 10px;
+                    border-radius: 3px;
+                }
+                QPushButton:hover { background-color: #229954; }
+            """)
+            pay_btn.clicked.connect(lambda checked, i=inst: self.mark_paid(i))
+            btn_layout.addWidget(pay_btn)
+            
+            btn_widget.setLayout(btn_layout)
+            self.table.setCellWidget(row, 6, btn_widget)
+        else:
+            self.table.removeCellWidget(row, 6)
+            self.table.setItem(row, 6, QTableWidgetItem(""))
+    
+    def on_installments_changed(self, event):
+        """Patch the rows of changed installments of this policy"""
+        from ..models import Installment, read_session
+        from ..models.queries import policy_installment_rows
+        from ..utils.change_bus import DELETED
+        
+        shown = event.ids.intersection(self.row_ids)
+        if event.action == DELETED:
+            for iid in shown:
+                row = self.row_ids.index(iid)
+                self.table.removeRow(row)
+                del self.row_ids[row]
+            return
+        
+        new_ids = event.ids - shown
+        with read_session(self.session) as session:
+            changed = session.execute(policy_installment_rows(self.policy_id).where(
+                Installment.id.in_(shown | new_ids)
+            )).all() if (shown or new_ids) else []
+        
+        for inst in changed:
+            if inst.id in shown:
+                self.set_installment_row(self.row_ids.index(inst.id), inst)
+            else:
+                self.table.insertRow(len(self.row_ids))
+                self.row_ids.append(inst.id)
+                self.set_installment_row(len(self.row_ids) - 1, inst)
+    
+    def on_policies_changed(self, event):
+        """Refresh totals when this policy's balance changes"""
+        from ..utils.change_bus import DELETED
+        
+        if self.policy_id not in event.ids:
+            return
+        if event.action == DELETED:
+            self.table.setRowCount(0)
+            self.row_ids = []
+            self.paid_label.setText("-")
+            self.unpaid_label.setText("-")
+        else:
+            self.update_balance_labels()
+    
+    def update_balance_labels(self):
+        """Show paid and unpaid totals from the policy balance summary"""
+        from ..controllers import PolicyBalanceController
+        from ..models import read_session
+        from ..utils.persian_utils import format_currency
+        
+        with read_session(self.session) as session:
+            balance = PolicyBalanceController(session).get_balance(self.policy_id)
+        if balance:
+            self.paid_label.setText(
+                f"{format_currency(balance.total_paid)} ({balance.paid_count} قسط)"
+            )
+            self.unpaid_label.setText(
+                f"{format_currency(balance.total_remaining)} "
+                f"({balance.pending_count + balance.overdue_count} قسط)"
+            )
+        else:
+            self.paid_label.setText("-")
+            self.unpaid_label.setText("-")
+    
     def get_status_text(self, status):
         """Get Persian text for status"""
         status_map = {
@@ -175,6 +261,7 @@ class PolicyInstallmentDialog(QDialog):
         }
         return color_map.get(status, QColor(255, 255, 255))
     
+    @track_action('policy_installments.mark_paid')
     def mark_paid(self, installment):
         """Mark installment as paid"""
         from ..controllers import InstallmentController
@@ -187,11 +274,15 @@ class PolicyInstallmentDialog(QDialog):
         )
         
         if reply == QMessageBox.Yes:
-            controller = InstallmentController(self.session)
-            success, message = controller.mark_as_paid(installment.id, payment_method='نقدی')
+            from ..models import session_scope
+            
+            with session_scope(self.session) as session:
+                success, message = InstallmentController(session).mark_as_paid(
+                    installment.id, payment_method='نقدی'
+                )
             
             if success:
+                # Rows and totals are patched through the change bus
                 QMessageBox.information(self, "موفق", message)
-                self.load_installments()
             else:
                 QMessageBox.warning(self, "خطا", message)
@@ -9,6 +9,7 @@ from dateutil.relativedelta import relativedelta
 from .persian_date_edit import PersianDateEdit
 from ..controllers import PolicyController
 import logging
+from ..utils.query_stats import track_action
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +20,12 @@ class PolicyWidget(QWidget):
         super().__init__()
         self.user = user
         self.session = session
+        self.row_ids = []  # policy id per table row
         self.setup_ui()
         self.load_policies()
+        
+        from ..utils.change_bus import get_change_bus, POLICY_CHANGED
+        get_change_bus().subscribe(POLICY_CHANGED, self.on_policies_changed)
     
     def setup_ui(self):
         """Setup UI"""
@@ -63,10 +68,10 @@ class PolicyWidget(QWidget):
         
         # Table
         self.table = QTableWidget()
-        self.table.setColumnCount(8)
+        self.table.setColumnCount(9)
         self.table.setHorizontalHeaderLabels([
             "شماره بیمه‌نامه", "بیمه‌گذار", "نوع", "شرکت بیمه",
-            "مبلغ کل", "وضعیت", "عملیات", "حذف"
+            "مبلغ کل", "مانده اقساط", "وضعیت", "عملیات", "حذف"
         ])
         self.table.setLayoutDirection(Qt.RightToLeft)
         self.table.setStyleSheet("""
@@ -88,61 +93,22 @@ class PolicyWidget(QWidget):
     
     def load_policies(self):
         """Load policies into table"""
-        from ..controllers import PolicyController
-        from ..utils.persian_utils import format_currency
+        from ..models import read_session
+        from ..models.queries import POLICY_WITH_BALANCE
         
         try:
-            controller = PolicyController(self.session)
-            policies = controller.get_all_policies(self.user.id)
+            # Rows keep the detached policies for their buttons, so the
+            # balance is loaded up front rather than lazily later
+            with read_session(self.session) as session:
+                policies = PolicyController(session).get_all_policies(
+                    self.user.id, options=POLICY_WITH_BALANCE
+                )
             
             self.table.setRowCount(len(policies))
+            self.row_ids = [p.id for p in policies]
             
             for row, policy in enumerate(policies):
-                self.table.setItem(row, 0, QTableWidgetItem(policy.policy_number))
-                self.table.setItem(row, 1, QTableWidgetItem(policy.policy_holder_name))
-                self.table.setItem(row, 2, QTableWidgetItem(policy.policy_type or "-"))
-                self.table.setItem(row, 3, QTableWidgetItem(policy.insurance_company or "-"))
-                self.table.setItem(row, 4, QTableWidgetItem(format_currency(policy.total_amount)))
-                self.table.setItem(row, 5, QTableWidgetItem(policy.status))
-                
-                # Action buttons
-                btn_widget = QWidget()
-                btn_layout = QHBoxLayout()
-                btn_layout.setContentsMargins(0, 0, 0, 0)
-                
-                view_btn = QPushButton("مشاهده")
-                view_btn.clicked.connect(lambda checked, p=policy: self.view_policy(p))
-                btn_layout.addWidget(view_btn)
-                
-                installments_btn = QPushButton("مدیریت اقساط")
-                installments_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #3498db;
-                        color: white;
-                        padding: 5px 10px;
-                        border-radius: 3px;
-                    }
-                    QPushButton:hover { background-color: #2980b9; }
-                """)
-                installments_btn.clicked.connect(lambda checked, p=policy: self.manage_installments(p))
-                btn_layout.addWidget(installments_btn)
-                
-                btn_widget.setLayout(btn_layout)
-                self.table.setCellWidget(row, 6, btn_widget)
-                
-                # Delete button
-                delete_btn = QPushButton("حذف")
-                delete_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #e74c3c;
-                        color: white;
-                        padding: 5px 10px;
-                        border-radius: 3px;
-                    }
-                    QPushButton:hover { background-color: #c0392b; }
-                """)
-                delete_btn.clicked.connect(lambda checked, p=policy: self.delete_policy(p))
-                self.table.setCellWidget(row, 7, delete_btn)
+                self.set_policy_row(row, policy, policy.balance)
             
             self.table.resizeColumnsToContents()
             
@@ -150,11 +116,101 @@ class PolicyWidget(QWidget):
             logger.error(f"Error loading policies: {e}")
             QMessageBox.warning(self, "خطا", "خطا در بارگذاری بیمه‌نامه‌ها")
     
+    def set_policy_row(self, row, policy, balance):
+        """Fill one table row from a policy and its balance summary"""
+        from ..utils.persian_utils import format_currency
+        
+        self.table.setItem(row, 0, QTableWidgetItem(policy.policy_number))
+        self.table.setItem(row, 1, QTableWidgetItem(policy.policy_holder_name))
+        self.table.setItem(row, 2, QTableWidgetItem(policy.policy_type or "-"))
+        self.table.setItem(row, 3, QTableWidgetItem(policy.insurance_company or "-"))
+        self.table.setItem(row, 4, QTableWidgetItem(format_currency(policy.total_amount)))
+        remaining = format_currency(balance.total_remaining) if balance else "-"
+        self.table.setItem(row, 5, QTableWidgetItem(remaining))
+        self.table.setItem(row, 6, QTableWidgetItem(policy.status))
+        
+        # Action buttons
+        btn_widget = QWidget()
+        btn_layout = QHBoxLayout()
+        btn_layout.setContentsMargins(0, 0, 0, 0)
+        
+        view_btn = QPushButton("مشاهده")
+        view_btn.clicked.connect(lambda checked, p=policy: self.view_policy(p))
+        btn_layout.addWidget(view_btn)
+        
+        installments_btn = QPushButton("مدیریت اقساط")
+        installments_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                padding: 5px 10px;
+                border-radius: 3px;
+            }
+            QPushButton:hover { background-color: #2980b9; }
+        """)
+        installments_btn.clicked.connect(lambda checked, p=policy: self.manage_installments(p))
+        btn_layout.addWidget(installments_btn)
+        
+        btn_widget.setLayout(btn_layout)
+        self.table.setCellWidget(row, 7, btn_widget)
+        
+        # Delete button
+        delete_btn = QPushButton("حذف")
+        delete_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                padding: 5px 10px;
+                border-radius: 3px;
+            }
+            QPushButton:hover { background-color: #c0392b; }
+        """)
+        delete_btn.clicked.connect(lambda checked, p=policy: self.delete_policy(p))
+        self.table.setCellWidget(row, 8, delete_btn)
+    
+    def on_policies_changed(self, event):
+        """Patch rows of changed policies instead of reloading the table"""
+        from ..models import InsurancePolicy, read_session
+        from ..models.queries import POLICY_WITH_BALANCE
+        from ..utils.change_bus import DELETED
+        
+        shown = event.ids.intersection(self.row_ids)
+        if event.action == DELETED:
+            self.remove_rows(shown)
+            return
+        
+        with read_session(self.session) as session:
+            policies = session.query(InsurancePolicy).options(*POLICY_WITH_BALANCE).filter(
+                InsurancePolicy.id.in_(event.ids),
+                InsurancePolicy.user_id == self.user.id
+            ).all()
+        found = {p.id for p in policies}
+        
+        # Newest first, like get_all_policies
+        for policy in sorted(policies, key=lambda p: p.created_at or datetime.min):
+            if policy.id in shown:
+                row = self.row_ids.index(policy.id)
+            else:
+                row = 0
+                self.table.insertRow(row)
+                self.row_ids.insert(row, policy.id)
+            self.set_policy_row(row, policy, policy.balance)
+            self.apply_search_to_row(row, self.search_input.text())
+        
+        self.remove_rows(shown - found)
+    
+    def remove_rows(self, policy_ids):
+        """Remove the rows of the given policies"""
+        for policy_id in policy_ids:
+            if policy_id in self.row_ids:
+                row = self.row_ids.index(policy_id)
+                self.table.removeRow(row)
+                del self.row_ids[row]
+    
     def show_add_policy_dialog(self):
         """Show add policy dialog"""
         dialog = AddPolicyDialog(self.user, self.session, self)
-        if dialog.exec_() == QDialog.Accepted:
-            self.load_policies()
+        dialog.exec_()  # The new row arrives through the change bus
     
     def view_policy(self, policy):
         """View policy details"""
@@ -175,6 +231,7 @@ class PolicyWidget(QWidget):
         dialog = PolicyInstallmentDialog(policy, self.session, self)
         dialog.exec_()
     
+    @track_action('policies.delete')
     def delete_policy(self, policy):
         """Delete policy after confirmation"""
         
@@ -188,26 +245,32 @@ class PolicyWidget(QWidget):
         )
         
         if reply == QMessageBox.Yes:
-            controller = PolicyController(self.session)
-            success, message = controller.delete_policy(policy.id)
+            from ..models import session_scope
+            
+            with session_scope(self.session) as session:
+                success, message = PolicyController(session).delete_policy(policy.id)
             
             if success:
                 QMessageBox.information(self, "موفق", message)
-                self.load_policies()
             else:
                 QMessageBox.warning(self, "خطا", message)
     
     def search_policies(self, text):
         """Search policies"""
         for row in range(self.table.rowCount()):
-            show = False
-            for col in range(self.table.columnCount() - 1):
-                item = self.table.item(row, col)
-                if item and text.lower() in item.text().lower():
-                    show = True
-                    break
-            self.table.setRowHidden(row, not show)
+            self.apply_search_to_row(row, text)
+    
+    def apply_search_to_row(self, row, text):
+        """Hide a row that does not contain the search text"""
+        show = False
+        for col in range(self.table.columnCount() - 1):
+            item = self.table.item(row, col)
+            if item and text.lower() in item.text().lower():
+                show = True
+                break
+        self.table.setRowHidden(row, not show)
     
+    @track_action('policies.refresh')
     def refresh(self):
         """Refresh table"""
         self.load_policies()
@@ -239,11 +302,13 @@ class AddPolicyDialog(QDialog):
         
         self.total_amount = QDoubleSpinBox()
         self.total_amount.setMaximum(999999999999)
+        self.total_amount.setDecimals(0)  # Whole rials
         self.total_amount.setGroupSeparatorShown(True)
         self.total_amount.setSuffix(" ریال")
         
         self.down_payment = QDoubleSpinBox()
         self.down_payment.setMaximum(999999999999)
+        self.down_payment.setDecimals(0)  # Whole rials
         self.down_payment.setGroupSeparatorShown(True)
         self.down_payment.setSuffix(" ریال")
         
@@ -286,7 +351,6 @@ class AddPolicyDialog(QDialog):
     def save_policy(self):
         """Save policy"""
         from ..controllers import PolicyController, InstallmentController
-        from dateutil.relativedelta import relativedelta
         
         if not self.policy_number.text() or not self.holder_name.text():
             QMessageBox.warning(self, "خطا", "لطفاً فیلدهای ضروری را پر کنید")
@@ -330,25 +394,30 @@ class AddPolicyDialog(QDialog):
             'description': self.description.toPlainText()
         }
         
-        controller = PolicyController(self.session)
-        success, message, policy = controller.create_policy(self.user.id, policy_data)
+        from ..models import session_scope
         
-        if success and policy:
+        with session_scope(self.session) as session:
+            controller = PolicyController(session)
+            success, message, policy = controller.create_policy(self.user.id, policy_data)
+            policy_id = policy.id if success and policy else None
+        
+        if policy_id:
             # Create installments: remaining amount after down payment divided by num_installments
             remaining_amount = total_amount - down_payment
             if remaining_amount > 0 and num_installments > 0:
-                installment_ctrl = InstallmentController(self.session)
-                # First installment starts next month
+                # First installment starts next Jalali month, then monthly on the same Jalali day
+                from ..utils.jalali_calendar import get_jalali_calendar
                 start_date = self.start_date.date().toPyDate()
-                first_installment_date = start_date + relativedelta(months=1)
+                first_installment_date = get_jalali_calendar().add_months_to_date(start_date, 1)
                 
-                success_inst, msg_inst, _ = installment_ctrl.create_installments_batch(
-                    policy.id,
-                    remaining_amount,
-                    num_installments,
-                    first_installment_date,
-                    interval_days=30
-                )
+                with session_scope(self.session) as session:
+                    success_inst, msg_inst, _ = InstallmentController(session).create_installments_batch(
+                        policy_id,
+                        remaining_amount,
+                        num_installments,
+                        datetime.combine(first_installment_date, datetime.min.time()),
+                        plan='monthly'
+                    )
                 
                 if success_inst:
                     QMessageBox.information(self, "موفق", 
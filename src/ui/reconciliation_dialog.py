@@ -0,0 +1,202 @@
+"""Bank statement reconciliation dialog"""
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                            QMessageBox, QFileDialog, QTableWidget, QTableWidgetItem,
+                            QComboBox, QHeaderView)
+from PyQt5.QtCore import Qt
+import logging
+
+logger = logging.getLogger(__name__)
+
+REVIEW_REASONS = {
+    'amount_mismatch': 'مبلغ با اقساط باز مطابقت ندارد',
+    'ambiguous_policy_number': 'چند بیمه‌نامه ممکن',
+    'ambiguous_mobile': 'چند بیمه‌نامه با این موبایل',
+    'ambiguous_amount_date': 'چند قسط با مبلغ و تاریخ مشابه',
+}
+
+METHOD_NAMES = {
+    'reference': 'شماره پیگیری',
+    'policy_number': 'شماره بیمه‌نامه',
+    'mobile': 'موبایل',
+    'amount_date': 'مبلغ و تاریخ',
+    'manual': 'تأیید دستی',
+}
+
+
+class ReconciliationDialog(QDialog):
+    """Import a bank statement, review ambiguous lines and apply payments"""
+
+    def __init__(self, session, parent=None):
+        super().__init__(parent)
+        from ..controllers import ReconciliationController
+
+        self.session = session
+        self.controller = ReconciliationController(session)
+        self.setWindowTitle("تطبیق صورتحساب بانکی")
+        self.setMinimumSize(900, 550)
+        self.setLayoutDirection(Qt.RightToLeft)
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup UI"""
+        layout = QVBoxLayout()
+
+        top_layout = QHBoxLayout()
+        open_btn = QPushButton("انتخاب فایل صورتحساب")
+        open_btn.clicked.connect(self.open_statement)
+        top_layout.addWidget(open_btn)
+
+        self.summary_label = QLabel("فایل CSV یا Excel صورتحساب بانک را انتخاب کنید")
+        top_layout.addWidget(self.summary_label, 1)
+        layout.addLayout(top_layout)
+
+        layout.addWidget(QLabel("موارد نیازمند بررسی:"))
+
+        self.review_table = QTableWidget()
+        self.review_table.setColumnCount(6)
+        self.review_table.setHorizontalHeaderLabels([
+            "ردیف", "مبلغ", "تاریخ", "شرح", "علت", "قسط پیشنهادی"
+        ])
+        self.review_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.review_table)
+
+        button_layout = QHBoxLayout()
+
+        confirm_btn = QPushButton("تأیید موارد انتخاب‌شده")
+        confirm_btn.clicked.connect(self.confirm_reviewed)
+        button_layout.addWidget(confirm_btn)
+
+        self.apply_btn = QPushButton("ثبت پرداخت‌ها")
+        self.apply_btn.setEnabled(False)
+        self.apply_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #27ae60;
+                color: white;
+                padding: 8px 20px;
+                border-radius: 5px;
+                font-weight: bold;
+            }
+            QPushButton:disabled {
+                background-color: #95a5a6;
+            }
+        """)
+        self.apply_btn.clicked.connect(self.apply_payments)
+        button_layout.addWidget(self.apply_btn)
+
+        close_btn = QPushButton("بستن")
+        close_btn.clicked.connect(self.reject)
+        button_layout.addWidget(close_btn)
+
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def open_statement(self):
+        """Choose and reconcile a statement file"""
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "انتخاب صورتحساب", "", "Statement Files (*.csv *.xlsx)"
+        )
+        if not filename:
+            return
+
+        success, message, summary = self.controller.reconcile(filename)
+        if not success:
+            QMessageBox.warning(self, "خطا", message)
+            return
+
+        self.update_summary()
+        self.load_review_queue()
+
+    def update_summary(self):
+        """Show counts of the current run"""
+        from ..utils.persian_utils import format_persian_number
+
+        summary = self.controller.summary()
+        methods = "، ".join(
+            f"{METHOD_NAMES.get(m, m)}: {format_persian_number(c)}"
+            for m, c in summary['by_method'].items()
+        )
+        methods = f" ({methods})" if methods else ""
+        self.summary_label.setText(
+            f"ردیف‌ها: {format_persian_number(summary['rows'])} | "
+            f"تطبیق: {format_persian_number(summary['matched'])}{methods} | "
+            f"بررسی: {format_persian_number(summary['review'])} | "
+            f"تکراری: {format_persian_number(summary['duplicates'])} | "
+            f"بدون تطبیق: {format_persian_number(summary['unmatched'])}"
+        )
+        self.apply_btn.setEnabled(summary['matched'] > 0)
+
+    def load_review_queue(self):
+        """Fill the review table with a candidate selector per line"""
+        from ..utils.persian_utils import format_currency, PersianDateConverter
+        from datetime import datetime
+
+        queue = self.controller.review_queue
+        self.review_table.setRowCount(len(queue))
+
+        for row, entry in enumerate(queue):
+            record = entry['record']
+            pay_date = record['date']
+
+            self.review_table.setItem(row, 0, QTableWidgetItem(str(entry['row_number'])))
+            self.review_table.setItem(row, 1, QTableWidgetItem(format_currency(record['amount'])))
+            self.review_table.setItem(row, 2, QTableWidgetItem(
+                PersianDateConverter.gregorian_to_jalali(
+                    datetime.combine(pay_date, datetime.min.time())
+                ) if pay_date else ""
+            ))
+            self.review_table.setItem(row, 3, QTableWidgetItem(record['description']))
+            self.review_table.setItem(row, 4, QTableWidgetItem(
+                REVIEW_REASONS.get(entry['reason'], entry['reason'])
+            ))
+
+            combo = QComboBox()
+            combo.addItem("— انتخاب نشده —", None)
+            for installment_id in entry['candidates']:
+                policy_number, amount, due = self.controller.describe_installment(installment_id)
+                due_text = PersianDateConverter.gregorian_to_jalali(
+                    datetime.combine(due, datetime.min.time())
+                ) if due else ""
+                combo.addItem(f"{policy_number} - {format_currency(amount)} - {due_text}", installment_id)
+            self.review_table.setCellWidget(row, 5, combo)
+
+    def confirm_reviewed(self):
+        """Confirm every review line that has a chosen installment"""
+        chosen = []
+        for row in range(self.review_table.rowCount()):
+            combo = self.review_table.cellWidget(row, 5)
+            installment_id = combo.currentData() if combo else None
+            if installment_id is not None:
+                chosen.append((int(self.review_table.item(row, 0).text()), installment_id))
+
+        errors = []
+        for row_number, installment_id in chosen:
+            success, message = self.controller.confirm(row_number, installment_id)
+            if not success:
+                errors.append(f"ردیف {row_number}: {message}")
+
+        if errors:
+            QMessageBox.warning(self, "خطا", "\n".join(errors[:20]))
+
+        self.update_summary()
+        self.load_review_queue()
+
+    def apply_payments(self):
+        """Record all matched lines as payments in one transaction"""
+        from ..utils.persian_utils import format_persian_number
+
+        count = len(self.controller.matches)
+        reply = QMessageBox.question(
+            self,
+            'تأیید ثبت',
+            f'پرداخت {format_persian_number(count)} قسط ثبت شود؟',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        success, message, result = self.controller.apply()
+        if success:
+            QMessageBox.information(self, "موفق", message)
+            self.update_summary()
+        else:
+            QMessageBox.warning(self, "خطا", message)
@@ -1,14 +1,18 @@
 """Registration dialog"""
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                             QLineEdit, QPushButton, QMessageBox)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 
 class RegisterDialog(QDialog):
     """User registration dialog"""
     
+    hash_done = pyqtSignal(object)  # Emitted from the auth worker thread
+    
     def __init__(self, auth_controller, parent=None):
         super().__init__(parent)
         self.auth_controller = auth_controller
+        self._pending_user = None
+        self.hash_done.connect(self.on_hash_done)
         self.setup_ui()
         self.setLayoutDirection(Qt.RightToLeft)
     
@@ -128,9 +132,9 @@ class RegisterDialog(QDialog):
         # Buttons
         button_layout = QHBoxLayout()
         
-        register_btn = QPushButton("ثبت‌نام")
-        register_btn.setMinimumHeight(40)
-        register_btn.setStyleSheet("""
+        self.register_btn = QPushButton("ثبت‌نام")
+        self.register_btn.setMinimumHeight(40)
+        self.register_btn.setStyleSheet("""
             QPushButton {
                 background-color: #27ae60;
                 color: white;
@@ -143,8 +147,8 @@ class RegisterDialog(QDialog):
                 background-color: #229954;
             }
         """)
-        register_btn.clicked.connect(self.handle_register)
-        button_layout.addWidget(register_btn)
+        self.register_btn.clicked.connect(self.handle_register)
+        button_layout.addWidget(self.register_btn)
         
         cancel_btn = QPushButton("انصراف")
         cancel_btn.setMinimumHeight(40)
@@ -190,14 +194,37 @@ class RegisterDialog(QDialog):
             QMessageBox.warning(self, "خطا", "رمز عبور باید حداقل 6 کاراکتر باشد")
             return
         
-        # Register user
-        success, message, user = self.auth_controller.register_user(
+        if self._pending_user is not None:
+            return
+        
+        # Hash in the auth worker thread, then register on the GUI thread
+        self._pending_user = dict(
             username=username,
-            password=password,
             full_name=fullname,
             email=email,
             phone=phone
         )
+        self.register_btn.setEnabled(False)
+        future = self.auth_controller.auth_service.hash_password_async(password)
+        future.add_done_callback(self.hash_done.emit)
+    
+    def on_hash_done(self, future):
+        """Register the user once the password hash is ready"""
+        data = self._pending_user
+        self._pending_user = None
+        self.register_btn.setEnabled(True)
+        
+        try:
+            password_hash = future.result()
+        except Exception as e:
+            QMessageBox.warning(self, "خطا در ثبت‌نام", str(e))
+            return
+        
+        success, message, user = self.auth_controller.register_user(
+            password=None,
+            password_hash=password_hash,
+            **data
+        )
         
         if success:
             self.accept()
@@ -35,7 +35,11 @@ class ReportsWidget(QWidget):
         self.report_type.addItems([
             "گزارش اقساط",
             "خلاصه بیمه‌نامه‌ها",
-            "آمار پرداخت‌ها"
+            "آمار پرداخت‌ها",
+            "سن‌بندی معوقات",
+            "نرخ وصول به تفکیک شرکت و نوع",
+            "پیش‌بینی وصول ماهانه",
+            "نرخ انتقال معوقات"
         ])
         type_layout.addRow("نوع:", self.report_type)
         
@@ -114,6 +118,7 @@ class ReportsWidget(QWidget):
     def _export_report(self, format_type):
         """Export report in specified format"""
         from ..utils import ReportGenerator
+        from ..models import read_session
         
         try:
             # Get parameters
@@ -136,19 +141,28 @@ class ReportsWidget(QWidget):
             insurance_type_filter = None if insurance_type == "همه" else insurance_type
             
             # Generate report
-            report_gen = ReportGenerator(self.session)
-            
-            if "اقساط" in report_type:
-                df = report_gen.generate_installment_report(
-                    start_date=start_date,
-                    end_date=end_date,
-                    status=status_filter,
-                    insurance_type=insurance_type_filter
-                )
-            elif "بیمه‌نامه" in report_type:
-                df = report_gen.generate_policy_summary(self.user.id)
-            else:
-                df = report_gen.generate_payment_statistics(start_date, end_date)
+            with read_session(self.session) as session:
+                report_gen = ReportGenerator(session)
+                
+                portfolio_reports = {
+                    "سن‌بندی معوقات": report_gen.generate_aging_report,
+                    "نرخ وصول به تفکیک شرکت و نوع": report_gen.generate_collection_rate_report,
+                    "پیش‌بینی وصول ماهانه": report_gen.generate_cash_in_forecast,
+                    "نرخ انتقال معوقات": report_gen.generate_roll_rate_report,
+                }
+                if report_type in portfolio_reports:
+                    df = portfolio_reports[report_type](self.user.id)
+                elif "اقساط" in report_type:
+                    df = report_gen.generate_installment_report(
+                        start_date=start_date,
+                        end_date=end_date,
+                        status=status_filter,
+                        insurance_type=insurance_type_filter
+                    )
+                elif "بیمه‌نامه" in report_type:
+                    df = report_gen.generate_policy_summary(self.user.id)
+                else:
+                    df = report_gen.generate_payment_statistics(start_date, end_date)
             
             if df.empty:
                 QMessageBox.information(self, "اطلاعات", "داده‌ای برای گزارش یافت نشد")
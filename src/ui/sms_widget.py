@@ -152,12 +152,13 @@ class SMSWidget(QWidget):
     
     def load_reminders(self):
         """Load reminder history"""
-        from ..controllers import ReminderController
+        from ..models import read_session
+        from ..models.read_models import ReminderRow, reminder_rows, fetch_rows
         from ..utils.persian_utils import PersianDateConverter
         
         try:
-            controller = ReminderController(self.session)
-            reminders = controller.get_user_reminders(self.user.id)
+            with read_session(self.session) as session:
+                reminders = fetch_rows(session, reminder_rows(self.user.id), ReminderRow)
             
             self.reminders_table.setRowCount(len(reminders))
             
@@ -181,18 +182,20 @@ class SMSWidget(QWidget):
     def auto_schedule_reminders(self):
         """Auto-schedule reminders for all policies"""
         from ..controllers import ReminderController, PolicyController
+        from ..models import session_scope
         
         try:
-            policy_ctrl = PolicyController(self.session)
-            reminder_ctrl = ReminderController(self.session)
-            
-            policies = policy_ctrl.get_all_policies(self.user.id, status='active')
-            
-            total_scheduled = 0
-            for policy in policies:
-                success, count = reminder_ctrl.auto_schedule_reminders_for_policy(policy.id)
-                if success:
-                    total_scheduled += count
+            with session_scope(self.session) as session:
+                policy_ctrl = PolicyController(session)
+                reminder_ctrl = ReminderController(session)
+                
+                policy_ids = [p.id for p in policy_ctrl.get_all_policies(self.user.id, status='active')]
+                
+                total_scheduled = 0
+                for policy_id in policy_ids:
+                    success, count = reminder_ctrl.auto_schedule_reminders_for_policy(policy_id)
+                    if success:
+                        total_scheduled += count
             
             QMessageBox.information(
                 self,
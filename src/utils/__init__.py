@@ -53,6 +53,19 @@ try:
 except Exception:
     pass
 
+try:
+    from .text_shaping import PersianTextShaper, get_shaper
+    _export_if_present("PersianTextShaper")
+    _export_if_present("get_shaper")
+except Exception:
+    pass
+
+try:
+    from .pdf_export import PDFExporter
+    _export_if_present("PDFExporter")
+except Exception:
+    pass
+
 # -------- مجموعه‌ی جدید (ترجیح داده‌شده) --------
 try:
     from .persian_utils import (
@@ -65,6 +78,67 @@ try:
 except Exception:
     _format_currency_persian = None  # برای انتخاب تابع currency پایین لازم است
 
+try:
+    from .number_format import to_persian_digits, format_currency_column
+    _export_if_present("to_persian_digits")
+    _export_if_present("format_currency_column")
+except Exception:
+    pass
+
+try:
+    from .jalali_calendar import JalaliCalendar, get_jalali_calendar
+    _export_if_present("JalaliCalendar")
+    _export_if_present("get_jalali_calendar")
+except Exception:
+    pass
+
+try:
+    from .installment_schedule import build_schedule, build_schedules
+    _export_if_present("build_schedule")
+    _export_if_present("build_schedules")
+except Exception:
+    pass
+
+try:
+    from .portfolio_analytics import PortfolioAnalytics
+    _export_if_present("PortfolioAnalytics")
+except Exception:
+    pass
+
+try:
+    from .statement_reader import iter_statement_chunks
+    _export_if_present("iter_statement_chunks")
+except Exception:
+    pass
+
+try:
+    from .change_bus import get_change_bus, ChangeFeed
+    _export_if_present("get_change_bus")
+    _export_if_present("ChangeFeed")
+except Exception:
+    pass
+
+try:
+    from .query_stats import get_query_stats, track_action
+    _export_if_present("get_query_stats")
+    _export_if_present("track_action")
+except Exception:
+    pass
+
+try:
+    from .query_cache import get_query_cache, cached_query
+    _export_if_present("get_query_cache")
+    _export_if_present("cached_query")
+except Exception:
+    pass
+
+try:
+    from .auth_service import AuthService, get_auth_service
+    _export_if_present("AuthService")
+    _export_if_present("get_auth_service")
+except Exception:
+    pass
+
 try:
     from .notification_manager import NotificationManager
     _export_if_present("NotificationManager")
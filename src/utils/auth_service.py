@@ -0,0 +1,192 @@
+"""Password hashing service
+
+bcrypt work runs in a dedicated worker thread so the GUI stays responsive,
+the work factor comes from configuration, and a short-lived in-memory session
+token lets the app re-authenticate the logged-in user without another bcrypt
+round.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 4
+MAX_BCRYPT_ROUNDS = 16
+DEFAULT_TOKEN_TTL = 15 * 60  # seconds
+
+
+def get_hash_rounds(password_hash):
+    """
+    Get the bcrypt cost factor of a stored hash
+
+    Args:
+        password_hash: bcrypt hash string like '$2b$12$...'
+
+    Returns:
+        int or None if the hash is not a bcrypt hash
+    """
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class AuthService:
+    """bcrypt hashing/verification in a worker thread plus session tokens"""
+
+    def __init__(self, rounds=None, token_ttl=None):
+        """
+        Initialize auth service
+
+        Args:
+            rounds: bcrypt work factor (default: security.bcrypt_rounds from config)
+            token_ttl: Session token lifetime in seconds (default: from config)
+        """
+        if rounds is None or token_ttl is None:
+            from .config_manager import get_config
+            config = get_config()
+            if rounds is None:
+                rounds = config.get('security.bcrypt_rounds', DEFAULT_BCRYPT_ROUNDS)
+            if token_ttl is None:
+                token_ttl = config.get('security.session_token_ttl', DEFAULT_TOKEN_TTL)
+
+        self.rounds = min(MAX_BCRYPT_ROUNDS, max(MIN_BCRYPT_ROUNDS, int(rounds)))
+        self.token_ttl = int(token_ttl)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='auth')
+        self._secret = secrets.token_bytes(32)
+        self._tokens = {}  # token -> (user_id, password digest, expires_at)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Hashing (blocking versions run on the calling thread)
+    # ------------------------------------------------------------------
+
+    def hash_password(self, password):
+        """Hash a password with the configured work factor"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify_password(self, password, password_hash):
+        """Verify a password against a stored bcrypt hash"""
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Invalid password hash: {e}")
+            return False
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different work factor"""
+        return get_hash_rounds(password_hash) != self.rounds
+
+    def check_and_rehash(self, password, password_hash):
+        """
+        Verify a password and re-hash it if the work factor changed
+
+        Returns:
+            tuple: (valid: bool, new_hash: str or None)
+        """
+        if not self.verify_password(password, password_hash):
+            return False, None
+        if self.needs_rehash(password_hash):
+            return True, self.hash_password(password)
+        return True, None
+
+    # ------------------------------------------------------------------
+    # Worker-thread versions (return concurrent.futures.Future)
+    # ------------------------------------------------------------------
+
+    def hash_password_async(self, password):
+        """Hash a password in the auth worker thread"""
+        return self._executor.submit(self.hash_password, password)
+
+    def verify_password_async(self, password, password_hash):
+        """Verify a password in the auth worker thread"""
+        return self._executor.submit(self.verify_password, password, password_hash)
+
+    def check_and_rehash_async(self, password, password_hash):
+        """Verify (and possibly re-hash) a password in the auth worker thread"""
+        return self._executor.submit(self.check_and_rehash, password, password_hash)
+
+    # ------------------------------------------------------------------
+    # Session tokens
+    # ------------------------------------------------------------------
+
+    def _digest(self, password):
+        """Keyed digest of a password; the key never leaves this process"""
+        return hmac.new(self._secret, password.encode('utf-8'), hashlib.sha256).digest()
+
+    def issue_token(self, user_id, password):
+        """
+        Issue a session token after a successful bcrypt verification
+
+        Returns:
+            str: Opaque token
+        """
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._purge_expired()
+            self._tokens[token] = (user_id, self._digest(password),
+                                   time.monotonic() + self.token_ttl)
+        return token
+
+    def reauthenticate(self, token, user_id, password):
+        """
+        Re-check a password against a live session token (no bcrypt)
+
+        Returns:
+            True/False if the token is valid for the user,
+            None if the token is unknown or expired (caller falls back to bcrypt)
+        """
+        if not token:
+            return None
+
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            token_user_id, digest, expires_at = entry
+            if token_user_id != user_id or time.monotonic() > expires_at:
+                self._tokens.pop(token, None)
+                return None
+
+        return hmac.compare_digest(digest, self._digest(password))
+
+    def update_token_password(self, token, password):
+        """Refresh the cached digest after a password change"""
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is not None:
+                user_id, _, expires_at = entry
+                self._tokens[token] = (user_id, self._digest(password), expires_at)
+
+    def revoke_token(self, token):
+        """Invalidate a session token"""
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def _purge_expired(self):
+        """Drop expired tokens (caller holds the lock)"""
+        now = time.monotonic()
+        for token in [t for t, (_, _, exp) in self._tokens.items() if exp < now]:
+            del self._tokens[token]
+
+
+# Global auth service instance
+_auth_service_instance = None
+
+
+def get_auth_service():
+    """Get global auth service instance"""
+    global _auth_service_instance
+    if _auth_service_instance is None:
+        _auth_service_instance = AuthService()
+    return _auth_service_instance
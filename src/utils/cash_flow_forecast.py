@@ -0,0 +1,349 @@
+"""Cash-flow forecast over future installments
+
+Unpaid installments due in the next N Jalali months are summed in SQL per
+due day and policy type (a range scan on the due_date index returning at
+most a few thousand rows, never one row per installment), then folded into
+Jalali weeks (Saturday to Friday) and months with the calendar table.
+Each policy type's scheduled amounts are scaled by its historic on-time
+ratio: the share of the amount due in the past year that was paid by its
+due date.
+
+Daily totals are cached per database and user. Payment events on the
+change bus re-aggregate only the due days of the paid installments, then
+the cached totals per policy type are checked against one grouped query:
+a moved due date (which leaves the installment counted on its old day)
+or a changed policy type shows up there and rebuilds the cache, as do new
+or deleted installments and a new day.
+"""
+import logging
+import threading
+import weakref
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, case, type_coerce, Integer
+
+from .portfolio_analytics import _day_ordinal, _as_ordinal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONTHS = 12
+# On-time ratios are measured over installments due in this many past days
+HISTORY_DAYS = 365
+_ID_CHUNK_SIZE = 500
+
+FORECAST_HEADERS = {
+    'period': 'دوره',
+    'start': 'از تاریخ',
+    'count': 'تعداد اقساط',
+    'scheduled': 'مبلغ سررسید',
+    'expected': 'وصول مورد انتظار',
+}
+
+
+def _midnight(ordinal):
+    return datetime.combine(date.fromordinal(ordinal), datetime.min.time())
+
+
+class _ForecastEntry:
+    """Cached daily totals of one user's (or the whole) book"""
+
+    __slots__ = ('as_of', 'months', 'start', 'end', 'daily', 'ratios', 'dirty_ids',
+                 'dirty_policies', 'stale')
+
+    def __init__(self, as_of, months, start, end, daily, ratios):
+        self.as_of = as_of          # day ordinal the entry was built for
+        self.months = months
+        self.start = start          # first day ordinal covered
+        self.end = end              # first day ordinal after the horizon
+        self.daily = daily          # {(day ordinal, policy type): [count, amount]}
+        self.ratios = ratios        # {policy type: on-time ratio}
+        self.dirty_ids = set()      # installments paid/updated since
+        self.dirty_policies = False # policies updated since
+        self.stale = False          # rows created or deleted since
+
+
+# engine -> {user_id: _ForecastEntry}
+_cache = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+_subscribed = False
+
+
+def _on_change(event):
+    """Change bus callback: mark cached forecasts dirty or stale"""
+    from .change_bus import INSTALLMENT_CHANGED, POLICY_CHANGED, UPDATED
+
+    with _cache_lock:
+        entries = [entry for users in _cache.values() for entry in users.values()]
+    for entry in entries:
+        if event.topic == INSTALLMENT_CHANGED and event.action == UPDATED:
+            entry.dirty_ids.update(event.ids)
+        elif event.topic == POLICY_CHANGED and event.action == UPDATED:
+            entry.dirty_policies = True
+        elif event.action != UPDATED:
+            entry.stale = True
+
+
+def _subscribe():
+    global _subscribed
+    if not _subscribed:
+        from .change_bus import get_change_bus, INSTALLMENT_CHANGED, POLICY_CHANGED
+        bus = get_change_bus()
+        bus.subscribe(INSTALLMENT_CHANGED, _on_change)
+        bus.subscribe(POLICY_CHANGED, _on_change)
+        _subscribed = True
+
+
+def clear_cache():
+    """Drop all cached forecasts"""
+    with _cache_lock:
+        _cache.clear()
+
+
+class CashFlowForecast:
+    """Expected receipts per Jalali week and month"""
+
+    def __init__(self, session, user_id=None, months=DEFAULT_MONTHS):
+        """
+        Initialize forecast
+
+        Args:
+            session: SQLAlchemy database session
+            user_id: Restrict to one user's policies (None: all policies)
+            months: Horizon in Jalali months, starting with the current month
+        """
+        self.session = session
+        self.user_id = user_id
+        self.months = months
+
+    # -- SQL aggregation --------------------------------------------------
+
+    def _scoped(self, stmt):
+        from ..models import Installment, InsurancePolicy
+
+        stmt = stmt.select_from(Installment).join(
+            InsurancePolicy, InsurancePolicy.id == Installment.policy_id)
+        if self.user_id is not None:
+            stmt = stmt.where(InsurancePolicy.user_id == self.user_id)
+        return stmt
+
+    def _daily_totals(self, start, end):
+        """Unpaid count and amount per (due day, policy type) in [start, end)"""
+        from ..models import Installment, InsurancePolicy
+
+        day = _day_ordinal(Installment.due_date)
+        stmt = self._scoped(select(
+            day,
+            InsurancePolicy.policy_type,
+            func.count(),
+            func.sum(type_coerce(Installment.amount, Integer)),
+        )).where(
+            Installment.due_date >= _midnight(start),
+            Installment.due_date < _midnight(end),
+            Installment.status.notin_(('paid', 'cancelled')),
+        ).group_by(day, InsurancePolicy.policy_type)
+        return {(row[0], row[1] or ''): [row[2], row[3] or 0]
+                for row in self.session.execute(stmt)}
+
+    def _type_totals(self, start, end):
+        """Unpaid count and amount per policy type in [start, end)"""
+        from ..models import Installment, InsurancePolicy
+
+        stmt = self._scoped(select(
+            InsurancePolicy.policy_type,
+            func.count(),
+            func.sum(type_coerce(Installment.amount, Integer)),
+        )).where(
+            Installment.due_date >= _midnight(start),
+            Installment.due_date < _midnight(end),
+            Installment.status.notin_(('paid', 'cancelled')),
+        ).group_by(InsurancePolicy.policy_type)
+        return {row[0] or '': [row[1], row[2] or 0] for row in self.session.execute(stmt)}
+
+    def _on_time_ratios(self, as_of):
+        """Share of the amount due in the last HISTORY_DAYS paid by its due date, per policy type"""
+        from ..models import Installment, InsurancePolicy
+
+        amount = type_coerce(Installment.amount, Integer)
+        # Paid before the day after the due date; date() strings compare
+        # correctly with the stored datetime strings
+        on_time = case(
+            (
+                (Installment.status == 'paid') & (
+                    Installment.payment_date.is_(None) |
+                    (Installment.payment_date < func.date(Installment.due_date, '+1 day'))
+                ),
+                amount
+            ),
+            else_=0
+        )
+        stmt = self._scoped(select(
+            InsurancePolicy.policy_type,
+            func.sum(amount),
+            func.sum(on_time),
+        )).where(
+            Installment.due_date >= _midnight(as_of - HISTORY_DAYS),
+            Installment.due_date < _midnight(as_of),
+            Installment.status != 'cancelled',
+        ).group_by(InsurancePolicy.policy_type)
+
+        ratios, due_total, on_time_total = {}, 0, 0
+        for policy_type, due, paid in self.session.execute(stmt):
+            due, paid = due or 0, paid or 0
+            if due:
+                ratios[policy_type or ''] = paid / due
+            due_total += due
+            on_time_total += paid
+        # Types without history fall back to the whole book's ratio
+        ratios[None] = on_time_total / due_total if due_total else 1.0
+        return ratios
+
+    # -- cache ------------------------------------------------------------
+
+    def _build(self, as_of):
+        from .jalali_calendar import get_jalali_calendar
+
+        calendar = get_jalali_calendar()
+        year, month, _ = calendar.to_jalali(date.fromordinal(as_of))
+        first = calendar.month_index(year, month)
+        start = as_of
+        end = calendar.month_start[first + self.months]
+        entry = _ForecastEntry(as_of, self.months, start, end,
+                               self._daily_totals(start, end), self._on_time_ratios(as_of))
+        logger.info(f"Cash-flow forecast built: {len(entry.daily)} day/type totals")
+        return entry
+
+    def _apply_changes(self, entry):
+        """
+        Re-aggregate only the due days of installments changed since the last read
+
+        Returns:
+            bool: False if the entry is still inconsistent and must be rebuilt
+        """
+        from ..models import Installment
+
+        ids = list(entry.dirty_ids)
+        entry.dirty_ids.clear()
+        entry.dirty_policies = False
+        days = set()
+        for i in range(0, len(ids), _ID_CHUNK_SIZE):
+            days.update(self.session.execute(
+                select(_day_ordinal(Installment.due_date)).where(
+                    Installment.id.in_(ids[i:i + _ID_CHUNK_SIZE])
+                ).distinct()
+            ).scalars())
+        days = sorted(day for day in days if day is not None and entry.start <= day < entry.end)
+        if days:
+            low, high = days[0], days[-1] + 1
+            fresh = self._daily_totals(low, high)
+            entry.daily = {key: value for key, value in entry.daily.items()
+                           if not low <= key[0] < high}
+            entry.daily.update(fresh)
+
+        # The old day of a moved installment and a policy's old type are not
+        # known from the events; both leave the per-type totals off
+        cached = {}
+        for (_, policy_type), (count, amount) in entry.daily.items():
+            totals = cached.setdefault(policy_type, [0, 0])
+            totals[0] += count
+            totals[1] += amount
+        return cached == self._type_totals(entry.start, entry.end)
+
+    def _entry(self, as_of):
+        _subscribe()
+        bind = self.session.get_bind()
+        with _cache_lock:
+            entry = _cache.setdefault(bind, {}).get(self.user_id)
+        if (entry is not None and not entry.stale and entry.as_of == as_of
+                and entry.months == self.months):
+            if not (entry.dirty_ids or entry.dirty_policies) or self._apply_changes(entry):
+                return entry
+        entry = self._build(as_of)
+        with _cache_lock:
+            _cache.setdefault(bind, {})[self.user_id] = entry
+        return entry
+
+    # -- results ----------------------------------------------------------
+
+    def _frame(self, as_of):
+        """Daily totals as arrays: day, count, scheduled, expected"""
+        entry = self._entry(_as_ordinal(as_of))
+        items = [(day, count, amount, entry.ratios.get(policy_type, entry.ratios[None]))
+                 for (day, policy_type), (count, amount) in entry.daily.items()]
+        if not items:
+            empty = np.zeros(0, dtype=np.int64)
+            return entry, empty, empty, empty, np.zeros(0)
+        days, counts, amounts, ratios = (np.array(column) for column in zip(*items))
+        return entry, days.astype(np.int64), counts.astype(np.int64), \
+            amounts.astype(np.int64), amounts * ratios
+
+    def _fold(self, bucket_starts, days, counts, amounts, expected, labels):
+        bucket = np.searchsorted(bucket_starts, days, side='right') - 1
+        size = len(labels)
+        return pd.DataFrame({
+            'period': labels,
+            'start': [date.fromordinal(int(start)) for start in bucket_starts[:size]],
+            'count': np.bincount(bucket, weights=counts, minlength=size).astype(np.int64),
+            'scheduled': np.bincount(bucket, weights=amounts, minlength=size).astype(np.int64),
+            'expected': np.rint(np.bincount(bucket, weights=expected, minlength=size)).astype(np.int64),
+        })
+
+    def monthly(self, as_of=None):
+        """
+        Forecast per Jalali month
+
+        The first month starts at as_of (the rest of the current month).
+
+        Args:
+            as_of: First forecast day (default: today)
+
+        Returns:
+            pandas DataFrame: period ('YYYY/MM'), start, count, scheduled, expected
+        """
+        from .jalali_calendar import get_jalali_calendar
+
+        calendar = get_jalali_calendar()
+        entry, days, counts, amounts, expected = self._frame(as_of)
+        year, month, _ = calendar.to_jalali(date.fromordinal(entry.start))
+        first = calendar.month_index(year, month)
+        starts = np.array(calendar.month_start[first:first + entry.months + 1], dtype=np.int64)
+        starts[0] = entry.start
+        labels = ["%d/%02d" % calendar.month_of_index(first + i) for i in range(entry.months)]
+        return self._fold(starts, days, counts, amounts, expected, labels)
+
+    def weekly(self, as_of=None):
+        """
+        Forecast per Jalali week (Saturday to Friday) over the same horizon
+
+        Args:
+            as_of: First forecast day (default: today)
+
+        Returns:
+            pandas DataFrame: period (Jalali date of the week's Saturday),
+            start, count, scheduled, expected
+        """
+        from .jalali_calendar import get_jalali_calendar
+
+        calendar = get_jalali_calendar()
+        entry, days, counts, amounts, expected = self._frame(as_of)
+        saturday = entry.start - calendar.weekday(date.fromordinal(entry.start))
+        starts = np.arange(saturday, entry.end + 7, 7, dtype=np.int64)
+        starts = starts[:np.searchsorted(starts, entry.end, side='left') + 1]
+        starts[0] = entry.start
+        labels = [calendar.format(date.fromordinal(int(max(s, entry.start)))) for s in starts[:-1]]
+        return self._fold(starts, days, counts, amounts, expected, labels)
+
+    def chart_series(self, period='month', as_of=None):
+        """
+        Series for a dashboard chart
+
+        Args:
+            period: 'month' or 'week'
+
+        Returns:
+            tuple: (labels, scheduled amounts, expected amounts) as lists
+        """
+        df = self.monthly(as_of) if period == 'month' else self.weekly(as_of)
+        return df['period'].tolist(), df['scheduled'].tolist(), df['expected'].tolist()
+
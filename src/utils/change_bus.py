@@ -0,0 +1,316 @@
+"""Change notification bus
+
+Controllers publish which policies/installments changed after each commit;
+widgets subscribe and patch only the affected rows instead of reloading
+everything. A change feed built on the ``updated_at`` columns and the row
+counts catches rows written or deleted by something other than this process.
+"""
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POLICY_CHANGED = 'policy_changed'
+INSTALLMENT_CHANGED = 'installment_changed'
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+# Rows committed late (a writer may wait out the busy timeout between flush
+# and commit), or by a host whose clock is behind, are still found while
+# their updated_at is at most this far behind the newest one seen
+FEED_LOOKBACK = timedelta(minutes=1)
+
+
+class ChangeEvent:
+    """A set of ids of one entity type that changed the same way"""
+
+    __slots__ = ('topic', 'action', 'ids')
+
+    def __init__(self, topic, action, ids):
+        self.topic = topic
+        self.action = action
+        self.ids = frozenset(ids)
+
+    def __repr__(self):
+        return f"<ChangeEvent({self.topic}, {self.action}, {len(self.ids)} ids)>"
+
+
+class ChangeBus:
+    """Synchronous publish/subscribe for data change events"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)  # topic -> [weak callback]
+        self._lock = threading.Lock()
+        self._batch_depth = 0
+        self._pending = defaultdict(set)       # (topic, action) -> ids
+
+    def subscribe(self, topic, callback):
+        """
+        Subscribe to a topic
+
+        Bound methods are held weakly, so a closed widget does not stay alive
+        (or keep receiving events) because it subscribed.
+
+        Args:
+            topic: POLICY_CHANGED or INSTALLMENT_CHANGED
+            callback: Callable taking a ChangeEvent
+        """
+        if hasattr(callback, '__self__'):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback  # noqa: E731 - plain functions are held strongly
+        with self._lock:
+            self._subscribers[topic].append(ref)
+
+    def unsubscribe(self, topic, callback):
+        """Remove a subscription"""
+        with self._lock:
+            self._subscribers[topic] = [
+                ref for ref in self._subscribers[topic]
+                if ref() is not None and ref() != callback
+            ]
+
+    def publish(self, topic, ids, action=UPDATED):
+        """
+        Publish changed ids (delivered immediately, or at the end of a batch)
+
+        Args:
+            topic: POLICY_CHANGED or INSTALLMENT_CHANGED
+            ids: Iterable of primary keys
+            action: CREATED, UPDATED or DELETED
+        """
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return
+
+        if self._batch_depth:
+            self._pending[(topic, action)].update(ids)
+            return
+
+        self._deliver(ChangeEvent(topic, action, ids))
+
+    @contextmanager
+    def batch(self):
+        """Collect events and deliver them merged per (topic, action) on exit"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                pending, self._pending = self._pending, defaultdict(set)
+                for (topic, action), ids in pending.items():
+                    self._deliver(ChangeEvent(topic, action, ids))
+
+    def _deliver(self, event):
+        with self._lock:
+            refs = list(self._subscribers[event.topic])
+
+        dead = False
+        for ref in refs:
+            callback = ref()
+            if callback is None:
+                dead = True
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Change subscriber failed for {event}: {e}")
+
+        if dead:
+            with self._lock:
+                self._subscribers[event.topic] = [
+                    ref for ref in self._subscribers[event.topic] if ref() is not None
+                ]
+
+
+class ChangeFeed:
+    """
+    Detect rows changed or deleted outside this process
+
+    Rows whose updated_at is past the high-water mark minus FEED_LOOKBACK
+    are published as UPDATED once per version, except rows this process
+    already published itself. Deletes are found by comparing the row count
+    with a map of the known ids (id -> owning policy id); when the two
+    differ the ids are re-read and the missing ones published as DELETED.
+    """
+
+    def __init__(self, bus=None):
+        self.bus = bus or get_change_bus()
+        self._marks = {}    # topic -> newest updated_at seen
+        self._seen = {}     # topic -> {id: updated_at} for rows inside the lookback
+        self._owners = {}   # topic -> array indexed by id: owning policy id, 0 = no row
+        self._local = {POLICY_CHANGED: {}, INSTALLMENT_CHANGED: {}}  # topic -> {id: published at}
+        self._polling = False
+        for topic in self._local:
+            self.bus.subscribe(topic, self._on_local_change)
+
+    def _models(self):
+        from ..models import InsurancePolicy, Installment
+        return {POLICY_CHANGED: (InsurancePolicy, InsurancePolicy.id),
+                INSTALLMENT_CHANGED: (Installment, Installment.policy_id)}
+
+    def _on_local_change(self, event):
+        """Remember what this process published so polling does not echo it"""
+        if self._polling:
+            return
+        now = datetime.now()
+        local = self._local[event.topic]
+        for row_id in event.ids:
+            local[row_id] = now
+        if event.action == DELETED:
+            self._forget(event.topic, event.ids)
+
+    def _forget(self, topic, ids):
+        ids = np.fromiter(ids, dtype=np.int64)
+        owners = self._owners.get(topic)
+        if owners is not None:
+            owners[ids[ids < len(owners)]] = 0
+        installments = self._owners.get(INSTALLMENT_CHANGED)
+        if topic == POLICY_CHANGED and installments is not None:
+            # Deleting a policy deletes its installments
+            installments[np.isin(installments, ids)] = 0
+
+    def _load_owners(self, session, model, owner):
+        from sqlalchemy import select
+
+        rows = list(map(tuple, session.connection().execute(select(model.id, owner))))
+        pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        owners = np.zeros(int(pairs[:, 0].max()) + 1 if len(pairs) else 1, dtype=np.int64)
+        owners[pairs[:, 0]] = pairs[:, 1]
+        return owners
+
+    def _set_owner(self, topic, row_id, owner_id):
+        owners = self._owners[topic]
+        if row_id >= len(owners):
+            grown = np.zeros(max(row_id + 1, 2 * len(owners)), dtype=np.int64)
+            grown[:len(owners)] = owners
+            owners = self._owners[topic] = grown
+        owners[row_id] = owner_id
+
+    def _recent_rows(self, session, model, owner, mark):
+        from sqlalchemy import select
+
+        stmt = select(model.id, owner, model.updated_at)
+        if mark is not None:
+            stmt = stmt.where(model.updated_at > mark - FEED_LOOKBACK)
+        return list(map(tuple, session.connection().execute(stmt)))
+
+    def prime(self, session):
+        """Start tracking from the current state without publishing anything"""
+        from sqlalchemy import select, func
+
+        for topic, (model, owner) in self._models().items():
+            mark = session.execute(select(func.max(model.updated_at))).scalar()
+            self._marks[topic] = mark
+            self._seen[topic] = {row[0]: row[2] for row in
+                                 self._recent_rows(session, model, owner, mark)}
+            self._owners[topic] = self._load_owners(session, model, owner)
+            self._local[topic].clear()
+
+    def poll(self, session):
+        """
+        Publish UPDATED events for rows changed and DELETED events for rows
+        deleted by other processes since the last poll
+
+        Returns:
+            dict: topic -> number of changed or deleted ids
+        """
+        if not self._marks:
+            self.prime(session)
+            return {}
+
+        started = datetime.now()
+        counts = {}
+        self._polling = True
+        try:
+            with self.bus.batch():
+                for topic, (model, owner) in self._models().items():
+                    counts[topic] = (self._poll_updates(session, topic, model, owner)
+                                     + self._poll_deletes(session, topic, model, owner))
+        finally:
+            self._polling = False
+
+        # Everything published before this poll is now in the seen versions
+        for local in self._local.values():
+            for row_id in [i for i, published in local.items() if published < started]:
+                del local[row_id]
+        return counts
+
+    def _poll_updates(self, session, topic, model, owner):
+        mark = self._marks[topic]
+        seen = self._seen[topic]
+        local = self._local[topic]
+
+        changed = []
+        for row_id, owner_id, updated_at in self._recent_rows(session, model, owner, mark):
+            if row_id in seen and seen[row_id] == updated_at:
+                continue
+            seen[row_id] = updated_at
+            self._set_owner(topic, row_id, owner_id)
+            if updated_at is None:
+                changed.append(row_id)
+                continue
+            if mark is None or updated_at > mark:
+                mark = updated_at
+            published = local.get(row_id)
+            if published is None or updated_at > published:
+                changed.append(row_id)
+
+        self._marks[topic] = mark
+        if mark is not None:
+            cutoff = mark - FEED_LOOKBACK
+            for row_id in [i for i, updated_at in seen.items()
+                           if updated_at is None or updated_at <= cutoff]:
+                del seen[row_id]
+
+        self.bus.publish(topic, changed, UPDATED)
+        return len(changed)
+
+    def _poll_deletes(self, session, topic, model, owner):
+        from sqlalchemy import select, func
+
+        owners = self._owners[topic]
+        count = session.execute(select(func.count()).select_from(model)).scalar()
+        if count == np.count_nonzero(owners):
+            return 0
+
+        # Rows disappeared (or appeared without a newer updated_at): compare the ids
+        current = self._load_owners(session, model, owner)
+        size = max(len(owners), len(current))
+        before = np.zeros(size, dtype=np.int64)
+        before[:len(owners)] = owners
+        after = np.zeros(size, dtype=np.int64)
+        after[:len(current)] = current
+        self._owners[topic] = current
+
+        deleted = np.flatnonzero((before != 0) & (after == 0)).tolist()
+        appeared = np.flatnonzero((before == 0) & (after != 0)).tolist()
+        self.bus.publish(topic, deleted, DELETED)
+        self.bus.publish(topic, appeared, UPDATED)
+        return len(deleted) + len(appeared)
+
+
+# Global change bus instance
+_change_bus_instance = None
+
+
+def get_change_bus():
+    """Get global change bus instance"""
+    global _change_bus_instance
+    if _change_bus_instance is None:
+        _change_bus_instance = ChangeBus()
+    return _change_bus_instance
+
+
+def publish_change(topic, ids, action=UPDATED):
+    """Publish on the global bus"""
+    get_change_bus().publish(topic, ids, action)
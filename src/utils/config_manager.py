@@ -54,6 +54,34 @@ class ConfigManager:
             'reports': {
                 'default_format': 'excel',
                 'include_charts': True
+            },
+            'security': {
+                'bcrypt_rounds': 12,
+                'session_token_ttl': 900
+            },
+            'diagnostics': {
+                'query_stats': True,
+                'slow_query_ms': 100,
+                'slow_log_size': 50,
+                'explain_slow_queries': True
+            },
+            'profiling': {
+                'enabled': False,
+                'trace_file': 'profile_trace.json',
+                'stall_threshold_ms': 250,
+                'max_events': 100000
+            },
+            'cache': {
+                'max_entries': 256,
+                'max_mb': 16,
+                'disk_enabled': False,
+                'disk_dir': 'cache'
+            },
+            'database': {
+                'path': '',
+                'journal_mode': 'wal',
+                'busy_timeout_ms': 10000,
+                'retry_attempts': 5
             }
         }
     
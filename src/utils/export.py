@@ -4,17 +4,8 @@ Export utilities for generating Excel and PDF reports.
 
 import pandas as pd
 from typing import List, Dict, Any
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.enums import TA_RIGHT, TA_CENTER
-import arabic_reshaper
-from bidi.algorithm import get_display
-import os
+from .pdf_export import PDFExporter
+from .text_shaping import shape_text
 
 
 def reshape_persian_text(text: str) -> str:
@@ -27,8 +18,7 @@ def reshape_persian_text(text: str) -> str:
     Returns:
         Reshaped text
     """
-    reshaped_text = arabic_reshaper.reshape(str(text))
-    return get_display(reshaped_text)
+    return shape_text(str(text))
 
 
 def export_to_excel(data: List[Dict[str, Any]], filename: str, sheet_name: str = "Sheet1"):
@@ -100,41 +90,16 @@ def export_to_pdf(data: List[List[str]], headers: List[str], filename: str, titl
     """
     Export data to a PDF file with Persian text support.
     
+    Rows are written as page-sized table chunks by PDFExporter, so large
+    exports do not require laying out a single giant table.
+    
     Args:
-        data: List of lists containing row data
+        data: List (or iterable) of lists containing row data
         headers: List of header strings
         filename: Output filename
         title: Document title
     """
-    doc = SimpleDocTemplate(filename, pagesize=A4)
-    elements = []
-    
-    # Title
-    title_text = reshape_persian_text(title)
-    title_para = Paragraph(title_text, getSampleStyleSheet()['Title'])
-    elements.append(title_para)
-    elements.append(Spacer(1, 0.3 * inch))
-    
-    # Prepare table data with reshaped Persian text
-    table_data = [[reshape_persian_text(h) for h in headers]]
-    for row in data:
-        table_data.append([reshape_persian_text(str(cell)) for cell in row])
-    
-    # Create table
-    table = Table(table_data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
+    PDFExporter().export(data, headers, filename, title)
 
 
 def export_policies_to_pdf(policies: List[Dict[str, Any]], filename: str):
@@ -0,0 +1,107 @@
+"""
+Jalali date and installment helpers.
+
+Function-style API over the precomputed Jalali calendar table
+(jalali_calendar.py), exported from src.utils.
+"""
+
+import logging
+from datetime import date, datetime
+
+from .jalali_calendar import get_jalali_calendar
+from .number_format import format_currency
+
+logger = logging.getLogger(__name__)
+
+
+def jalali_to_gregorian(year, month, day):
+    """
+    Gregorian datetime (midnight) of a Jalali date
+
+    Returns:
+        datetime, or None if the Jalali date does not exist
+    """
+    try:
+        g = get_jalali_calendar().to_gregorian(year, month, day)
+    except ValueError:
+        return None
+    return datetime(g.year, g.month, g.day)
+
+
+def gregorian_to_jalali(value):
+    """
+    Jalali 'YYYY/MM/DD' of a Gregorian date or datetime
+
+    Returns:
+        str, or '' if the value is not a date inside the calendar table
+    """
+    if not isinstance(value, date):
+        return ""
+    try:
+        return get_jalali_calendar().format(value)
+    except ValueError:
+        return ""
+
+
+def get_current_jalali_date():
+    """Today as a Jalali (year, month, day) tuple"""
+    return get_jalali_calendar().to_jalali(date.today())
+
+
+def add_months_to_jalali_date(year, month, day, months):
+    """
+    Add whole Jalali months to a Jalali date
+
+    The day is clamped to the target month's length (31 Shahrivar + 1
+    month is 30 Mehr).
+
+    Returns:
+        tuple: (year, month, day)
+    """
+    return get_jalali_calendar().add_months(year, month, day, months)
+
+
+def generate_installments(total_amount, num_installments, start_date, interval_months=1):
+    """
+    Installment schedule due on the same Jalali day of successive months
+
+    Args:
+        total_amount: Amount to divide (whole-rial parts that add up exactly)
+        num_installments: Number of installments
+        start_date: Due date of the first installment (date or datetime)
+        interval_months: Jalali months between installments
+
+    Returns:
+        list: dicts with installment_number, amount and due_date
+    """
+    from .installment_schedule import build_schedule
+
+    schedule = build_schedule(total_amount, num_installments, start_date, (0, interval_months))
+    due_dates = schedule.due_dates
+    if not isinstance(start_date, datetime):
+        due_dates = [due.date() for due in due_dates]
+    return [
+        {'installment_number': number, 'amount': amount, 'due_date': due}
+        for number, amount, due in zip(schedule.installment_number.tolist(),
+                                       schedule.amount.tolist(), due_dates)
+    ]
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def is_date_in_range(value, start=None, end=None):
+    """True if the value's day lies within [start, end] (open-ended when a bound is None)"""
+    day = _day(value)
+    if start is not None and day < _day(start):
+        return False
+    if end is not None and day > _day(end):
+        return False
+    return True
+
+
+def compare_dates(first, second):
+    """Compare two dates by day: -1, 0 or 1"""
+    first, second = _day(first), _day(second)
+    return (first > second) - (first < second)
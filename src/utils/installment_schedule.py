@@ -0,0 +1,194 @@
+"""
+Installment schedule engine.
+
+Builds due dates and amounts for one policy or for thousands at once as
+NumPy arrays. Monthly and quarterly plans fall on the same Jalali day of
+the month as the first installment, clamped to the month's length
+(31 Shahrivar -> 30 Mehr -> 30 Aban -> ... -> 29 Esfand), using the
+precomputed Jalali calendar table; weekly plans step by seven days.
+Amounts are whole rials that add up to the payable amount (total minus
+down payment) exactly, with the remainder placed by a balancing rule.
+"""
+
+import logging
+from datetime import date, datetime, time
+
+import numpy as np
+
+from .jalali_calendar import get_jalali_calendar
+
+logger = logging.getLogger(__name__)
+
+# plan -> (days, Jalali months) between installments
+PLANS = {
+    'weekly': (7, 0),
+    'monthly': (0, 1),
+    'quarterly': (0, 3),
+}
+
+# Where the rials that do not divide evenly go
+REMAINDER_RULES = ('spread', 'first', 'last')
+
+
+def plan_step(plan):
+    """
+    (days, months) between installments of a plan
+
+    Args:
+        plan: Name in PLANS, or a (days, months) tuple with exactly one non-zero
+    """
+    if isinstance(plan, str):
+        if plan not in PLANS:
+            raise ValueError(f"Unknown installment plan: {plan}")
+        return PLANS[plan]
+    days, months = plan
+    if (days > 0) == (months > 0) or days < 0 or months < 0:
+        raise ValueError(f"Invalid installment interval: {plan}")
+    return int(days), int(months)
+
+
+class InstallmentSchedules:
+    """Flat arrays of the installments of one or more policies"""
+
+    __slots__ = ('policy_index', 'installment_number', 'amount', 'due_ordinal', 'due_time')
+
+    def __init__(self, policy_index, installment_number, amount, due_ordinal, due_time):
+        self.policy_index = policy_index          # position of the policy in the input
+        self.installment_number = installment_number
+        self.amount = amount                      # int64 rials
+        self.due_ordinal = due_ordinal            # date.toordinal() of each due date
+        self.due_time = due_time                  # time of day per policy
+
+    def __len__(self):
+        return len(self.amount)
+
+    @property
+    def due_dates(self):
+        """Due dates as datetimes (time of day taken from each policy's first due date)"""
+        times = self.due_time
+        return [
+            datetime.combine(date.fromordinal(ordinal), times[index])
+            for ordinal, index in zip(self.due_ordinal.tolist(), self.policy_index.tolist())
+        ]
+
+    def rows(self, policy_ids, **extra):
+        """
+        Installment rows for a bulk INSERT
+
+        Args:
+            policy_ids: Policy ID per input position
+            **extra: Columns added to every row (e.g. created_at)
+
+        Returns:
+            list: dicts with policy_id, installment_number, amount, due_date, status
+        """
+        return [
+            dict(policy_id=policy_ids[index], installment_number=number, amount=amount,
+                 due_date=due, status='pending', **extra)
+            for index, number, amount, due in zip(
+                self.policy_index.tolist(), self.installment_number.tolist(),
+                self.amount.tolist(), self.due_dates
+            )
+        ]
+
+
+def build_schedules(total_amounts, counts, first_due_dates, plan='monthly',
+                    down_payments=None, round_to=1, remainder='spread'):
+    """
+    Build the installments of many policies in one vectorized pass
+
+    Args:
+        total_amounts: Total amount per policy (rials)
+        counts: Number of installments per policy
+        first_due_dates: Due date (date or datetime) of each policy's first installment
+        plan: 'weekly', 'monthly', 'quarterly' or a (days, months) interval
+        down_payments: Down payment per policy, deducted before splitting
+        round_to: Installment amounts are multiples of this (e.g. 10000 rials);
+                  what does not divide goes to the remainder installment
+        remainder: 'spread' (one unit each to the first installments, largest
+                   remainder), 'first' or 'last' (all on that installment)
+
+    Returns:
+        InstallmentSchedules ordered by policy, then installment number
+    """
+    from ..models.money import to_rials
+
+    if remainder not in REMAINDER_RULES:
+        raise ValueError(f"Unknown remainder rule: {remainder}")
+    round_to = int(round_to)
+    if round_to < 1:
+        raise ValueError("round_to must be a positive number of rials")
+    step_days, step_months = plan_step(plan)
+
+    totals = np.array([to_rials(a) for a in total_amounts], dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    downs = (np.zeros(len(totals), dtype=np.int64) if down_payments is None
+             else np.array([to_rials(a) for a in down_payments], dtype=np.int64))
+    firsts = list(first_due_dates)
+    if not len(totals) == len(counts) == len(downs) == len(firsts):
+        raise ValueError("One total, count, down payment and first due date per policy")
+    if (counts <= 0).any():
+        raise ValueError("Every policy needs at least one installment")
+    payable = totals - downs
+    if (downs < 0).any() or (payable < 0).any():
+        raise ValueError("Down payment must be between zero and the total amount")
+
+    # One row per installment: policy position and 0-based installment offset
+    policies = len(counts)
+    policy_index = np.repeat(np.arange(policies), counts)
+    starts = np.cumsum(counts) - counts
+    offset = np.arange(len(policy_index)) - np.repeat(starts, counts)
+
+    # Amounts: equal parts in units of round_to, remainder placed by rule
+    units, leftover = np.divmod(payable, round_to)
+    base, extra = np.divmod(units, counts)
+    amount = base[policy_index] * round_to
+    is_first = offset == 0
+    is_last = offset == counts[policy_index] - 1
+    if remainder == 'spread':
+        amount += (offset < extra[policy_index]) * round_to
+        amount += is_first * leftover[policy_index]
+    else:
+        target = is_first if remainder == 'first' else is_last
+        amount += target * (extra * round_to + leftover)[policy_index]
+
+    # Due dates
+    first_ordinals = np.array([_as_date(d).toordinal() for d in firsts], dtype=np.int64)
+    due_time = [d.time() if isinstance(d, datetime) else time() for d in firsts]
+    if step_days:
+        due_ordinal = first_ordinals[policy_index] + offset * step_days
+    else:
+        due_ordinal = _monthly_ordinals(first_ordinals, policy_index, offset * step_months)
+
+    return InstallmentSchedules(policy_index, offset + 1, amount, due_ordinal, due_time)
+
+
+def build_schedule(total_amount, num_installments, first_due_date, plan='monthly',
+                   down_payment=0, round_to=1, remainder='spread'):
+    """
+    Build the installments of one policy (see build_schedules)
+
+    Returns:
+        InstallmentSchedules with policy_index 0
+    """
+    return build_schedules([total_amount], [num_installments], [first_due_date], plan,
+                           [down_payment], round_to, remainder)
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _monthly_ordinals(first_ordinals, policy_index, month_offsets):
+    """Same Jalali day-of-month, clamped to month length, month_offsets after each first date"""
+    calendar = get_jalali_calendar()
+    month_start = np.frombuffer(calendar.month_start, dtype=np.dtype(calendar.month_start.typecode))
+    month_length = np.frombuffer(calendar.month_length, dtype=np.int8).astype(np.int64)
+
+    years, months, days = calendar.to_jalali_arrays(first_ordinals)
+    first_month = (years - calendar.first_year) * 12 + months - 1
+    month = first_month[policy_index] + month_offsets
+    if len(month) and month.max() >= len(month_length):
+        raise ValueError(f"Schedule runs past the Jalali calendar table ({calendar.last_year})")
+    day = np.minimum(days[policy_index], month_length[month])
+    return month_start[month] + day - 1
@@ -0,0 +1,239 @@
+"""
+Precomputed Jalali (Solar Hijri) calendar table.
+
+Covers 1300-1500 AP in a few flat arrays: the Gregorian ordinal of the
+first day of every month, month lengths, leap flags per year and the
+weekday of every month's first day. Conversions, month lengths and
+"add N months" arithmetic are array lookups, so calendar rendering,
+installment scheduling and Jalali bucketing need no per-date library calls.
+
+Year boundaries come from jdatetime, whose leap-year rule is consistent
+with its own date conversion across the whole range.
+"""
+
+import logging
+from array import array
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+FIRST_YEAR = 1300
+LAST_YEAR = 1500
+
+MONTH_NAMES = ('فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+               'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند')
+WEEKDAY_NAMES = ('شنبه', 'یکشنبه', 'دوشنبه', 'سه‌شنبه', 'چهارشنبه', 'پنج‌شنبه', 'جمعه')
+
+# Average Gregorian days per Jalali month, used to guess a month index
+_DAYS_PER_MONTH = 365.2422 / 12
+
+
+class JalaliCalendar:
+    """Array-backed Jalali calendar for FIRST_YEAR..LAST_YEAR"""
+
+    def __init__(self, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+        """
+        Build the table
+
+        Args:
+            first_year: First Jalali year covered
+            last_year: Last Jalali year covered
+        """
+        import jdatetime
+
+        self.first_year = first_year
+        self.last_year = last_year
+        years = last_year - first_year + 1
+
+        new_years = array('l', (
+            jdatetime.date(year, 1, 1).togregorian().toordinal()
+            for year in range(first_year, last_year + 2)
+        ))
+        self.leap = array('b', (new_years[i + 1] - new_years[i] == 366 for i in range(years)))
+
+        # month_start has one extra entry: the first day after the table
+        self.month_start = array('l')
+        self.month_length = array('b')
+        for i in range(years):
+            start = new_years[i]
+            for month in range(1, 13):
+                if month <= 6:
+                    length = 31
+                elif month <= 11:
+                    length = 30
+                else:
+                    length = 30 if self.leap[i] else 29
+                self.month_start.append(start)
+                self.month_length.append(length)
+                start += length
+        self.month_start.append(new_years[years])
+
+        # Jalali weekday (Saturday = 0) of each month's first day;
+        # date.fromordinal(n).weekday() is (n + 6) % 7 with Monday = 0
+        self.first_weekday = array('b', ((start + 1) % 7 for start in self.month_start[:-1]))
+
+        self.first_ordinal = self.month_start[0]
+        self.end_ordinal = self.month_start[-1]
+
+    # -- indexing ---------------------------------------------------------
+
+    def month_index(self, year, month):
+        """Position of (year, month) in the month arrays"""
+        if not (self.first_year <= year <= self.last_year) or not 1 <= month <= 12:
+            raise ValueError(f"Jalali month {year}/{month} outside {self.first_year}-{self.last_year}")
+        return (year - self.first_year) * 12 + month - 1
+
+    def month_of_index(self, index):
+        """(year, month) at a position of the month arrays"""
+        year, month = divmod(index, 12)
+        return self.first_year + year, month + 1
+
+    def _index_of_ordinal(self, ordinal):
+        if not self.first_ordinal <= ordinal < self.end_ordinal:
+            raise ValueError(f"Date outside the Jalali table ({self.first_year}-{self.last_year})")
+        starts = self.month_start
+        index = int((ordinal - self.first_ordinal) / _DAYS_PER_MONTH)
+        # The estimate is off by at most one month
+        while starts[index] > ordinal:
+            index -= 1
+        while starts[index + 1] <= ordinal:
+            index += 1
+        return index
+
+    # -- months -----------------------------------------------------------
+
+    def is_leap(self, year):
+        """True if the Jalali year has 366 days (Esfand has 30 days)"""
+        return bool(self.leap[self.month_index(year, 1) // 12])
+
+    def days_in_month(self, year, month):
+        """Number of days in a Jalali month"""
+        return self.month_length[self.month_index(year, month)]
+
+    def first_weekday_of(self, year, month):
+        """Weekday of the month's first day (Saturday = 0 ... Friday = 6)"""
+        return self.first_weekday[self.month_index(year, month)]
+
+    def month_range(self, year, month):
+        """First and last Gregorian date of a Jalali month"""
+        index = self.month_index(year, month)
+        start = self.month_start[index]
+        return date.fromordinal(start), date.fromordinal(start + self.month_length[index] - 1)
+
+    def add_months(self, year, month, day, months):
+        """
+        Move a Jalali date by whole months
+
+        The day is clamped to the length of the target month, so 31 Shahrivar
+        plus one month is 30 Mehr and 30 Esfand of a leap year plus one year
+        is 29 Esfand.
+
+        Args:
+            year, month, day: Jalali date
+            months: Number of months to add (may be negative)
+
+        Returns:
+            tuple: (year, month, day)
+        """
+        index = self.month_index(year, month) + months
+        if not 0 <= index < len(self.month_length):
+            raise ValueError(f"Result outside the Jalali table ({self.first_year}-{self.last_year})")
+        new_year, new_month = self.month_of_index(index)
+        return new_year, new_month, min(day, self.month_length[index])
+
+    def months_between(self, start, end):
+        """Whole Jalali months from one Gregorian date to another (by month, ignoring days)"""
+        return self._index_of_ordinal(_ordinal(end)) - self._index_of_ordinal(_ordinal(start))
+
+    # -- conversion -------------------------------------------------------
+
+    def to_jalali(self, value):
+        """
+        Jalali (year, month, day) of a Gregorian date or datetime
+
+        Raises:
+            ValueError: If the date is outside the table
+        """
+        ordinal = _ordinal(value)
+        index = self._index_of_ordinal(ordinal)
+        year, month = self.month_of_index(index)
+        return year, month, ordinal - self.month_start[index] + 1
+
+    def to_gregorian(self, year, month, day):
+        """
+        Gregorian date of a Jalali date
+
+        Raises:
+            ValueError: If the date does not exist or is outside the table
+        """
+        index = self.month_index(year, month)
+        if not 1 <= day <= self.month_length[index]:
+            raise ValueError(f"Jalali day {year}/{month}/{day} does not exist")
+        return date.fromordinal(self.month_start[index] + day - 1)
+
+    def weekday(self, value):
+        """Jalali weekday (Saturday = 0) of a Gregorian date or datetime"""
+        return (_ordinal(value) + 1) % 7
+
+    def add_months_to_date(self, value, months):
+        """
+        Move a Gregorian date or datetime by whole Jalali months
+
+        The time of day of a datetime is kept; the Jalali day is clamped to
+        the target month's length.
+        """
+        year, month, day = self.to_jalali(value)
+        result = self.to_gregorian(*self.add_months(year, month, day, months))
+        if isinstance(value, datetime):
+            return datetime.combine(result, value.time())
+        return result
+
+    def format(self, value, separator='/'):
+        """Jalali 'YYYY/MM/DD' of a Gregorian date or datetime"""
+        year, month, day = self.to_jalali(value)
+        return f"{year}{separator}{month:02d}{separator}{day:02d}"
+
+    # -- vectorized -------------------------------------------------------
+
+    def to_jalali_arrays(self, ordinals):
+        """
+        Jalali year, month and day arrays for an array of Gregorian ordinals
+
+        Args:
+            ordinals: NumPy integer array of date.toordinal() values
+
+        Returns:
+            tuple: (years, months, days) NumPy int arrays
+        """
+        import numpy as np
+
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        if ordinals.size and (ordinals.min() < self.first_ordinal or ordinals.max() >= self.end_ordinal):
+            raise ValueError(f"Dates outside the Jalali table ({self.first_year}-{self.last_year})")
+        starts = np.frombuffer(self.month_start, dtype=np.dtype(self.month_start.typecode))
+        index = np.searchsorted(starts, ordinals, side='right') - 1
+        return (self.first_year + index // 12, index % 12 + 1,
+                ordinals - starts[index] + 1)
+
+    def month_keys(self, ordinals):
+        """Jalali month index (year * 12 + month - 1) for an array of Gregorian ordinals"""
+        years, months, _ = self.to_jalali_arrays(ordinals)
+        return years * 12 + months - 1
+
+
+def _ordinal(value):
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+# Global calendar table
+_calendar_instance = None
+
+
+def get_jalali_calendar():
+    """Get global Jalali calendar table (built on first use)"""
+    global _calendar_instance
+    if _calendar_instance is None:
+        _calendar_instance = JalaliCalendar()
+    return _calendar_instance
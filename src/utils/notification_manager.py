@@ -52,3 +52,14 @@ class NotificationManager:
         message = f"قسط بیمه‌نامه {policy_number}\nمبلغ {format_currency(amount)} پرداخت شد"
         
         return self.send_notification(title, message)
+    
+    def send_batch_payment_confirmation(self, count, total_amount, completed_policies=0):
+        """Send one summary notification for a batch of payments"""
+        from ..utils.persian_utils import format_currency, format_persian_number
+        
+        title = "ثبت گروهی پرداخت‌ها"
+        message = f"{format_persian_number(count)} قسط به مبلغ {format_currency(total_amount)} پرداخت شد"
+        if completed_policies:
+            message += f"\n{format_persian_number(completed_policies)} بیمه‌نامه تسویه شد"
+        
+        return self.send_notification(title, message)
@@ -0,0 +1,185 @@
+"""
+Fast Persian number and currency formatting.
+
+Digits are mapped with a single str.translate table instead of ten
+str.replace passes. Currency strings are assembled from a table of
+pre-translated three-digit groups, and scalar results are memoized
+(installments of a policy, and of many policies, share the same amounts).
+format_currency_column formats a whole NumPy/pandas column at once: values
+are rounded as an array, each distinct amount is formatted once, and the
+Persian digit, separator and suffix code points are laid out with NumPy and
+viewed as strings, with no per-value Python formatting.
+"""
+
+from functools import lru_cache
+
+PERSIAN_DIGITS = '۰۱۲۳۴۵۶۷۸۹'
+CURRENCY_SUFFIX = ' ریال'
+ZERO_CURRENCY = '۰' + CURRENCY_SUFFIX
+
+# Western and Arabic-Indic digits both map to Persian digits
+_DIGIT_TABLE = str.maketrans('0123456789٠١٢٣٤٥٦٧٨٩', PERSIAN_DIGITS * 2)
+
+DEFAULT_MEMO_SIZE = 8192
+
+
+def to_persian_digits(value) -> str:
+    """
+    Convert the digits of a value to Persian digits
+
+    Args:
+        value: Any value (converted with str())
+
+    Returns:
+        String with Persian digits
+    """
+    return str(value).translate(_DIGIT_TABLE)
+
+
+def _rials(amount) -> int:
+    if type(amount) is int:
+        return amount
+    from ..models.money import to_rials
+    return to_rials(amount)
+
+
+# '000'..'999' and '0'..'999' in Persian digits
+_GROUPS = [f"{i:03d}".translate(_DIGIT_TABLE) for i in range(1000)]
+_LEADING_GROUPS = [str(i).translate(_DIGIT_TABLE) for i in range(1000)]
+
+
+def _format_rials_uncached(rials: int, suffix: str = CURRENCY_SUFFIX) -> str:
+    sign = ''
+    if rials < 0:
+        sign, rials = '-', -rials
+    if rials < 1000:
+        return sign + _LEADING_GROUPS[rials] + suffix
+    groups = []
+    while rials >= 1000:
+        rials, group = divmod(rials, 1000)
+        groups.append(_GROUPS[group])
+    groups.append(_LEADING_GROUPS[rials])
+    groups.reverse()
+    return sign + ','.join(groups) + suffix
+
+
+_format_rials = lru_cache(maxsize=DEFAULT_MEMO_SIZE)(_format_rials_uncached)
+
+
+def format_currency(amount, memo: bool = True) -> str:
+    """
+    Format an amount as Persian-digit rials with thousand separators
+
+    Args:
+        amount: Amount (rounded half-up to the rial; None gives zero)
+        memo: Reuse the result for amounts formatted before
+
+    Returns:
+        String such as '۱,۲۵۰,۰۰۰ ریال'
+    """
+    if amount is None:
+        return ZERO_CURRENCY
+    rials = _rials(amount)
+    return _format_rials(rials) if memo else _format_rials_uncached(rials)
+
+
+_ZERO_CODE = ord(PERSIAN_DIGITS[0])
+_CHUNK_SIZE = 100000
+
+
+def _format_rials_array(rials, suffix: str):
+    """
+    Format an int64 array as currency strings without per-value Python code
+
+    Each chunk becomes a 2-D array of UCS-4 code points: the suffix and the
+    digits/separators are laid out right to left, every row is then shifted
+    to start at column 0 according to its own length, and the rows are
+    viewed as a fixed-width NumPy string array.
+    """
+    import numpy as np
+
+    suffix_codes = [ord(c) for c in reversed(suffix)]
+    result = []
+    for start in range(0, len(rials), _CHUNK_SIZE):
+        chunk = rials[start:start + _CHUNK_SIZE]
+        count = len(chunk)
+        negative = chunk < 0
+        value = np.abs(chunk)
+
+        digits = np.ones(count, dtype=np.int64)
+        rest = value // 10
+        while rest.any():
+            digits += rest > 0
+            rest //= 10
+
+        columns = [np.full(count, code, dtype=np.uint32) for code in suffix_codes]
+        rest = value.copy()
+        for k in range(int(digits.max())):
+            if k and k % 3 == 0:
+                columns.append(np.full(count, ord(','), dtype=np.uint32))
+            columns.append((_ZERO_CODE + rest % 10).astype(np.uint32))
+            rest //= 10
+        columns.append(np.zeros(count, dtype=np.uint32))  # room for the sign
+        reversed_codes = np.stack(columns, axis=1)
+
+        lengths = len(suffix_codes) + digits + (digits - 1) // 3
+        rows = np.nonzero(negative)[0]
+        reversed_codes[rows, lengths[rows]] = ord('-')
+        lengths += negative
+
+        width = reversed_codes.shape[1]
+        index = lengths[:, None] - 1 - np.arange(width)[None, :]
+        valid = index >= 0
+        codes = np.take_along_axis(reversed_codes, np.where(valid, index, 0), axis=1)
+        codes[~valid] = 0  # trailing NULs end the string
+        result.extend(np.ascontiguousarray(codes).view(np.dtype(('U', width))).ravel().tolist())
+    return result
+
+
+def format_currency_column(values, memo: bool = True, suffix: str = CURRENCY_SUFFIX):
+    """
+    Format a whole column of amounts as Persian-digit currency strings
+
+    Args:
+        values: pandas Series, NumPy array or sequence of amounts
+                (missing values format as zero)
+        memo: Format each distinct amount once and map the results back
+        suffix: Text appended to every value (default ' ریال')
+
+    Returns:
+        pandas Series (same index and name) for a Series input, else a list
+    """
+    import numpy as np
+    import pandas as pd
+
+    is_series = isinstance(values, pd.Series)
+    array = values.to_numpy() if is_series else np.asarray(values)
+
+    if array.dtype.kind in 'iub':
+        rials = array.astype(np.int64, copy=False)
+    else:
+        numbers = pd.to_numeric(pd.Series(array, copy=False), errors='coerce').to_numpy(dtype=np.float64)
+        # Half-up (away from zero) rounding, matching models.money.to_rials
+        rounded = np.sign(numbers) * np.floor(np.abs(numbers) + 0.5)
+        rials = np.nan_to_num(rounded, nan=0.0).astype(np.int64)
+
+    if memo:
+        codes, uniques = pd.factorize(rials)
+        formatted = np.array(_format_rials_array(uniques, suffix), dtype=object)
+        result = formatted[codes] if len(codes) else np.array([], dtype=object)
+    else:
+        result = np.array(_format_rials_array(rials, suffix), dtype=object)
+
+    if is_series:
+        return pd.Series(result, index=values.index, name=values.name, dtype=object)
+    return result.tolist()
+
+
+def memo_info():
+    """Hit/miss statistics of the scalar currency memo"""
+    return _format_rials.cache_info()
+
+
+def clear_memo():
+    """Forget memoized currency strings"""
+    _format_rials.cache_clear()
@@ -0,0 +1,221 @@
+"""
+Paginated PDF export engine with Persian font support.
+
+Rows are laid out in page-sized table chunks with fixed column widths, so
+reportlab never has to measure or split one huge table. Chunk sizes are
+capped by the measured header and row heights - the first chunk by the space
+left below the title - so no chunk spills a row onto an extra page. Persian
+text shaping goes through the shared PersianTextShaper cache and the Vazir
+font is registered once per process.
+"""
+
+import os
+import logging
+import threading
+from itertools import islice
+from typing import Iterable, List, Optional, Sequence
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.enums import TA_CENTER
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from .text_shaping import get_shaper
+
+logger = logging.getLogger(__name__)
+
+# Assets folder at the project root (src/utils/pdf_export.py -> ../../assets)
+ASSETS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'assets'
+)
+
+FONT_NAME = 'Vazir'
+FONT_NAME_BOLD = 'Vazir-Bold'
+FALLBACK_FONT = 'Helvetica'
+FALLBACK_FONT_BOLD = 'Helvetica-Bold'
+
+ROWS_PER_PAGE = 35              # upper bound; fewer rows if the page is shorter
+
+# SimpleDocTemplate frames pad each side by 6pt
+_FRAME_PADDING = 12
+
+_font_lock = threading.Lock()
+_registered_fonts = None
+
+
+def register_vazir_font():
+    """
+    Register the Vazir TTF fonts with reportlab (once per process).
+
+    Returns:
+        tuple: (regular_font_name, bold_font_name) - falls back to Helvetica
+        if the font files are not available
+    """
+    global _registered_fonts
+
+    if _registered_fonts is not None:
+        return _registered_fonts
+
+    with _font_lock:
+        if _registered_fonts is not None:
+            return _registered_fonts
+
+        regular_path = os.path.join(ASSETS_DIR, 'Vazir-Regular.ttf')
+        bold_path = os.path.join(ASSETS_DIR, 'Vazir-Bold.ttf')
+
+        try:
+            pdfmetrics.registerFont(TTFont(FONT_NAME, regular_path))
+            if os.path.exists(bold_path):
+                pdfmetrics.registerFont(TTFont(FONT_NAME_BOLD, bold_path))
+                fonts = (FONT_NAME, FONT_NAME_BOLD)
+            else:
+                fonts = (FONT_NAME, FONT_NAME)
+            logger.info("Vazir font registered for PDF export")
+        except Exception as e:
+            logger.warning(f"Vazir font not available for PDF export, using Helvetica: {e}")
+            fonts = (FALLBACK_FONT, FALLBACK_FONT_BOLD)
+
+        _registered_fonts = fonts
+        return _registered_fonts
+
+
+def _chunks(rows: Iterable[Sequence], first_size: int, size: int):
+    """Yield a list of at most `first_size` rows, then lists of at most `size` rows"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, first_size))
+        if not chunk:
+            return
+        yield chunk
+        first_size = size
+
+
+class PDFExporter:
+    """Export tabular data to PDF as page-sized table chunks"""
+
+    def __init__(self, rows_per_page: int = ROWS_PER_PAGE, pagesize=A4,
+                 col_widths: Optional[List[float]] = None):
+        """
+        Initialize PDF exporter
+
+        Args:
+            rows_per_page: Maximum number of data rows per page-sized table chunk
+            pagesize: reportlab page size
+            col_widths: Optional fixed column widths (points); split evenly if omitted
+        """
+        self.rows_per_page = max(1, int(rows_per_page))
+        self.pagesize = pagesize
+        self.col_widths = col_widths
+        self.font_name, self.bold_font_name = register_vazir_font()
+        self.shaper = get_shaper()
+
+    def _table_style(self):
+        """Style shared by all table chunks"""
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), self.bold_font_name),
+            ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+        ])
+
+    def _column_widths(self, doc, num_columns):
+        """Get fixed column widths so reportlab never measures cell contents"""
+        if self.col_widths:
+            return self.col_widths
+        return [doc.width / num_columns] * num_columns
+
+    def _rows_fitting(self, height, header_row, col_widths, style):
+        """Number of data rows that fit below the header in `height` points (at least 1)"""
+        probe = Table([header_row, [''] * len(header_row)], colWidths=col_widths)
+        probe.setStyle(style)
+        probe.wrap(sum(col_widths), height)
+        header_height, row_height = probe._rowHeights
+        fitting = int((height - header_height) // row_height)
+        return max(1, min(self.rows_per_page, fitting))
+
+    def build_elements(self, doc, data: Iterable[Sequence], headers: List[str], title: str):
+        """
+        Build the flowables for a document
+
+        Args:
+            doc: Target SimpleDocTemplate (used for the available width)
+            data: Iterable of row sequences (may be a generator)
+            headers: List of header strings
+            title: Document title
+
+        Returns:
+            list: reportlab flowables
+        """
+        title_style = ParagraphStyle(
+            'PersianTitle',
+            parent=getSampleStyleSheet()['Title'],
+            fontName=self.bold_font_name,
+            alignment=TA_CENTER
+        )
+
+        elements = [Paragraph(self.shaper.shape(title), title_style),
+                    Spacer(1, 0.3 * inch)]
+
+        header_row = self.shaper.shape_many(headers)
+        num_columns = len(headers)
+        col_widths = self._column_widths(doc, num_columns)
+        style = self._table_style()
+
+        # No chunk is taller than the frame, so reportlab never splits one
+        page_height = doc.height - _FRAME_PADDING
+        title_height = sum(
+            e.wrap(doc.width, page_height)[1] + e.getSpaceBefore() + e.getSpaceAfter()
+            for e in elements
+        )
+        first_rows = self._rows_fitting(page_height - title_height, header_row, col_widths, style)
+        page_rows = self._rows_fitting(page_height, header_row, col_widths, style)
+
+        first = True
+        for chunk in _chunks(data, first_rows, page_rows):
+            first = False
+
+            # Shape the whole chunk in one batch; repeated values hit the cache
+            cells = self.shaper.shape_many(cell for row in chunk for cell in row)
+            table_data = [header_row]
+            table_data.extend(
+                cells[i:i + num_columns] for i in range(0, len(cells), num_columns)
+            )
+
+            table = Table(table_data, colWidths=col_widths, repeatRows=1)
+            table.setStyle(style)
+            elements.append(table)
+
+        if first:
+            # No rows: still emit the header so the document is not empty
+            table = Table([header_row], colWidths=col_widths)
+            table.setStyle(style)
+            elements.append(table)
+
+        return elements
+
+    def export(self, data: Iterable[Sequence], headers: List[str], filename: str, title: str):
+        """
+        Export rows to a PDF file
+
+        Args:
+            data: Iterable of row sequences
+            headers: List of header strings
+            filename: Output filename
+            title: Document title
+        """
+        doc = SimpleDocTemplate(filename, pagesize=self.pagesize)
+        elements = self.build_elements(doc, data, headers, title)
+        doc.build(elements)
+        logger.info(f"PDF exported to {filename}")
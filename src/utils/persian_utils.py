@@ -2,6 +2,8 @@
 import jdatetime
 from datetime import datetime
 from persiantools.jdatetime import JalaliDate, JalaliDateTime
+from .number_format import to_persian_digits, format_currency as _format_currency
+from .jalali_calendar import get_jalali_calendar, MONTH_NAMES, WEEKDAY_NAMES
 
 class PersianDateConverter:
     """Convert between Gregorian and Persian (Solar Hijri) dates"""
@@ -10,16 +12,19 @@ class PersianDateConverter:
     def gregorian_to_jalali(date):
         """Convert Gregorian date to Jalali"""
         if isinstance(date, datetime):
-            j = JalaliDateTime.to_jalali(date)
-            return f"{j.year}/{j.month:02d}/{j.day:02d}"
+            try:
+                return get_jalali_calendar().format(date)
+            except ValueError:
+                # Outside the precomputed table
+                j = JalaliDateTime.to_jalali(date)
+                return f"{j.year}/{j.month:02d}/{j.day:02d}"
         return ""
     
     @staticmethod
     def jalali_to_gregorian(year, month, day):
         """Convert Jalali date to Gregorian"""
         try:
-            j = JalaliDate(year, month, day)
-            g = j.to_gregorian()
+            g = get_jalali_calendar().to_gregorian(year, month, day)
             return datetime(g.year, g.month, g.day)
         except:
             return None
@@ -40,43 +45,21 @@ class PersianDateConverter:
     @staticmethod
     def get_jalali_month_name(month):
         """Get Persian month name"""
-        months = {
-            1: 'فروردین', 2: 'اردیبهشت', 3: 'خرداد',
-            4: 'تیر', 5: 'مرداد', 6: 'شهریور',
-            7: 'مهر', 8: 'آبان', 9: 'آذر',
-            10: 'دی', 11: 'بهمن', 12: 'اسفند'
-        }
-        return months.get(month, '')
+        if isinstance(month, int) and 1 <= month <= 12:
+            return MONTH_NAMES[month - 1]
+        return ''
     
     @staticmethod
     def get_jalali_weekday_name(date):
         """Get Persian weekday name"""
-        weekdays = {
-            0: 'شنبه', 1: 'یکشنبه', 2: 'دوشنبه',
-            3: 'سه‌شنبه', 4: 'چهارشنبه', 5: 'پنج‌شنبه', 6: 'جمعه'
-        }
         if isinstance(date, datetime):
-            j = JalaliDateTime.to_jalali(date)
-            return weekdays.get(j.weekday(), '')
+            return WEEKDAY_NAMES[get_jalali_calendar().weekday(date)]
         return ""
 
 def format_persian_number(number):
     """Convert English numbers to Persian numbers"""
-    persian_digits = '۰۱۲۳۴۵۶۷۸۹'
-    english_digits = '0123456789'
-    
-    str_number = str(number)
-    for i in range(10):
-        str_number = str_number.replace(english_digits[i], persian_digits[i])
-    
-    return str_number
+    return to_persian_digits(number)
 
 def format_currency(amount):
     """Format amount as Persian currency (Rial)"""
-    if amount is None:
-        return "۰ ریال"
-    
-    # Format with thousand separators
-    formatted = "{:,}".format(int(amount))
-    formatted = format_persian_number(formatted)
-    return f"{formatted} ریال"
+    return _format_currency(amount)
@@ -0,0 +1,471 @@
+"""UI responsiveness profiler
+
+When profiling is on, widget load/refresh paths, controller calls, SQL
+statements, chart drawing, table row filling and Jalali date conversion are
+timed as nested spans. The profiler keeps a per-call-path breakdown (total and
+self time), watches the Qt event loop for stalls and writes everything as a
+Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+
+Instrumentation wraps the methods of the relevant classes when profiling is
+started, so a normal run pays nothing; a profiled run pays one clock read
+and a list append per span.
+
+Enable with ``profiling.enabled`` in config.json or by starting the
+application with ``--profile``.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Span categories
+UI = 'ui'
+CONTROLLER = 'controller'
+SQL = 'sql'
+CHART = 'chart'
+TABLE = 'table'
+JALALI = 'jalali'
+STALL = 'stall'
+
+DEFAULT_MAX_EVENTS = 100_000
+DEFAULT_STALL_THRESHOLD_MS = 250
+STALL_CHECK_INTERVAL_MS = 100
+
+# Distinct call paths kept in the breakdown
+MAX_PATHS = 5000
+
+_SQL_TARGET = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+
+def sql_span_name(statement):
+    """Short span name such as 'SELECT installments' for a SQL statement"""
+    verb = statement.lstrip()[:6].upper().strip()
+    match = _SQL_TARGET.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+class _PathStats:
+    __slots__ = ('calls', 'total_ns', 'self_ns', 'category')
+
+    def __init__(self, category):
+        self.calls = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.category = category
+
+
+class Profiler:
+    """Collect nested timing spans and event-loop stalls"""
+
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin_ns = time.perf_counter_ns()
+        self._thread_ids = {}
+        self.events = deque(maxlen=max_events)   # (name, cat, start_ns, dur_ns, tid, args)
+        self.paths = {}                          # call path tuple -> _PathStats
+        self.recent_roots = deque(maxlen=64)     # (name, start_ns, end_ns) of top-level spans
+        self.stalls = deque(maxlen=1000)
+
+    # -- spans ---------------------------------------------------------
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _tid(self):
+        ident = threading.get_ident()
+        tid = self._thread_ids.get(ident)
+        if tid is None:
+            with self._lock:
+                tid = self._thread_ids.setdefault(ident, len(self._thread_ids) + 1)
+        return tid
+
+    def enter(self, name, category=UI, emit=True):
+        """Open a span; every enter() must be matched by exit()"""
+        # frame: name, category, start, child time, emit
+        self._stack().append([name, category, time.perf_counter_ns(), 0, emit])
+
+    def exit(self, args=None):
+        """Close the innermost span"""
+        end = time.perf_counter_ns()
+        stack = self._stack()
+        name, category, start, child_ns, emit = stack[-1]
+        path = tuple(frame[0] for frame in stack)
+        stack.pop()
+        self._account(path, category, start, end - start, child_ns, emit, args, stack)
+
+    def record(self, name, category, start_ns, dur_ns, args=None):
+        """Add a finished leaf span (e.g. a SQL statement) under the current span"""
+        stack = self._stack()
+        path = tuple(frame[0] for frame in stack) + (name,)
+        self._account(path, category, start_ns, dur_ns, 0, True, args, stack)
+
+    def _account(self, path, category, start, duration, child_ns, emit, args, stack):
+        if stack:
+            stack[-1][3] += duration
+        with self._lock:
+            stats = self.paths.get(path)
+            if stats is None and len(self.paths) < MAX_PATHS:
+                stats = self.paths[path] = _PathStats(category)
+            if stats is not None:
+                stats.calls += 1
+                stats.total_ns += duration
+                stats.self_ns += duration - child_ns
+        if emit:
+            self.events.append((path[-1], category, start, duration, self._tid(), args))
+        if not stack:
+            self.recent_roots.append((path[-1], start, start + duration))
+
+    def span(self, name, category=UI, emit=True):
+        """Context manager timing a block as a span"""
+        return _Span(self, name, category, emit)
+
+    # -- stalls --------------------------------------------------------
+
+    def record_stall(self, start_ns, dur_ns):
+        """Record an event-loop stall and the top-level spans that ran during it"""
+        end_ns = start_ns + dur_ns
+        during = sorted({name for name, s, e in list(self.recent_roots) if s < end_ns and e > start_ns})
+        stall = {'start_ns': start_ns, 'dur_ns': dur_ns, 'during': during}
+        self.stalls.append(stall)
+        self.events.append(('event loop stall', STALL, start_ns, dur_ns, self._tid(),
+                            {'blocked_ms': round(dur_ns / 1e6, 1), 'during': during}))
+        logger.warning(f"UI stalled for {dur_ns / 1e6:.0f} ms"
+                       + (f" during {', '.join(during)}" if during else ""))
+
+    # -- reporting -----------------------------------------------------
+
+    def reset(self):
+        """Forget collected spans and stalls"""
+        with self._lock:
+            self.events.clear()
+            self.paths.clear()
+            self.recent_roots.clear()
+            self.stalls.clear()
+
+    def breakdown(self):
+        """
+        Nested time breakdown by call path
+
+        Returns:
+            list: Root nodes, each {'name', 'category', 'calls', 'total_ms',
+                  'self_ms', 'children'}, children sorted by total time
+        """
+        with self._lock:
+            items = [(path, stats.calls, stats.total_ns, stats.self_ns, stats.category)
+                     for path, stats in self.paths.items()]
+
+        nodes = {}
+        roots = []
+        for path, calls, total_ns, self_ns, category in sorted(items, key=lambda i: len(i[0])):
+            node = {'name': path[-1], 'category': category, 'calls': calls,
+                    'total_ms': round(total_ns / 1e6, 3), 'self_ms': round(self_ns / 1e6, 3),
+                    'children': []}
+            nodes[path] = node
+            parent = nodes.get(path[:-1])
+            (parent['children'] if parent is not None else roots).append(node)
+
+        def sort(children):
+            children.sort(key=lambda n: n['total_ms'], reverse=True)
+            for child in children:
+                sort(child['children'])
+        sort(roots)
+        return roots
+
+    def format_breakdown(self, min_ms=1.0):
+        """Breakdown as indented text, skipping nodes under min_ms"""
+        lines = []
+
+        def walk(nodes, depth):
+            for node in nodes:
+                if node['total_ms'] < min_ms:
+                    continue
+                lines.append(f"{'  ' * depth}{node['name']} [{node['category']}] "
+                             f"x{node['calls']}: {node['total_ms']:.1f} ms "
+                             f"(self {node['self_ms']:.1f} ms)")
+                walk(node['children'], depth + 1)
+        walk(self.breakdown(), 0)
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Collected spans as a Chrome trace-event dictionary"""
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 1,
+                   'args': {'name': 'Insurance Manager'}}]
+        with self._lock:
+            thread_ids = dict(self._thread_ids)
+        main_ident = threading.main_thread().ident
+        for ident, tid in thread_ids.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                           'args': {'name': 'UI' if ident == main_ident else f'thread {tid}'}})
+
+        origin = self._origin_ns
+        for name, category, start, duration, tid, args in list(self.events):
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': 1, 'tid': tid,
+                     'ts': (start - origin) / 1000, 'dur': duration / 1000}
+            if args:
+                event['args'] = args
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        """Write chrome_trace() to a JSON file"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        logger.info(f"Profile trace written to {path}")
+        return path
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'category', 'emit', 'active')
+
+    def __init__(self, profiler, name, category, emit):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.emit = emit
+        self.active = False
+
+    def __enter__(self):
+        self.active = self.profiler.enabled
+        if self.active:
+            self.profiler.enter(self.name, self.category, self.emit)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.active:
+            self.profiler.exit()
+        return False
+
+
+class StallMonitor:
+    """Detect event-loop stalls with a Qt timer that measures its own lateness"""
+
+    def __init__(self, profiler, threshold_ms=DEFAULT_STALL_THRESHOLD_MS,
+                 interval_ms=STALL_CHECK_INTERVAL_MS):
+        from PyQt5.QtCore import QTimer
+
+        self.profiler = profiler
+        self.threshold_ns = int(threshold_ms * 1e6)
+        self.interval_ns = int(interval_ms * 1e6)
+        self._last = time.perf_counter_ns()
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.check)
+        self.timer.start(interval_ms)
+
+    def check(self):
+        """Timer tick: a late tick means the event loop was blocked"""
+        now = time.perf_counter_ns()
+        if now - self._last - self.interval_ns >= self.threshold_ns:
+            self.profiler.record_stall(self._last, now - self._last)
+        self._last = now
+
+    def stop(self):
+        self.timer.stop()
+
+
+# -- instrumentation ----------------------------------------------------
+
+_instrumented = []  # (owner, attribute, original)
+
+
+def _wrap(func, profiler, name, category, emit):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        profiler.enter(name, category, emit)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.exit()
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+def instrument_class(cls, category, predicate, profiler=None, emit=True):
+    """
+    Wrap methods defined on cls whose names satisfy predicate in spans
+
+    Args:
+        cls: Class to instrument
+        category: Span category
+        predicate: Callable taking a method name
+        profiler: Profiler (defaults to the global one)
+        emit: Emit a trace event per call; False only feeds the breakdown
+              (used for per-row helpers called thousands of times)
+
+    Returns:
+        int: Number of methods wrapped
+    """
+    profiler = profiler or get_profiler()
+    count = 0
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith('__') or not predicate(attr):
+            continue
+        is_static = isinstance(value, staticmethod)
+        func = value.__func__ if is_static else value
+        if not callable(func) or isinstance(value, (classmethod, property, type)):
+            continue
+        if getattr(func, '__profiled__', False):
+            continue
+        wrapped = _wrap(func, profiler, f"{cls.__name__}.{attr}", category, emit)
+        setattr(cls, attr, staticmethod(wrapped) if is_static else wrapped)
+        _instrumented.append((cls, attr, value))
+        count += 1
+    return count
+
+
+def uninstrument_all():
+    """Restore every method wrapped by instrument_class"""
+    while _instrumented:
+        owner, attr, original = _instrumented.pop()
+        setattr(owner, attr, original)
+
+
+def _is_ui_path(name):
+    # Handlers that wait on a modal dialog (mark_paid, delete_policy) are left
+    # out; their controller calls are still timed
+    return name.startswith(('load_', 'refresh', 'on_')) or name in (
+        'update_calendar', 'mark_calendar_dates', 'date_selected', 'apply_filters')
+
+
+def _is_row_helper(name):
+    return (name.startswith('set_') and name.endswith('_row')) or name in (
+        'upsert_row', 'apply_search_to_row', 'update_stat_card')
+
+
+def instrument_application(profiler=None):
+    """Wrap widget load/refresh paths, controllers, charts, row helpers and Jalali conversion"""
+    from .. import controllers
+    from ..ui import (dashboard_widget, policy_widget, installment_widget, calendar_widget,
+                      overdue_installments_widget, policy_installment_management,
+                      sms_widget, main_window)
+    from .persian_utils import PersianDateConverter
+
+    profiler = profiler or get_profiler()
+    widgets = [
+        dashboard_widget.DashboardWidget,
+        policy_widget.PolicyWidget,
+        installment_widget.InstallmentWidget,
+        calendar_widget.CalendarWidget,
+        calendar_widget.PersianCalendarWidget,
+        overdue_installments_widget.OverdueInstallmentsWidget,
+        policy_installment_management.PolicyInstallmentDialog,
+        sms_widget.SMSWidget,
+        main_window.MainWindow,
+    ]
+    count = 0
+    for cls in widgets:
+        count += instrument_class(cls, UI, _is_ui_path, profiler)
+        count += instrument_class(cls, CHART, lambda n: n.startswith('create_') and n.endswith('_chart'),
+                                  profiler)
+        count += instrument_class(cls, TABLE, _is_row_helper, profiler, emit=False)
+
+    for name in controllers.__all__:
+        count += instrument_class(getattr(controllers, name), CONTROLLER,
+                                  lambda n: not n.startswith('_'), profiler)
+
+    count += instrument_class(PersianDateConverter, JALALI,
+                              lambda n: n in ('gregorian_to_jalali', 'jalali_to_gregorian',
+                                              'format_jalali_date'),
+                              profiler, emit=False)
+    logger.info(f"Profiling {count} methods")
+    return count
+
+
+def install_sql_spans(engine, profiler=None):
+    """Emit a span per SQL statement executed on the engine"""
+    from sqlalchemy import event
+
+    profiler = profiler or get_profiler()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if profiler.enabled:
+            conn.info.setdefault('profiler_start', []).append(time.perf_counter_ns())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profiler_start')
+        if starts:
+            start = starts.pop()
+            profiler.record(sql_span_name(statement), SQL, start, time.perf_counter_ns() - start,
+                            {'statement': statement[:500]})
+
+
+# -- lifecycle ------------------------------------------------------------
+
+_profiler_instance = None
+_stall_monitor = None
+
+
+def get_profiler():
+    """Get global profiler instance"""
+    global _profiler_instance
+    if _profiler_instance is None:
+        max_events = DEFAULT_MAX_EVENTS
+        try:
+            from .config_manager import get_config
+            max_events = get_config().get('profiling.max_events', DEFAULT_MAX_EVENTS)
+        except Exception as e:
+            logger.error(f"Failed to read profiling settings: {e}")
+        _profiler_instance = Profiler(max_events=max_events)
+    return _profiler_instance
+
+
+def profiling_requested(argv=None):
+    """True if --profile was passed or profiling.enabled is set"""
+    import sys
+    from .config_manager import get_config
+
+    argv = sys.argv if argv is None else argv
+    return '--profile' in argv or bool(get_config().get('profiling.enabled', False))
+
+
+def start_profiling(engine=None):
+    """Instrument the application, hook SQL and start stall detection (needs a QApplication)"""
+    global _stall_monitor
+    from .config_manager import get_config
+
+    profiler = get_profiler()
+    instrument_application(profiler)
+    if engine is not None:
+        install_sql_spans(engine, profiler)
+    _stall_monitor = StallMonitor(
+        profiler, get_config().get('profiling.stall_threshold_ms', DEFAULT_STALL_THRESHOLD_MS)
+    )
+    profiler.enabled = True
+    logger.info("Profiling enabled")
+    return profiler
+
+
+def stop_profiling():
+    """Stop collecting, write the trace file and log the breakdown"""
+    global _stall_monitor
+    from .config_manager import get_config
+
+    profiler = get_profiler()
+    if not profiler.enabled:
+        return None
+    profiler.enabled = False
+    if _stall_monitor is not None:
+        _stall_monitor.stop()
+        _stall_monitor = None
+
+    logger.info("Profile breakdown:\n" + profiler.format_breakdown())
+    try:
+        return profiler.write_chrome_trace(
+            get_config().get('profiling.trace_file', 'profile_trace.json')
+        )
+    except Exception as e:
+        logger.error(f"Failed to write profile trace: {e}")
+        return None
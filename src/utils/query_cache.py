@@ -0,0 +1,309 @@
+"""Query-result cache with per-table data versions
+
+Expensive read results (statistics, chart series, calendar maps) are
+cached under a query name and its parameters, together with the versions
+of the tables they read. Every table has a counter in this process that
+only increases:
+
+- an engine hook bumps a table's counter whenever an INSERT, UPDATE or
+  DELETE on it runs, and again when that transaction commits or rolls
+  back; raw SQL that cannot be attributed bumps every table;
+- commits by other connections or processes are noticed through SQLite's
+  ``PRAGMA data_version`` and bump every table.
+
+A cached result is used only while the counters of its tables are
+unchanged, so a refresh with nothing changed costs one PRAGMA and a dict
+lookup. Results are stored pickled, which isolates callers from each
+other and gives the size used by the LRU limits (entry count and bytes).
+
+The optional disk tier keeps results of file databases across runs. As
+counters restart with the process, disk entries are validated against a
+fingerprint of their tables instead: row count, highest id and latest
+updated_at, computed once per table version.
+"""
+import hashlib
+import itertools
+import logging
+import os
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Tables with id and updated_at columns can be fingerprinted for the disk tier
+FINGERPRINT_TABLES = ('policies', 'installments', 'policy_balances')
+# Version of every table, for writes that cannot be attributed to one
+ALL_TABLES = '*'
+
+_versions = {}                  # table name -> counter
+_versions_lock = threading.Lock()
+_engine_ids = weakref.WeakKeyDictionary()
+_next_engine_id = itertools.count(1)
+
+
+def table_version(table):
+    """Current counter of a table in this process"""
+    return _versions.get(table, 0) + _versions.get(ALL_TABLES, 0)
+
+
+def bump(*tables):
+    """Mark tables changed (no tables: all of them)"""
+    with _versions_lock:
+        for table in tables or (ALL_TABLES,):
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def _written_tables(context, statement):
+    """Tables a DML statement writes, () for reads, None if unknown"""
+    if context is not None and context.compiled is not None and \
+            (context.isinsert or context.isupdate or context.isdelete):
+        table = getattr(context.compiled.statement, 'table', None)
+        return (table.name,) if table is not None and hasattr(table, 'name') else None
+    verb = statement.lstrip()[:7].upper()
+    if verb.startswith(('INSERT', 'UPDATE', 'DELETE', 'REPLACE')):
+        return None
+    return ()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tables = _written_tables(context, statement)
+    if tables == ():
+        return
+    tables = tables or (ALL_TABLES,)
+    bump(*tables)
+    conn.info.setdefault('query_cache_written', set()).update(tables)
+
+
+def _end_transaction(conn):
+    written = conn.info.pop('query_cache_written', None)
+    if written:
+        bump(*written)
+
+
+_hooked_engines = weakref.WeakSet()
+_hook_lock = threading.Lock()
+
+
+def watch_engine(engine):
+    """Attach the write hooks to an engine (once per engine)"""
+    with _hook_lock:
+        if engine in _hooked_engines:
+            return
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'commit', _end_transaction)
+        event.listen(engine, 'rollback', _end_transaction)
+        _hooked_engines.add(engine)
+
+
+def _engine_id(engine):
+    with _versions_lock:
+        if engine not in _engine_ids:
+            _engine_ids[engine] = next(_next_engine_id)
+        return _engine_ids[engine]
+
+
+def _check_external_writes(session):
+    """Bump every table if another connection committed since this connection last looked"""
+    if session.get_bind().dialect.name != 'sqlite':
+        return
+    connection = session.connection()
+    current = connection.execute(text('PRAGMA data_version')).scalar()
+    # connection.info lives as long as the pooled DBAPI connection
+    previous = connection.info.get('query_cache_data_version')
+    connection.info['query_cache_data_version'] = current
+    if previous != current:
+        bump()
+
+
+class _Entry:
+    __slots__ = ('versions', 'payload')
+
+    def __init__(self, versions, payload):
+        self.versions = versions
+        self.payload = payload
+
+
+class QueryCache:
+    """LRU cache of read results keyed by query name and parameters"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Most results kept in memory
+            max_bytes: Most pickled bytes kept in memory
+            disk_dir: Directory of the on-disk tier (None: memory only)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()   # key -> _Entry
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._fingerprints = {}         # (engine id, table) -> (version, fingerprint)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, session, name, params, tables, compute):
+        """
+        Cached result of compute(), recomputed when one of tables changed
+
+        Args:
+            session: Session the result is read with
+            name: Query name
+            params: Hashable tuple of the query's parameters
+            tables: Names of the tables the query reads
+            compute: Callable returning the (picklable) result
+
+        Returns:
+            A private copy of the result
+        """
+        engine = session.get_bind()
+        watch_engine(engine)
+        _check_external_writes(session)
+
+        key = (_engine_id(engine), name, params)
+        versions = tuple(table_version(table) for table in tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.versions == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry.payload)
+
+        self.misses += 1
+        payload = self._load_from_disk(session, name, params, tables)
+        if payload is None:
+            result = compute()
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            self._save_to_disk(session, name, params, tables, payload)
+        else:
+            result = pickle.loads(payload)
+            self.disk_hits += 1
+        self._store(key, _Entry(versions, payload))
+        return result
+
+    def _store(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.payload)
+            if len(entry.payload) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += len(entry.payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped.payload)
+
+    def clear(self):
+        """Drop all in-memory results"""
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Entry count, bytes and hit counters"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+        }
+
+    # -- disk tier --------------------------------------------------------
+
+    def _disk_path(self, session, name, params):
+        if not self.disk_dir:
+            return None
+        database = session.get_bind().url.database
+        if not database or database == ':memory:':
+            return None
+        digest = hashlib.sha1(repr((os.path.abspath(database), name, params)).encode('utf-8'))
+        return os.path.join(self.disk_dir, f"{name}-{digest.hexdigest()}.pickle")
+
+    def _fingerprint(self, session, tables):
+        """(count, max id, max updated_at) per table, cached per table version"""
+        engine_id = _engine_id(session.get_bind())
+        fingerprint = []
+        for table in tables:
+            if table not in FINGERPRINT_TABLES:
+                return None
+            version = table_version(table)
+            cached = self._fingerprints.get((engine_id, table))
+            if cached is None or cached[0] != version:
+                row = session.execute(text(
+                    f"SELECT count(*), max(id), max(updated_at) FROM {table}"
+                )).one()
+                cached = (version, tuple(row))
+                self._fingerprints[(engine_id, table)] = cached
+            fingerprint.append(cached[1])
+        return tuple(fingerprint)
+
+    def _load_from_disk(self, session, name, params, tables):
+        path = self._disk_path(session, name, params)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                fingerprint, payload = pickle.load(f)
+            if fingerprint is not None and fingerprint == self._fingerprint(session, tables):
+                return payload
+        except Exception as e:
+            logger.error(f"Failed to read cached result {path}: {e}")
+        return None
+
+    def _save_to_disk(self, session, name, params, tables, payload):
+        path = self._disk_path(session, name, params)
+        if path is None:
+            return
+        try:
+            fingerprint = self._fingerprint(session, tables)
+            if fingerprint is None:
+                return
+            os.makedirs(self.disk_dir, exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump((fingerprint, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"Failed to write cached result {path}: {e}")
+
+
+# Global query cache instance
+_query_cache_instance = None
+
+
+def get_query_cache():
+    """Get global query cache instance (limits and disk tier from the 'cache' config)"""
+    global _query_cache_instance
+    if _query_cache_instance is None:
+        from .config_manager import get_config
+        config = get_config()
+        disk_dir = None
+        if config.get('cache.disk_enabled', False):
+            disk_dir = config.get('cache.disk_dir', 'cache')
+            if not os.path.isabs(disk_dir):
+                disk_dir = os.path.join(config.config_dir, disk_dir)
+        _query_cache_instance = QueryCache(
+            max_entries=config.get('cache.max_entries', DEFAULT_MAX_ENTRIES),
+            max_bytes=config.get('cache.max_mb', DEFAULT_MAX_BYTES // (1024 * 1024)) * 1024 * 1024,
+            disk_dir=disk_dir,
+        )
+    return _query_cache_instance
+
+
+def cached_query(session, name, params, tables, compute):
+    """Shortcut for get_query_cache().get(...)"""
+    return get_query_cache().get(session, name, params, tables, compute)
@@ -0,0 +1,345 @@
+"""Query timing instrumentation
+
+Hooks SQLAlchemy's ``before/after_cursor_execute`` engine events to keep,
+per distinct SQL statement, a count and a latency histogram. Statements
+slower than a threshold go to a bounded slow-query log together with their
+``EXPLAIN QUERY PLAN`` output. Queries are also attributed to the UI action
+(widget refresh, payment, ...) running when they were issued, so the number
+of queries one click costs is visible. Everything can be shown in the
+diagnostics dialog or written out as JSON.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_SLOW_LOG_SIZE = 50
+
+# Distinct statements tracked; anything past this is counted under OTHER_STATEMENT
+MAX_STATEMENTS = 500
+OTHER_STATEMENT = '<other statements>'
+
+_WHITESPACE = re.compile(r'\s+')
+# Expanded IN lists differ only in their number of placeholders
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_statement(statement):
+    """Statement text with whitespace collapsed and IN (?, ?, ...) lists folded"""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    return _PLACEHOLDER_LIST.sub('(?, ...)', statement)
+
+
+def _bucket_label(index):
+    if index < len(BUCKET_BOUNDS_MS):
+        return f"<={BUCKET_BOUNDS_MS[index]}ms"
+    return f">{BUCKET_BOUNDS_MS[-1]}ms"
+
+
+class StatementStats:
+    """Count, total/max time and latency histogram of one statement"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of executions"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'histogram': {_bucket_label(i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class ActionStats:
+    """Queries issued by one kind of UI action"""
+
+    __slots__ = ('runs', 'queries', 'query_ms', 'max_queries', 'last_queries')
+
+    def __init__(self):
+        self.runs = 0
+        self.queries = 0
+        self.query_ms = 0.0
+        self.max_queries = 0
+        self.last_queries = 0
+
+    def add(self, queries, query_ms):
+        self.runs += 1
+        self.queries += queries
+        self.query_ms += query_ms
+        self.max_queries = max(self.max_queries, queries)
+        self.last_queries = queries
+
+    def to_dict(self):
+        return {
+            'runs': self.runs,
+            'queries': self.queries,
+            'queries_per_run': round(self.queries / self.runs, 1) if self.runs else 0.0,
+            'max_queries': self.max_queries,
+            'last_queries': self.last_queries,
+            'query_ms': round(self.query_ms, 3),
+        }
+
+
+class QueryStats:
+    """Collect per-statement latency, slow queries and per-action query counts"""
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, slow_log_size=DEFAULT_SLOW_LOG_SIZE,
+                 explain=True):
+        """
+        Initialize query statistics
+
+        Args:
+            slow_query_ms: Statements taking at least this long are logged as slow
+            slow_log_size: Number of slow queries kept (oldest are dropped)
+            explain: Attach EXPLAIN QUERY PLAN output to slow SELECTs
+        """
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._engines = weakref.WeakSet()
+        self.started_at = datetime.now()
+        self.statements = {}
+        self.actions = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+
+    # -- engine hooks --------------------------------------------------
+
+    def install(self, engine):
+        """Attach the timing hooks to an engine (once per engine)"""
+        from sqlalchemy import event
+
+        if engine in self._engines:
+            return
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines.add(engine)
+
+    def uninstall(self, engine):
+        """Detach the timing hooks from an engine"""
+        from sqlalchemy import event
+
+        if engine not in self._engines:
+            return
+        event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines.discard(engine)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_stats_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_stats_start')
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        if self.enabled:
+            self.record(statement, elapsed_ms, parameters, executemany, cursor)
+
+    def record(self, statement, elapsed_ms, parameters=None, executemany=False, cursor=None):
+        """
+        Account one executed statement
+
+        Args:
+            statement: SQL text as sent to the driver
+            elapsed_ms: Execution time in milliseconds
+            parameters: Bound parameters (used for the query plan of slow queries)
+            executemany: Whether this was a batched executemany call
+            cursor: DBAPI cursor the statement ran on (used for EXPLAIN)
+        """
+        key = normalize_statement(statement)
+        stack = getattr(self._local, 'actions', None)
+
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= MAX_STATEMENTS:
+                    key = OTHER_STATEMENT
+                    stats = self.statements.get(key)
+                if stats is None:
+                    stats = self.statements[key] = StatementStats()
+            stats.add(elapsed_ms)
+
+        if stack:
+            for frame in stack:
+                frame[1] += 1
+                frame[2] += elapsed_ms
+
+        if elapsed_ms >= self.slow_query_ms:
+            plan = None
+            if self.explain and cursor is not None and not executemany:
+                plan = self._explain(cursor, statement, parameters)
+            entry = {
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'ms': round(elapsed_ms, 3),
+                'statement': key,
+                'action': stack[-1][0] if stack else None,
+                'plan': plan,
+            }
+            with self._lock:
+                self.slow_queries.append(entry)
+            logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {key[:200]}")
+
+    def _explain(self, cursor, statement, parameters):
+        """EXPLAIN QUERY PLAN lines for a SELECT, run on a raw cursor so no hooks fire"""
+        head = statement.lstrip()[:6].upper()
+        if head not in ('SELECT', 'WITH'):
+            return None
+        try:
+            plan_cursor = cursor.connection.cursor()
+            try:
+                plan_cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ())
+                return [row[-1] for row in plan_cursor.fetchall()]
+            finally:
+                plan_cursor.close()
+        except Exception as e:
+            logger.debug(f"EXPLAIN QUERY PLAN failed: {e}")
+            return None
+
+    # -- UI actions ----------------------------------------------------
+
+    @contextmanager
+    def action(self, name):
+        """
+        Attribute the queries issued inside the block to a UI action
+
+        Actions nest: a query counts towards every action that is running,
+        so refresh_all includes the queries of the widget refreshes it calls.
+        """
+        stack = getattr(self._local, 'actions', None)
+        if stack is None:
+            stack = self._local.actions = []
+        frame = [name, 0, 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            with self._lock:
+                stats = self.actions.get(name)
+                if stats is None:
+                    stats = self.actions[name] = ActionStats()
+                stats.add(frame[1], frame[2])
+
+    # -- reporting -----------------------------------------------------
+
+    def reset(self):
+        """Forget everything collected so far"""
+        with self._lock:
+            self.statements.clear()
+            self.actions.clear()
+            self.slow_queries.clear()
+            self.started_at = datetime.now()
+
+    def snapshot(self):
+        """
+        Collected statistics as plain data
+
+        Returns:
+            dict: totals, statements (slowest total first), slow_queries and actions
+        """
+        with self._lock:
+            statements = [dict(statement=key, **stats.to_dict())
+                          for key, stats in self.statements.items()]
+            actions = [dict(action=name, **stats.to_dict())
+                       for name, stats in self.actions.items()]
+            slow_queries = list(self.slow_queries)
+
+        statements.sort(key=lambda s: s['total_ms'], reverse=True)
+        actions.sort(key=lambda a: a['queries'], reverse=True)
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_query_ms': self.slow_query_ms,
+            'totals': {
+                'queries': sum(s['count'] for s in statements),
+                'query_ms': round(sum(s['total_ms'] for s in statements), 3),
+                'statements': len(statements),
+                'slow_queries': len(slow_queries),
+            },
+            'statements': statements,
+            'slow_queries': slow_queries,
+            'actions': actions,
+        }
+
+    def dump_json(self, path):
+        """Write snapshot() to a JSON file"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        logger.info(f"Query statistics written to {path}")
+        return path
+
+
+# Global query statistics instance
+_query_stats_instance = None
+
+
+def get_query_stats():
+    """Get global query statistics instance (configured from diagnostics.* settings)"""
+    global _query_stats_instance
+    if _query_stats_instance is None:
+        try:
+            from .config_manager import get_config
+            config = get_config()
+            _query_stats_instance = QueryStats(
+                slow_query_ms=config.get('diagnostics.slow_query_ms', DEFAULT_SLOW_QUERY_MS),
+                slow_log_size=config.get('diagnostics.slow_log_size', DEFAULT_SLOW_LOG_SIZE),
+                explain=config.get('diagnostics.explain_slow_queries', True),
+            )
+        except Exception as e:
+            logger.error(f"Failed to read diagnostics settings: {e}")
+            _query_stats_instance = QueryStats()
+    return _query_stats_instance
+
+
+def track_action(name):
+    """Decorator attributing a method's queries to the named UI action"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_query_stats().action(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,254 @@
+"""Column-oriented report engine
+
+Reports are pulled straight from SQL into pandas with typed dtypes, dates are
+converted to Jalali once per distinct day, and Persian headers are applied
+with a single rename at the end - no per-row Python dicts or ORM objects.
+"""
+import logging
+import re
+import pandas as pd
+from sqlalchemy import select, func
+
+logger = logging.getLogger(__name__)
+
+# date.toordinal() of 1970-01-01 (day 0 of datetime64[D])
+_EPOCH_ORDINAL = 719163
+_FORMAT_DIRECTIVE = re.compile(r'%.')
+
+# Persian column headers (internal column name -> display header)
+INSTALLMENT_REPORT_HEADERS = {
+    'policy_number': 'شماره بیمه‌نامه',
+    'policy_holder_name': 'نام بیمه‌گذار',
+    'policy_type': 'نوع بیمه',
+    'installment_number': 'شماره قسط',
+    'amount': 'مبلغ',
+    'due_date': 'تاریخ سررسید',
+    'payment_date': 'تاریخ پرداخت',
+    'status': 'وضعیت',
+    'payment_method': 'روش پرداخت',
+}
+
+POLICY_SUMMARY_HEADERS = {
+    'policy_number': 'شماره بیمه‌نامه',
+    'policy_holder_name': 'نام بیمه‌گذار',
+    'policy_type': 'نوع بیمه',
+    'total_amount': 'مبلغ کل',
+    'total_installments': 'تعداد اقساط',
+    'total_paid': 'مجموع پرداخت شده',
+    'total_pending': 'مجموع باقی‌مانده',
+    'status': 'وضعیت',
+}
+
+PAYMENT_STATISTICS_HEADERS = {
+    'month': 'ماه',
+    'count': 'تعداد پرداخت‌ها',
+    'total': 'مجموع مبلغ',
+}
+
+INSTALLMENT_REPORT_DTYPES = {
+    'policy_number': 'object',
+    'policy_holder_name': 'object',
+    'policy_type': 'category',
+    'installment_number': 'int32',
+    'amount': 'int64',
+    'status': 'category',
+    'payment_method': 'category',
+}
+
+POLICY_SUMMARY_DTYPES = {
+    'policy_number': 'object',
+    'policy_holder_name': 'object',
+    'policy_type': 'category',
+    'total_amount': 'int64',
+    'total_installments': 'int32',
+    'total_paid': 'int64',
+    'total_pending': 'int64',
+    'status': 'category',
+}
+
+
+def jalali_date_strings(dates, date_format='%Y/%m/%d'):
+    """
+    Format a datetime Series as Jalali date strings
+
+    Each distinct day is converted once, in one vectorized lookup in the
+    Jalali calendar table, and the results are mapped back, so the cost is
+    O(distinct days) instead of O(rows).
+
+    Args:
+        dates: pandas Series of datetimes (NaT allowed)
+        date_format: Jalali strftime format
+
+    Returns:
+        pandas Series of strings ('' for missing dates)
+    """
+    from .jalali_calendar import get_jalali_calendar
+
+    days = pd.to_datetime(dates).dt.normalize()
+    unique_days = pd.DatetimeIndex(days.dropna().unique())
+    try:
+        if set(_FORMAT_DIRECTIVE.findall(date_format)) - {'%Y', '%m', '%d'}:
+            raise ValueError(f"Unsupported Jalali format {date_format!r} for the table")
+        ordinals = unique_days.values.astype('datetime64[D]').astype('int64') + _EPOCH_ORDINAL
+        years, months, month_days = get_jalali_calendar().to_jalali_arrays(ordinals)
+        texts = [
+            date_format.replace('%Y', str(y)).replace('%m', f"{m:02d}").replace('%d', f"{d:02d}")
+            for y, m, d in zip(years.tolist(), months.tolist(), month_days.tolist())
+        ]
+    except ValueError:
+        # Dates outside the calendar table, or other strftime directives
+        from persiantools.jdatetime import JalaliDate
+        texts = [JalaliDate.to_jalali(day.date()).strftime(date_format) for day in unique_days]
+    mapping = dict(zip(unique_days, texts))
+    return days.map(mapping).fillna('').astype(object)
+
+
+class ReportEngine:
+    """Build report DataFrames column-wise from SQL"""
+
+    def __init__(self, session):
+        """
+        Initialize report engine
+
+        Args:
+            session: SQLAlchemy database session
+        """
+        self.session = session
+
+    def _read(self, statement, dtypes, date_columns=()):
+        """Run a Core select on the session connection and return a typed DataFrame"""
+        df = pd.read_sql(
+            statement,
+            self.session.connection(),
+            parse_dates=list(date_columns) or None
+        )
+        # Apply dtypes after loading so empty results and NULLs are handled uniformly
+        for column, dtype in dtypes.items():
+            if column in df.columns:
+                if dtype.startswith('int') or dtype.startswith('float'):
+                    df[column] = df[column].fillna(0).astype(dtype)
+                else:
+                    df[column] = df[column].astype(dtype)
+        return df
+
+    def installment_report(self, start_date=None, end_date=None,
+                           status=None, policy_id=None, insurance_type=None):
+        """
+        Installment report with filters
+
+        Args:
+            start_date: Filter by due date >= start_date
+            end_date: Filter by due date <= end_date
+            status: Filter by status (pending, paid, overdue, etc.)
+            policy_id: Filter by specific policy
+            insurance_type: Filter by insurance type
+
+        Returns:
+            pandas DataFrame with Persian headers
+        """
+        from ..models import Installment, InsurancePolicy
+
+        stmt = select(
+            InsurancePolicy.policy_number,
+            InsurancePolicy.policy_holder_name,
+            InsurancePolicy.policy_type,
+            Installment.installment_number,
+            Installment.amount,
+            Installment.due_date,
+            Installment.payment_date,
+            Installment.status,
+            Installment.payment_method
+        ).join(InsurancePolicy, Installment.policy_id == InsurancePolicy.id)
+
+        if start_date:
+            stmt = stmt.where(Installment.due_date >= start_date)
+        if end_date:
+            stmt = stmt.where(Installment.due_date <= end_date)
+        if status:
+            stmt = stmt.where(Installment.status == status)
+        if policy_id:
+            stmt = stmt.where(Installment.policy_id == policy_id)
+        if insurance_type:
+            stmt = stmt.where(InsurancePolicy.policy_type == insurance_type)
+
+        df = self._read(stmt, INSTALLMENT_REPORT_DTYPES,
+                        date_columns=('due_date', 'payment_date'))
+
+        df['due_date'] = jalali_date_strings(df['due_date'])
+        df['payment_date'] = jalali_date_strings(df['payment_date'])
+
+        return df.rename(columns=INSTALLMENT_REPORT_HEADERS)
+
+    def policy_summary(self, user_id=None):
+        """
+        Policy summary report (installment count, paid and pending totals)
+
+        Args:
+            user_id: Optional owner filter
+
+        Returns:
+            pandas DataFrame with Persian headers
+        """
+        from ..models import InsurancePolicy, PolicyBalance
+
+        # Totals come from the maintained policy_balances table: O(policies)
+        stmt = select(
+            InsurancePolicy.policy_number,
+            InsurancePolicy.policy_holder_name,
+            InsurancePolicy.policy_type,
+            InsurancePolicy.total_amount,
+            func.coalesce(PolicyBalance.installment_count, 0).label('total_installments'),
+            func.coalesce(PolicyBalance.total_paid, 0).label('total_paid'),
+            func.coalesce(PolicyBalance.total_pending, 0).label('total_pending'),
+            InsurancePolicy.status
+        ).outerjoin(
+            PolicyBalance, PolicyBalance.policy_id == InsurancePolicy.id
+        )
+
+        if user_id:
+            stmt = stmt.where(InsurancePolicy.user_id == user_id)
+
+        df = self._read(stmt, POLICY_SUMMARY_DTYPES)
+        return df.rename(columns=POLICY_SUMMARY_HEADERS)
+
+    def payment_statistics(self, start_date=None, end_date=None):
+        """
+        Paid amounts grouped by Jalali month
+
+        Args:
+            start_date: Filter by payment date >= start_date
+            end_date: Filter by payment date <= end_date
+
+        Returns:
+            pandas DataFrame with Persian headers, sorted by month
+        """
+        from .query_cache import cached_query
+
+        # Cached until installments change
+        return cached_query(self.session, 'payment_statistics', (start_date, end_date),
+                            ('installments',),
+                            lambda: self._payment_statistics(start_date, end_date))
+
+    def _payment_statistics(self, start_date, end_date):
+        from ..models import Installment
+
+        stmt = select(
+            Installment.payment_date,
+            Installment.amount
+        ).where(
+            Installment.status == 'paid',
+            Installment.payment_date.isnot(None)
+        )
+
+        if start_date:
+            stmt = stmt.where(Installment.payment_date >= start_date)
+        if end_date:
+            stmt = stmt.where(Installment.payment_date <= end_date)
+
+        df = self._read(stmt, {'amount': 'int64'}, date_columns=('payment_date',))
+
+        df['month'] = jalali_date_strings(df['payment_date'], '%Y/%m')
+        grouped = df.groupby('month', sort=True)['amount'].agg(['count', 'sum'])
+        grouped = grouped.reset_index().rename(columns={'sum': 'total'})
+
+        return grouped.rename(columns=PAYMENT_STATISTICS_HEADERS)
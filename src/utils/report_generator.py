@@ -2,6 +2,7 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
+from .report_engine import ReportEngine
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,7 @@ class ReportGenerator:
             session: SQLAlchemy database session
         """
         self.session = session
+        self.engine = ReportEngine(session)
     
     def generate_installment_report(self, start_date=None, end_date=None, 
                                    status=None, policy_id=None, insurance_type=None):
@@ -32,123 +34,45 @@ class ReportGenerator:
         Returns:
             pandas DataFrame with report data
         """
-        from ..models import Installment, InsurancePolicy
-        from ..utils.persian_utils import PersianDateConverter
-        
-        query = self.session.query(
-            Installment,
-            InsurancePolicy.policy_number,
-            InsurancePolicy.policy_holder_name,
-            InsurancePolicy.policy_type
-        ).join(InsurancePolicy)
-        
-        # Apply filters
-        if start_date:
-            query = query.filter(Installment.due_date >= start_date)
-        if end_date:
-            query = query.filter(Installment.due_date <= end_date)
-        if status:
-            query = query.filter(Installment.status == status)
-        if policy_id:
-            query = query.filter(Installment.policy_id == policy_id)
-        if insurance_type:
-            query = query.filter(InsurancePolicy.policy_type == insurance_type)
-        
-        # Execute query
-        results = query.all()
-        
-        # Convert to DataFrame with Persian headers and dates
-        data = []
-        for inst, policy_num, holder_name, policy_type in results:
-            data.append({
-                'شماره بیمه‌نامه': policy_num,
-                'نام بیمه‌گذار': holder_name,
-                'نوع بیمه': policy_type,
-                'شماره قسط': inst.installment_number,
-                'مبلغ': inst.amount,
-                'تاریخ سررسید': PersianDateConverter.gregorian_to_jalali(inst.due_date) if inst.due_date else '',
-                'تاریخ پرداخت': PersianDateConverter.gregorian_to_jalali(inst.payment_date) if inst.payment_date else '',
-                'وضعیت': inst.status,
-                'روش پرداخت': inst.payment_method
-            })
-        
-        return pd.DataFrame(data)
+        return self.engine.installment_report(
+            start_date=start_date,
+            end_date=end_date,
+            status=status,
+            policy_id=policy_id,
+            insurance_type=insurance_type
+        )
     
     def generate_policy_summary(self, user_id=None):
         """Generate policy summary report"""
-        from ..models import InsurancePolicy, Installment
-        from sqlalchemy import func
-        
-        query = self.session.query(
-            InsurancePolicy,
-            func.count(Installment.id).label('total_installments'),
-            func.sum(Installment.amount).filter(Installment.status == 'paid').label('total_paid'),
-            func.sum(Installment.amount).filter(Installment.status == 'pending').label('total_pending')
-        ).outerjoin(Installment).group_by(InsurancePolicy.id)
-        
-        if user_id:
-            query = query.filter(InsurancePolicy.user_id == user_id)
-        
-        results = query.all()
-        
-        data = []
-        for policy, total_inst, paid, pending in results:
-            data.append({
-                'شماره بیمه‌نامه': policy.policy_number,
-                'نام بیمه‌گذار': policy.policy_holder_name,
-                'نوع بیمه': policy.policy_type,
-                'مبلغ کل': policy.total_amount,
-                'تعداد اقساط': total_inst or 0,
-                'مجموع پرداخت شده': paid or 0,
-                'مجموع باقی‌مانده': pending or 0,
-                'وضعیت': policy.status
-            })
-        
-        return pd.DataFrame(data)
+        return self.engine.policy_summary(user_id=user_id)
     
     def generate_payment_statistics(self, start_date=None, end_date=None):
         """Generate payment statistics report with Persian dates"""
-        from ..models import Installment
-        from sqlalchemy import func
-        from ..utils.persian_utils import PersianDateConverter
-        from persiantools.jdatetime import JalaliDateTime
-        
-        query = self.session.query(
-            Installment
-        ).filter(
-            Installment.status == 'paid'
-        )
-        
-        if start_date:
-            query = query.filter(Installment.payment_date >= start_date)
-        if end_date:
-            query = query.filter(Installment.payment_date <= end_date)
-        
-        results = query.all()
-        
-        # Group by Persian month
-        monthly_data = {}
-        for inst in results:
-            if inst.payment_date:
-                jalali = JalaliDateTime.to_jalali(inst.payment_date)
-                month_key = f"{jalali.year}/{jalali.month:02d}"
-                
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = {'count': 0, 'total': 0}
-                
-                monthly_data[month_key]['count'] += 1
-                monthly_data[month_key]['total'] += inst.amount
-        
-        # Convert to DataFrame with Persian headers
-        data = []
-        for month, stats in sorted(monthly_data.items()):
-            data.append({
-                'ماه': month,
-                'تعداد پرداخت‌ها': stats['count'],
-                'مجموع مبلغ': stats['total']
-            })
-        
-        return pd.DataFrame(data)
+        return self.engine.payment_statistics(start_date, end_date)
+    
+    def generate_aging_report(self, user_id=None, as_of=None):
+        """Generate overdue aging report (1-30/31-60/61-90/90+ days past due)"""
+        from .portfolio_analytics import PortfolioAnalytics, AGING_HEADERS
+        df = PortfolioAnalytics(self.session, user_id).aging(as_of)
+        return df.rename(columns=AGING_HEADERS)
+    
+    def generate_collection_rate_report(self, user_id=None, as_of=None):
+        """Generate collection rate report per insurer and policy type"""
+        from .portfolio_analytics import PortfolioAnalytics, COLLECTION_RATE_HEADERS
+        df = PortfolioAnalytics(self.session, user_id).collection_rate(as_of=as_of)
+        return df.rename(columns=COLLECTION_RATE_HEADERS)
+    
+    def generate_cash_in_forecast(self, user_id=None, months=12, as_of=None):
+        """Generate expected cash-in per Jalali month"""
+        from .portfolio_analytics import PortfolioAnalytics, CASH_IN_HEADERS
+        df = PortfolioAnalytics(self.session, user_id).expected_cash_in(months, as_of)
+        return df.rename(columns=CASH_IN_HEADERS)
+    
+    def generate_roll_rate_report(self, user_id=None, as_of=None):
+        """Generate delinquency roll rates over the last 30 days"""
+        from .portfolio_analytics import PortfolioAnalytics, ROLL_RATE_HEADERS
+        _, rates = PortfolioAnalytics(self.session, user_id).roll_rates(as_of)
+        return rates.rename(columns=ROLL_RATE_HEADERS)
     
     def export_to_excel(self, dataframe, filename):
         """Export DataFrame to Excel file"""
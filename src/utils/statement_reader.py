@@ -0,0 +1,231 @@
+"""Streaming bank statement reader
+
+Reads CSV and Excel (.xlsx) statements row by row and yields normalized
+payment records in fixed-size chunks, so memory use does not grow with the
+statement length.
+"""
+import csv
+import logging
+import os
+import re
+from datetime import datetime, date
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Normalized field -> accepted header names (compared lower-case, without spaces/ZWNJ)
+STATEMENT_COLUMNS = {
+    'reference': ['reference', 'transaction_reference', 'ref', 'trace',
+                  'شمارهپیگیری', 'کدپیگیری', 'شمارهمرجع', 'پیگیری'],
+    'amount': ['amount', 'credit', 'deposit', 'مبلغ', 'واریز', 'بستانکار'],
+    'date': ['date', 'transaction_date', 'تاریخ', 'تاریختراکنش'],
+    'mobile': ['mobile', 'mobile_number', 'phone', 'موبایل', 'شمارهموبایل',
+               'تلفنهمراه', 'شمارههمراه'],
+    'policy_number': ['policy_number', 'policy', 'شمارهبیمهنامه', 'بیمهنامه'],
+    'description': ['description', 'memo', 'details', 'شرح', 'توضیحات', 'بابت'],
+}
+
+# Persian and Arabic-Indic digits -> ASCII
+_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+_MOBILE_RE = re.compile(r'(?:\+98|0098|0)?(9\d{9})')
+_TOKEN_RE = re.compile(r'[\w\-/]+')
+_DATE_RE = re.compile(r'(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})')
+
+
+def _normalize_header(name):
+    """Lower-case a header and drop spaces, ZWNJ and separators"""
+    text = str(name or '').strip().lower()
+    return re.sub(r'[\s\u200c_\-]+', '', text)
+
+
+_HEADER_LOOKUP = {
+    _normalize_header(alias): field
+    for field, aliases in STATEMENT_COLUMNS.items()
+    for alias in aliases
+}
+
+
+def map_statement_columns(headers):
+    """
+    Map statement header cells to normalized field names
+
+    Args:
+        headers: Sequence of header cell values
+
+    Returns:
+        dict: column index -> field name (unknown columns are skipped)
+    """
+    mapping = {}
+    for index, header in enumerate(headers):
+        field = _HEADER_LOOKUP.get(_normalize_header(header))
+        if field and field not in mapping.values():
+            mapping[index] = field
+    return mapping
+
+
+def to_ascii_digits(value):
+    """Convert Persian/Arabic digits in a value to ASCII"""
+    return str(value).translate(_DIGITS)
+
+
+def parse_amount(value):
+    """
+    Parse a statement amount ('1,250,000', '۱٬۲۵۰٬۰۰۰ ریال', 1250000.0)
+
+    Returns:
+        float or None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r'[^\d.\-]', '', to_ascii_digits(value).replace('٫', '.'))
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    """Parse a Jalali or Gregorian date string (cached: statements repeat dates)"""
+    match = _DATE_RE.search(text)
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.groups())
+    try:
+        if year < 1700:
+            from .persian_utils import PersianDateConverter
+            converted = PersianDateConverter.jalali_to_gregorian(year, month, day)
+            return converted.date() if converted else None
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_statement_date(value):
+    """
+    Parse a statement date (datetime, '1403/05/12' or '2024-08-02')
+
+    Returns:
+        datetime.date or None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_date_text(to_ascii_digits(value))
+
+
+def normalize_mobile(value):
+    """
+    Normalize an Iranian mobile number to '09xxxxxxxxx'
+
+    Returns:
+        str or None
+    """
+    if not value:
+        return None
+    match = _MOBILE_RE.search(re.sub(r'[\s\-]', '', to_ascii_digits(value)))
+    return f"0{match.group(1)}" if match else None
+
+
+def description_tokens(text):
+    """Split a description into tokens that may be policy numbers"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(to_ascii_digits(text))
+
+
+def normalize_record(row_number, cells, mapping):
+    """
+    Build a normalized payment record from raw cells
+
+    Returns:
+        dict with row_number, reference, amount, date, mobile,
+        policy_number and description
+    """
+    raw = {field: cells[index] if index < len(cells) else None
+           for index, field in mapping.items()}
+
+    reference = raw.get('reference')
+    reference = to_ascii_digits(reference).strip() if reference not in (None, '') else None
+    policy_number = raw.get('policy_number')
+    policy_number = to_ascii_digits(policy_number).strip() if policy_number not in (None, '') else None
+    description = str(raw.get('description') or '')
+
+    return {
+        'row_number': row_number,
+        'reference': reference or None,
+        'amount': parse_amount(raw.get('amount')),
+        'date': parse_statement_date(raw.get('date')),
+        'mobile': normalize_mobile(raw.get('mobile')) or normalize_mobile(description),
+        'policy_number': policy_number or None,
+        'description': description,
+    }
+
+
+def _iter_csv_rows(path):
+    """Yield raw rows of a CSV file"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.reader(f)
+
+
+def _iter_excel_rows(path):
+    """Yield raw rows of the first sheet of an .xlsx file (read-only, streaming)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_statement_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a bank statement as chunks of normalized records
+
+    Args:
+        path: CSV or .xlsx statement file
+        chunk_size: Records per chunk
+
+    Yields:
+        list of dicts (see normalize_record)
+
+    Raises:
+        ValueError: If the format is unsupported or no amount column is found
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.csv', '.txt'):
+        rows = _iter_csv_rows(path)
+    elif extension in ('.xlsx', '.xlsm'):
+        rows = _iter_excel_rows(path)
+    else:
+        raise ValueError(f"Unsupported statement format: {extension}")
+
+    mapping = None
+    chunk = []
+    for row_number, cells in enumerate(rows, start=1):
+        if mapping is None:
+            mapping = map_statement_columns(cells)
+            if 'amount' not in mapping.values():
+                raise ValueError("Statement has no amount column")
+            logger.info(f"Statement columns: {sorted(mapping.values())}")
+            continue
+
+        if not cells or all(cell in (None, '') for cell in cells):
+            continue
+
+        chunk.append(normalize_record(row_number, cells, mapping))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
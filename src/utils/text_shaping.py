@@ -0,0 +1,151 @@
+"""
+Memoized Persian text shaping for PDF/report rendering.
+
+Reports repeat the same strings (status labels, insurer names, holder names)
+thousands of times. PersianTextShaper reshapes each distinct string once and
+keeps the result in a bounded LRU cache.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 8192
+
+
+def _shape_uncached(text: str) -> str:
+    """Reshape and reorder a single string (no caching)"""
+    if text.isascii():
+        # Numbers, dates and policy numbers need no shaping
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+
+class PersianTextShaper:
+    """Bounded LRU cache around arabic_reshaper + bidi"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """
+        Initialize text shaper
+
+        Args:
+            maxsize: Maximum number of shaped strings kept in the cache
+        """
+        self.maxsize = max(1, int(maxsize))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def shape(self, text) -> str:
+        """
+        Shape a single value for display in PDF
+
+        Args:
+            text: Value to shape (converted to str, None becomes '')
+
+        Returns:
+            Shaped text in visual order
+        """
+        text = '' if text is None else str(text)
+
+        with self._lock:
+            shaped = self._cache.get(text)
+            if shaped is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return shaped
+
+        shaped = _shape_uncached(text)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[text] = shaped
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return shaped
+
+    def warm(self, values: Iterable) -> int:
+        """
+        Pre-shape the distinct values of a column
+
+        Args:
+            values: Column values (list, pandas Series, ...)
+
+        Returns:
+            int: Number of distinct values shaped
+        """
+        distinct = {'' if v is None else str(v) for v in values}
+        for text in distinct:
+            self.shape(text)
+        return len(distinct)
+
+    def shape_many(self, values: Iterable):
+        """
+        Shape a whole column, reshaping each unique value only once
+
+        Args:
+            values: Column values; a pandas Series is mapped in place
+
+        Returns:
+            pandas Series if a Series was given, otherwise a list of shaped strings
+            (missing values - None, NaN, NaT - become '')
+        """
+        if hasattr(values, 'map') and hasattr(values, 'unique'):
+            # pandas Series: shape the uniques, then map back vectorized
+            missing = values.isna()
+            mapping = {v: self.shape(v) for v in values[~missing].unique()}
+            return values.map(mapping).astype(object).where(~missing, '')
+
+        values = list(values)
+        mapping = {}
+        for v in values:
+            if v not in mapping:
+                mapping[v] = self.shape(v)
+        return [mapping[v] for v in values]
+
+    def cache_info(self) -> dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'maxsize': self.maxsize
+            }
+
+    def clear(self):
+        """Clear the cache and its statistics"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Global shaper instance
+_shaper_instance = None
+
+
+def get_shaper() -> PersianTextShaper:
+    """Get global text shaper instance"""
+    global _shaper_instance
+    if _shaper_instance is None:
+        _shaper_instance = PersianTextShaper()
+    return _shaper_instance
+
+
+def shape_text(text) -> str:
+    """Shape a single value with the global shaper"""
+    return get_shaper().shape(text)
+
+
+def shape_column(values):
+    """Shape a column of values with the global shaper"""
+    return get_shaper().shape_many(values)
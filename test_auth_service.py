@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Test worker-thread password hashing, rehash on login and session tokens"""
+import os
+import sys
+import threading
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bcrypt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User
+from src.controllers import AuthController
+from src.utils.auth_service import AuthService, get_hash_rounds
+
+
+def make_controller(rounds=4):
+    """Create an auth controller on an in-memory database"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    auth = AuthController(session)
+    auth.auth_service = AuthService(rounds=rounds, token_ttl=60)
+    return session, auth
+
+
+def test_auth_service():
+    """Hashing happens off-thread, old hashes are upgraded, tokens skip bcrypt"""
+    session, auth = make_controller(rounds=4)
+
+    # 1. Hashing and verification run in the auth worker thread
+    service = auth.auth_service
+    threads = []
+    original = service.hash_password
+
+    def record_thread(password):
+        threads.append(threading.current_thread().name)
+        return original(password)
+
+    with mock.patch.object(service, 'hash_password', side_effect=record_thread):
+        password_hash = service.hash_password_async('secret123').result()
+    assert threads and threads[0].startswith('auth')
+    assert get_hash_rounds(password_hash) == 4
+    assert service.verify_password_async('secret123', password_hash).result()
+    assert not service.verify_password_async('wrong', password_hash).result()
+    print("✓ Hashing and verification run in the worker thread")
+
+    # 2. register_user uses the configured work factor
+    success, _, user = auth.register_user('alice', 'secret123', 'Alice')
+    assert success
+    assert get_hash_rounds(user.password_hash) == 4
+    print("✓ Registration hashes with the configured work factor")
+
+    # 3. Login re-hashes a hash made with an older cost
+    user.password_hash = bcrypt.hashpw(b'secret123', bcrypt.gensalt(5)).decode('utf-8')
+    session.commit()
+    success, _, _ = auth.login('alice', 'wrong')
+    assert not success
+    assert get_hash_rounds(user.password_hash) == 5
+    success, _, logged_in = auth.login('alice', 'secret123')
+    assert success and logged_in.id == user.id
+    assert get_hash_rounds(user.password_hash) == 4
+    assert auth.session_token
+    print("✓ Successful login upgrades the hash cost")
+
+    # 4. Async login: begin on the caller, finish with the future's result
+    future, _, pending_user = auth.begin_login('alice', 'secret123')
+    success, _, _ = auth.finish_login(pending_user, 'secret123', future.result())
+    assert success
+    future, message, _ = auth.begin_login('nobody', 'x')
+    assert future is None and message
+    print("✓ begin_login/finish_login split works")
+
+    # 5. Re-authentication and password change use the token, not bcrypt
+    with mock.patch('bcrypt.checkpw', side_effect=AssertionError('bcrypt called')):
+        assert auth.verify_current_password('secret123')
+        assert not auth.verify_current_password('wrong')
+        success, _ = auth.change_password(user.id, 'secret123', 'newpass456')
+    assert success
+    assert auth.verify_current_password('newpass456')
+    assert service.verify_password('newpass456', user.password_hash)
+    print("✓ Re-authentication skips bcrypt while the token is valid")
+
+    # 6. Expired/revoked tokens fall back to bcrypt
+    token = auth.session_token
+    auth.logout()
+    assert service.reauthenticate(token, user.id, 'newpass456') is None
+    expiring = AuthService(rounds=4, token_ttl=-1)
+    assert expiring.reauthenticate(expiring.issue_token(1, 'pw'), 1, 'pw') is None
+    print("✓ Expired and revoked tokens are rejected")
+
+    session.close()
+
+
+def test_change_password_off_gui_thread():
+    """The password dialog hashes in the worker; the model uses the configured cost"""
+    from PyQt5.QtWidgets import QApplication
+    from src.ui import main_window
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    session, auth = make_controller(rounds=4)
+    success, _, user = auth.register_user('bob', 'secret123', 'Bob')
+    assert auth.login('bob', 'secret123')[0]
+
+    window = mock.Mock(auth_controller=auth, user=user, _pending_password_change=None)
+    window.ask_new_password.side_effect = (
+        lambda *args: main_window.MainWindow.ask_new_password(window, *args))
+    futures = []
+    done = threading.Event()
+    for signal in (window.password_verify_done, window.password_hash_done):
+        signal.emit.side_effect = lambda future: (futures.append(future), done.set())
+    bcrypt_threads = []
+    original_hash = auth.auth_service.hash_password
+    original_verify = auth.auth_service.verify_password
+
+    def record_hash(password):
+        bcrypt_threads.append(threading.current_thread().name)
+        return original_hash(password)
+
+    def record_verify(password, password_hash):
+        bcrypt_threads.append(threading.current_thread().name)
+        return original_verify(password, password_hash)
+
+    def wait_for_worker():
+        assert done.wait(10) and len(futures) == 1
+        done.clear()
+        return futures.pop()
+
+    answers = iter([('secret123', True), ('newpass456', True),
+                    ('newpass456', True), ('third789', True)])
+    with mock.patch.object(main_window, 'QMessageBox'), \
+            mock.patch('PyQt5.QtWidgets.QInputDialog.getText', side_effect=lambda *a: next(answers)), \
+            mock.patch.object(auth.auth_service, 'hash_password', side_effect=record_hash), \
+            mock.patch.object(auth.auth_service, 'verify_password', side_effect=record_verify):
+        # Live session token: the current password is checked without bcrypt
+        main_window.MainWindow.show_change_password(window)
+        main_window.MainWindow.on_password_hash_done(window, wait_for_worker())
+        assert window._pending_password_change is None
+        assert original_verify('newpass456', user.password_hash)
+        print("✓ Password change hashes in the worker thread")
+
+        # Expired token: the current password is verified in the worker too
+        auth.auth_service.revoke_token(auth.session_token)
+        main_window.MainWindow.show_change_password(window)
+        assert window._pending_password_change == ('newpass456', None)
+        main_window.MainWindow.on_password_verify_done(window, wait_for_worker())
+        main_window.MainWindow.on_password_hash_done(window, wait_for_worker())
+    assert window._pending_password_change is None
+    assert original_verify('third789', user.password_hash)
+    assert len(bcrypt_threads) == 3, bcrypt_threads
+    assert all(name.startswith('auth') for name in bcrypt_threads), bcrypt_threads
+    assert auth.verify_current_password('third789'), "token re-issued after verification"
+    print("✓ Expired session token is re-checked in the worker thread")
+
+    with mock.patch('src.utils.auth_service._auth_service_instance', auth.auth_service):
+        user.set_password('other789')
+        assert get_hash_rounds(user.password_hash) == 4
+        assert user.check_password('other789')
+    print("✓ User.set_password uses the configured work factor")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_auth_service()
+        test_change_password_off_gui_thread()
+        print("\n✅ All auth service tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
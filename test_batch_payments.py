@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Test the batched mark_many_as_paid API"""
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment, PolicyBalance
+from src.controllers import PolicyController, InstallmentController, PolicyBalanceController
+
+
+def make_session():
+    """Create an in-memory database session with one user"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='batch', password_hash='x', full_name='Batch Test')
+    session.add(user)
+    session.commit()
+    return engine, session, user
+
+
+def create_policy(session, user, number, num_installments):
+    """Create a policy with a batch of installments"""
+    success, message, policy = PolicyController(session).create_policy(user.id, {
+        'policy_number': number,
+        'policy_holder_name': 'تست گروهی',
+        'total_amount': 1000000 * num_installments,
+        'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    })
+    assert success, message
+    success, message, installments = InstallmentController(session).create_installments_batch(
+        policy.id, 1000000 * num_installments, num_installments, datetime.now() + timedelta(days=30), 30
+    )
+    assert success, message
+    return policy, installments
+
+
+def test_mark_many_as_paid():
+    """Batch payments run in one transaction with a bounded number of statements"""
+    engine, session, user = make_session()
+    inst_ctrl = InstallmentController(session)
+
+    done_policy, done_installments = create_policy(session, user, 'BATCH-001', 3)
+    open_policy, open_installments = create_policy(session, user, 'BATCH-002', 200)
+
+    # Pay all of BATCH-001, most of BATCH-002 and one unknown id
+    done_policy_id = done_policy.id
+    payments = [inst.id for inst in done_installments]
+    payments += [{'installment_id': inst.id, 'transaction_reference': f'TR-{inst.id}'}
+                 for inst in open_installments[:150]]
+    payments += [999999]
+
+    statements = []
+    commits = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda *args: statements.append(args[2]))
+    event.listen(session, 'after_commit', lambda s: commits.append(1))
+
+    with mock.patch('src.utils.NotificationManager') as notifier:
+        success, message, result = inst_ctrl.mark_many_as_paid(payments, payment_method='card')
+
+    assert success, message
+    assert len(result['paid']) == 153
+    assert result['missing'] == [999999]
+    assert result['completed_policies'] == ['BATCH-001']
+    assert result['total_amount'] == 153000000 and isinstance(result['total_amount'], int)
+    assert len(commits) == 1
+    assert len(statements) < 20, f"{len(statements)} statements issued"
+    notifier.return_value.send_batch_payment_confirmation.assert_called_once_with(153, result['total_amount'], 1)
+    print(f"✓ 153 payments applied with {len(statements)} statements and 1 commit")
+
+    # Completed policy is gone together with its rows
+    assert session.query(InsurancePolicy).filter_by(policy_number='BATCH-001').first() is None
+    assert session.query(Installment).filter_by(policy_id=done_policy_id).count() == 0
+    assert session.query(PolicyBalance).filter_by(policy_id=done_policy_id).first() is None
+    print("✓ Fully paid policy deleted")
+
+    # Per-row fields and balances are applied
+    inst = session.get(Installment, open_installments[0].id)
+    assert inst.status == 'paid' and inst.payment_method == 'card'
+    assert inst.transaction_reference == f'TR-{inst.id}'
+    balance = PolicyBalanceController(session).get_balance(open_policy.id)
+    assert balance.paid_count == 150 and balance.pending_count == 50
+    assert PolicyBalanceController(session).check_consistency() == []
+    print("✓ Installment fields and balances updated")
+
+    # Re-submitting the same ids is a no-op
+    with mock.patch('src.utils.NotificationManager'):
+        success, _, result = inst_ctrl.mark_many_as_paid([open_installments[0].id])
+    assert success and result['paid'] == [] and result['skipped'] == [open_installments[0].id]
+
+    # Cancelled installments are neither paid nor counted
+    cancelled = open_installments[-1]
+    cancelled.status = 'cancelled'
+    session.commit()
+    with mock.patch('src.utils.NotificationManager'):
+        success, _, result = inst_ctrl.mark_many_as_paid([cancelled.id, open_installments[-2].id])
+    assert success and result['skipped'] == [cancelled.id]
+    assert result['paid'] == [open_installments[-2].id]
+    assert result['total_amount'] == open_installments[-2].amount
+    assert isinstance(result['total_amount'], int)
+    assert session.get(Installment, cancelled.id).status == 'cancelled'
+    print("✓ Already paid and cancelled installments are skipped")
+
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_mark_many_as_paid()
+        print("\n✅ All batch payment tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Test the cash-flow forecast service and its dashboard chart"""
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from src.models import Installment, InsurancePolicy, User
+from src.controllers import InstallmentController
+from src.utils.jalali_calendar import get_jalali_calendar
+from src.utils.cash_flow_forecast import CashFlowForecast, clear_cache
+
+from synthetic_book import generate_book
+
+TODAY = datetime(2024, 6, 1)
+
+
+def make_book(installments=3000):
+    engine = create_engine('sqlite:///:memory:')
+    generate_book(engine, installments=installments, users=1, seed=5, today=TODAY)
+    return engine, sessionmaker(bind=engine)()
+
+
+def reference(session, months=12):
+    """Per-row forecast: scheduled and on-time-adjusted amounts per Jalali month"""
+    calendar = get_jalali_calendar()
+    today = TODAY.date()
+    rows = session.query(Installment, InsurancePolicy.policy_type).join(InsurancePolicy).all()
+
+    due, on_time = defaultdict(int), defaultdict(int)
+    for inst, policy_type in rows:
+        if inst.status != 'cancelled' and 0 < (today - inst.due_date.date()).days <= 365:
+            due[policy_type] += inst.amount
+            if inst.status == 'paid' and (inst.payment_date is None or
+                                          inst.payment_date.date() <= inst.due_date.date()):
+                on_time[policy_type] += inst.amount
+    ratios = {t: on_time[t] / due[t] for t in due if due[t]}
+
+    year, month, _ = calendar.to_jalali(today)
+    labels = ["%d/%02d" % calendar.month_of_index(calendar.month_index(year, month) + i)
+              for i in range(months)]
+    scheduled, expected = defaultdict(int), defaultdict(float)
+    for inst, policy_type in rows:
+        if inst.status in ('paid', 'cancelled') or inst.due_date.date() < today:
+            continue
+        y, m, _ = calendar.to_jalali(inst.due_date)
+        label = f"{y}/{m:02d}"
+        if label in labels:
+            scheduled[label] += inst.amount
+            expected[label] += inst.amount * ratios.get(policy_type, 1.0)
+    return labels, [scheduled[l] for l in labels], [round(expected[l]) for l in labels]
+
+
+def test_forecast_matches_reference():
+    """Monthly and weekly totals match a per-row computation"""
+    engine, session = make_book()
+    forecast = CashFlowForecast(session)
+
+    labels, scheduled, expected = reference(session)
+    monthly = forecast.monthly(TODAY)
+    assert monthly['period'].tolist() == labels
+    assert monthly['scheduled'].tolist() == scheduled
+    assert all(abs(a - b) <= 1 for a, b in zip(monthly['expected'], expected))
+    assert sum(scheduled) > 0 and (monthly['expected'] <= monthly['scheduled']).all()
+
+    weekly = forecast.weekly(TODAY)
+    assert weekly['scheduled'].sum() == monthly['scheduled'].sum()
+    assert weekly['count'].sum() == monthly['count'].sum()
+    calendar = get_jalali_calendar()
+    assert all(calendar.weekday(start) == 0 for start in weekly['start'][1:])
+    assert weekly['start'][0] == TODAY.date()
+    print("✓ Monthly and weekly forecast")
+
+
+def test_incremental_payments():
+    """Payments re-aggregate only the paid installments' days; creations rebuild"""
+    clear_cache()
+    engine, session = make_book(2000)
+    forecast = CashFlowForecast(session)
+    before = forecast.monthly(TODAY)
+
+    upcoming = session.execute(
+        select(Installment.id, Installment.amount).where(
+            Installment.status == 'pending', Installment.due_date >= TODAY
+        ).order_by(Installment.due_date).limit(5)
+    ).all()
+
+    with mock.patch.object(CashFlowForecast, '_build', wraps=forecast._build) as build:
+        success, message, _ = InstallmentController(session).mark_many_as_paid(
+            [row.id for row in upcoming], notify=False)
+        assert success, message
+        after = forecast.monthly(TODAY)
+        assert build.call_count == 0
+    assert before['scheduled'].sum() - after['scheduled'].sum() == sum(r.amount for r in upcoming)
+
+    clear_cache()
+    assert CashFlowForecast(session).monthly(TODAY).equals(after)
+
+    # A new schedule invalidates the cache
+    policy = session.query(InsurancePolicy).first()
+    success, message, _ = InstallmentController(session).create_installments_batch(
+        policy.id, 1_200_000, 3, datetime(2024, 7, 1), plan='monthly')
+    assert success, message
+    grown = forecast.monthly(TODAY)
+    assert grown['scheduled'].sum() == after['scheduled'].sum() + 1_200_000
+    print("✓ Incremental update on payments")
+
+
+def test_incremental_edits():
+    """A moved due date leaves neither day counted wrong; a policy type change moves totals"""
+    from src.controllers import PolicyController
+    clear_cache()
+    engine, session = make_book(2000)
+    forecast = CashFlowForecast(session)
+    forecast.monthly(TODAY)
+
+    moved = session.execute(
+        select(Installment.id, Installment.amount, Installment.due_date).where(
+            Installment.status == 'pending', Installment.due_date >= datetime(2024, 7, 1)
+        ).order_by(Installment.due_date).limit(1)
+    ).one()
+    old_day, new_day = moved.due_date.date(), datetime(2024, 6, 20).date()
+
+    def day_totals(day):
+        entry = forecast._entry(TODAY.toordinal())
+        return [sum(value[i] for (d, _), value in entry.daily.items() if d == day.toordinal())
+                for i in (0, 1)]
+
+    old_before, new_before = day_totals(old_day), day_totals(new_day)
+    success, message, _ = InstallmentController(session).update_installment(
+        moved.id, {'due_date': datetime.combine(new_day, datetime.min.time())})
+    assert success, message
+    assert day_totals(old_day) == [old_before[0] - 1, old_before[1] - moved.amount]
+    assert day_totals(new_day) == [new_before[0] + 1, new_before[1] + moved.amount]
+    after = forecast.monthly(TODAY)
+    clear_cache()
+    assert CashFlowForecast(session).monthly(TODAY).equals(after)
+    print("✓ Moved due date updates both days")
+
+    # Policy type changes move the policy's totals to its new type
+    policy_id = session.execute(
+        select(Installment.policy_id).where(
+            Installment.status == 'pending', Installment.due_date >= TODAY
+        ).limit(1)
+    ).scalar()
+    success, message, _ = PolicyController(session).update_policy(
+        policy_id, {'policy_type': 'نوع جدید'})
+    assert success, message
+    entry = forecast._entry(TODAY.toordinal())
+    assert any(policy_type == 'نوع جدید' for _, policy_type in entry.daily)
+    changed = forecast.monthly(TODAY)
+    clear_cache()
+    assert CashFlowForecast(session).monthly(TODAY).equals(changed)
+    print("✓ Policy type change regroups totals")
+
+
+def test_dashboard_charts():
+    """Dashboard builds the payment and forecast charts from the report headers"""
+    from PyQt5.QtWidgets import QApplication
+    from src.ui.dashboard_widget import DashboardWidget
+    from src.models import read_session
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    engine, session = make_book(1000)
+    user = session.query(User).first()
+    pending = session.query(Installment.id).filter(Installment.status == 'pending').limit(3).all()
+    InstallmentController(session).mark_many_as_paid([p.id for p in pending], notify=False)
+
+    dashboard = DashboardWidget(user, session)
+    with read_session(session) as read:
+        # Raised KeyError 'month' before: the report has Persian headers
+        dashboard.create_monthly_chart(read)
+        dashboard.create_forecast_chart(read)
+    assert dashboard.forecast_chart_layout.count() == 1
+    assert dashboard.monthly_chart_layout.count() == 1
+
+    labels, scheduled, expected = CashFlowForecast(session, user.id).chart_series('month')
+    assert len(labels) == 12 and len(scheduled) == len(expected) == 12
+    print("✓ Dashboard charts")
+
+
+if __name__ == '__main__':
+    try:
+        test_forecast_matches_reference()
+        test_incremental_payments()
+        test_incremental_edits()
+        test_dashboard_charts()
+        print("\n✅ All cash-flow forecast tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Test the change notification bus and row-level widget patching"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert, update, delete
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.controllers import PolicyController, InstallmentController, PolicyBalanceController
+from src.utils.change_bus import (ChangeBus, ChangeFeed, get_change_bus,
+                                  POLICY_CHANGED, INSTALLMENT_CHANGED,
+                                  CREATED, UPDATED, DELETED)
+
+
+def make_session():
+    """Create an in-memory database session with one user"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='bus', password_hash='x', full_name='Bus Test')
+    session.add(user)
+    session.commit()
+    return session, user
+
+
+def test_change_bus():
+    """Events are delivered, merged in batches and dropped for dead subscribers"""
+    bus = ChangeBus()
+    received = []
+
+    class Subscriber:
+        def handle(self, event):
+            received.append((event.topic, event.action, set(event.ids)))
+
+    subscriber = Subscriber()
+    bus.subscribe(INSTALLMENT_CHANGED, subscriber.handle)
+
+    bus.publish(INSTALLMENT_CHANGED, [1, 2])
+    assert received == [(INSTALLMENT_CHANGED, UPDATED, {1, 2})]
+
+    with bus.batch():
+        bus.publish(INSTALLMENT_CHANGED, [3])
+        bus.publish(INSTALLMENT_CHANGED, [4, None])
+        assert len(received) == 1
+    assert received[-1] == (INSTALLMENT_CHANGED, UPDATED, {3, 4})
+
+    del subscriber
+    bus.publish(INSTALLMENT_CHANGED, [5])
+    assert len(received) == 2
+    print("✓ Delivery, batching and weak subscriptions work")
+
+
+def test_controllers_publish():
+    """Controllers publish ids after commit, and the feed catches external writes"""
+    session, user = make_session()
+    events = []
+    record = lambda e: events.append((e.topic, e.action, set(e.ids)))  # noqa: E731
+    bus = get_change_bus()
+    bus.subscribe(POLICY_CHANGED, record)
+    bus.subscribe(INSTALLMENT_CHANGED, record)
+
+    success, _, policy = PolicyController(session).create_policy(user.id, {
+        'policy_number': 'BUS-1', 'policy_holder_name': 'تست',
+        'total_amount': 2000000, 'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    })
+    policy_id = policy.id
+    assert events[-1] == (POLICY_CHANGED, CREATED, {policy_id})
+
+    inst_ctrl = InstallmentController(session)
+    _, _, installments = inst_ctrl.create_installments_batch(
+        policy_id, 2000000, 2, datetime.now() + timedelta(days=30))
+    ids = [i.id for i in installments]
+    assert (INSTALLMENT_CHANGED, CREATED, set(ids)) in events
+
+    events.clear()
+    with mock.patch('src.utils.NotificationManager'):
+        inst_ctrl.mark_as_paid(ids[0])
+    assert events == [(INSTALLMENT_CHANGED, UPDATED, {ids[0]}),
+                      (POLICY_CHANGED, UPDATED, {policy_id})]
+
+    events.clear()
+    with mock.patch('src.utils.NotificationManager'):
+        inst_ctrl.mark_as_paid(ids[1])
+    assert events[-1] == (POLICY_CHANGED, DELETED, {policy_id})
+    print("✓ Controllers publish created/updated/deleted ids")
+
+    # Rows written by another process are found through updated_at
+    feed = ChangeFeed(bus)
+    feed.prime(session)
+    _, _, other = PolicyController(session).create_policy(user.id, {
+        'policy_number': 'BUS-2', 'policy_holder_name': 'تست',
+        'total_amount': 1000000, 'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    })
+    session.execute(insert(Installment), [{
+        'policy_id': other.id, 'installment_number': 1, 'amount': 1000000,
+        'due_date': datetime.now(), 'status': 'pending',
+        'updated_at': datetime.now() + timedelta(seconds=1),
+    }])
+    session.commit()
+    events.clear()
+    counts = feed.poll(session)
+    assert counts[INSTALLMENT_CHANGED] == 1
+    assert any(topic == INSTALLMENT_CHANGED for topic, _, _ in events)
+    assert feed.poll(session)[INSTALLMENT_CHANGED] == 0
+    print("✓ Change feed publishes rows past the high-water mark")
+
+    # This process's own writes are not published a second time
+    _, _, own = inst_ctrl.create_installments_batch(
+        other.id, 2000000, 2, datetime.now() + timedelta(days=60))
+    own_ids = [i.id for i in own]
+    with mock.patch('src.utils.NotificationManager'):
+        inst_ctrl.mark_as_paid(own_ids[0])
+    events.clear()
+    assert feed.poll(session) == {POLICY_CHANGED: 0, INSTALLMENT_CHANGED: 0}
+    assert events == []
+    print("✓ Own writes are not echoed")
+
+    # A late commit with an updated_at behind the mark is still found
+    late = datetime.now() - timedelta(minutes=1)
+    session.execute(update(Installment).where(Installment.id == own_ids[1])
+                    .values(notes='late', updated_at=late))
+    session.commit()
+    events.clear()
+    assert feed.poll(session)[INSTALLMENT_CHANGED] == 1
+    assert events == [(INSTALLMENT_CHANGED, UPDATED, {own_ids[1]})]
+    assert feed.poll(session)[INSTALLMENT_CHANGED] == 0
+    print("✓ Late commits inside the lookback are published")
+
+    # Deletes by another process are published; own deletes are not
+    user_id, other_id = user.id, other.id
+    session.execute(delete(Installment).where(Installment.id == own_ids[1]))
+    session.commit()
+    session.expunge_all()  # deleted behind the ORM's back
+    events.clear()
+    assert feed.poll(session)[INSTALLMENT_CHANGED] == 1
+    assert events == [(INSTALLMENT_CHANGED, DELETED, {own_ids[1]})]
+
+    _, _, third = PolicyController(session).create_policy(user_id, {
+        'policy_number': 'BUS-3', 'policy_holder_name': 'تست',
+        'total_amount': 1000000, 'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    })
+    third_id = third.id
+    _, _, third_installments = inst_ctrl.create_installments_batch(
+        third_id, 1000000, 2, datetime.now() + timedelta(days=30))
+    third_installment_ids = {i.id for i in third_installments}
+    feed.poll(session)
+    assert PolicyController(session).delete_policy(third_id)[0]
+    events.clear()
+    assert feed.poll(session) == {POLICY_CHANGED: 0, INSTALLMENT_CHANGED: 0}
+    assert events == []
+
+    remaining = {i for (i,) in session.query(Installment.id).filter(
+        Installment.policy_id == other_id)}
+    session.execute(delete(Installment).where(Installment.policy_id == other_id))
+    session.execute(delete(InsurancePolicy).where(InsurancePolicy.id == other_id))
+    session.commit()
+    events.clear()
+    feed.poll(session)
+    assert (POLICY_CHANGED, DELETED, {other_id}) in events
+    assert (INSTALLMENT_CHANGED, DELETED, remaining) in events
+    assert not third_installment_ids & remaining
+    print("✓ External deletes are published")
+
+    bus.unsubscribe(POLICY_CHANGED, record)
+    bus.unsubscribe(INSTALLMENT_CHANGED, record)
+    session.close()
+
+
+def test_widget_patching():
+    """Widgets patch single rows on a big book instead of reloading"""
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ui.installment_widget import InstallmentWidget
+    from src.ui.policy_widget import PolicyWidget
+
+    session, user = make_session()
+    due = datetime.now() + timedelta(days=10)
+    for p in range(300):
+        session.add(InsurancePolicy(
+            user_id=user.id, policy_number=f'BIG-{p:04d}', policy_holder_name='تست',
+            total_amount=12000000, start_date=due, end_date=due + timedelta(days=365)))
+    session.flush()
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 1000000,
+         'due_date': due + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(300) for n in range(12)
+    ])
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+
+    installment_widget = InstallmentWidget(user, session)
+    policy_widget = PolicyWidget(user, session)
+    assert installment_widget.table.rowCount() == 3600
+
+    target = session.query(Installment).filter_by(policy_id=5, installment_number=3).one()
+    with mock.patch.object(installment_widget, 'load_installments') as reload_installments, \
+            mock.patch.object(policy_widget, 'load_policies') as reload_policies, \
+            mock.patch('src.utils.NotificationManager'):
+        start = time.perf_counter()
+        InstallmentController(session).mark_as_paid(target.id)
+        elapsed = time.perf_counter() - start
+    assert not reload_installments.called and not reload_policies.called
+    row = installment_widget.row_ids.index(target.id)
+    assert installment_widget.table.cellWidget(row, 6).text() == "✓ پرداخت شده"
+    assert elapsed < 0.1, f"edit took {elapsed * 1000:.0f} ms"
+    print(f"✓ Payment patched 1 row of 3600 in {elapsed * 1000:.1f} ms")
+
+    # Moving the due date re-sorts only that row; deleting a policy drops its rows
+    InstallmentController(session).update_installment(target.id, {'due_date': due - timedelta(days=1)})
+    assert installment_widget.row_ids[0] == target.id
+    PolicyController(session).delete_policy(7)
+    assert 7 not in installment_widget.row_policy_ids
+    assert installment_widget.table.rowCount() == 3600 - 12
+    assert 7 not in policy_widget.row_ids
+    assert policy_widget.table.rowCount() == 299
+    print("✓ Moves and deletes are patched in place")
+
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_change_bus()
+        test_controllers_publish()
+        test_widget_patching()
+        print("\n✅ All change bus tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
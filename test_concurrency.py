@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Stress test several processes sharing one database file"""
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+from src.models import database, concurrency
+from src.models.concurrency import CONFLICT_MESSAGE, BUSY_MESSAGE, retry_on_busy
+from src.models import User, InsurancePolicy, Installment
+
+WORKERS = 4
+INCREMENTS = 25         # per worker, on one shared counter
+RACED_POLICIES = 10     # every worker pays all of their installments
+BATCH_POLICIES = 30     # every worker pays them in overlapping batches
+INSTALLMENTS = 4
+DUE = datetime(2024, 1, 1)
+
+
+def make_book(db_path):
+    """Shared file with a counter policy and the policies the workers pay"""
+    database.init_database(db_path)
+    session = database.get_session()
+    user = User(username='shared', password_hash='x', full_name='Shared Test')
+    session.add(user)
+    session.flush()
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id, 'policy_number': f'CC-{p:04d}', 'policy_holder_name': 'تست',
+         'description': '0', 'total_amount': 4000000,
+         'start_date': DUE, 'end_date': DUE + timedelta(days=365)}
+        for p in range(1 + RACED_POLICIES + BATCH_POLICIES)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 2, 'installment_number': n + 1, 'amount': 1000000,
+         'due_date': DUE + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(RACED_POLICIES + BATCH_POLICIES) for n in range(INSTALLMENTS)
+    ])
+    session.commit()
+    raced = [iid for (iid,) in session.execute(text(
+        f"SELECT id FROM installments WHERE policy_id <= {RACED_POLICIES + 1} ORDER BY id"))]
+    batched = [iid for (iid,) in session.execute(text(
+        f"SELECT id FROM installments WHERE policy_id > {RACED_POLICIES + 1} ORDER BY id"))]
+    session.close()
+    database.engine.dispose()
+    return raced, batched
+
+
+def worker(worker_id, raced, batched):
+    """One application process: increments, single payments and batch payments"""
+    from src.controllers import InstallmentController, PolicyController
+    logging.getLogger('src').setLevel(logging.CRITICAL)
+    database.init_database()  # path from INSURANCE_DB_PATH
+    session = database.get_session()
+    policies = PolicyController(session)
+    installments = InstallmentController(session)
+    rng = random.Random(worker_id)
+    report = {'increments': 0, 'conflicts': 0, 'paid': [], 'batch_paid': [], 'errors': []}
+
+    # Read-modify-write of one counter with the version that was read
+    while report['increments'] < INCREMENTS:
+        session.expire_all()
+        policy = session.get(InsurancePolicy, 1)
+        value, version = int(policy.description), policy.updated_at
+        session.commit()
+        success, message, _ = policies.update_policy(
+            1, {'description': str(value + 1)}, expected_updated_at=version)
+        if success:
+            report['increments'] += 1
+        elif message == CONFLICT_MESSAGE:
+            report['conflicts'] += 1
+        else:
+            report['errors'].append(message)
+
+    # Everyone pays the same installments
+    for iid in rng.sample(raced, len(raced)):
+        success, message = installments.mark_as_paid(iid, payment_method=f'worker-{worker_id}')
+        if success:
+            report['paid'].append(iid)
+        elif message not in ("این قسط قبلاً پرداخت شده است", "قسط یافت نشد"):
+            report['errors'].append(message)
+
+    # ... and overlapping batches of the others
+    ids = list(batched)
+    rng.shuffle(ids)
+    for i in range(0, len(ids), 15):
+        success, message, result = installments.mark_many_as_paid(ids[i:i + 15], notify=False)
+        if success:
+            report['batch_paid'].extend(result['paid'])
+        else:
+            report['errors'].append(message)
+
+    session.close()
+    database.engine.dispose()
+    return report
+
+
+def test_shared_file_stress():
+    """Processes sharing a WAL file lose no update and never fail on locks"""
+    directory = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(directory, 'shared', 'insurance.db')
+        os.makedirs(os.path.dirname(db_path))
+        raced, batched = make_book(db_path)
+
+        started = time.perf_counter()
+        with mock.patch.dict(os.environ, {database.DB_PATH_ENV: db_path}):
+            with multiprocessing.get_context('spawn').Pool(WORKERS) as pool:
+                reports = pool.starmap(worker, [(w, raced, batched) for w in range(WORKERS)])
+        elapsed = time.perf_counter() - started
+
+        errors = [message for report in reports for message in report['errors']]
+        assert not errors, errors
+        assert BUSY_MESSAGE not in errors
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        counter = int(conn.execute("SELECT description FROM policies WHERE id = 1").fetchone()[0])
+        assert counter == WORKERS * INCREMENTS, counter
+        conflicts = sum(report['conflicts'] for report in reports)
+        print(f"   {WORKERS} processes: {counter} increments, {conflicts} conflicts detected, "
+              f"{elapsed:.1f}s")
+        print("✓ No lost updates on a shared counter")
+
+        paid = sorted(iid for report in reports for iid in report['paid'])
+        assert paid == raced, "every installment paid exactly once"
+        batch_paid = sorted(iid for report in reports for iid in report['batch_paid'])
+        assert batch_paid == batched, "batches paid each installment exactly once"
+        left = conn.execute("SELECT count(*) FROM policies").fetchone()[0]
+        assert left == 1  # paid-off policies were deleted by whichever process finished them
+        conn.close()
+        print("✓ Racing payments are applied once")
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_stale_writes_and_retries():
+    """Stale versions are rejected; busy errors are retried after the lock is released"""
+    from src.controllers import InstallmentController, PolicyController
+    directory = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(directory, 'book.db')
+        url = f'sqlite:///{db_path}'
+        engine = create_engine(url)
+        concurrency.install(engine, busy_timeout_ms=50)
+        database.Base.metadata.create_all(engine)
+        first = sessionmaker(bind=engine)()
+        second = sessionmaker(bind=engine)()
+        user = User(username='stale', password_hash='x', full_name='Stale Test')
+        first.add(user)
+        first.flush()
+        policy = InsurancePolicy(user_id=user.id, policy_number='ST-1', policy_holder_name='تست',
+                                 total_amount=2000000, start_date=DUE, end_date=DUE)
+        first.add(policy)
+        first.flush()
+        first.add_all([Installment(policy_id=policy.id, installment_number=n, amount=1000000,
+                                   due_date=DUE) for n in (1, 2)])
+        first.commit()
+
+        # Another user's change between reading and writing
+        seen = first.get(InsurancePolicy, policy.id)
+        version = seen.updated_at
+        assert PolicyController(second).update_policy(policy.id, {'description': 'B'})[0]
+        assert second.get(InsurancePolicy, policy.id).updated_at > version
+        success, message, _ = PolicyController(first).update_policy(
+            policy.id, {'description': 'A'}, expected_updated_at=version)
+        assert not success and message == CONFLICT_MESSAGE
+        assert first.get(InsurancePolicy, policy.id).description == 'B'
+
+        # A flush of an object loaded before the other change is rejected
+        installment = first.query(Installment).first()
+        assert InstallmentController(second).mark_as_paid(installment.id)[0]
+        installment.notes = 'stale edit'
+        try:
+            first.commit()
+            raise AssertionError("stale flush was accepted")
+        except StaleDataError:
+            first.rollback()
+        success, message = InstallmentController(first).mark_as_paid(installment.id)
+        assert not success and message == "این قسط قبلاً پرداخت شده است"
+        print("✓ Stale versions are rejected")
+
+        # Hold the write lock from another connection for a while
+        locker = sqlite3.connect(db_path, check_same_thread=False)
+        locker.execute("BEGIN IMMEDIATE")
+        release = threading.Timer(0.3, locker.commit)
+        release.start()
+        other = InstallmentController(first).get_policy_installments(policy.id)[1]
+        success, message = InstallmentController(first).mark_as_paid(other.id)
+        release.join()
+        locker.close()
+        assert success, message
+        print("✓ Locked writes are retried")
+
+        calls = []
+
+        @retry_on_busy
+        def always_locked():
+            calls.append(1)
+            concurrency.note_error(OperationalError('UPDATE', {}, sqlite3.OperationalError(
+                'database is locked')))
+            return False, BUSY_MESSAGE
+
+        with mock.patch.object(concurrency, 'RETRY_DELAY', 0.001):
+            assert always_locked() == (False, BUSY_MESSAGE)
+        assert len(calls) == concurrency.DEFAULT_RETRY_ATTEMPTS
+        first.close()
+        second.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_database_path_setting():
+    """The environment variable wins over the setting, the setting over the default"""
+    from src.utils.config_manager import get_config
+    config = get_config()
+    with mock.patch.dict(os.environ, {database.DB_PATH_ENV: ''}):
+        assert database.resolve_db_path() == database.DB_PATH
+        with mock.patch.dict(config.config, {'database': {'path': 'data/shared.db'}}):
+            assert database.resolve_db_path() == str(config.config_dir / 'data' / 'shared.db')
+            os.environ[database.DB_PATH_ENV] = '/mnt/office/insurance.db'
+            assert database.resolve_db_path() == '/mnt/office/insurance.db'
+    print("✓ Database path setting")
+
+
+if __name__ == '__main__':
+    try:
+        test_database_path_setting()
+        test_stale_writes_and_retries()
+        test_shared_file_stress()
+        print("\n✅ All concurrency tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Test that hot paths run without lazy loads"""
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment, Reminder, session_scope
+from src.models.queries import forbid_lazy_loads, LazyLoadError
+from src.controllers import (PolicyController, InstallmentController,
+                             ReminderController, PolicyBalanceController)
+
+
+def make_book(policies=20, installments=12):
+    """In-memory database with one user and a small book of policies"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='eager', password_hash='x', full_name='Eager Test',
+                phone='09120000000', email='eager@example.com')
+    session.add(user)
+    session.flush()
+    due = datetime.now() + timedelta(days=10)
+    for p in range(policies):
+        session.add(InsurancePolicy(
+            user_id=user.id, policy_number=f'EG-{p:03d}', policy_holder_name='تست',
+            total_amount=12000000, start_date=due, end_date=due + timedelta(days=365)))
+    session.flush()
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 1000000,
+         'due_date': due + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(policies) for n in range(installments)
+    ])
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+    user_id = user.id
+    session.expunge_all()
+    return session, session.get(User, user_id)
+
+
+def count_statements(engine):
+    """Attach a statement counter to an engine"""
+    counter = {'n': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(*args):
+        counter['n'] += 1
+
+    return counter
+
+
+def test_detector():
+    """The detector reports relationship and expired-attribute loads"""
+    session, user = make_book(policies=1, installments=2)
+    installment = session.query(Installment).first()
+
+    try:
+        with forbid_lazy_loads():
+            installment.policy.policy_number
+        assert False, "lazy load not detected"
+    except LazyLoadError as e:
+        assert 'relationship' in str(e)
+
+    session.commit()  # expires everything
+    try:
+        with forbid_lazy_loads():
+            installment.amount
+        assert False, "expired load not detected"
+    except LazyLoadError as e:
+        assert 'attribute' in str(e)
+
+    from src.models.queries import INSTALLMENT_WITH_POLICY
+    with forbid_lazy_loads():
+        loaded = session.query(Installment).options(*INSTALLMENT_WITH_POLICY).all()
+        [inst.policy.policy_number for inst in loaded]
+    print("✓ Detector catches lazy loads and passes eager ones")
+    session.close()
+
+
+def test_reminders_use_projection():
+    """Reminder creation reads installment, policy and user in one query"""
+    session, user = make_book(policies=3, installments=12)
+    counter = count_statements(session.get_bind())
+
+    with forbid_lazy_loads():
+        success, _, reminder = ReminderController(session).create_installment_reminder(1)
+    assert success
+    assert reminder.recipient_phone == '09120000000'
+    assert counter['n'] <= 3, f"{counter['n']} statements"
+
+    counter['n'] = 0
+    with forbid_lazy_loads():
+        success, count = ReminderController(session).auto_schedule_reminders_for_policy(2)
+    assert success and count == 12
+    assert counter['n'] <= 4, f"{counter['n']} statements"
+    assert session.query(Reminder).filter(Reminder.installment_id.between(13, 24)).count() == 12
+    print(f"✓ Auto-scheduled 12 reminders in {counter['n']} statements")
+    session.close()
+
+
+def test_hot_paths_have_no_lazy_loads():
+    """Widget loads, payments, patches and deletes run without lazy loads"""
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ui.installment_widget import InstallmentWidget
+    from src.ui.policy_widget import PolicyWidget
+    from src.ui.policy_installment_management import PolicyInstallmentDialog
+
+    session, user = make_book()
+    user.full_name  # the shared session's user is loaded once up front
+
+    with forbid_lazy_loads():
+        installment_widget = InstallmentWidget(user, session)
+        policy_widget = PolicyWidget(user, session)
+        dialog = PolicyInstallmentDialog(
+            session.query(InsurancePolicy).filter_by(id=3).one(), session
+        )
+    assert dialog.table.rowCount() == 12
+
+    with forbid_lazy_loads(), mock.patch('src.utils.NotificationManager'):
+        with session_scope(session) as uow:
+            assert InstallmentController(uow).mark_as_paid(dialog.row_ids[0])[0]
+        installment_widget.refresh()
+        policy_widget.refresh()
+    assert dialog.table.item(0, 4).text() == 'پرداخت شده'
+
+    with forbid_lazy_loads():
+        with session_scope(session) as uow:
+            assert PolicyController(uow).delete_policy(5)[0]
+    assert policy_widget.table.rowCount() == 19
+    print("✓ Loads, payment, patching and delete ran without lazy loads")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_detector()
+        test_reminders_use_projection()
+        test_hot_paths_have_no_lazy_loads()
+        print("\n✅ All eager loading tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
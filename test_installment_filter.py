@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Test the cached installment filter engine and the debounced installments view"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.models.read_models import InstallmentRow, fetch_rows
+from src.controllers import InstallmentController, PolicyController
+from src.ui.installment_filter import (InstallmentFilter, FilterKey, ALL_INSTALLMENTS,
+                                       covers, normalize_search)
+
+HOLDERS = ['محمد رضایی', 'محمود احمدی', 'زهرا کریمی', 'Sara Nouri']
+TODAY = datetime.combine(datetime.now().date(), datetime.min.time())
+
+
+def make_book(policies, installments=6):
+    """One user's book with due dates around today, plus another user's policy"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='filter', password_hash='x', full_name='Filter Test')
+    other = User(username='other', password_hash='x', full_name='Other')
+    session.add_all([user, other])
+    session.flush()
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': other.id if p == policies else user.id, 'policy_number': f'FL-{p:05d}',
+         'policy_holder_name': HOLDERS[p % len(HOLDERS)], 'mobile_number': f'0912{p:07d}',
+         'policy_type': 'بدنه', 'total_amount': 6000000,
+         'start_date': TODAY, 'end_date': TODAY + timedelta(days=365)}
+        for p in range(policies + 1)
+    ])
+    statuses = ['pending', 'paid', 'overdue', 'pending', 'cancelled', 'pending']
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 1000000,
+         'due_date': TODAY + timedelta(days=(p % 40) - 20 + 7 * n),
+         'status': statuses[(p + n) % len(statuses)]}
+        for p in range(policies + 1) for n in range(installments)
+    ])
+    session.commit()
+    return session, user
+
+
+def sql_ids(engine, key):
+    """Reference result: the key's query run directly"""
+    stmt = engine.statement(key).order_by(Installment.due_date, Installment.id)
+    return [row.id for row in fetch_rows(engine.session, stmt, InstallmentRow)]
+
+
+def test_keys_and_narrowing():
+    """Cached, narrowed and queried results all match SQL"""
+    session, user = make_book(200)
+    engine = InstallmentFilter(session, user.id)
+
+    keys = [
+        ALL_INSTALLMENTS,
+        FilterKey(None, None, None, normalize_search(' م ')),
+        FilterKey(None, None, None, 'محم'),
+        FilterKey(None, None, 'pending', 'محم'),
+        FilterKey(TODAY, TODAY + timedelta(days=8), None, ''),
+        FilterKey(TODAY, TODAY + timedelta(days=1), 'pending', ''),
+        FilterKey(None, None, None, normalize_search('SARA')),
+        FilterKey(None, None, None, '0912000001'),
+        FilterKey(None, None, None, '%'),
+    ]
+    for key in keys:
+        assert engine.ids(key) == sql_ids(engine, key), key
+    assert engine.ids(keys[-1]) == []  # wildcards are matched literally
+    assert engine.ids(keys[6])  # ASCII case is ignored, like LIKE
+    assert all(session.get(InsurancePolicy, engine.rows[i].policy_id).user_id == user.id
+               for i in engine.ids(ALL_INSTALLMENTS))
+
+    assert covers(keys[1], keys[2]) and covers(keys[2], keys[3]) and covers(keys[4], keys[5])
+    assert not covers(keys[2], keys[1]) and not covers(keys[5], keys[4])
+    print("✓ Filter keys match SQL")
+
+    # Tighter keys never query; a repeated key is a cache hit
+    fresh = InstallmentFilter(session, user.id)
+    with mock.patch.object(InstallmentFilter, '_query', wraps=fresh._query) as query:
+        fresh.ids(ALL_INSTALLMENTS)
+        for key in keys[1:]:
+            fresh.ids(key)
+        fresh.ids(keys[2])
+        assert query.call_count == 1
+    print("✓ Tighter filters narrow cached results in memory")
+
+    small = InstallmentFilter(session, user.id, max_keys=2)
+    for key in keys[:3]:
+        small.ids(key)
+    assert list(small.results) == keys[1:3]
+    session.close()
+
+
+def test_change_invalidation():
+    """Change events keep every cached result equal to SQL"""
+    session, user = make_book(100)
+    engine = InstallmentFilter(session, user.id)
+    keys = [ALL_INSTALLMENTS, FilterKey(None, None, 'pending', ''),
+            FilterKey(None, None, None, 'محم'), FilterKey(TODAY, TODAY + timedelta(days=8), None, '')]
+    for key in keys:
+        engine.ids(key)
+
+    controller = InstallmentController(session)
+    pending = engine.ids(keys[1])[:3]
+    controller.mark_many_as_paid(pending, notify=False)
+    controller.update_installment(engine.ids(keys[0])[0], {'due_date': TODAY + timedelta(days=2)})
+    engine.refresh_rows(pending + [engine.ids(keys[0])[0]])
+
+    policy_id = engine.rows[engine.ids(keys[2])[0]].policy_id
+    PolicyController(session).update_policy(policy_id, {'policy_holder_name': 'علی محمدی'})
+    engine.refresh_rows(engine.installments_of({policy_id}))
+    deleted = engine.installments_of({5})
+    PolicyController(session).delete_policy(5)
+    engine.discard(deleted)
+
+    for key in keys:
+        assert engine.ids(key) == sql_ids(engine, key), key
+        sort_keys = engine._sort_keys.get(key)
+        assert sort_keys is None or sort_keys == [engine._sort_key(i) for i in engine.ids(key)]
+    print("✓ Cached results follow payments, moves, edits and deletes")
+    session.close()
+
+
+def test_widget_filtering():
+    """Input is debounced; tighter filters hide rows instead of re-rendering"""
+    from PyQt5.QtWidgets import QApplication
+    from src.ui.installment_widget import InstallmentWidget, FILTER_DELAY_MS
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    session, user = make_book(2000, 10)
+    widget = InstallmentWidget(user, session)
+    assert widget.table.rowCount() == 20000
+
+    def shown():
+        return [iid for row, iid in enumerate(widget.row_ids) if not widget.table.isRowHidden(row)]
+
+    with mock.patch.object(widget, 'render_rows', wraps=widget.render_rows) as render:
+        for text in ('م', 'مح', 'محم'):
+            widget.search_box.setText(text)
+        assert shown() == widget.row_ids  # nothing applied yet
+        started = time.perf_counter()
+        widget.filter_timer.timeout.emit()
+        widget.status_filter.setCurrentText("در انتظار")
+        widget.load_installments()
+        widget.search_box.setText("مح")
+        widget.load_installments()
+        elapsed = time.perf_counter() - started
+        assert render.call_count == 0 and elapsed < 1
+    assert widget.filter_timer.interval() == FILTER_DELAY_MS
+    assert shown() == sql_ids(widget.filters, widget.filter_key())
+    print(f"   3 filter changes on 20000 rows in {elapsed * 1000:.0f} ms")
+
+    # A payment patches the row and hides it under the pending filter
+    target = shown()[0]
+    InstallmentController(session).mark_as_paid(target)
+    assert target in widget.row_ids and target not in shown()
+    widget.status_filter.setCurrentText("همه")
+    widget.load_installments()
+    assert target in shown()
+
+    # A filter wider than the rendered one re-renders
+    widget.search_box.clear()
+    widget.date_filter.setCurrentText("امروز")
+    widget.refresh()
+    assert widget.table.rowCount() == len(sql_ids(widget.filters, widget.filter_key()))
+    widget.date_filter.setCurrentText("همه اقساط")
+    widget.load_installments()
+    assert widget.table.rowCount() == 20000
+    assert shown() == sql_ids(widget.filters, widget.filter_key())
+    print("✓ Debounced filtering hides and shows rendered rows")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_keys_and_narrowing()
+        test_change_invalidation()
+        test_widget_filtering()
+        print("\n✅ All installment filter tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Test the vectorized installment schedule engine"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, Installment, PolicyBalance, split_amount
+from src.controllers import PolicyController, InstallmentController
+from src.utils.jalali_calendar import get_jalali_calendar
+from src.utils.installment_schedule import build_schedule, build_schedules
+
+
+def test_monthly_dates():
+    """Monthly and quarterly dates keep the Jalali day, clamped to short months"""
+    calendar = get_jalali_calendar()
+    first = calendar.to_gregorian(1403, 6, 31)
+    schedule = build_schedule(1200, 8, first)
+    jalali = [calendar.to_jalali(d) for d in schedule.due_dates]
+    assert jalali == [(1403, 6, 31), (1403, 7, 30), (1403, 8, 30), (1403, 9, 30),
+                      (1403, 10, 30), (1403, 11, 30), (1403, 12, 30), (1404, 1, 31)]
+
+    # 1404 is not a leap year: 30 Bahman + 1 month is 29 Esfand
+    schedule = build_schedule(300, 3, calendar.to_gregorian(1404, 11, 30))
+    assert calendar.to_jalali(schedule.due_dates[1]) == (1404, 12, 29)
+
+    quarterly = build_schedule(400, 4, calendar.to_gregorian(1403, 3, 31), plan='quarterly')
+    assert [calendar.to_jalali(d) for d in quarterly.due_dates] == [
+        (1403, 3, 31), (1403, 6, 31), (1403, 9, 30), (1403, 12, 30)]
+
+    weekly = build_schedule(300, 3, datetime(2024, 5, 1, 9, 30), plan='weekly')
+    assert weekly.due_dates == [datetime(2024, 5, 1, 9, 30), datetime(2024, 5, 8, 9, 30),
+                                datetime(2024, 5, 15, 9, 30)]
+
+    # Same result as the scalar calendar arithmetic for many random starts
+    rng = np.random.default_rng(1)
+    starts = [date(2020, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 3000, 500)]
+    counts = rng.integers(1, 25, 500)
+    many = build_schedules([1_000_000] * 500, counts, starts)
+    expected = [calendar.add_months_to_date(start, i)
+                for start, count in zip(starts, counts) for i in range(count)]
+    assert [d.date() for d in many.due_dates] == expected
+    print("✓ Due dates")
+
+
+def test_amounts():
+    """Amounts add up exactly under every remainder rule"""
+    schedule = build_schedule(1000, 3, date(2024, 1, 1))
+    assert schedule.amount.tolist() == split_amount(1000, 3) == [334, 333, 333]
+
+    schedule = build_schedule(10_000_000, 3, date(2024, 1, 1), down_payment=1_000_000,
+                              round_to=10_000)
+    assert schedule.amount.tolist() == [3_000_000] * 3
+
+    schedule = build_schedule(10_050_007, 4, date(2024, 1, 1), round_to=10_000)
+    assert schedule.amount.tolist() == [2_520_007, 2_510_000, 2_510_000, 2_510_000]
+    last = build_schedule(10_050_007, 4, date(2024, 1, 1), round_to=10_000, remainder='last')
+    assert last.amount.tolist() == [2_510_000, 2_510_000, 2_510_000, 2_520_007]
+    first = build_schedule(10_050_007, 4, date(2024, 1, 1), round_to=10_000, remainder='first')
+    assert first.amount.tolist()[0] == 2_520_007
+
+    rng = np.random.default_rng(2)
+    totals = rng.integers(1, 10**10, 1000)
+    downs = totals // rng.integers(2, 10, 1000)
+    counts = rng.integers(1, 37, 1000)
+    for rule in ('spread', 'first', 'last'):
+        many = build_schedules(totals.tolist(), counts, [date(2024, 1, 1)] * 1000,
+                               down_payments=downs.tolist(), round_to=1000, remainder=rule)
+        sums = np.bincount(many.policy_index, weights=many.amount, minlength=1000)
+        assert (sums.astype(np.int64) == totals - downs).all()
+        assert (many.amount >= 0).all()
+
+    for bad in (dict(num_installments=0), dict(plan='yearly'), dict(down_payment=2000),
+                dict(round_to=0), dict(remainder='middle')):
+        args = dict(total_amount=1000, num_installments=3, first_due_date=date(2024, 1, 1))
+        args.update(bad)
+        try:
+            build_schedule(**args)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✓ Amounts and validation")
+
+
+def test_controller():
+    """Single-policy and bulk onboarding through the controller"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='schedule', password_hash='x', full_name='Schedule Test')
+    session.add(user)
+    session.commit()
+
+    policy_ctrl = PolicyController(session)
+    policy_ids = []
+    for n in range(2000):
+        success, message, policy = policy_ctrl.create_policy(user.id, {
+            'policy_number': f'SCH-{n:05d}',
+            'policy_holder_name': 'تست',
+            'total_amount': 12_000_000,
+            'start_date': datetime(2024, 9, 21),
+            'end_date': datetime(2025, 9, 21),
+        })
+        assert success, message
+        policy_ids.append(policy.id)
+
+    inst_ctrl = InstallmentController(session)
+    success, message, installments = inst_ctrl.create_installments_batch(
+        policy_ids[0], 12_000_000, 4, datetime(2024, 9, 21), plan='quarterly',
+        down_payment=2_000_000, round_to=10_000)
+    assert success, message
+    assert [i.amount for i in installments] == [2_500_000] * 4
+    # 1403/06/31 -> 1403/09/30
+    assert installments[1].due_date == datetime(2024, 12, 20)
+
+    specs = [{'policy_id': pid, 'total_amount': 12_000_000, 'num_installments': 12,
+              'start_date': datetime(2024, 9, 21) + timedelta(days=pid % 40),
+              'down_payment': 1_000_001}
+             for pid in policy_ids[1:]]
+    started = time.perf_counter()
+    success, message, count = inst_ctrl.create_schedules_bulk(specs)
+    elapsed = time.perf_counter() - started
+    assert success, message
+    assert count == len(specs) * 12
+    assert session.scalar(select(func.count()).select_from(Installment)) == count + 4
+
+    balance = session.get(PolicyBalance, policy_ids[1])
+    assert balance.installment_count == 12 and balance.total_remaining == 10_999_999
+    print(f"✓ Controller ({count:,} installments bulk-created in {elapsed:.2f} s)")
+
+
+if __name__ == '__main__':
+    try:
+        test_monthly_dates()
+        test_amounts()
+        test_controller()
+        print("\n✅ All installment schedule tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Test the precomputed Jalali calendar table"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jdatetime
+import numpy as np
+from src.utils.jalali_calendar import JalaliCalendar, get_jalali_calendar, FIRST_YEAR, LAST_YEAR
+from src.utils.helpers import (add_months_to_jalali_date, generate_installments,
+                               jalali_to_gregorian, gregorian_to_jalali,
+                               is_date_in_range, compare_dates)
+
+
+def test_table_matches_library():
+    """Every day of 1300-1500 converts like jdatetime, in both directions"""
+    calendar = get_jalali_calendar()
+    assert len(calendar.month_length) == (LAST_YEAR - FIRST_YEAR + 1) * 12
+
+    day = calendar.month_range(FIRST_YEAR, 1)[0]
+    last = calendar.month_range(LAST_YEAR, 12)[1]
+    assert day == jdatetime.date(FIRST_YEAR, 1, 1).togregorian()
+    while day <= last:
+        j = jdatetime.date.fromgregorian(date=day)
+        assert calendar.to_jalali(day) == (j.year, j.month, j.day), day
+        assert calendar.to_gregorian(j.year, j.month, j.day) == day
+        assert calendar.weekday(day) == j.weekday()
+        day += timedelta(days=1)
+
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        assert calendar.is_leap(year) == jdatetime.date(year, 1, 1).isleap()
+        assert calendar.days_in_month(year, 12) == (30 if calendar.is_leap(year) else 29)
+        assert calendar.first_weekday_of(year, 7) == jdatetime.date(year, 7, 1).weekday()
+    print("✓ Table matches jdatetime for every day")
+
+
+def test_month_arithmetic():
+    """Adding months keeps the Jalali day, clamped to short months"""
+    calendar = get_jalali_calendar()
+    assert calendar.add_months(1403, 6, 31, 1) == (1403, 7, 30)
+    assert calendar.add_months(1403, 12, 30, 12) == (1404, 12, 29)
+    assert calendar.add_months(1403, 1, 15, -1) == (1402, 12, 15)
+    assert calendar.add_months(1402, 11, 30, 1) == (1402, 12, 29)
+    assert calendar.add_months(1400, 1, 1, 120) == (1410, 1, 1)
+
+    start = datetime(2024, 9, 21, 10, 30)  # 1403/06/31
+    assert calendar.add_months_to_date(start, 1) == datetime(2024, 10, 21, 10, 30)
+    assert calendar.add_months_to_date(start.date(), 2) == date(2024, 11, 20)
+    assert calendar.months_between(date(2024, 3, 20), date(2025, 3, 21)) == 12
+
+    assert calendar.month_range(1403, 12) == (date(2025, 2, 19), date(2025, 3, 20))
+    assert calendar.format(datetime(2024, 3, 20)) == '1403/01/01'
+
+    for bad in (lambda: calendar.to_gregorian(1402, 12, 30),
+                lambda: calendar.add_months(LAST_YEAR, 12, 1, 1),
+                lambda: calendar.to_jalali(date(1900, 1, 1)),
+                lambda: calendar.month_index(1403, 13)):
+        try:
+            bad()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected ValueError")
+    print("✓ Month arithmetic")
+
+
+def test_vectorized():
+    """Array conversion agrees with scalar conversion"""
+    calendar = get_jalali_calendar()
+    ordinals = np.arange(calendar.first_ordinal, calendar.end_ordinal, 37)
+    years, months, days = calendar.to_jalali_arrays(ordinals)
+    for i in range(0, len(ordinals), 11):
+        assert calendar.to_jalali(date.fromordinal(int(ordinals[i]))) == (years[i], months[i], days[i])
+    keys = calendar.month_keys(ordinals)
+    assert (np.diff(keys) >= 0).all()
+    print("✓ Vectorized conversion")
+
+
+def test_helpers():
+    """Function-style helpers use the table"""
+    assert add_months_to_jalali_date(1403, 6, 31, 1) == (1403, 7, 30)
+    assert jalali_to_gregorian(1403, 1, 1) == datetime(2024, 3, 20)
+    assert jalali_to_gregorian(1402, 12, 30) is None
+    assert gregorian_to_jalali(datetime(2024, 3, 20)) == '1403/01/01'
+    assert gregorian_to_jalali('2024-03-20') == ''
+
+    schedule = generate_installments(1000, 3, datetime(2024, 9, 21))
+    assert [i['amount'] for i in schedule] == [334, 333, 333]
+    assert [i['due_date'] for i in schedule] == [
+        datetime(2024, 9, 21), datetime(2024, 10, 21), datetime(2024, 11, 20)
+    ]
+
+    assert is_date_in_range(datetime(2024, 1, 5, 23), date(2024, 1, 5), date(2024, 1, 5))
+    assert not is_date_in_range(date(2024, 1, 6), end=date(2024, 1, 5))
+    assert compare_dates(datetime(2024, 1, 5, 8), date(2024, 1, 5)) == 0
+    assert compare_dates(date(2024, 1, 4), date(2024, 1, 5)) == -1
+    print("✓ Helpers")
+
+
+if __name__ == '__main__':
+    try:
+        test_table_matches_library()
+        test_month_arithmetic()
+        test_vectorized()
+        test_helpers()
+        print("\n✅ All Jalali calendar tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
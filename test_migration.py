@@ -16,9 +16,10 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 
 def cleanup_database():
-    """Remove test database if it exists."""
-    if os.path.exists('test_migration.db'):
-        os.remove('test_migration.db')
+    """Remove test database (and its WAL files) if it exists."""
+    for path in ('test_migration.db', 'test_migration.db-wal', 'test_migration.db-shm'):
+        if os.path.exists(path):
+            os.remove(path)
 
 
 def create_old_schema(db_path):
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Test integer-rial money storage and installment splitting"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, Installment, PolicyBalance, to_rials, split_amount
+from src.controllers import PolicyController, InstallmentController
+from src.utils.report_engine import ReportEngine
+
+
+def make_session():
+    """Create an in-memory database session with one user"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='money', password_hash='x', full_name='Money Test')
+    session.add(user)
+    session.commit()
+    return session, user
+
+
+def test_to_rials():
+    """Amounts are rounded half-up once, to whole rials"""
+    assert to_rials(1000) == 1000
+    assert to_rials(1000.0) == 1000
+    assert to_rials(1000.5) == 1001
+    assert to_rials(2.5) == 3  # not banker's rounding
+    assert to_rials('1999.49') == 1999
+    assert to_rials(None) == 0
+    assert to_rials(-2.5) == -3
+    print("✓ to_rials rounds half-up")
+
+
+def test_split_amount():
+    """Largest remainder split adds up exactly"""
+    assert split_amount(1000, 3) == [334, 333, 333]
+    assert split_amount(100, 4) == [25, 25, 25, 25]
+    assert split_amount(10, 3, weights=[1, 1, 2]) == [3, 2, 5]
+    assert split_amount(5, 7) == [1, 1, 1, 1, 1, 0, 0]
+
+    for total in (1, 999, 1000001, 123456789):
+        for parts in (1, 3, 7, 12, 36):
+            amounts = split_amount(total, parts)
+            assert sum(amounts) == total
+            assert max(amounts) - min(amounts) <= 1
+
+    for bad in ((100, 0), (100, 2, [1]), (100, 2, [0, 0]), (100, 2, [0.5, 0.5])):
+        try:
+            split_amount(*bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"split_amount{bad} should fail")
+    print("✓ split_amount distributes the remainder")
+
+
+def test_money_columns():
+    """Amounts are stored as INTEGER and batch schedules add up to the total"""
+    session, user = make_session()
+    success, message, policy = PolicyController(session).create_policy(user.id, {
+        'policy_number': 'MONEY-001',
+        'policy_holder_name': 'تست مبلغ',
+        'total_amount': 10000000.0,
+        'down_payment': 0.4,
+        'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    })
+    assert success, message
+    success, message, installments = InstallmentController(session).create_installments_batch(
+        policy.id, 10000000, 3, datetime.now() + timedelta(days=30)
+    )
+    assert success, message
+
+    amounts = [inst.amount for inst in installments]
+    assert amounts == [3333334, 3333333, 3333333]
+    assert all(type(a) is int for a in amounts)
+
+    types = session.execute(text("SELECT DISTINCT typeof(amount) FROM installments")).scalars().all()
+    assert types == ['integer']
+    assert session.execute(text("SELECT typeof(down_payment) FROM policies")).scalar() == 'integer'
+
+    total = session.query(func.sum(Installment.amount)).scalar()
+    assert total == 10000000 and type(total) is int
+    balance = session.get(PolicyBalance, policy.id)
+    assert balance.total_pending == 10000000 and type(balance.total_pending) is int
+
+    stats = InstallmentController(session).get_installment_statistics()
+    assert stats['total_pending'] == 10000000 and type(stats['total_pending']) is int
+
+    report = ReportEngine(session).installment_report()
+    assert str(report['مبلغ'].dtype) == 'int64'
+    assert report['مبلغ'].sum() == 10000000
+    summary = ReportEngine(session).policy_summary()
+    assert str(summary['مجموع باقی‌مانده'].dtype) == 'int64'
+    print("✓ Amounts stored and aggregated as integers")
+
+
+def test_format_currency_rounds():
+    """Currency formatting rounds instead of truncating"""
+    from src.utils.persian_utils import format_currency
+
+    assert format_currency(1999.6) == "۲,۰۰۰ ریال"
+    assert format_currency(1234567) == "۱,۲۳۴,۵۶۷ ریال"
+    print("✓ format_currency rounds to the rial")
+
+
+def test_migration_converts_amounts():
+    """Migration 004 rounds legacy float amounts per policy and retypes the columns"""
+    import sqlite3
+    import tempfile
+    from src.migrations import MigrationManager
+
+    path = os.path.join(tempfile.mkdtemp(), 'old.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY);
+        CREATE TABLE policies (id INTEGER NOT NULL, total_amount FLOAT NOT NULL,
+                               created_at DATETIME, PRIMARY KEY (id));
+        CREATE TABLE installments (id INTEGER NOT NULL,
+                                   policy_id INTEGER NOT NULL REFERENCES policies(id),
+                                   installment_number INTEGER, amount FLOAT NOT NULL,
+                                   due_date DATETIME, status VARCHAR(20), PRIMARY KEY (id));
+        CREATE TABLE reminders (id INTEGER PRIMARY KEY,
+                                installment_id INTEGER REFERENCES installments(id));
+        INSERT INTO policies VALUES (1, 1000.0, NULL), (2, 700.0, NULL);
+        INSERT INTO installments VALUES
+            (1, 1, 1, 333.3333333333, '2024-01-01', 'paid'),
+            (2, 1, 2, 333.3333333333, '2024-02-01', 'pending'),
+            (3, 1, 3, 333.3333333334, '2024-03-01', 'pending'),
+            (4, 2, 1, 700.0, '2024-01-01', 'overdue');
+        INSERT INTO reminders VALUES (1, 2);
+    """)
+    conn.commit()
+    conn.close()
+
+    MigrationManager(path).run_migrations()
+    MigrationManager(path).run_migrations()
+
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id, amount, typeof(amount) FROM installments ORDER BY id").fetchall()
+    assert rows == [(1, 333, 'integer'), (2, 333, 'integer'), (3, 334, 'integer'), (4, 700, 'integer')]
+    balances = conn.execute(
+        "SELECT policy_id, total_paid, total_pending, total_overdue FROM policy_balances ORDER BY policy_id"
+    ).fetchall()
+    assert balances == [(1, 333, 667, 0), (2, 0, 0, 700)]
+    declared = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(policies)")}
+    assert declared['total_amount'] == 'INTEGER' and declared['down_payment'] == 'INTEGER'
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert 'ix_installments_due_date_id' in indexes
+    assert conn.execute("SELECT installment_id FROM reminders").fetchone() == (2,)
+    conn.close()
+    print("✓ Migration 004 converts existing amounts")
+
+
+if __name__ == '__main__':
+    try:
+        test_to_rials()
+        test_split_amount()
+        test_money_columns()
+        test_format_currency_rounds()
+        test_migration_converts_amounts()
+        print("\n✅ All money tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
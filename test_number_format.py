@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Test Persian number and currency formatting"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from src.utils import number_format
+from src.utils.number_format import to_persian_digits, format_currency, format_currency_column
+from src.utils.persian_utils import format_persian_number
+
+
+def reference(amount):
+    """Straightforward formatting the fast paths must match"""
+    digits = '{:,}'.format(amount)
+    for western, persian in zip('0123456789', '۰۱۲۳۴۵۶۷۸۹'):
+        digits = digits.replace(western, persian)
+    return f"{digits} ریال"
+
+
+def test_digits():
+    """Digits are translated, everything else is kept"""
+    assert to_persian_digits(1402) == '۱۴۰۲'
+    assert to_persian_digits('1402/05/03') == '۱۴۰۲/۰۵/۰۳'
+    assert to_persian_digits('٣ قسط') == '۳ قسط'
+    assert format_persian_number(25) == '۲۵'
+    print("✓ Digits translated")
+
+
+def test_scalar_currency():
+    """Scalar formatting matches the reference, with and without the memo"""
+    values = [0, 7, 999, 1000, 1001, 999999, 1000000, -1, -1234567, 10**15]
+    rng = random.Random(3)
+    values += [rng.randrange(-10**12, 10**12) for _ in range(2000)]
+    for value in values:
+        assert format_currency(value) == reference(value), value
+        assert format_currency(value, memo=False) == reference(value), value
+
+    assert format_currency(None) == '۰ ریال'
+    assert format_currency(1999.6) == '۲,۰۰۰ ریال'
+    assert format_currency('2500') == '۲,۵۰۰ ریال'
+
+    number_format.clear_memo()
+    for _ in range(3):
+        format_currency(1500000)
+    info = number_format.memo_info()
+    assert info.hits == 2 and info.misses == 1
+    print("✓ Scalar currency formatting")
+
+
+def test_column_currency():
+    """Column formatting matches scalar formatting for every input kind"""
+    rng = random.Random(5)
+    ints = [rng.randrange(-10**10, 10**10) for _ in range(5000)] + [0, 5, 1000, -1000]
+    expected = [reference(v) for v in ints]
+
+    for memo in (True, False):
+        assert format_currency_column(ints, memo=memo) == expected
+        assert format_currency_column(np.array(ints, dtype=np.int64), memo=memo) == expected
+
+    series = pd.Series(ints, index=range(100, 100 + len(ints)), name='amount')
+    formatted = format_currency_column(series)
+    assert isinstance(formatted, pd.Series)
+    assert formatted.index.equals(series.index) and formatted.name == 'amount'
+    assert formatted.tolist() == expected
+
+    floats = pd.Series([1000.4, 1000.5, None, float('nan'), -2.5])
+    assert format_currency_column(floats).tolist() == [
+        '۱,۰۰۰ ریال', '۱,۰۰۱ ریال', '۰ ریال', '۰ ریال', '-۳ ریال'
+    ]
+    assert format_currency_column([]) == []
+    assert format_currency_column([1234], suffix='') == ['۱,۲۳۴']
+
+    # Larger than one internal chunk
+    many = np.tile(np.array([1500000, 2750000, 333333], dtype=np.int64), 70000)
+    result = format_currency_column(many, memo=False)
+    assert len(result) == len(many) and result[-1] == reference(333333)
+    print("✓ Column currency formatting")
+
+
+if __name__ == '__main__':
+    try:
+        test_digits()
+        test_scalar_currency()
+        test_column_currency()
+        print("\n✅ All number formatting tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Test per-policy overdue aggregation, paging and the lazy overdue tree"""
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.controllers import InstallmentController
+from src.ui.overdue_installments_widget import OVERDUE_THRESHOLD_DAYS
+
+
+def make_book(policies, installments=4):
+    """One user's book (policy 1 onwards); higher policy ids fall further behind"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='overdue', password_hash='x', full_name='Overdue Test')
+    other = User(username='other', password_hash='x', full_name='Other')
+    session.add_all([user, other])
+    session.flush()
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id if p else other.id, 'policy_number': f'OD-{p:05d}',
+         'policy_holder_name': 'تست', 'policy_type': 'بدنه', 'total_amount': 4000000,
+         'start_date': today, 'end_date': today + timedelta(days=365)}
+        for p in range(policies)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 100000 * (n + 1),
+         'due_date': today - timedelta(days=40 + p % 500 - 30 * n),
+         'status': 'paid' if (p + n) % 5 == 0 else 'pending'}
+        for p in range(policies) for n in range(installments)
+    ])
+    session.commit()
+    return session, user.id
+
+
+def overdue_installment_ids(session, policy_id):
+    """Ids of a policy's installments shown in the overdue tree"""
+    return [row.id for row in InstallmentController(session).get_policy_overdue_installments(
+        policy_id, OVERDUE_THRESHOLD_DAYS)]
+
+
+def test_aggregation_and_paging():
+    """Per-policy totals match the rows; pages walk the book most severe first"""
+    session, user_id = make_book(300)
+    controller = InstallmentController(session)
+    threshold = datetime.now() - timedelta(days=OVERDUE_THRESHOLD_DAYS)
+
+    expected = defaultdict(lambda: [0, 0, None])
+    for inst in session.query(Installment).join(InsurancePolicy).filter(
+            InsurancePolicy.user_id == user_id):
+        if inst.status != 'paid' and inst.due_date < threshold:
+            group = expected[inst.policy_id]
+            group[0] += 1
+            group[1] += inst.amount
+            group[2] = min(group[2] or inst.due_date, inst.due_date)
+
+    groups, token, pages = [], None, 0
+    while True:
+        page = controller.get_overdue_policies_page(user_id, OVERDUE_THRESHOLD_DAYS, 50, token)
+        groups.extend(page.items)
+        pages += 1
+        token = page.next_token
+        if not token:
+            break
+    assert pages == (len(expected) + 49) // 50
+    assert {g.policy_id for g in groups} == set(expected)
+    for g in groups:
+        assert [g.overdue_count, g.overdue_amount, g.oldest_due_date] == expected[g.policy_id]
+    keys = [(g.oldest_due_date, g.policy_id) for g in groups]
+    assert keys == sorted(keys)
+    print("✓ Per-policy aggregation and severity paging")
+
+    summary = controller.get_overdue_summary(user_id, OVERDUE_THRESHOLD_DAYS)
+    assert summary['policies'] == len(expected)
+    assert summary['installments'] == sum(g[0] for g in expected.values())
+    assert summary['amount'] == sum(g[1] for g in expected.values())
+
+    rows = controller.get_policy_overdue_installments(groups[0].policy_id, OVERDUE_THRESHOLD_DAYS)
+    assert len(rows) == groups[0].overdue_count
+    assert [r.installment_number for r in rows] == sorted(r.installment_number for r in rows)
+    assert all(r.status != 'paid' and r.due_date < threshold for r in rows)
+    print("✓ Summary and policy installments")
+    session.close()
+
+
+def test_widget_large_book():
+    """The tree materializes one page of policies and expands lazily"""
+    from PyQt5.QtWidgets import QApplication, QLabel
+    from src.ui.overdue_installments_widget import (OverdueInstallmentsWidget, POLICY_PAGE_SIZE,
+                                                    ROW_ROLE)
+    from src.ui.dashboard_widget import DashboardWidget
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    session, user_id = make_book(10_001)
+    user = session.get(User, user_id)
+
+    started = time.perf_counter()
+    widget = OverdueInstallmentsWidget(user, session)
+    elapsed = time.perf_counter() - started
+    print(f"   10k overdue policies rendered in {elapsed:.2f}s")
+    assert elapsed < 5
+
+    tree = widget.tree
+    assert tree.topLevelItemCount() == POLICY_PAGE_SIZE
+    assert all(tree.topLevelItem(i).childCount() == 0 for i in range(POLICY_PAGE_SIZE))
+    summary = InstallmentController(session).get_overdue_summary(user_id, OVERDUE_THRESHOLD_DAYS)
+    assert summary['policies'] > 9000
+    assert widget.summary_label.text().startswith(f"{summary['policies']} بیمه‌نامه")
+
+    first = tree.topLevelItem(0)
+    first.setExpanded(True)
+    group = first.data(0, ROW_ROLE)
+    assert first.childCount() == group.overdue_count
+    first.setExpanded(False)
+    first.setExpanded(True)
+    assert first.childCount() == group.overdue_count  # loaded once
+
+    widget.load_more_policies()
+    assert tree.topLevelItemCount() == 2 * POLICY_PAGE_SIZE
+    assert widget.more_btn.isVisibleTo(widget)
+    print("✓ Overdue tree pages and lazy expansion")
+
+    # A payment patches its policy's group in place: loaded pages and
+    # expanded groups survive, other rows are untouched
+    items = [tree.topLevelItem(i) for i in range(tree.topLevelItemCount())]
+    target = next(item for item in items[POLICY_PAGE_SIZE:]
+                  if item.data(0, ROW_ROLE).overdue_count > 1)
+    target.setExpanded(True)
+    group = target.data(0, ROW_ROLE)
+    paid_id = target.child(target.childCount() - 1).data(0, ROW_ROLE).id  # keeps its position
+    others = [item for item in items if item is not target]
+    cleared = others[0]
+    cleared_ids = overdue_installment_ids(session, cleared.data(0, ROW_ROLE).policy_id)
+
+    with mock.patch.object(widget, 'load_overdue_installments') as reload, \
+            mock.patch('src.utils.NotificationManager'):
+        InstallmentController(session).mark_as_paid(paid_id)
+        for installment_id in cleared_ids:
+            InstallmentController(session).mark_as_paid(installment_id)
+    assert not reload.called
+    assert tree.topLevelItemCount() == 2 * POLICY_PAGE_SIZE - 1
+    assert widget.policy_items[group.policy_id] is target
+    assert cleared.data(0, ROW_ROLE).policy_id not in widget.policy_items
+    assert target.isExpanded()
+    assert target.data(0, ROW_ROLE).overdue_count == group.overdue_count - 1
+    assert target.childCount() == group.overdue_count - 1
+    assert paid_id not in [target.child(i).data(0, ROW_ROLE).id for i in range(target.childCount())]
+    keys = [(tree.topLevelItem(i).data(0, ROW_ROLE).oldest_due_date,
+             tree.topLevelItem(i).data(0, ROW_ROLE).policy_id)
+            for i in range(tree.topLevelItemCount())]
+    assert keys == sorted(keys)
+    assert all(tree.indexOfTopLevelItem(item) >= 0 for item in others if item is not cleared)
+    summary = InstallmentController(session).get_overdue_summary(user_id, OVERDUE_THRESHOLD_DAYS)
+    assert widget.summary_label.text().startswith(f"{summary['policies']} بیمه‌نامه")
+
+    # Paying its oldest installment moves the group past the loaded pages
+    with mock.patch('src.utils.NotificationManager'):
+        InstallmentController(session).mark_as_paid(target.child(0).data(0, ROW_ROLE).id)
+    assert group.policy_id not in widget.policy_items
+    assert tree.topLevelItemCount() == 2 * POLICY_PAGE_SIZE - 2
+    print("✓ Payments patch their policy group in place")
+
+    # The dashboard card counts every unpaid past-due installment, not only
+    # the ones flagged by this call
+    dashboard = DashboardWidget(user, session)
+    summary = InstallmentController(session).get_overdue_summary(user_id)
+    card = dashboard.pending_installments_card.findChild(QLabel, "value_label")
+    assert card.text() == str(summary['installments'])
+    print("✓ Dashboard overdue card")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_aggregation_and_paging()
+        test_widget_large_book()
+        print("\n✅ All overdue group tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
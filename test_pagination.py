@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Test keyset pagination of the list APIs"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment, Reminder
+from src.models.pagination import Page, iter_pages, encode_token
+from src.controllers import PolicyController, InstallmentController, ReminderController
+
+
+def make_book(policies=250, installments=10):
+    """In-memory database whose due dates and creation times tie a lot"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='pages', password_hash='x', full_name='Page Test')
+    session.add(user)
+    session.flush()
+    start = datetime(2024, 3, 1)
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id, 'policy_number': f'PG-{p:05d}', 'policy_holder_name': 'تست',
+         'total_amount': 1000000, 'start_date': start, 'end_date': start + timedelta(days=365),
+         'created_at': start + timedelta(days=p // 7)}
+        for p in range(policies)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 100000,
+         'due_date': start + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(policies) for n in range(installments)
+    ])
+    session.execute(insert(Reminder), [
+        {'user_id': user.id, 'title': f'r{r}', 'status': 'pending',
+         'scheduled_date': start + timedelta(days=r // 3)}
+        for r in range(95)
+    ])
+    session.commit()
+    return session, user.id
+
+
+def test_pages_cover_listing():
+    """Walking the pages yields the full ordered listing exactly once"""
+    session, user_id = make_book()
+    controller = InstallmentController(session)
+    start, end = datetime(2024, 1, 1), datetime(2026, 1, 1)
+
+    expected = [i.id for i in session.query(Installment).order_by(Installment.due_date, Installment.id)]
+    seen, token, pages = [], None, 0
+    while True:
+        page = controller.get_installments_by_date_range_page(start, end, user_id=user_id,
+                                                              page_size=99, page_token=token)
+        assert isinstance(page, Page) and len(page.items) <= 99
+        seen.extend(i.id for i in page.items)
+        pages += 1
+        token = page.next_token
+        if token is None:
+            break
+        assert isinstance(token, str) and 'due_date' not in token
+    assert seen == expected and len(seen) == 2500
+    assert pages == 26
+
+    numbers = [i.installment_number for i in iter_pages(
+        controller.get_policy_installments_page, policy_id=7, page_size=3)]
+    assert numbers == list(range(1, 11))
+    print(f"✓ {len(seen)} installments in {pages} pages, no gaps or duplicates")
+    session.close()
+
+
+def test_descending_listings():
+    """Policies and reminders page newest first"""
+    session, user_id = make_book()
+
+    policies = list(iter_pages(PolicyController(session).get_all_policies_page,
+                               user_id=user_id, page_size=40))
+    keys = [(p.created_at, p.id) for p in policies]
+    assert len(policies) == 250 and keys == sorted(keys, reverse=True)
+
+    reminders = list(iter_pages(ReminderController(session).get_user_reminders_page,
+                                user_id=user_id, page_size=10))
+    keys = [(r.scheduled_date, r.id) for r in reminders]
+    assert len(reminders) == 95 and keys == sorted(keys, reverse=True)
+
+    last = ReminderController(session).get_user_reminders_page(user_id, page_size=95)
+    assert len(last.items) == 95 and last.next_token is None
+    print("✓ Descending policy and reminder listings")
+    session.close()
+
+
+def test_bad_tokens():
+    """Malformed or foreign tokens give an empty page instead of wrong rows"""
+    session, user_id = make_book(policies=5)
+    controller = InstallmentController(session)
+
+    assert controller.get_policy_installments_page(1, page_token='not-a-token') == Page([], None)
+    foreign = encode_token('policies', [datetime(2024, 3, 1), 3])
+    assert controller.get_policy_installments_page(1, page_token=foreign) == Page([], None)
+    other_policy = controller.get_policy_installments_page(2, page_size=2).next_token
+    assert controller.get_policy_installments_page(1, page_token=other_policy) == Page([], None)
+    print("✓ Bad and foreign tokens rejected")
+    session.close()
+
+
+def test_seek_uses_index():
+    """Pages are fetched with a row-value seek on an index, never by skipping rows"""
+    session, user_id = make_book()
+    statements = []
+
+    @event.listens_for(session.get_bind(), 'before_cursor_execute')
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    controller = InstallmentController(session)
+    first = controller.get_installments_by_date_range_page(datetime(2024, 1, 1), datetime(2026, 1, 1),
+                                                           page_size=50)
+    controller.get_installments_by_date_range_page(datetime(2024, 1, 1), datetime(2026, 1, 1),
+                                                   page_size=50, page_token=first.next_token)
+    sql, params = statements[-1]
+    assert params[-1] == 0, params  # SQLite renders "LIMIT ? OFFSET ?" with a zero offset
+    assert '(installments.due_date, installments.id) >' in sql, sql
+
+    plan = session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    detail = ' '.join(row[-1] for row in plan)
+    assert 'ix_installments_due_date_id' in detail, detail
+    assert 'TEMP B-TREE' not in detail, detail
+    print(f"✓ Seek plan: {detail}")
+    session.close()
+
+
+def test_migration_adds_indexes():
+    """Migration 003 adds the indexes to databases created before them"""
+    import sqlite3
+    import tempfile
+    from src.migrations import MigrationManager
+
+    path = os.path.join(tempfile.mkdtemp(), 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TABLE installments (id INTEGER PRIMARY KEY, policy_id INTEGER, "
+                 "installment_number INTEGER, amount FLOAT, due_date DATETIME, status VARCHAR(20))")
+    conn.execute("CREATE TABLE policies (id INTEGER PRIMARY KEY, created_at DATETIME)")
+    conn.execute("CREATE TABLE reminders (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+
+    MigrationManager(path).run_migrations()
+    MigrationManager(path).run_migrations()
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    conn.close()
+    assert {'ix_installments_due_date_id', 'ix_installments_policy_number_id',
+            'ix_policies_created_at_id', 'ix_reminders_user_scheduled_id'} <= names
+    print("✓ Migration 003 adds keyset indexes")
+
+
+if __name__ == '__main__':
+    try:
+        test_pages_cover_listing()
+        test_descending_listings()
+        test_bad_tokens()
+        test_seek_uses_index()
+        test_migration_adds_indexes()
+        print("\n✅ All pagination tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
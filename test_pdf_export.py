@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Test paginated PDF export with Persian font support"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_pdf_export():
+    """Test that large exports are chunked per page and shaping is memoized"""
+    import pandas as pd
+    from reportlab.platypus import SimpleDocTemplate, Table, PageBreak
+    from src.utils.pdf_export import PDFExporter, register_vazir_font, ROWS_PER_PAGE
+    from src.utils.export import export_installments_to_pdf
+
+    print("=" * 70)
+    print("Paginated PDF Export Test")
+    print("=" * 70)
+
+    # 1. Font registration happens once per process
+    fonts = register_vazir_font()
+    assert fonts == register_vazir_font(), "Font registration should be cached"
+    assert fonts[0] == 'Vazir', f"Vazir font should be registered, got {fonts}"
+    print(f"✓ Fonts registered: {fonts}")
+
+    # 2. Shaping is memoized and skips pure ASCII
+    from src.utils.text_shaping import PersianTextShaper
+    shaper = PersianTextShaper(maxsize=2)
+    assert shaper.shape('TEST-001') == 'TEST-001'
+    shaper.shape('پرداخت شده')
+    shaper.shape('پرداخت شده')
+    info = shaper.cache_info()
+    assert info['hits'] == 1, "Repeated strings should be served from the cache"
+    shaper.shape('پرداخت نشده')
+    assert shaper.cache_info()['size'] == 2, "Cache should stay within maxsize"
+    print(f"✓ Shaping cache: {shaper.cache_info()}")
+
+    # 3. Batch API shapes each unique value once and maps results back
+    shaper.clear()
+    column = ['معوق', 'معوق', 'پرداخت شده', None, 'معوق']
+    shaped = shaper.shape_many(column)
+    assert len(shaped) == len(column)
+    assert shaped[0] == shaped[1] == shaped[4]
+    assert shaped[3] == ''
+    assert shaper.cache_info()['misses'] == 3, "Only unique values should be reshaped"
+    assert shaper.warm(column) == 3
+
+    # Missing values in a Series (object or categorical) become '' rather than 'nan'
+    for series in (pd.Series(column + [float('nan')]),
+                   pd.Series(column + [float('nan')], dtype='category')):
+        shaped_series = shaper.shape_many(series)
+        assert shaped_series.tolist() == shaped + ['']
+        assert shaped_series.dtype == object
+    assert 'nan' not in shaper._cache and 'None' not in shaper._cache
+    print("✓ Batch shaping maps unique values back to the column")
+
+    # 4. Rows are split into page-sized table chunks
+    exporter = PDFExporter(rows_per_page=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'chunks.pdf')
+        doc = SimpleDocTemplate(filename)
+        rows = ([f'P-{i}', 'علی رضایی', str(i)] for i in range(25))
+        elements = exporter.build_elements(doc, rows, ['شماره', 'نام', 'قسط'], 'عنوان')
+        tables = [e for e in elements if isinstance(e, Table)]
+        breaks = [e for e in elements if isinstance(e, PageBreak)]
+        assert len(tables) == 3, f"25 rows / 10 per page should give 3 tables, got {len(tables)}"
+        assert not breaks, "Page-sized chunks start new pages without page breaks"
+        print("✓ Rows split into page-sized tables")
+
+        # Rendered pages: one per chunk, no page holding a single spilled row
+        exporter = PDFExporter()
+        for count in (1, 34, 35, 36, 70, 350):
+            doc = SimpleDocTemplate(os.path.join(tmp, f'pages-{count}.pdf'))
+            rows = ([f'P-{i}', 'علی رضایی', str(i)] for i in range(count))
+            elements = exporter.build_elements(doc, rows, ['شماره', 'نام', 'قسط'], 'عنوان')
+            sizes = [len(e._cellvalues) - 1 for e in elements if isinstance(e, Table)]
+            doc.build(elements)
+            assert doc.page == len(sizes), f"{count} rows: {doc.page} pages for {len(sizes)} chunks"
+            assert all(size == sizes[1] for size in sizes[1:-1]), sizes
+            assert max(sizes) <= ROWS_PER_PAGE
+            if count > 1:
+                assert sizes[0] >= 30, "The first page is filled below the title"
+        assert doc.page == 1 + -(-(350 - sizes[0]) // ROWS_PER_PAGE)
+        print(f"✓ Rendered page counts match the chunks ({sizes[0]} rows under the title)")
+
+        # 5. End-to-end export of a larger installment list
+        installments = [{
+            'policy_number': f'P-{i % 500}',
+            'insured_name': 'محمد کریمی',
+            'installment_number': i % 12 + 1,
+            'due_date': '1403/05/12',
+            'amount': 1500000,
+            'status': 'paid' if i % 2 else 'pending',
+        } for i in range(2000)]
+        filename = os.path.join(tmp, 'installments.pdf')
+        export_installments_to_pdf(installments, filename)
+        assert os.path.getsize(filename) > 0, "PDF file should not be empty"
+        print("✓ 2000-row installment PDF exported")
+
+    print("\n✅ PDF export tests passed!")
+
+
+if __name__ == '__main__':
+    try:
+        test_pdf_export()
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Test the materialized policy_balances summary table"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment, PolicyBalance
+from src.controllers import PolicyController, InstallmentController, PolicyBalanceController
+
+
+def make_session():
+    """Create an in-memory database session with one user"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='balance', password_hash='x', full_name='Balance Test')
+    session.add(user)
+    session.commit()
+    return session, user
+
+
+def create_policy(session, user, number, num_installments=4, amount=4000000):
+    """Create a policy with a batch of installments"""
+    success, message, policy = PolicyController(session).create_policy(user.id, {
+        'policy_number': number,
+        'policy_holder_name': 'تست مانده',
+        'total_amount': amount,
+        'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    })
+    assert success, message
+    success, message, installments = InstallmentController(session).create_installments_batch(
+        policy.id, amount, num_installments, datetime.now() + timedelta(days=30), 30
+    )
+    assert success, message
+    return policy, installments
+
+
+def test_policy_balances():
+    """Balances follow every installment write and match a fresh aggregation"""
+    session, user = make_session()
+    balances = PolicyBalanceController(session)
+    inst_ctrl = InstallmentController(session)
+
+    # 1. Creating policy and installments fills the summary row
+    policy, installments = create_policy(session, user, 'BAL-001')
+    balance = balances.get_balance(policy.id)
+    assert balance.installment_count == 4
+    assert balance.pending_count == 4
+    assert abs(balance.total_pending - 4000000) < 0.01
+    assert balance.next_due_date == installments[0].due_date
+    print("✓ Balance row created with installments")
+
+    # 2. mark_as_paid moves the amount from pending to paid
+    success, _ = inst_ctrl.mark_as_paid(installments[0].id)
+    assert success
+    balance = balances.get_balance(policy.id)
+    assert balance.paid_count == 1 and balance.pending_count == 3
+    assert abs(balance.total_paid - 1000000) < 0.01
+    assert balance.next_due_date == installments[1].due_date
+    print("✓ Payment updates paid/pending totals and next due date")
+
+    # 3. Status transitions through update_installment and the overdue sweep
+    inst_ctrl.update_installment(installments[1].id, {'status': 'cancelled'})
+    inst_ctrl.update_installment(installments[2].id, {'due_date': datetime.now() - timedelta(days=5)})
+    inst_ctrl.get_overdue_installments()
+    balance = balances.get_balance(policy.id)
+    assert balance.cancelled_count == 1
+    assert balance.overdue_count == 1
+    assert abs(balance.total_overdue - 1000000) < 0.01
+    print("✓ Status transitions are reflected")
+
+    # 4. Auto-delete after the last payment removes the balance row too
+    policy2, installments2 = create_policy(session, user, 'BAL-002', num_installments=2)
+    for inst in installments2:
+        inst_ctrl.mark_as_paid(inst.id)
+    assert session.query(InsurancePolicy).filter_by(id=policy2.id).first() is None
+    assert session.query(PolicyBalance).filter_by(policy_id=policy2.id).first() is None
+    print("✓ Fully paid policy and its balance row are deleted")
+
+    # 5. Consistency checker detects drift and rebuild repairs it
+    assert balances.check_consistency() == []
+    session.query(PolicyBalance).filter_by(policy_id=policy.id).update({'paid_count': 99})
+    session.commit()
+    mismatches = balances.check_consistency()
+    assert [m['field'] for m in mismatches] == ['paid_count']
+    success, _, count = balances.rebuild()
+    assert success and count == 1
+    assert balances.check_consistency() == []
+
+    # A policy deleted outside the ORM leaves its balance row (no FK cascade in SQLite)
+    policy3, _ = create_policy(session, user, 'BAL-003')
+    policy3_id = policy3.id
+    session.execute(delete(Installment).where(Installment.policy_id == policy3_id))
+    session.execute(delete(InsurancePolicy).where(InsurancePolicy.id == policy3_id))
+    session.commit()
+    assert [m['field'] for m in balances.check_consistency()] == ['orphan']
+    assert balances.rebuild()[2] == 1
+    assert session.get(PolicyBalance, policy3_id) is None
+    print("✓ Consistency checker and rebuild work")
+
+    # 6. Policy summary report reads the summary table
+    from src.utils.report_generator import ReportGenerator
+    df = ReportGenerator(session).generate_policy_summary(user.id)
+    assert len(df) == 1
+    assert df['مجموع پرداخت شده'].iloc[0] == balances.get_balance(policy.id).total_paid
+    print("✓ Policy summary uses maintained balances")
+
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_policy_balances()
+        print("\n✅ All policy balance tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Test the vectorized portfolio analytics against plain per-row computations"""
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+from src.models import Installment, InsurancePolicy
+from src.utils.jalali_calendar import get_jalali_calendar
+from src.utils.portfolio_analytics import PortfolioAnalytics, AGING_BUCKETS, ROLL_STATES
+from src.utils.report_generator import ReportGenerator
+
+from synthetic_book import generate_book
+
+TODAY = datetime(2024, 6, 1)
+
+
+def make_book(installments=3000):
+    engine = create_engine('sqlite:///:memory:')
+    generate_book(engine, installments=installments, users=2, seed=11, today=TODAY)
+    session = sessionmaker(bind=engine)()
+    rows = session.query(
+        Installment.amount, Installment.due_date, Installment.payment_date, Installment.status,
+        InsurancePolicy.insurance_company, InsurancePolicy.policy_type, InsurancePolicy.user_id
+    ).join(InsurancePolicy, InsurancePolicy.id == Installment.policy_id).all()
+    return engine, session, rows
+
+
+def bucket_of(days_late):
+    for bucket, upper in zip(AGING_BUCKETS, (30, 60, 90)):
+        if days_late <= upper:
+            return bucket
+    return AGING_BUCKETS[-1]
+
+
+def state_of(row, day):
+    if row.status == 'paid' and (row.payment_date is None or row.payment_date.date() <= day):
+        return 'paid'
+    days_late = (day - row.due_date.date()).days
+    return 'current' if days_late <= 0 else bucket_of(days_late)
+
+
+def test_matches_reference():
+    """Every analysis matches a straightforward per-row computation"""
+    engine, session, rows = make_book()
+    analytics = PortfolioAnalytics(session)
+    today = TODAY.date()
+
+    expected = defaultdict(int)
+    for row in rows:
+        if row.status not in ('paid', 'cancelled') and row.due_date.date() < today:
+            expected[bucket_of((today - row.due_date.date()).days)] += row.amount
+    aging = analytics.aging(today)
+    assert aging['bucket'].tolist() == list(AGING_BUCKETS)
+    assert aging['amount'].tolist() == [expected[b] for b in AGING_BUCKETS]
+    assert expected and abs(aging['share'].sum() - 1) < 1e-9
+    print("✓ Aging buckets")
+
+    due, collected = defaultdict(int), defaultdict(int)
+    for row in rows:
+        if row.status != 'cancelled' and row.due_date.date() <= today:
+            key = (row.insurance_company or '', row.policy_type or '')
+            due[key] += row.amount
+            if state_of(row, today) == 'paid':
+                collected[key] += row.amount
+    rates = analytics.collection_rate(as_of=today)
+    assert len(rates) == len(due)
+    for r in rates.itertuples():
+        key = (r.insurance_company, r.policy_type)
+        assert r.due_amount == due[key] and r.collected_amount == collected[key], key
+    assert rates['collection_rate'].is_monotonic_increasing
+    by_type = analytics.collection_rate(by=('policy_type',), as_of=today)
+    assert by_type['due_amount'].sum() == sum(due.values())
+    print("✓ Collection rates")
+
+    calendar = get_jalali_calendar()
+    months = defaultdict(int)
+    for row in rows:
+        if row.status not in ('paid', 'cancelled') and row.due_date.date() >= today:
+            year, month, _ = calendar.to_jalali(row.due_date)
+            months[f"{year}/{month:02d}"] += row.amount
+    cash_in = analytics.expected_cash_in(months=6, as_of=today)
+    assert cash_in['month'].tolist()[0] == '1403/03'
+    assert cash_in['amount'].tolist() == [months[m] for m in cash_in['month']]
+    print("✓ Expected cash-in per Jalali month")
+
+    previous = today - timedelta(days=30)
+    transitions = defaultdict(int)
+    for row in rows:
+        if row.status != 'cancelled':
+            transitions[(state_of(row, previous), state_of(row, today))] += 1
+    matrix, roll = analytics.roll_rates(as_of=today)
+    for before in ROLL_STATES:
+        for after in ROLL_STATES:
+            assert matrix.loc[before, after] == transitions[(before, after)], (before, after)
+    first = roll.iloc[0]
+    total = sum(transitions[('1-30', after)] for after in ROLL_STATES)
+    assert first['count'] == total
+    assert abs(first['roll_rate'] - transitions[('1-30', '31-60')] / total) < 1e-12
+    print("✓ Roll rates")
+
+
+def test_cache():
+    """Results are reused until the data version changes"""
+    engine, session, rows = make_book(1000)
+    analytics = PortfolioAnalytics(session)
+    today = TODAY.date()
+
+    with mock.patch.object(PortfolioAnalytics, '_load', wraps=analytics._load) as load:
+        first = analytics.aging(today)
+        overdue_total = first['amount'].sum()
+        PortfolioAnalytics(session).collection_rate(as_of=today)
+        analytics.aging(today)
+        assert load.call_count == 1
+
+        # Returned frames are copies; callers cannot corrupt the cache
+        first.loc[0, 'amount'] = -1
+        assert analytics.aging(today).loc[0, 'amount'] != -1
+
+        unpaid = session.query(Installment).filter(Installment.status == 'overdue').first()
+        session.execute(update(Installment).where(Installment.id == unpaid.id).values(
+            status='paid', payment_date=TODAY - timedelta(days=1)))
+        session.commit()
+        after = analytics.aging(today)
+        assert load.call_count == 2
+        assert after['amount'].sum() == overdue_total - unpaid.amount
+
+    user_ids = sorted({row.user_id for row in rows})
+    per_user = [PortfolioAnalytics(session, uid).aging(today)['amount'].sum() for uid in user_ids]
+    assert sum(per_user) == analytics.aging(today)['amount'].sum()
+
+    report = ReportGenerator(session).generate_aging_report(as_of=today)
+    assert report.columns[0] == 'بازه معوق (روز)'
+    print("✓ Cache and data version")
+
+    # Column loads go through the engine, so statement hooks see them
+    statements = []
+    event.listen(engine, 'after_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    session.execute(update(Installment).where(Installment.id == unpaid.id).values(notes='x'))
+    session.commit()
+    statements.clear()
+    analytics.aging(today)
+    assert any('installments.due_date' in statement and 'installments.status' in statement
+               for statement in statements), statements
+    print("✓ Column loads are instrumented")
+
+
+if __name__ == '__main__':
+    try:
+        test_matches_reference()
+        test_cache()
+        print("\n✅ All portfolio analytics tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Test the UI responsiveness profiler"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.controllers import PolicyBalanceController
+from src.utils.profiler import (Profiler, StallMonitor, instrument_class, instrument_application,
+                                install_sql_spans, uninstrument_all, sql_span_name)
+
+
+def make_book(policies=40, installments=12):
+    """In-memory database with one user's book"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='prof', password_hash='x', full_name='Profile Test')
+    session.add(user)
+    session.flush()
+    due = datetime.now() - timedelta(days=40)
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id, 'policy_number': f'PF-{p:03d}', 'policy_holder_name': 'تست',
+         'total_amount': 1200000, 'start_date': due, 'end_date': due + timedelta(days=365)}
+        for p in range(policies)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 100000,
+         'due_date': due + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(policies) for n in range(installments)
+    ])
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+    return session, user.id
+
+
+def find(nodes, name):
+    """Depth-first search of a breakdown for a node name"""
+    for node in nodes:
+        if node['name'] == name:
+            return node
+        found = find(node['children'], name)
+        if found:
+            return found
+    return None
+
+
+def test_nested_spans():
+    """Spans nest, self time excludes children and disabled spans cost nothing"""
+    profiler = Profiler()
+
+    class Worker:
+        def outer(self):
+            time.sleep(0.01)
+            self.inner()
+            return 'done'
+
+        def inner(self):
+            time.sleep(0.02)
+
+        def row(self):
+            pass
+
+    instrument_class(Worker, 'ui', lambda n: n in ('outer', 'inner'), profiler)
+    instrument_class(Worker, 'table', lambda n: n == 'row', profiler, emit=False)
+    try:
+        assert Worker().outer() == 'done'
+        assert not profiler.paths  # disabled: nothing recorded
+
+        profiler.enabled = True
+        Worker().outer()
+        for _ in range(100):
+            Worker().row()
+        with profiler.span('block'):
+            pass
+
+        outer = find(profiler.breakdown(), 'Worker.outer')
+        inner = outer['children'][0]
+        assert inner['name'] == 'Worker.inner' and inner['total_ms'] >= 20
+        assert outer['total_ms'] >= inner['total_ms'] + 10
+        assert abs(outer['self_ms'] - (outer['total_ms'] - inner['total_ms'])) < 0.01
+        assert find(profiler.breakdown(), 'Worker.row')['calls'] == 100
+        names = [e[0] for e in profiler.events]
+        assert names.count('Worker.row') == 0 and 'block' in names
+    finally:
+        uninstrument_all()
+    assert not getattr(Worker.outer, '__profiled__', False)
+    print("✓ Nested spans with self time")
+
+
+def test_refresh_breakdown_and_trace():
+    """refresh paths break down into controller, SQL, table and Jalali time"""
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ui.installment_widget import InstallmentWidget
+    from src.ui.overdue_installments_widget import OverdueInstallmentsWidget
+    from src.models import User as UserModel
+
+    session, user_id = make_book()
+    profiler = Profiler()
+    instrument_application(profiler)
+    install_sql_spans(session.get_bind(), profiler)
+    try:
+        user = session.get(UserModel, user_id)
+        installments = InstallmentWidget(user, session)
+        overdue = OverdueInstallmentsWidget(user, session)
+
+        profiler.enabled = True
+        installments.refresh()
+        overdue.refresh()
+        profiler.enabled = False
+
+        tree = profiler.breakdown()
+        refresh = find(tree, 'InstallmentWidget.refresh')
+        load = find(refresh['children'], 'InstallmentWidget.load_installments')
+        categories = {child['category'] for child in load['children']}
+        assert {'sql', 'table'} <= categories, categories
+        assert find(load['children'], 'InstallmentWidget.set_installment_row')['calls'] == 480
+        assert find(tree, 'PersianDateConverter.gregorian_to_jalali') is not None
+        assert find(tree, 'OverdueInstallmentsWidget.load_overdue_installments') is not None
+
+        path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+        profiler.write_chrome_trace(path)
+        with open(path, encoding='utf-8') as f:
+            trace = json.load(f)
+        spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        assert spans and all('ts' in e and 'dur' in e and 'tid' in e for e in spans)
+        assert any(e['cat'] == 'sql' and e['name'].startswith('SELECT') for e in spans)
+        assert not any(e['name'] == 'InstallmentWidget.set_installment_row' for e in spans)
+        print(f"✓ Breakdown and trace ({len(spans)} spans):\n{profiler.format_breakdown(min_ms=0.5)}")
+    finally:
+        uninstrument_all()
+        session.close()
+
+
+def test_stall_detection():
+    """A blocked event loop is reported with the span that blocked it"""
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer, QEventLoop
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    profiler = Profiler()
+    profiler.enabled = True
+    monitor = StallMonitor(profiler, threshold_ms=100, interval_ms=20)
+
+    def block():
+        with profiler.span('slow handler'):
+            time.sleep(0.3)
+
+    loop = QEventLoop()
+    QTimer.singleShot(50, block)
+    QTimer.singleShot(600, loop.quit)
+    loop.exec_()
+    monitor.stop()
+
+    assert profiler.stalls, "no stall detected"
+    stall = max(profiler.stalls, key=lambda s: s['dur_ns'])
+    assert stall['dur_ns'] >= 250e6 and stall['during'] == ['slow handler']
+    assert any(e[1] == 'stall' for e in profiler.events)
+    print(f"✓ Stall of {stall['dur_ns'] / 1e6:.0f} ms attributed to {stall['during']}")
+
+
+def test_sql_span_names():
+    assert sql_span_name("SELECT a FROM installments JOIN policies") == "SELECT installments"
+    assert sql_span_name("UPDATE policy_balances SET x=1") == "UPDATE policy_balances"
+    assert sql_span_name("INSERT INTO reminders (a) VALUES (?)") == "INSERT reminders"
+    print("✓ SQL span names")
+
+
+if __name__ == '__main__':
+    try:
+        test_sql_span_names()
+        test_nested_spans()
+        test_refresh_breakdown_and_trace()
+        test_stall_detection()
+        print("\n✅ All profiler tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
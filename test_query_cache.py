@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Test the query-result cache and its data-version invalidation"""
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, insert, update, text
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.controllers import InstallmentController, PolicyController
+from src.utils.query_cache import QueryCache, get_query_cache, table_version
+from src.utils.report_generator import ReportGenerator
+
+DUE = datetime(2024, 5, 1)
+
+
+def make_book(url='sqlite:///:memory:', policies=20):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='cache', password_hash='x', full_name='Cache Test')
+    session.add(user)
+    session.flush()
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id, 'policy_number': f'QC-{p:04d}', 'policy_holder_name': 'تست',
+         'total_amount': 3000000, 'start_date': DUE, 'end_date': DUE + timedelta(days=365)}
+        for p in range(policies)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 1000000,
+         'due_date': DUE + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(policies) for n in range(3)
+    ])
+    session.commit()
+    return engine, session, user
+
+
+class StatementCounter:
+    """Counts statements other than the data_version check"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if 'data_version' not in statement:
+            self.count += 1
+
+
+def test_hits_and_invalidation():
+    """Unchanged tables are served from memory; any write to them recomputes"""
+    engine, session, user = make_book()
+    statements = StatementCounter(engine)
+    installments = InstallmentController(session)
+    policies = PolicyController(session)
+
+    first = installments.get_installment_statistics(user.id)
+    assert first['total_pending'] == 60 * 1000000
+    executed = statements.count
+    first['total'] = -1  # callers get private copies
+    for _ in range(5):
+        assert installments.get_installment_statistics(user.id)['total'] == 60
+        assert policies.get_policy_statistics(user.id)['total_policies'] == 20
+    assert statements.count == executed + 1  # only the first policy statistics query
+    print("✓ Repeated reads run no queries")
+
+    # Controller write
+    target = session.query(Installment).first()
+    installments.mark_as_paid(target.id)
+    assert installments.get_installment_statistics(user.id)['total_paid'] == 1000000
+
+    # Raw Core write bypassing the controllers
+    version = table_version('installments')
+    session.execute(update(Installment).where(Installment.policy_id == 2).values(status='overdue'))
+    session.commit()
+    assert table_version('installments') > version
+    assert installments.get_installment_statistics(user.id)['total_overdue'] == 3 * 1000000
+
+    # Raw SQL text bumps every table
+    session.execute(text("UPDATE policies SET status = 'cancelled' WHERE id = 3"))
+    session.commit()
+    assert policies.get_policy_statistics(user.id)['active_policies'] == 19
+
+    # Results of tables that were not written stay cached
+    reports = ReportGenerator(session)
+    assert len(reports.generate_payment_statistics()) == 1
+    policies.update_policy(4, {'policy_holder_name': 'تغییر'})
+    statements.count = 0
+    reports.generate_payment_statistics()
+    assert statements.count == 0
+    print("✓ Controller, Core and raw SQL writes invalidate")
+    session.close()
+
+
+def test_other_connections_and_disk():
+    """Commits by another connection are noticed; the disk tier survives a restart"""
+    directory = tempfile.mkdtemp()
+    try:
+        url = f"sqlite:///{os.path.join(directory, 'book.db')}"
+        engine, session, user = make_book(url)
+        cache = QueryCache(disk_dir=os.path.join(directory, 'cache'))
+        calls = []
+
+        def pending_total():
+            calls.append(1)
+            return session.execute(text(
+                "SELECT sum(amount) FROM installments WHERE status = 'pending'")).scalar()
+
+        def cached_total(c=cache):
+            value = c.get(session, 'pending_total', (), ('installments',), pending_total)
+            session.commit()
+            return value
+
+        assert cached_total() == 60 * 1000000 and cached_total() == 60 * 1000000
+        assert len(calls) == 1
+
+        # Another process (modelled by a second engine the cache never saw)
+        other = create_engine(url)
+        with other.begin() as conn:
+            conn.execute(text("UPDATE installments SET status = 'paid', "
+                              "updated_at = '2030-01-01 00:00:00' WHERE id = 1"))
+        other.dispose()
+        assert cached_total() == 59 * 1000000 and len(calls) == 2
+
+        # A new cache with the same directory reads the result from disk
+        restarted = QueryCache(disk_dir=cache.disk_dir)
+        assert cached_total(restarted) == 59 * 1000000
+        assert len(calls) == 2 and restarted.disk_hits == 1
+
+        # ... unless the table changed since it was written
+        session.execute(text("DELETE FROM installments WHERE id = 2"))
+        session.commit()
+        fresh = QueryCache(disk_dir=cache.disk_dir)
+        assert cached_total(fresh) == 58 * 1000000 and len(calls) == 3
+        print("✓ Other connections and the disk tier")
+        session.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_limits():
+    """The LRU keeps at most max_entries results and max_bytes of pickled data"""
+    engine, session, user = make_book(policies=1)
+    cache = QueryCache(max_entries=3, max_bytes=10_000)
+    for i in range(5):
+        cache.get(session, 'numbers', (i,), ('installments',), lambda i=i: list(range(i)))
+    assert cache.stats()['entries'] == 3
+    cache.get(session, 'numbers', (4,), ('installments',), lambda: None)
+    assert cache.hits == 1
+
+    cache.get(session, 'big', (), ('installments',), lambda: b'x' * 6000)
+    cache.get(session, 'big', (1,), ('installments',), lambda: b'x' * 6000)
+    assert cache.stats()['bytes'] <= 10_000
+    cache.get(session, 'huge', (), ('installments',), lambda: b'x' * 20_000)
+    assert cache.stats()['bytes'] <= 10_000
+    print("✓ Entry and byte limits")
+    session.close()
+
+
+def test_views_use_cache():
+    """Dashboard and calendar refreshes reuse cached results"""
+    from PyQt5.QtWidgets import QApplication
+    from src.ui.dashboard_widget import DashboardWidget
+    from src.ui.calendar_widget import CalendarWidget
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    engine, session, user = make_book(policies=50)
+    dashboard = DashboardWidget(user, session)
+    calendar = CalendarWidget(user, session)
+    cache = get_query_cache()
+
+    hits = cache.hits
+    dashboard.refresh()
+    calendar.refresh()
+    assert cache.hits - hits >= 4  # policy, installment and payment statistics, calendar map
+
+    InstallmentController(session).mark_as_paid(1)
+    calendar.refresh()
+    assert 'paid' in calendar.statuses_by_date[DUE.date()]
+    calendar.status_filter.setCurrentText("پرداخت شده")
+    calendar.apply_filters()
+    assert list(calendar.statuses_by_date) == [DUE.date()]
+    print("✓ Dashboard and calendar refreshes hit the cache")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_hits_and_invalidation()
+        test_other_connections_and_disk()
+        test_limits()
+        test_views_use_cache()
+        print("\n✅ All query cache tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Test query timing instrumentation"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment, session_scope
+from src.controllers import InstallmentController, PolicyBalanceController
+from src.utils.query_stats import QueryStats, normalize_statement, OTHER_STATEMENT
+
+
+def make_book(stats, policies=30, installments=12):
+    """In-memory database with timing hooks installed"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    stats.install(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='stats', password_hash='x', full_name='Stats Test')
+    session.add(user)
+    session.flush()
+    due = datetime.now() + timedelta(days=10)
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id, 'policy_number': f'QS-{p:03d}', 'policy_holder_name': 'تست',
+         'total_amount': 1200000, 'start_date': due, 'end_date': due + timedelta(days=365)}
+        for p in range(policies)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 100000,
+         'due_date': due + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(policies) for n in range(installments)
+    ])
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+    return session, user.id
+
+
+def test_normalize():
+    """Whitespace and IN-list lengths do not split statements"""
+    a = normalize_statement("SELECT id FROM t\n  WHERE id IN (?, ?, ?)")
+    b = normalize_statement("SELECT id FROM t WHERE id IN (?,?)")
+    assert a == b == "SELECT id FROM t WHERE id IN (?, ...)"
+    print("✓ Statements normalized")
+
+
+def test_histogram_and_totals():
+    """Every execution is counted once with its latency bucketed"""
+    stats = QueryStats(slow_query_ms=10_000)
+    session, user_id = make_book(stats)
+    stats.reset()
+
+    for _ in range(20):
+        session.execute(text("SELECT COUNT(*) FROM installments")).scalar()
+    snapshot = stats.snapshot()
+    entry = next(s for s in snapshot['statements'] if s['statement'] == "SELECT COUNT(*) FROM installments")
+    assert entry['count'] == 20
+    assert sum(entry['histogram'].values()) == 20
+    assert 0 < entry['p50_ms'] <= entry['p95_ms']
+    assert snapshot['totals']['queries'] == 20 and snapshot['slow_queries'] == []
+
+    stats.enabled = False
+    session.execute(text("SELECT 1"))
+    assert stats.snapshot()['totals']['queries'] == 20
+    print(f"✓ Histogram: {entry['histogram']}")
+    session.close()
+
+
+def test_slow_query_log_has_plan():
+    """Slow SELECTs are logged with their query plan"""
+    stats = QueryStats(slow_query_ms=0, slow_log_size=5)
+    session, user_id = make_book(stats)
+    stats.reset()
+
+    session.execute(text("SELECT * FROM installments WHERE policy_id = :p"), {'p': 3}).all()
+    slow = stats.snapshot()['slow_queries']
+    assert len(slow) == 1
+    assert slow[0]['plan'] and any('installments' in line for line in slow[0]['plan'])
+    assert slow[0]['action'] is None
+
+    for _ in range(10):
+        session.execute(text("SELECT 1"))
+    assert len(stats.snapshot()['slow_queries']) == 5  # bounded
+    assert stats.snapshot()['totals']['queries'] == 11  # EXPLAIN itself is not counted
+    print(f"✓ Slow query plan: {slow[0]['plan']}")
+    session.close()
+
+
+def test_queries_per_action():
+    """Queries are attributed to every running action, nested ones included"""
+    stats = QueryStats(slow_query_ms=0)
+    session, user_id = make_book(stats)
+    stats.reset()
+
+    with mock.patch('src.utils.NotificationManager'), stats.action('refresh_all'):
+        with stats.action('installments.mark_paid'):
+            with session_scope(session) as uow:
+                assert InstallmentController(uow).mark_as_paid(5)[0]
+        session.execute(text("SELECT 1"))
+
+    actions = {a['action']: a for a in stats.snapshot()['actions']}
+    paid = actions['installments.mark_paid']
+    assert paid['runs'] == 1 and paid['last_queries'] > 0
+    assert actions['refresh_all']['queries'] == paid['queries'] + 1
+    assert any(q['action'] == 'installments.mark_paid' for q in stats.snapshot()['slow_queries'])
+    print(f"✓ mark_as_paid issued {paid['queries']} queries")
+    session.close()
+
+
+def test_statement_cap_and_json():
+    """Distinct statements are capped and the snapshot round-trips through JSON"""
+    import src.utils.query_stats as query_stats
+
+    stats = QueryStats(slow_query_ms=10_000)
+    with mock.patch.object(query_stats, 'MAX_STATEMENTS', 3):
+        for n in range(6):
+            stats.record(f"SELECT {n}", 1.0)
+    keys = [s['statement'] for s in stats.snapshot()['statements']]
+    assert len(keys) == 4 and OTHER_STATEMENT in keys
+
+    path = os.path.join(tempfile.mkdtemp(), 'stats.json')
+    stats.dump_json(path)
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['totals']['queries'] == 6
+    assert set(data) >= {'statements', 'slow_queries', 'actions', 'totals'}
+    print("✓ Statement cap and JSON dump")
+
+
+def test_diagnostics_dialog():
+    """The diagnostics dialog renders all three tables"""
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ui.diagnostics_dialog import DiagnosticsDialog
+
+    stats = QueryStats(slow_query_ms=0)
+    session, user_id = make_book(stats, policies=2)
+    with stats.action('installments.refresh'):
+        session.execute(text("SELECT * FROM policies")).all()
+
+    dialog = DiagnosticsDialog(stats=stats)
+    assert dialog.statements_table.rowCount() == len(stats.snapshot()['statements'])
+    assert dialog.slow_table.rowCount() > 0
+    assert dialog.actions_table.rowCount() == 1
+    dialog.reset_stats()
+    assert dialog.statements_table.rowCount() == 0
+    print("✓ Diagnostics dialog")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_normalize()
+        test_histogram_and_totals()
+        test_slow_query_log_has_plan()
+        test_queries_per_action()
+        test_statement_cap_and_json()
+        test_diagnostics_dialog()
+        print("\n✅ All query statistics tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
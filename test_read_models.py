@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Test tuple and column-batch read models for table views"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment, Reminder
+from src.models.read_models import (InstallmentRow, ReminderRow, installment_rows,
+                                    reminder_rows, fetch_rows, fetch_columns)
+
+
+def make_book(policies, installments):
+    """In-memory database with one user's book"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='rows', password_hash='x', full_name='Rows Test')
+    session.add(user)
+    session.flush()
+    start = datetime(2024, 3, 1)
+    session.execute(insert(InsurancePolicy), [
+        {'user_id': user.id, 'policy_number': f'RM-{p:05d}', 'policy_holder_name': 'تست',
+         'policy_type': 'بدنه', 'total_amount': 1200000, 'start_date': start,
+         'end_date': start + timedelta(days=365)}
+        for p in range(policies)
+    ])
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 100000,
+         'due_date': start + timedelta(days=30 * n), 'status': 'paid' if n == 0 else 'pending'}
+        for p in range(policies) for n in range(installments)
+    ])
+    session.commit()
+    return session, user.id
+
+
+def test_rows_and_batches():
+    """Rows are plain named tuples; batches hold one list per column"""
+    session, user_id = make_book(3, 4)
+
+    rows = fetch_rows(session, installment_rows(user_id).order_by(Installment.id), InstallmentRow)
+    assert len(rows) == 12
+    first = rows[0]
+    assert isinstance(first, tuple) and not hasattr(first, '__dict__')
+    assert first.policy_number == 'RM-00000' and first.policy_id == 1
+    assert first.status == 'paid' and first.policy_type == 'بدنه'
+    assert len(session.identity_map) == 0  # rows are not tracked
+
+    batch = fetch_columns(session, select(Installment.due_date, Installment.status))
+    assert len(batch) == 12 and batch.status.count('paid') == 3
+    assert batch.names == ('due_date', 'status')
+
+    session.add(Reminder(user_id=user_id, reminder_type='sms', title='t',
+                         scheduled_date=datetime.now(), recipient_phone='0912'))
+    session.commit()
+    reminders = fetch_rows(session, reminder_rows(user_id), ReminderRow)
+    assert reminders[0].recipient_phone == '0912' and reminders[0].status == 'pending'
+
+    empty = fetch_columns(session, select(Installment.id).where(Installment.id < 0))
+    assert len(empty) == 0 and empty.id == []
+    print("✓ Named tuple rows and column batches")
+    session.close()
+
+
+def test_cheaper_than_orm():
+    """Rows use a fraction of the memory and time of ORM entity pairs"""
+    session, user_id = make_book(1000, 12)
+    engine = session.get_bind()
+
+    def measure(load):
+        fresh = sessionmaker(bind=engine)()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = load(fresh)
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        fresh.close()
+        return len(result), elapsed, size
+
+    orm_count, orm_time, orm_size = measure(lambda s: s.query(Installment, InsurancePolicy).join(
+        InsurancePolicy).filter(InsurancePolicy.user_id == user_id).all())
+    row_count, row_time, row_size = measure(lambda s: fetch_rows(
+        s, installment_rows(user_id), InstallmentRow))
+
+    assert orm_count == row_count == 12000
+    assert row_size * 2 < orm_size, f"{row_size} vs {orm_size} bytes"
+    assert row_time < orm_time, f"{row_time:.3f}s vs {orm_time:.3f}s"
+    print(f"✓ 12000 rows: {row_size // 1024} KB / {row_time * 1000:.0f} ms "
+          f"vs ORM {orm_size // 1024} KB / {orm_time * 1000:.0f} ms")
+    session.close()
+
+
+def test_views_use_rows():
+    """Calendar, overdue and installment views render from read models"""
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QDate
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ui.calendar_widget import CalendarWidget
+    from src.ui.overdue_installments_widget import OverdueInstallmentsWidget
+    from src.ui.installment_widget import InstallmentWidget
+
+    session, user_id = make_book(5, 3)
+    user = session.get(User, user_id)
+
+    calendar = CalendarWidget(user, session)
+    assert calendar.statuses_by_date[datetime(2024, 3, 1).date()] == {'paid'}
+    calendar.date_selected(QDate(2024, 3, 31))
+    assert calendar.installments_list.count() == 5
+    assert 'RM-00000' in calendar.installments_list.item(0).text()
+
+    overdue = OverdueInstallmentsWidget(user, session)
+    assert overdue.tree.topLevelItemCount() == 5
+    overdue.tree.topLevelItem(0).setExpanded(True)
+    assert overdue.tree.topLevelItem(0).childCount() == 2
+
+    installments = InstallmentWidget(user, session)
+    installments.date_filter.setCurrentText("همه اقساط")
+    installments.load_installments()
+    assert installments.table.rowCount() == 15
+    assert installments.row_policy_ids[:5] == [1, 2, 3, 4, 5]
+    print("✓ Views render from read-model rows")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_rows_and_batches()
+        test_cheaper_than_orm()
+        test_views_use_rows()
+        print("\n✅ All read model tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
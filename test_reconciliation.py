@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Test bank statement reconciliation"""
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.controllers import ReconciliationController
+from src.utils.statement_reader import (iter_statement_chunks, parse_amount,
+                                        parse_statement_date, normalize_mobile)
+
+
+def make_session():
+    """Create an in-memory database session with one user"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='recon', password_hash='x', full_name='Recon Test')
+    session.add(user)
+    session.commit()
+    return session, user
+
+
+def add_policy(session, user, number, mobile, amounts, first_due):
+    """Add a policy with monthly pending installments"""
+    policy = InsurancePolicy(
+        user_id=user.id, policy_number=number, policy_holder_name='تست',
+        mobile_number=mobile, total_amount=sum(amounts),
+        start_date=first_due, end_date=first_due + timedelta(days=365)
+    )
+    session.add(policy)
+    session.flush()
+    for i, amount in enumerate(amounts, start=1):
+        session.add(Installment(
+            policy_id=policy.id, installment_number=i, amount=amount,
+            due_date=first_due + timedelta(days=30 * (i - 1)), status='pending'
+        ))
+    session.commit()
+    return policy
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['تاریخ', 'مبلغ', 'شماره پیگیری', 'شرح'])
+        writer.writerows(rows)
+
+
+def test_statement_parsing():
+    """Amounts, Jalali/Gregorian dates and mobiles are normalized"""
+    assert parse_amount('۱٬۲۵۰٬۰۰۰ ریال') == 1250000
+    assert parse_amount('1,250,000') == 1250000
+    assert parse_statement_date('1403/01/01') == datetime(2024, 3, 20).date()
+    assert parse_statement_date('2024-08-02') == datetime(2024, 8, 2).date()
+    assert normalize_mobile('واریز از +98 912 345 6789') == '09123456789'
+    print("✓ Statement fields are normalized")
+
+
+def test_reconciliation():
+    """Lines match by reference, policy, mobile and amount/date; ambiguous ones are queued"""
+    session, user = make_session()
+    due = datetime(2024, 5, 1)
+    p1 = add_policy(session, user, 'P-100', '09120000001', [1000000, 1000000], due)
+    add_policy(session, user, 'P-200', '09120000002', [2500000], due)
+    add_policy(session, user, 'P-300', '09120000003', [777000, 777000], due)
+    add_policy(session, user, 'P-400', None, [555000], due)
+    add_policy(session, user, 'P-500', None, [555000], due + timedelta(days=2))
+    inst_ref = session.query(Installment).filter_by(policy_id=p1.id, installment_number=2).one()
+    inst_ref.transaction_reference = 'PRE-REF'
+    session.commit()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'statement.csv')
+        write_csv(path, [
+            ['1403/02/12', '1,000,000', 'PRE-REF', ''],                      # reference
+            ['1403/02/12', '1,000,000', 'T1', 'قسط بیمه نامه P-100'],         # policy number
+            ['1403/02/12', '2,500,000', 'T2', 'واریز از 09120000002'],        # mobile
+            ['1403/02/11', '777,000', 'T3', ''],                              # amount/date
+            ['1403/02/12', '555,000', 'T4', ''],                              # ambiguous
+            ['1403/02/12', '999,000', 'T5', 'P-300'],                         # amount mismatch
+            ['1403/02/12', '123,456', 'T6', ''],                              # unmatched
+            ['1403/02/12', '1,000,000', 'T1', 'P-100'],                       # duplicate ref
+        ])
+
+        controller = ReconciliationController(session)
+        success, message, summary = controller.reconcile(path, chunk_size=3)
+        assert success, message
+
+    methods = {m['row_number']: m['method'] for m in controller.matches}
+    assert methods == {2: 'reference', 3: 'policy_number', 4: 'mobile', 5: 'amount_date'}
+    assert {e['row_number']: e['reason'] for e in controller.review_queue} == {
+        6: 'ambiguous_amount_date', 7: 'amount_mismatch'}
+    assert summary['unmatched'] == 1 and summary['duplicates'] == 1
+    print("✓ Matching by reference, policy, mobile and amount/date window")
+
+    # Resolve the ambiguous line and apply everything in one batch
+    ambiguous = controller.review_queue[0]
+    success, _ = controller.confirm(6, ambiguous['candidates'][0])
+    assert success
+    assert not controller.confirm(7, ambiguous['candidates'][0])[0]
+    with mock.patch('src.utils.NotificationManager'):
+        success, message, result = controller.apply()
+    assert success, message
+    assert len(result['paid']) == 5
+    assert sorted(result['completed_policies']) == ['P-100', 'P-200', 'P-400']
+    paid = session.query(Installment).filter_by(transaction_reference='T3').one()
+    assert paid.status == 'paid' and paid.payment_date == datetime(2024, 4, 30)
+    print("✓ Confirmed matches are applied in bulk")
+
+    session.close()
+
+
+def test_large_statement():
+    """A 100k-line statement is processed in seconds"""
+    session, user = make_session()
+    due = datetime(2024, 5, 1)
+    for i in range(2000):
+        add_policy(session, user, f'L-{i:05d}', f'0912{i:07d}', [1000000 + i] * 5, due)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'large.csv')
+        rows = []
+        for n in range(100000):
+            i = n % 2000
+            rows.append(['1403/02/12', str(1000000 + i), f'BIG-{n}', f'L-{i:05d}'])
+        write_csv(path, rows)
+
+        assert sum(len(c) for c in iter_statement_chunks(path, 10000)) == 100000
+
+        controller = ReconciliationController(session)
+        start = time.perf_counter()
+        success, message, summary = controller.reconcile(path)
+        elapsed = time.perf_counter() - start
+
+    assert success, message
+    assert summary['matched'] == 10000
+    assert summary['unmatched'] + summary['review'] == 90000
+    assert elapsed < 15, f"took {elapsed:.1f}s"
+    print(f"✓ 100k-line statement reconciled in {elapsed:.2f}s")
+
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_statement_parsing()
+        test_reconciliation()
+        test_large_statement()
+        print("\n✅ All reconciliation tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Test that the column-wise report engine matches the per-row report builders"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from src.models.database import Base
+from src.models import User, InsurancePolicy, Installment
+from src.controllers import PolicyBalanceController
+from src.utils.persian_utils import PersianDateConverter
+from src.utils.report_engine import (
+    ReportEngine, INSTALLMENT_REPORT_HEADERS, INSTALLMENT_REPORT_DTYPES,
+    POLICY_SUMMARY_HEADERS, POLICY_SUMMARY_DTYPES, PAYMENT_STATISTICS_HEADERS
+)
+
+
+def make_book():
+    """Small book: paid, pending, overdue and cancelled installments, NULL payment
+    dates and methods, a policy without a type and one without installments"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='reports', password_hash='x', full_name='Report Test')
+    session.add(user)
+    session.flush()
+
+    policies = [
+        InsurancePolicy(user_id=user.id, policy_number='RE-001', policy_holder_name='علی رضایی',
+                        policy_type='Third Party', total_amount=3000000,
+                        start_date=datetime(2024, 3, 20), end_date=datetime(2025, 3, 20)),
+        InsurancePolicy(user_id=user.id, policy_number='RE-002', policy_holder_name='مریم احمدی',
+                        policy_type='Body', total_amount=2500000,
+                        start_date=datetime(2024, 1, 10), end_date=datetime(2025, 1, 10)),
+        InsurancePolicy(user_id=user.id, policy_number='RE-003', policy_holder_name='رضا کریمی',
+                        total_amount=1000000,
+                        start_date=datetime(2024, 6, 1), end_date=datetime(2025, 6, 1)),
+        InsurancePolicy(user_id=user.id, policy_number='RE-004', policy_holder_name='سارا نوری',
+                        policy_type='Fire', total_amount=5000000, status='cancelled',
+                        start_date=datetime(2024, 2, 1), end_date=datetime(2025, 2, 1)),
+    ]
+    session.add_all(policies)
+    session.flush()
+    first, second, third, _ = policies
+
+    session.add_all([
+        # Paid on the last day of a Jalali month and on the first of the next
+        Installment(policy_id=first.id, installment_number=1, amount=1000000,
+                    due_date=datetime(2024, 4, 20), status='paid',
+                    payment_date=datetime(2024, 4, 19, 16, 30), payment_method='card'),
+        Installment(policy_id=first.id, installment_number=2, amount=1000000,
+                    due_date=datetime(2024, 5, 20), status='paid',
+                    payment_date=datetime(2024, 4, 20, 9, 0), payment_method='cash'),
+        Installment(policy_id=first.id, installment_number=3, amount=1000000,
+                    due_date=datetime(2024, 6, 20), status='pending'),
+        Installment(policy_id=second.id, installment_number=1, amount=1250000,
+                    due_date=datetime(2024, 2, 10), status='overdue'),
+        # Paid without a recorded payment date
+        Installment(policy_id=second.id, installment_number=2, amount=1250000,
+                    due_date=datetime(2024, 3, 10), status='paid', payment_method='transfer'),
+        Installment(policy_id=third.id, installment_number=1, amount=400000,
+                    due_date=datetime(2024, 7, 1), status='cancelled'),
+        Installment(policy_id=third.id, installment_number=2, amount=600000,
+                    due_date=datetime(2024, 8, 1), status='paid',
+                    payment_date=datetime(2024, 3, 19), payment_method='card'),
+    ])
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+    return session, user
+
+
+# The per-row builders the engine replaced, kept as the reference output
+
+def per_row_installment_report(session, status=None):
+    query = session.query(
+        Installment,
+        InsurancePolicy.policy_number,
+        InsurancePolicy.policy_holder_name,
+        InsurancePolicy.policy_type
+    ).join(InsurancePolicy)
+    if status:
+        query = query.filter(Installment.status == status)
+
+    data = []
+    for inst, policy_num, holder_name, policy_type in query.all():
+        data.append({
+            'شماره بیمه‌نامه': policy_num,
+            'نام بیمه‌گذار': holder_name,
+            'نوع بیمه': policy_type,
+            'شماره قسط': inst.installment_number,
+            'مبلغ': inst.amount,
+            'تاریخ سررسید': PersianDateConverter.gregorian_to_jalali(inst.due_date) if inst.due_date else '',
+            'تاریخ پرداخت': PersianDateConverter.gregorian_to_jalali(inst.payment_date) if inst.payment_date else '',
+            'وضعیت': inst.status,
+            'روش پرداخت': inst.payment_method
+        })
+    return pd.DataFrame(data)
+
+
+def per_row_policy_summary(session, user_id):
+    query = session.query(
+        InsurancePolicy,
+        func.count(Installment.id).label('total_installments'),
+        func.sum(Installment.amount).filter(Installment.status == 'paid').label('total_paid'),
+        func.sum(Installment.amount).filter(Installment.status == 'pending').label('total_pending')
+    ).outerjoin(Installment).group_by(InsurancePolicy.id)
+    query = query.filter(InsurancePolicy.user_id == user_id)
+
+    data = []
+    for policy, total_inst, paid, pending in query.all():
+        data.append({
+            'شماره بیمه‌نامه': policy.policy_number,
+            'نام بیمه‌گذار': policy.policy_holder_name,
+            'نوع بیمه': policy.policy_type,
+            'مبلغ کل': policy.total_amount,
+            'تعداد اقساط': total_inst or 0,
+            'مجموع پرداخت شده': paid or 0,
+            'مجموع باقی‌مانده': pending or 0,
+            'وضعیت': policy.status
+        })
+    return pd.DataFrame(data)
+
+
+def per_row_payment_statistics(session):
+    from persiantools.jdatetime import JalaliDateTime
+
+    monthly_data = {}
+    for inst in session.query(Installment).filter(Installment.status == 'paid').all():
+        if inst.payment_date:
+            jalali = JalaliDateTime.to_jalali(inst.payment_date)
+            month_key = f"{jalali.year}/{jalali.month:02d}"
+            if month_key not in monthly_data:
+                monthly_data[month_key] = {'count': 0, 'total': 0}
+            monthly_data[month_key]['count'] += 1
+            monthly_data[month_key]['total'] += inst.amount
+
+    data = []
+    for month, stats in sorted(monthly_data.items()):
+        data.append({
+            'ماه': month,
+            'تعداد پرداخت‌ها': stats['count'],
+            'مجموع مبلغ': stats['total']
+        })
+    return pd.DataFrame(data)
+
+
+def typed(df, headers, dtypes):
+    """Reference frame with the engine's declared dtypes"""
+    return df.astype({headers[column]: dtype for column, dtype in dtypes.items()})
+
+
+def test_installment_report():
+    """Same rows, column order, Jalali strings and NULL handling as the per-row report"""
+    session, _ = make_book()
+    engine = ReportEngine(session)
+
+    df = engine.installment_report()
+    expected = per_row_installment_report(session)
+    assert list(df.columns) == list(INSTALLMENT_REPORT_HEADERS.values())
+    assert list(df.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(
+        df, typed(expected, INSTALLMENT_REPORT_HEADERS, INSTALLMENT_REPORT_DTYPES))
+    print("✓ Installment report matches the per-row builder")
+
+    for column, dtype in INSTALLMENT_REPORT_DTYPES.items():
+        assert str(df[INSTALLMENT_REPORT_HEADERS[column]].dtype) == dtype, column
+    due = df['تاریخ سررسید'].tolist()
+    assert due[0] == '1403/02/01'  # 2024-04-20
+    paid = df['تاریخ پرداخت'].tolist()
+    assert paid[0] == '1403/01/31' and paid[1] == '1403/02/01'
+    assert paid[2] == '' and paid[4] == ''  # pending, and paid without a date
+    assert all(isinstance(value, str) for value in due + paid)
+    assert df['روش پرداخت'].isna().tolist() == [False, False, True, True, False, True, False]
+    assert df['نوع بیمه'].isna().sum() == 2
+    print("✓ Dtypes, Jalali dates and NULL payment dates")
+
+    df = engine.installment_report(status='overdue')
+    pd.testing.assert_frame_equal(
+        df, typed(per_row_installment_report(session, status='overdue'),
+                  INSTALLMENT_REPORT_HEADERS, INSTALLMENT_REPORT_DTYPES))
+    print("✓ Filtered installment report matches")
+
+    df = engine.installment_report(status='no-such-status')
+    assert df.empty
+    assert list(df.columns) == list(INSTALLMENT_REPORT_HEADERS.values())
+    for column, dtype in INSTALLMENT_REPORT_DTYPES.items():
+        assert str(df[INSTALLMENT_REPORT_HEADERS[column]].dtype) == dtype, column
+    assert per_row_installment_report(session, status='no-such-status').empty
+    print("✓ Empty installment report keeps headers and dtypes")
+    session.close()
+
+
+def test_policy_summary():
+    """Balances-table summary matches the per-row aggregation"""
+    session, user = make_book()
+    engine = ReportEngine(session)
+
+    df = engine.policy_summary(user.id)
+    expected = per_row_policy_summary(session, user.id)
+    assert list(df.columns) == list(POLICY_SUMMARY_HEADERS.values())
+    assert list(df.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(
+        df, typed(expected, POLICY_SUMMARY_HEADERS, POLICY_SUMMARY_DTYPES))
+    for column, dtype in POLICY_SUMMARY_DTYPES.items():
+        assert str(df[POLICY_SUMMARY_HEADERS[column]].dtype) == dtype, column
+    # The policy without installments
+    assert df['تعداد اقساط'].tolist()[-1] == 0
+    assert df['مجموع پرداخت شده'].tolist()[-1] == 0
+    print("✓ Policy summary matches the per-row builder")
+
+    df = engine.policy_summary(user.id + 1)
+    assert df.empty
+    assert list(df.columns) == list(POLICY_SUMMARY_HEADERS.values())
+    for column, dtype in POLICY_SUMMARY_DTYPES.items():
+        assert str(df[POLICY_SUMMARY_HEADERS[column]].dtype) == dtype, column
+    print("✓ Empty policy summary keeps headers and dtypes")
+    session.close()
+
+
+def test_payment_statistics():
+    """Monthly totals match the per-row grouping; undated payments are left out"""
+    session, _ = make_book()
+    engine = ReportEngine(session)
+
+    df = engine.payment_statistics()
+    expected = per_row_payment_statistics(session)
+    assert list(df.columns) == list(PAYMENT_STATISTICS_HEADERS.values())
+    pd.testing.assert_frame_equal(df, expected)
+    assert df['ماه'].tolist() == ['1402/12', '1403/01', '1403/02']
+    assert df['تعداد پرداخت‌ها'].tolist() == [1, 1, 1]
+    assert str(df['مجموع مبلغ'].dtype) == 'int64'
+    print("✓ Payment statistics match the per-row builder")
+
+    df = engine.payment_statistics(start_date=datetime(2030, 1, 1))
+    assert df.empty
+    assert list(df.columns) == list(PAYMENT_STATISTICS_HEADERS.values())
+    print("✓ Empty payment statistics keep headers")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_installment_report()
+        test_policy_summary()
+        test_payment_statistics()
+        print("\n✅ All report engine tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Test unit-of-work and read-only session scopes"""
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import sessionmaker, selectinload
+from src.models.database import Base
+from src.models import (User, InsurancePolicy, Installment,
+                        session_scope, read_session)
+from src.controllers import PolicyController, PolicyBalanceController
+
+
+def make_session():
+    """Create an in-memory database session with one user"""
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    user = User(username='scope', password_hash='x', full_name='Scope Test')
+    session.add(user)
+    session.commit()
+    return session, user
+
+
+def count_statements(engine):
+    """Attach a statement counter to an engine"""
+    counter = {'n': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(*args):
+        counter['n'] += 1
+
+    return counter
+
+
+def test_session_scope():
+    """Unit of work commits, rolls back on error and always closes"""
+    session, user = make_session()
+    policy_data = {
+        'policy_number': 'UOW-1', 'policy_holder_name': 'تست',
+        'total_amount': 1000000, 'start_date': datetime.now(),
+        'end_date': datetime.now() + timedelta(days=365),
+    }
+
+    with session_scope(session) as uow:
+        success, _, policy = PolicyController(uow).create_policy(user.id, policy_data)
+        assert success and uow is not session
+    assert policy not in uow
+    assert session.query(InsurancePolicy).filter_by(policy_number='UOW-1').count() == 1
+
+    try:
+        with session_scope(session) as uow:
+            uow.add(InsurancePolicy(user_id=user.id, policy_number='UOW-2', policy_holder_name='x',
+                                    total_amount=1, start_date=datetime.now(), end_date=datetime.now()))
+            uow.flush()
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert session.query(InsurancePolicy).filter_by(policy_number='UOW-2').count() == 0
+    print("✓ Unit of work commits, rolls back and closes")
+    session.close()
+
+
+def test_read_session():
+    """Read sessions refuse writes and leave usable detached objects"""
+    session, user = make_session()
+    session.add(InsurancePolicy(user_id=user.id, policy_number='RO-1', policy_holder_name='تست',
+                                total_amount=1000000, start_date=datetime.now(),
+                                end_date=datetime.now() + timedelta(days=365)))
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+    counter = count_statements(session.get_bind())
+
+    with read_session(session) as reader:
+        policies = PolicyController(reader).get_all_policies(
+            user.id, options=[selectinload(InsurancePolicy.balance)]
+        )
+        policies[0].status = 'cancelled'
+        try:
+            reader.flush()
+            assert False, "read-only session flushed"
+        except InvalidRequestError:
+            pass
+    loaded = counter['n']
+
+    # Detached, yet columns and the eager-loaded balance read without SQL
+    policy = policies[0]
+    assert policy.policy_number == 'RO-1'
+    assert policy.balance is not None and policy.balance.total_remaining == 0
+    assert counter['n'] == loaded
+    assert session.query(InsurancePolicy.status).scalar() == 'active'
+    print("✓ Read session rejects flushes and keeps loaded attributes")
+    session.close()
+
+
+def test_widgets_do_not_grow_shared_session():
+    """Views load through short-lived sessions; commits cause no reload storm"""
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ui.installment_widget import InstallmentWidget
+    from src.ui.policy_widget import PolicyWidget
+
+    session, user = make_session()
+    due = datetime.now() + timedelta(days=10)
+    for p in range(100):
+        session.add(InsurancePolicy(
+            user_id=user.id, policy_number=f'MEM-{p:03d}', policy_holder_name='تست',
+            total_amount=12000000, start_date=due, end_date=due + timedelta(days=365)))
+    session.flush()
+    session.execute(insert(Installment), [
+        {'policy_id': p + 1, 'installment_number': n + 1, 'amount': 1000000,
+         'due_date': due + timedelta(days=30 * n), 'status': 'pending'}
+        for p in range(100) for n in range(12)
+    ])
+    session.commit()
+    PolicyBalanceController(session).rebuild()
+    user_id = user.id
+    session.expunge_all()
+    user = session.get(User, user_id)
+
+    installment_widget = InstallmentWidget(user, session)
+    policy_widget = PolicyWidget(user, session)
+    assert installment_widget.table.rowCount() == 1200
+    assert policy_widget.table.rowCount() == 100
+    assert len(session.identity_map) == 1
+
+    counter = count_statements(session.get_bind())
+    target = installment_widget.row_ids[0]
+    with mock.patch('src.ui.installment_widget.QMessageBox') as box, \
+            mock.patch('src.utils.NotificationManager'):
+        box.question.return_value = box.Yes
+        installment_widget.mark_paid(mock.Mock(id=target, installment_number=1))
+    statements = counter['n']
+
+    # Only the paid row and its policy are re-read; nothing else lazy-loads
+    assert statements < 30, f"{statements} statements"
+    assert len(session.identity_map) == 1
+    installment_widget.refresh()
+    assert len(session.identity_map) == 1
+    print(f"✓ Payment took {statements} statements; shared session holds only the user")
+    session.close()
+
+
+if __name__ == '__main__':
+    try:
+        test_session_scope()
+        test_read_session()
+        test_widgets_do_not_grow_shared_session()
+        print("\n✅ All session scope tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
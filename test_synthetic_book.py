@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Test the synthetic book generator and benchmark harness"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from src.models import InsurancePolicy, Installment, Reminder, PolicyBalance
+from src.utils.query_stats import QueryStats
+
+from synthetic_book import generate_book, POLICY_TYPES
+from bench_hot_paths import Context, run_scenario, compare_results
+
+TODAY = datetime(2024, 6, 1)
+
+
+def make_book(installments=2000, users=2, seed=7):
+    engine = create_engine('sqlite:///:memory:')
+    summary = generate_book(engine, installments=installments, users=users, seed=seed, today=TODAY)
+    return engine, summary
+
+
+def test_generated_counts():
+    """Exactly the requested installments, spread over policies and users"""
+    engine, summary = make_book()
+    session = sessionmaker(bind=engine)()
+
+    assert summary['installments'] == 2000
+    assert session.query(Installment).count() == 2000
+    assert session.query(InsurancePolicy).count() == summary['policies']
+    assert session.query(Reminder).count() == summary['reminders'] > 0
+    assert session.query(PolicyBalance).count() == summary['policies']
+
+    per_policy = session.query(func.count(Installment.id)).group_by(Installment.policy_id).all()
+    assert sum(count for (count,) in per_policy) == 2000
+    users = {user_id for (user_id,) in session.query(InsurancePolicy.user_id).distinct()}
+    assert len(users) == 2
+
+    types = {name for name, _, _ in POLICY_TYPES}
+    assert {t for (t,) in session.query(InsurancePolicy.policy_type).distinct()} <= types
+    print("✓ Generated book has the requested size")
+
+
+def test_statuses_follow_due_dates():
+    """Only past-due installments are paid or overdue; schedules add up to the total"""
+    engine, _ = make_book()
+    session = sessionmaker(bind=engine)()
+
+    future = session.query(Installment).filter(Installment.due_date >= TODAY)
+    assert future.filter(Installment.status != 'pending').count() == 0
+    paid = session.query(Installment).filter(Installment.status == 'paid')
+    assert paid.count() > 0
+    assert paid.filter(Installment.payment_date.is_(None)).count() == 0
+    assert session.query(Installment).filter(Installment.status == 'overdue').count() > 0
+
+    for policy in session.query(InsurancePolicy).limit(50):
+        total = sum(i.amount for i in policy.installments)
+        assert abs(total - policy.total_amount) < 1, policy.policy_number
+    print("✓ Statuses and amounts are consistent")
+
+
+def test_deterministic():
+    """The same seed gives the same book"""
+    def fingerprint(engine):
+        session = sessionmaker(bind=engine)()
+        return session.query(Installment.amount, Installment.due_date, Installment.status) \
+            .order_by(Installment.id).all()
+
+    first, _ = make_book(500, seed=11)
+    second, _ = make_book(500, seed=11)
+    third, _ = make_book(500, seed=12)
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint(third)
+    print("✓ Generation is deterministic per seed")
+
+
+def test_run_scenarios():
+    """Non-UI scenarios produce timing records with query counts"""
+    engine, _ = make_book()
+    session = sessionmaker(bind=engine)()
+    user_id = session.query(InsurancePolicy.user_id).first()[0]
+    session.close()
+
+    stats = QueryStats(explain=False)
+    stats.install(engine)
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = Context(engine, user_id, workdir)
+        try:
+            for name in ('overdue_sweep', 'report_export', 'reminder_dispatch'):
+                record = run_scenario(ctx, name, 2, stats)
+                assert record['error'] is None, record['error']
+                assert len(record['runs_s']) == 2
+                assert all(q > 0 for q in record['queries'])
+                assert record['min_s'] <= record['median_s'] <= record['max_s']
+                ctx.release()
+        finally:
+            ctx.close()
+    stats.uninstall(engine)
+    print("✓ Scenarios run and report timings")
+
+
+def test_compare_results():
+    """Regressions beyond the tolerance are flagged"""
+    def results(medians):
+        return {'books': [{'target_installments': 10000, 'scenarios': {
+            name: {'median_s': median} for name, median in medians.items()}}]}
+
+    rows = compare_results(results({'a': 1.0, 'b': 1.0, 'c': 1.0}),
+                           results({'a': 1.1, 'b': 2.0, 'd': 1.0}), tolerance=1.25)
+    assert [(name, regressed) for _, name, _, _, _, regressed in rows] == [('a', False), ('b', True)]
+    print("✓ Result comparison flags regressions")
+
+
+if __name__ == '__main__':
+    try:
+        test_generated_counts()
+        test_statuses_follow_due_dates()
+        test_deterministic()
+        test_run_scenarios()
+        test_compare_results()
+        print("\n✅ All synthetic book tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)